@@ -1,15 +1,17 @@
 # chroma_service.py
+import os
 import grpc
-import chromadb
 from concurrent import futures
-from chromadb.utils.embedding_functions import SentenceTransformerEmbeddingFunction
+from google.protobuf import json_format
 
 try:
     from . import chroma_pb2
     from . import chroma_pb2_grpc
+    from .embedding_cache import EmbeddingCache
 except ImportError:
     import chroma_pb2
     import chroma_pb2_grpc
+    from embedding_cache import EmbeddingCache
 
 import threading
 import logging
@@ -20,63 +22,236 @@ from grpc_health.v1 import health_pb2_grpc
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("chroma_service")
 
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+# Documents embedded per call on batch writes
+EMBED_BATCH_SIZE = int(os.getenv("CHROMA_EMBED_BATCH_SIZE", "256"))
+# Embedding cache: in-memory LRU entries (0 = off) and optional SQLite file
+EMBED_CACHE_SIZE = int(os.getenv("CHROMA_EMBED_CACHE_SIZE", "10000"))
+EMBED_CACHE_PATH = os.getenv("CHROMA_EMBED_CACHE_PATH") or None
+MAX_TOP_K = 20
+
+
 class ChromaService:
-    def __init__(self):
+    """
+    Collection plus embedder.
+
+    Embeddings are computed by the service, outside the write lock, so
+    concurrent writers only serialize on the collection insert itself.
+    Texts go through the embedding cache first; documents and queries that
+    carry a precomputed embedding skip both. A collection/embedder can be
+    injected (tests); by default the persistent collection with the MiniLM
+    sentence-transformer is opened.
+    """
+
+    def __init__(
+        self,
+        collection=None,
+        embedder=None,
+        batch_size: int = EMBED_BATCH_SIZE,
+        cache_size: int = EMBED_CACHE_SIZE,
+        cache_path: str = EMBED_CACHE_PATH,
+    ):
         self.lock = threading.Lock()
-        self.embedder = SentenceTransformerEmbeddingFunction(
-            model_name="sentence-transformers/all-MiniLM-L6-v2"
+        self.batch_size = max(1, batch_size)
+        if embedder is None:
+            from chromadb.utils.embedding_functions import SentenceTransformerEmbeddingFunction
+
+            embedder = SentenceTransformerEmbeddingFunction(model_name=EMBEDDING_MODEL)
+            namespace = EMBEDDING_MODEL
+        else:
+            namespace = getattr(embedder, "model_name", type(embedder).__name__)
+        self.embedder = embedder
+        self.cache = (
+            EmbeddingCache(namespace, max_entries=cache_size, disk_path=cache_path)
+            if cache_size or cache_path
+            else None
         )
-        # Simplified client initialization for latest Chroma
-        self.client = chromadb.PersistentClient(path="/app/data")
-        self.collection = self.client.get_or_create_collection(
-            name="documents",
-            embedding_function=self.embedder,
-            metadata={"hnsw:space": "cosine"}
+        if collection is None:
+            import chromadb
+
+            # Simplified client initialization for latest Chroma
+            self.client = chromadb.PersistentClient(path="/app/data")
+            collection = self.client.get_or_create_collection(
+                name="documents",
+                embedding_function=self.embedder,
+                metadata={"hnsw:space": "cosine"}
+            )
+        self.collection = collection
+
+    def embed(self, texts):
+        """Embed texts, serving repeats from the cache."""
+        if self.cache is not None:
+            return self.cache.get_or_compute(texts, self._embed_uncached)
+        return self._embed_uncached(texts)
+
+    def _embed_uncached(self, texts):
+        """Embed texts in chunks of batch_size."""
+        embeddings = []
+        for start in range(0, len(texts), self.batch_size):
+            embeddings.extend(self.embedder(list(texts[start:start + self.batch_size])))
+        return embeddings
+
+    def write(self, documents, upsert: bool = False) -> int:
+        """Embed and add (or upsert) a batch of chroma_pb2.Document."""
+        for start in range(0, len(documents), self.batch_size):
+            chunk = documents[start:start + self.batch_size]
+            texts = [doc.text for doc in chunk]
+            embeddings = self._with_precomputed(
+                texts, [list(doc.embedding) for doc in chunk]
+            )
+            metadatas = [dict(doc.metadata) for doc in chunk]
+            write = self.collection.upsert if upsert else self.collection.add
+            with self.lock:
+                write(
+                    ids=[doc.id for doc in chunk],
+                    embeddings=embeddings,
+                    documents=texts,
+                    metadatas=metadatas if any(metadatas) else None,
+                )
+        return len(documents)
+
+    def query(self, query_texts, top_k: int, where=None, query_embeddings=None):
+        """Nearest documents for each query text (or precomputed embedding)."""
+        return self.collection.query(
+            query_embeddings=self._with_precomputed(query_texts, query_embeddings),
+            n_results=top_k,
+            where=where,
+            include=["documents", "metadatas", "distances"]
         )
 
+    def _with_precomputed(self, texts, precomputed=None):
+        """Embeddings for texts, keeping any non-empty precomputed vectors."""
+        precomputed = precomputed or [None] * len(texts)
+        todo = [i for i, vector in enumerate(precomputed) if not vector]
+        if not todo:
+            return list(precomputed)
+        embedded = self.embed([texts[i] for i in todo])
+        embeddings = list(precomputed)
+        for i, vector in zip(todo, embedded):
+            embeddings[i] = vector
+        return embeddings
+
+
+def _where(request):
+    """Chroma `where` filter from an optional Struct field (None if unset)."""
+    if not request.HasField("where") or not request.where.fields:
+        return None
+    return json_format.MessageToDict(request.where)
+
+
+def _top_k(request) -> int:
+    return max(1, min(request.top_k or 1, MAX_TOP_K))
+
+
+def _fill_results(response, results, index: int) -> None:
+    """Append query `index` of a Chroma result set to a QueryResponse."""
+    if not results['documents']:
+        return
+    for doc_id, doc, meta, dist in zip(results['ids'][index],
+                                       results['documents'][index],
+                                       results['metadatas'][index],
+                                       results['distances'][index]):
+        entry = response.results.add()
+        entry.id = doc_id
+        entry.text = doc
+        if meta:
+            entry.metadata.update(meta)
+        entry.score = float(1 - dist)
+
+
 class ChromaServiceServicer(chroma_pb2_grpc.ChromaServiceServicer):
-    def __init__(self):
-        self.chroma = ChromaService()
+    def __init__(self, chroma: ChromaService = None):
+        self.chroma = chroma or ChromaService()
 
     def AddDocument(self, request, context):
-        with self.chroma.lock:
-            try:
-                metadata = dict(request.document.metadata) if request.document.metadata else {}
-                self.chroma.collection.add(
-                    documents=[request.document.text],
-                    ids=[request.document.id],
-                    metadatas=[metadata]
-                )
-                return chroma_pb2.AddDocumentResponse(success=True)
-            except Exception as e:
-                logger.error(f"Document add failed: {str(e)}")
-                context.abort(grpc.StatusCode.INTERNAL, f"Storage error: {str(e)}")
+        try:
+            self.chroma.write([request.document])
+            return chroma_pb2.AddDocumentResponse(success=True)
+        except Exception as e:
+            logger.error(f"Document add failed: {str(e)}")
+            context.abort(grpc.StatusCode.INTERNAL, f"Storage error: {str(e)}")
+
+    def AddDocuments(self, request, context):
+        return self._write_batch(request, context, upsert=False)
+
+    def UpsertDocuments(self, request, context):
+        return self._write_batch(request, context, upsert=True)
+
+    def _write_batch(self, request, context, upsert: bool):
+        documents = list(request.documents)
+        if any(not doc.id for doc in documents):
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, "Every document needs an id")
+        try:
+            count = self.chroma.write(documents, upsert=upsert)
+            return chroma_pb2.BatchWriteResponse(success=True, count=count)
+        except Exception as e:
+            logger.error(f"Batch write failed ({len(documents)} docs): {str(e)}")
+            context.abort(grpc.StatusCode.INTERNAL, f"Storage error: {str(e)}")
+
+    def DeleteDocuments(self, request, context):
+        ids = list(request.ids)
+        where = _where(request)
+        if not ids and where is None:
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, "Delete needs ids or a where filter")
+        try:
+            with self.chroma.lock:
+                self.chroma.collection.delete(ids=ids or None, where=where)
+            return chroma_pb2.DeleteDocumentsResponse(success=True)
+        except Exception as e:
+            logger.error(f"Delete failed: {str(e)}")
+            context.abort(grpc.StatusCode.INTERNAL, f"Storage error: {str(e)}")
 
     def Query(self, request, context):
         try:
-            results = self.chroma.collection.query(
-                query_texts=[request.query_text],
-                n_results=min(request.top_k, 20),
-                include=["documents", "metadatas", "distances"]
+            results = self.chroma.query(
+                [request.query_text], _top_k(request), where=_where(request),
+                query_embeddings=[list(request.query_embedding)],
             )
             response = chroma_pb2.QueryResponse()
-            
-            if not results['documents']:
-                return response
-                
-            for doc, meta, dist in zip(results['documents'][0],
-                                    results['metadatas'][0],
-                                    results['distances'][0]):
-                entry = response.results.add()
-                entry.text = doc
-                if meta:
-                    entry.metadata.update(meta)
-                entry.score = float(1 - dist)
+            _fill_results(response, results, 0)
             return response
         except Exception as e:
             logger.error(f"Query failed: {str(e)}")
             context.abort(grpc.StatusCode.INTERNAL, f"Query error: {str(e)}")
 
+    def MultiQuery(self, request, context):
+        response = chroma_pb2.MultiQueryResponse()
+        if not request.query_texts:
+            return response
+        query_texts = list(request.query_texts)
+        query_embeddings = [list(e.values) for e in request.query_embeddings]
+        if query_embeddings and len(query_embeddings) != len(query_texts):
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT,
+                          "query_embeddings must match query_texts one-to-one")
+        try:
+            results = self.chroma.query(
+                query_texts, _top_k(request), where=_where(request),
+                query_embeddings=query_embeddings or None,
+            )
+            for index in range(len(query_texts)):
+                _fill_results(response.results.add(), results, index)
+            return response
+        except Exception as e:
+            logger.error(f"Multi-query failed: {str(e)}")
+            context.abort(grpc.StatusCode.INTERNAL, f"Query error: {str(e)}")
+
+    def Embed(self, request, context):
+        response = chroma_pb2.EmbedResponse()
+        if not request.texts:
+            return response
+        try:
+            for vector in self.chroma.embed(list(request.texts)):
+                response.embeddings.add(values=vector)
+            return response
+        except Exception as e:
+            logger.error(f"Embed failed: {str(e)}")
+            context.abort(grpc.StatusCode.INTERNAL, f"Embedding error: {str(e)}")
+
+    def GetCacheStats(self, request, context):
+        if self.chroma.cache is None:
+            return chroma_pb2.CacheStatsResponse()
+        return chroma_pb2.CacheStatsResponse(**self.chroma.cache.stats())
+
 class HealthServicer(health_pb2_grpc.HealthServicer):
     def Check(self, request, context):
         return health_pb2.HealthCheckResponse(
@@ -87,17 +262,17 @@ def serve():
     server = grpc.server(futures.ThreadPoolExecutor(max_workers=8))
     chroma_pb2_grpc.add_ChromaServiceServicer_to_server(ChromaServiceServicer(), server)
     health_pb2_grpc.add_HealthServicer_to_server(HealthServicer(), server)
-    
+
     reflection.enable_server_reflection([
         chroma_pb2.DESCRIPTOR.services_by_name['ChromaService'].full_name,
         health_pb2.DESCRIPTOR.services_by_name['Health'].full_name,
         reflection.SERVICE_NAME
     ], server)
-    
+
     server.add_insecure_port("[::]:50052")
     server.start()
     logger.info("ChromaDB Service running on port 50052")
     server.wait_for_termination()
 
 if __name__ == "__main__":
-    serve()
\ No newline at end of file
+    serve()
@@ -0,0 +1,161 @@
+"""
+Embedding cache for chroma_service.
+
+Embeddings are keyed by a hash of (model namespace, text). Two tiers:
+
+- memory: bounded LRU of float32 vectors
+- disk (optional): SQLite table of float32 blobs; survives restarts and
+  refills the memory tier on hit
+
+Only texts missing from both tiers reach the model, in a single call per
+lookup, with duplicates inside a batch embedded once.
+"""
+
+import hashlib
+import logging
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence
+
+logger = logging.getLogger("chroma_service")
+
+Vector = List[float]
+
+
+def _key(namespace: str, text: str) -> bytes:
+    return hashlib.blake2b(f"{namespace}\0{text}".encode("utf-8"), digest_size=16).digest()
+
+
+class EmbeddingCache:
+    """
+    Content-hash keyed embedding cache.
+
+    Example:
+        >>> cache = EmbeddingCache("all-MiniLM-L6-v2", max_entries=10_000,
+        ...                        disk_path="/app/data/embeddings.db")
+        >>> vectors = cache.get_or_compute(texts, embedder)
+
+    Args:
+        namespace: Model identity; part of every key
+        max_entries: Memory tier size (0 disables the memory tier)
+        disk_path: SQLite file for the disk tier (None disables it)
+    """
+
+    def __init__(self, namespace: str, max_entries: int = 10_000, disk_path: Optional[str] = None):
+        self.namespace = namespace
+        self.max_entries = max(0, max_entries)
+        self._memory: "OrderedDict[bytes, array]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if disk_path:
+            try:
+                self._db = sqlite3.connect(disk_path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vector BLOB)"
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Embedding disk cache unavailable at {disk_path}: {e}")
+                self._db = None
+
+    def get_or_compute(
+        self,
+        texts: Sequence[str],
+        compute: Callable[[List[str]], Sequence[Sequence[float]]],
+    ) -> List[Vector]:
+        """Embeddings for texts, calling compute only for uncached ones."""
+        keys = [_key(self.namespace, text) for text in texts]
+        found: Dict[bytes, array] = {}
+
+        with self._lock:
+            for key in keys:
+                if key in found:
+                    continue
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+            missing = [key for key in dict.fromkeys(keys) if key not in found]
+            disk = self._disk_get(missing)
+            for key, vector in disk.items():
+                found[key] = vector
+                self._remember(key, vector)
+
+            self.disk_hits += sum(1 for key in keys if key in disk)
+            self.hits += sum(1 for key in keys if key in found and key not in disk)
+
+        todo: Dict[bytes, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                todo.setdefault(key, text)
+
+        if todo:
+            computed = compute(list(todo.values()))
+            fresh = {key: array("f", vector) for key, vector in zip(todo, computed)}
+            with self._lock:
+                self.misses += sum(1 for key in keys if key in fresh)
+                for key, vector in fresh.items():
+                    self._remember(key, vector)
+                self._disk_put(fresh)
+            found.update(fresh)
+
+        return [found[key].tolist() for key in keys]
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "entries": len(self._memory),
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _remember(self, key: bytes, vector: array) -> None:
+        if not self.max_entries:
+            return
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_get(self, keys: List[bytes]) -> Dict[bytes, array]:
+        if self._db is None or not keys:
+            return {}
+        result: Dict[bytes, array] = {}
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for key, blob in self._db.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+            ):
+                vector = array("f")
+                vector.frombytes(blob)
+                result[key] = vector
+        return result
+
+    def _disk_put(self, vectors: Dict[bytes, array]) -> None:
+        if self._db is None or not vectors:
+            return
+        try:
+            with self._db:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    ((key, vector.tobytes()) for key, vector in vectors.items()),
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding disk cache write failed: {e}")
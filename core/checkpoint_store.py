@@ -0,0 +1,274 @@
+"""
+Checkpoint storage format and retention for the SQLite checkpointer.
+
+Blobs written by SqliteSaver (checkpoints and pending writes) are framed
+with a small versioned header and compressed:
+
+    magic (4) | version (1) | codec (1) | crc32 of payload (4) | raw length (4) | payload
+
+The header lets integrity checks run on raw rows (CRC and length) without
+deserializing anything. Rows written before this format are read as-is and
+can be rewritten in place with ``migrate_rows``.
+
+Retention trims old checkpoints by age, count and byte budget, per thread
+and across the database, always keeping each thread's latest checkpoint.
+"""
+
+import logging
+import sqlite3
+import struct
+import uuid
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from langgraph.checkpoint.serde.base import SerializerProtocol
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"\x00LGC"
+FORMAT_VERSION = 1
+CODEC_NONE = 0
+CODEC_ZLIB = 1
+_HEADER = struct.Struct(">4sBBII")
+
+# Payloads smaller than this are stored uncompressed (zlib would grow them)
+MIN_COMPRESS_BYTES = 256
+
+_UUID_EPOCH = datetime(1582, 10, 15, tzinfo=timezone.utc)
+
+
+def encode_blob(data: bytes, level: int = 6) -> bytes:
+    """Frame (and compress) a serialized payload."""
+    codec, payload = CODEC_NONE, data
+    if len(data) >= MIN_COMPRESS_BYTES:
+        compressed = zlib.compress(data, level)
+        if len(compressed) < len(data):
+            codec, payload = CODEC_ZLIB, compressed
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, codec, zlib.crc32(payload), len(data))
+    return header + payload
+
+
+def is_framed(blob: Optional[bytes]) -> bool:
+    return blob is not None and blob[:4] == MAGIC
+
+
+def decode_blob(blob: bytes) -> bytes:
+    """Payload of a framed blob; legacy (unframed) blobs are returned as-is."""
+    if not is_framed(blob):
+        return blob
+    error = check_blob(blob)
+    if error:
+        raise ValueError(error)
+    _, _, codec, _, raw_length = _HEADER.unpack_from(blob)
+    payload = blob[_HEADER.size:]
+    data = zlib.decompress(payload) if codec == CODEC_ZLIB else bytes(payload)
+    if len(data) != raw_length:
+        raise ValueError(f"length mismatch ({len(data)} != {raw_length})")
+    return data
+
+
+def check_blob(blob: Optional[bytes]) -> Optional[str]:
+    """
+    Cheap integrity check of a stored blob (no decompression or unpickling).
+
+    Returns:
+        None if the blob looks intact, otherwise a description of the problem
+    """
+    if blob is None or len(blob) == 0:
+        return "empty blob"
+    if not is_framed(blob):
+        return None  # legacy row; nothing to verify beyond presence
+    if len(blob) < _HEADER.size:
+        return "truncated header"
+    _, version, codec, crc, raw_length = _HEADER.unpack_from(blob)
+    if version > FORMAT_VERSION:
+        return f"unsupported format version {version}"
+    if codec not in (CODEC_NONE, CODEC_ZLIB):
+        return f"unknown codec {codec}"
+    payload = memoryview(blob)[_HEADER.size:]
+    if codec == CODEC_NONE and len(payload) != raw_length:
+        return f"length mismatch ({len(payload)} != {raw_length})"
+    if zlib.crc32(payload) != crc:
+        return "checksum mismatch"
+    return None
+
+
+class CompressedSerializer(SerializerProtocol):
+    """
+    Wraps a LangGraph serializer, framing and compressing its output.
+
+    The type tag is passed through unchanged, so rows stay readable by the
+    wrapped serializer once decoded.
+
+    Example:
+        >>> saver = SqliteSaver(conn)
+        >>> saver.serde = CompressedSerializer(saver.serde)
+    """
+
+    def __init__(self, inner: SerializerProtocol, level: int = 6):
+        self.inner = inner
+        self.level = level
+
+    def dumps(self, obj: Any) -> bytes:
+        return encode_blob(self.inner.dumps(obj), self.level)
+
+    def loads(self, data: bytes) -> Any:
+        return self.inner.loads(decode_blob(data))
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        type_, data = self.inner.dumps_typed(obj)
+        return type_, encode_blob(data, self.level)
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        type_, blob = data
+        return self.inner.loads_typed((type_, decode_blob(blob)))
+
+
+def checkpoint_time(checkpoint_id: str) -> Optional[datetime]:
+    """Creation time encoded in a LangGraph (UUIDv6) checkpoint id."""
+    try:
+        value = uuid.UUID(checkpoint_id)
+    except (ValueError, TypeError):
+        return None
+    if value.version != 6:
+        return None
+    high = value.int >> 64
+    ticks = ((high >> 32) << 28) | (((high >> 16) & 0xFFFF) << 12) | (high & 0x0FFF)
+    return _UUID_EPOCH + timedelta(microseconds=ticks // 10)
+
+
+def migrate_rows(conn: sqlite3.Connection, batch_size: int = 500, level: int = 6) -> int:
+    """
+    Rewrite unframed checkpoint and write blobs in the current format.
+
+    The stored bytes are only wrapped, never deserialized. Safe to run
+    repeatedly; returns the number of rows rewritten.
+    """
+    migrated = 0
+    for table, column, key in (
+        ("checkpoints", "checkpoint", "thread_id, checkpoint_ns, checkpoint_id"),
+        ("writes", "value", "thread_id, checkpoint_ns, checkpoint_id, task_id, idx"),
+    ):
+        where = " AND ".join(f"{name.strip()} = ?" for name in key.split(","))
+        while True:
+            rows = conn.execute(
+                f"SELECT {key}, {column} FROM {table} "
+                f"WHERE {column} IS NOT NULL AND substr({column}, 1, 4) != ? LIMIT ?",
+                (MAGIC, batch_size),
+            ).fetchall()
+            if not rows:
+                break
+            with conn:
+                conn.executemany(
+                    f"UPDATE {table} SET {column} = ? WHERE {where}",
+                    [(encode_blob(row[-1], level), *row[:-1]) for row in rows],
+                )
+            migrated += len(rows)
+    if migrated:
+        logger.info(f"Migrated {migrated} checkpoint rows to format v{FORMAT_VERSION}")
+    return migrated
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    """
+    Limits on stored checkpoints. None disables a limit.
+
+    The newest checkpoint of every thread is always kept, so a thread can
+    resume regardless of the limits.
+
+    Attributes:
+        max_age_days: Drop checkpoints older than this
+        max_checkpoints_per_thread: Keep at most this many per thread
+        max_bytes_per_thread: Keep a thread's newest checkpoints within this size
+        max_total_bytes: Then drop the oldest checkpoints database-wide until
+            all checkpoints fit
+        interval_seconds: How often the background compactor runs
+    """
+
+    max_age_days: Optional[float] = None
+    max_checkpoints_per_thread: Optional[int] = None
+    max_bytes_per_thread: Optional[int] = None
+    max_total_bytes: Optional[int] = None
+    interval_seconds: float = 300.0
+
+
+def enforce_retention(
+    conn: sqlite3.Connection,
+    policy: RetentionPolicy,
+    now: Optional[datetime] = None,
+) -> Dict[str, int]:
+    """
+    Delete checkpoints (and their pending writes) outside the policy.
+
+    Returns:
+        dict: {"deleted": rows removed, "bytes_freed": blob bytes removed}
+    """
+    now = now or datetime.now(timezone.utc)
+    cutoff = now - timedelta(days=policy.max_age_days) if policy.max_age_days is not None else None
+
+    rows = conn.execute(
+        """
+        SELECT c.thread_id, c.checkpoint_ns, c.checkpoint_id,
+               IFNULL(length(c.checkpoint), 0) + IFNULL(length(c.metadata), 0)
+               + IFNULL(w.size, 0)
+        FROM checkpoints c
+        LEFT JOIN (
+            SELECT thread_id, checkpoint_ns, checkpoint_id, SUM(length(value)) AS size
+            FROM writes GROUP BY thread_id, checkpoint_ns, checkpoint_id
+        ) w USING (thread_id, checkpoint_ns, checkpoint_id)
+        ORDER BY c.thread_id, c.checkpoint_ns, c.checkpoint_id DESC
+        """
+    ).fetchall()
+
+    doomed: List[Tuple[str, str, str]] = []
+    survivors: List[Tuple[str, Tuple[str, str, str], int]] = []  # droppable, kept for now
+    freed = 0
+    kept_total = 0
+    group = None
+    rank = used = 0
+    for thread_id, ns, checkpoint_id, size in rows:
+        if (thread_id, ns) != group:
+            group, rank, used = (thread_id, ns), 0, 0
+        key = (thread_id, ns, checkpoint_id)
+        rank += 1
+        if rank == 1:
+            used += size
+            kept_total += size
+            continue
+        created = checkpoint_time(checkpoint_id)
+        if (
+            (policy.max_checkpoints_per_thread is not None and rank > policy.max_checkpoints_per_thread)
+            or (cutoff is not None and created is not None and created < cutoff)
+            or (policy.max_bytes_per_thread is not None and used + size > policy.max_bytes_per_thread)
+        ):
+            doomed.append(key)
+            freed += size
+            continue
+        used += size
+        kept_total += size
+        survivors.append((checkpoint_id, key, size))
+
+    if policy.max_total_bytes is not None and kept_total > policy.max_total_bytes:
+        # UUIDv6 ids sort by creation time
+        for _, key, size in sorted(survivors):
+            if kept_total <= policy.max_total_bytes:
+                break
+            doomed.append(key)
+            kept_total -= size
+            freed += size
+
+    if doomed:
+        with conn:
+            conn.executemany(
+                "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                doomed,
+            )
+            conn.executemany(
+                "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                doomed,
+            )
+        logger.info(f"Retention removed {len(doomed)} checkpoints ({freed / 1024:.1f} KB)")
+    return {"deleted": len(doomed), "bytes_freed": freed}
@@ -3,19 +3,126 @@ SQLite-based checkpointing and crash recovery for conversation persistence.
 
 Wraps LangGraph's SqliteSaver with convenience methods for managing
 conversation threads, checkpoints, state recovery, and crash detection.
+
+Database access is pooled: each thread reuses its own read connection, and
+thread-status updates go through a single writer connection that
+group-commits them on a short interval.
+
+Checkpoint blobs are stored compressed in a versioned format
+(core.checkpoint_store); a background compactor migrates older rows and
+enforces the retention policy.
 """
 
+import atexit
 import logging
 import sqlite3
+import threading
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from contextlib import contextmanager
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
 from langgraph.checkpoint.sqlite import SqliteSaver
 
+from .checkpoint_store import (
+    CompressedSerializer,
+    RetentionPolicy,
+    check_blob,
+    checkpoint_time,
+    enforce_retention,
+    migrate_rows,
+)
+
 logger = logging.getLogger(__name__)
 
+# Milliseconds a connection waits on a locked database before raising
+BUSY_TIMEOUT_MS = 5000
+
+
+def _connect(db_path: Path, check_same_thread: bool = True) -> sqlite3.Connection:
+    conn = sqlite3.connect(str(db_path), check_same_thread=check_same_thread)
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    return conn
+
+
+def _utc_now() -> str:
+    """Current UTC time in SQLite's datetime('now') format."""
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+class _StatusWriter:
+    """
+    Single writer for thread_status rows.
+
+    Updates are buffered per thread (last status wins, stamped with the
+    time of the call) and committed together every ``interval`` seconds by
+    a background thread, or immediately on ``flush()``.
+    """
+
+    def __init__(self, db_path: Path, interval: float):
+        self.interval = interval
+        self._conn = _connect(db_path, check_same_thread=False)
+        self._pending: Dict[str, Tuple[str, str]] = {}
+        self._lock = threading.Lock()  # guards _pending
+        self._write_lock = threading.Lock()  # serializes commits on _conn
+        self._wake = threading.Event()
+        self._closed = False
+        self.commits = 0
+        self._thread = threading.Thread(
+            target=self._run, name="checkpoint-status-writer", daemon=True
+        )
+        self._thread.start()
+
+    def put(self, thread_id: str, status: str) -> None:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("CheckpointManager is closed")
+            self._pending[thread_id] = (status, _utc_now())
+
+    def flush(self) -> None:
+        """Commit all buffered updates now."""
+        with self._write_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return
+            try:
+                with self._conn:
+                    self._conn.executemany(
+                        """
+                        INSERT OR REPLACE INTO thread_status (thread_id, status, last_updated)
+                        VALUES (?, ?, ?)
+                        """,
+                        [(tid, status, ts) for tid, (status, ts) in batch.items()],
+                    )
+                self.commits += 1
+            except sqlite3.Error as e:
+                # Re-queue unless a newer update arrived meanwhile
+                with self._lock:
+                    for tid, update in batch.items():
+                        self._pending.setdefault(tid, update)
+                logger.error(f"Thread status commit failed ({len(batch)} rows): {e}")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._wake.set()
+        self._thread.join()
+        self.flush()
+        self._conn.close()
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wake.wait(self.interval)
+            self.flush()
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
 
 class CheckpointManager:
     """
@@ -23,6 +130,8 @@ class CheckpointManager:
     
     Provides high-level API for:
     - Creating checkpointers with connection pooling
+    - Tracking thread status for crash recovery (group-committed)
+    - Compressed checkpoint storage with background retention
     - Listing conversation threads
     - Retrieving checkpoint history
     - Cleaning up old conversations
@@ -33,16 +142,33 @@ class CheckpointManager:
         >>> app = workflow.compile(checkpointer)
     """
     
-    def __init__(self, db_path: str = "agent_memory.sqlite"):
+    def __init__(
+        self,
+        db_path: str = "agent_memory.sqlite",
+        status_flush_interval: float = 0.05,
+        retention: Optional[RetentionPolicy] = None,
+    ):
         """
         Initialize checkpoint manager with SQLite database.
         
         Args:
             db_path: Path to SQLite database file (created if not exists)
+            status_flush_interval: Seconds between group commits of
+                thread-status updates (the crash-detection window)
+            retention: Checkpoint retention limits (None keeps everything)
         """
         self.db_path = Path(db_path)
+        self.retention = retention
+        self.serde = CompressedSerializer(JsonPlusSerializer())
+        self._compactor: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._local = threading.local()
+        self._pool: list[sqlite3.Connection] = []
+        self._pool_lock = threading.Lock()
         self._ensure_db_exists()
         self.setup_status_table()
+        self._status_writer = _StatusWriter(self.db_path, status_flush_interval)
+        atexit.register(self._status_writer.close)
         
         logger.info(f"CheckpointManager initialized: {self.db_path}")
     
@@ -52,6 +178,7 @@ class CheckpointManager:
         if not self.db_path.exists():
             # Create empty database
             conn = sqlite3.connect(str(self.db_path))
+            conn.execute("PRAGMA journal_mode=WAL")  # Readers don't block the writer
             conn.close()
             logger.info(f"Created new checkpoint database: {self.db_path}")
     
@@ -72,22 +199,94 @@ class CheckpointManager:
         conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
         conn.execute("PRAGMA journal_mode=WAL")  # Write-Ahead Logging for concurrency
         
-        # Create SqliteSaver with the persistent connection
+        # Create SqliteSaver with the persistent connection; blobs are
+        # framed and compressed by the wrapping serializer
         checkpointer = SqliteSaver(conn=conn)
+        checkpointer.serde = self.serde = CompressedSerializer(checkpointer.serde)
         
         # Initialize database tables
         checkpointer.setup()
+        self._start_compactor()
         logger.debug(f"Created checkpointer for {self.db_path}")
         return checkpointer
     
+    def _start_compactor(self) -> None:
+        """Start the background migration/retention thread (once)."""
+        if self._compactor is not None:
+            return
+        self._compactor = threading.Thread(
+            target=self._compact_loop, name="checkpoint-compactor", daemon=True
+        )
+        self._compactor.start()
+    
+    def _compact_loop(self) -> None:
+        try:
+            self.migrate_checkpoints()
+        except sqlite3.Error as e:
+            logger.error(f"Checkpoint migration failed: {e}")
+        if self.retention is None:
+            return
+        while not self._stop.wait(self.retention.interval_seconds):
+            try:
+                self.compact()
+            except sqlite3.Error as e:
+                logger.error(f"Checkpoint retention pass failed: {e}")
+    
+    def migrate_checkpoints(self) -> int:
+        """Rewrite rows stored before the compressed format; returns rows migrated."""
+        with self._get_connection() as conn:
+            return migrate_rows(conn)
+    
+    def compact(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Enforce the retention policy once.
+        
+        Vacuums when deletions leave more than a quarter of the file free.
+        
+        Returns:
+            dict: {"deleted": checkpoints removed, "bytes_freed": blob bytes removed}
+        """
+        if self.retention is None:
+            return {"deleted": 0, "bytes_freed": 0}
+        with self._get_connection() as conn:
+            result = enforce_retention(conn, self.retention, now=now)
+            if result["deleted"]:
+                free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+                pages = conn.execute("PRAGMA page_count").fetchone()[0]
+                if pages and free / pages > 0.25:
+                    conn.execute("VACUUM")
+        return result
+    
     @contextmanager
     def _get_connection(self):
-        """Context manager for database connections."""
-        conn = sqlite3.connect(str(self.db_path))
+        """Context manager yielding this thread's pooled connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = _connect(self.db_path)
+            self._local.conn = conn
+            with self._pool_lock:
+                self._pool.append(conn)
         try:
             yield conn
         finally:
-            conn.close()
+            if conn.in_transaction:
+                conn.rollback()  # Never leave uncommitted writes on a pooled connection
+    
+    def close(self) -> None:
+        """Commit pending status updates, stop the compactor and close connections."""
+        self._stop.set()
+        if self._compactor is not None:
+            self._compactor.join()
+        self._status_writer.close()
+        atexit.unregister(self._status_writer.close)
+        with self._pool_lock:
+            pool, self._pool = self._pool, []
+        for conn in pool:
+            try:
+                conn.close()
+            except sqlite3.ProgrammingError:
+                pass  # Owned by another (still running) thread
+        self._local = threading.local()
     
     def list_threads(self, limit: int = 100) -> list[dict]:
         """
@@ -105,19 +304,20 @@ class CheckpointManager:
             ...     print(f"{thread['thread_id']}: {thread['last_updated']}")
         """
         with self._get_connection() as conn:
+            # Checkpoint ids are UUIDv6, so they sort by creation time
             cursor = conn.execute(
                 """
-                SELECT DISTINCT thread_id, MAX(timestamp) as last_updated
+                SELECT thread_id, MAX(checkpoint_id) as last_checkpoint
                 FROM checkpoints
                 GROUP BY thread_id
-                ORDER BY last_updated DESC
+                ORDER BY last_checkpoint DESC
                 LIMIT ?
                 """,
                 (limit,),
             )
             
             threads = [
-                {"thread_id": row[0], "last_updated": row[1]}
+                {"thread_id": row[0], "last_updated": _isoformat(checkpoint_time(row[1]))}
                 for row in cursor.fetchall()
             ]
             
@@ -142,10 +342,10 @@ class CheckpointManager:
         with self._get_connection() as conn:
             cursor = conn.execute(
                 """
-                SELECT checkpoint_id, thread_id, timestamp, parent_id
+                SELECT checkpoint_id, thread_id, parent_checkpoint_id
                 FROM checkpoints
-                WHERE thread_id = ?
-                ORDER BY timestamp DESC
+                WHERE thread_id = ? AND checkpoint_ns = ''
+                ORDER BY checkpoint_id DESC
                 LIMIT ?
                 """,
                 (thread_id, limit),
@@ -155,8 +355,8 @@ class CheckpointManager:
                 {
                     "checkpoint_id": row[0],
                     "thread_id": row[1],
-                    "timestamp": row[2],
-                    "parent_id": row[3],
+                    "timestamp": _isoformat(checkpoint_time(row[0])),
+                    "parent_id": row[2],
                 }
                 for row in cursor.fetchall()
             ]
@@ -175,6 +375,7 @@ class CheckpointManager:
             >>> manager.delete_thread("conv-123")
         """
         with self._get_connection() as conn:
+            conn.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
             cursor = conn.execute(
                 "DELETE FROM checkpoints WHERE thread_id = ?",
                 (thread_id,),
@@ -198,17 +399,20 @@ class CheckpointManager:
             >>> deleted = manager.cleanup_old_threads(days=7)
             >>> print(f"Cleaned up {deleted} old checkpoints")
         """
+        cutoff = datetime.now(timezone.utc) - timedelta(days=days)
         with self._get_connection() as conn:
-            cursor = conn.execute(
-                """
-                DELETE FROM checkpoints
-                WHERE timestamp < datetime('now', ? || ' days')
-                """,
-                (-days,),
-            )
+            stale = [
+                (thread_id,)
+                for thread_id, last_checkpoint in conn.execute(
+                    "SELECT thread_id, MAX(checkpoint_id) FROM checkpoints GROUP BY thread_id"
+                )
+                if (checkpoint_time(last_checkpoint) or cutoff) < cutoff
+            ]
+            conn.executemany("DELETE FROM writes WHERE thread_id = ?", stale)
+            cursor = conn.executemany("DELETE FROM checkpoints WHERE thread_id = ?", stale)
             conn.commit()
             
-            deleted_count = cursor.rowcount
+            deleted_count = cursor.rowcount if stale else 0
             logger.info(f"Cleaned up {deleted_count} checkpoints older than {days} days")
             return deleted_count
     
@@ -228,7 +432,7 @@ class CheckpointManager:
         Compact database to reclaim space after deletions.
         
         Should be called after cleanup_old_threads() or delete_thread()
-        to actually free disk space.
+        to actually free disk space (compact() does this automatically).
         
         Example:
             >>> manager.cleanup_old_threads(days=7)
@@ -260,6 +464,9 @@ class CheckpointManager:
         """
         Validate checkpoint data integrity for a thread.
         
+        Checks the stored blob's header, length and checksum; nothing is
+        decompressed or deserialized.
+        
         Args:
             thread_id: Thread to validate
         
@@ -278,10 +485,10 @@ class CheckpointManager:
                 # Get latest checkpoint
                 cursor = conn.execute(
                     """
-                    SELECT checkpoint_id, checkpoint, metadata
+                    SELECT checkpoint_id, checkpoint
                     FROM checkpoints
-                    WHERE thread_id = ?
-                    ORDER BY timestamp DESC
+                    WHERE thread_id = ? AND checkpoint_ns = ''
+                    ORDER BY checkpoint_id DESC
                     LIMIT 1
                     """,
                     (thread_id,),
@@ -291,18 +498,15 @@ class CheckpointManager:
                 if not row:
                     return False, f"No checkpoints found for thread {thread_id}"
                 
-                checkpoint_id, checkpoint_data, metadata = row
+                checkpoint_id, checkpoint_data = row
                 
                 # Validate checkpoint data is not null
                 if checkpoint_data is None:
                     return False, f"Checkpoint {checkpoint_id} has null data"
                 
-                # Try to deserialize checkpoint (basic validation)
-                try:
-                    import pickle
-                    pickle.loads(checkpoint_data)
-                except Exception as e:
-                    return False, f"Checkpoint {checkpoint_id} is corrupted: {e}"
+                error = check_blob(checkpoint_data)
+                if error:
+                    return False, f"Checkpoint {checkpoint_id} is corrupted: {error}"
                 
                 return True, None
                 
@@ -313,31 +517,21 @@ class CheckpointManager:
         """
         Mark a thread as incomplete (workflow in progress).
         
-        Used to track threads that may need recovery after crash.
+        Used to track threads that may need recovery after crash. The
+        update is buffered and committed with the next group commit (within
+        status_flush_interval).
         """
-        with self._get_connection() as conn:
-            conn.execute(
-                """
-                INSERT OR REPLACE INTO thread_status (thread_id, status, last_updated)
-                VALUES (?, 'incomplete', datetime('now'))
-                """,
-                (thread_id,),
-            )
-            conn.commit()
-            logger.debug(f"Marked thread {thread_id} as incomplete")
+        self._status_writer.put(thread_id, "incomplete")
+        logger.debug(f"Marked thread {thread_id} as incomplete")
     
     def mark_thread_complete(self, thread_id: str) -> None:
-        """Mark a thread as complete (workflow finished)."""
-        with self._get_connection() as conn:
-            conn.execute(
-                """
-                INSERT OR REPLACE INTO thread_status (thread_id, status, last_updated)
-                VALUES (?, 'complete', datetime('now'))
-                """,
-                (thread_id,),
-            )
-            conn.commit()
-            logger.debug(f"Marked thread {thread_id} as complete")
+        """Mark a thread as complete (workflow finished; group-committed)."""
+        self._status_writer.put(thread_id, "complete")
+        logger.debug(f"Marked thread {thread_id} as complete")
+    
+    def flush_thread_status(self) -> None:
+        """Commit buffered thread-status updates immediately."""
+        self._status_writer.flush()
     
     def get_incomplete_threads(self, older_than_minutes: int = 5) -> list[str]:
         """
@@ -349,6 +543,7 @@ class CheckpointManager:
         Returns:
             list: Thread IDs that may need recovery
         """
+        self.flush_thread_status()
         with self._get_connection() as conn:
             cursor = conn.execute(
                 """
@@ -368,6 +563,7 @@ class CheckpointManager:
         
         Should be called after critical operations to ensure durability.
         """
+        self.flush_thread_status()
         with self._get_connection() as conn:
             conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
             logger.debug("WAL checkpoint flushed to disk")
@@ -479,15 +675,14 @@ class CheckpointManager:
             # Load from SqliteSaver (via LangGraph)
             with self._get_connection() as conn:
                 cursor = conn.execute(
-                    "SELECT checkpoint FROM checkpoints WHERE checkpoint_id = ?",
-                    (checkpoint_id,),
+                    "SELECT type, checkpoint FROM checkpoints WHERE thread_id = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_id),
                 )
                 row = cursor.fetchone()
                 if not row:
                     return None
                 
-                import pickle
-                state = pickle.loads(row[0])
+                state = self.serde.loads_typed((row[0], row[1]))
                 return state
                 
         except Exception as e:
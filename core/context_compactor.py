@@ -11,12 +11,20 @@ turns are:
 This lets long-running conversations stay coherent without blowing up the
 context window, and gives the knowledge base a growing memory of past
 interactions.
+
+``ContextCompactor`` is the token-budget version used by the agent graph:
+the request path only measures the prompt and swaps in the latest finished
+summary; summarisation and archival run in the background.
 """
 
 import logging
+import threading
 import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime
-from typing import List, Optional, Sequence
+from typing import Callable, List, Optional, Sequence, Set, Tuple
 
 from langchain_core.messages import (
     AIMessage,
@@ -77,14 +85,7 @@ def compact_context(
     )
 
     # ── 1. Build a plain-text transcript of evicted messages ──────────
-    transcript_lines: List[str] = []
-    for msg in evicted:
-        role = _role_label(msg)
-        text = msg.content if isinstance(msg.content, str) else str(msg.content)
-        if text.strip():
-            transcript_lines.append(f"{role}: {text.strip()}")
-
-    transcript = "\n".join(transcript_lines)
+    transcript = _transcript(evicted)
     if not transcript.strip():
         # Nothing meaningful to summarise — just drop silently
         return kept
@@ -107,8 +108,264 @@ def compact_context(
     return [summary_msg] + kept
 
 
+# ── Token-budget compaction ───────────────────────────────────────
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token)."""
+    return max(1, len(text) // 4)
+
+
+# Per-message framing (role tags, separators) in chat templates
+_MESSAGE_OVERHEAD_TOKENS = 4
+
+
+@dataclass(frozen=True)
+class _Summary:
+    """Rolling summary of the first ``covered`` messages of a conversation."""
+
+    text: str
+    covered: int
+    first_key: Tuple  # identity of messages[0]
+    last_key: Tuple  # identity of messages[covered - 1]
+
+
+def _message_key(msg: BaseMessage) -> Tuple:
+    content = msg.content if isinstance(msg.content, str) else str(msg.content)
+    return (getattr(msg, "id", None) or "", type(msg).__name__, content)
+
+
+class ContextCompactor:
+    """
+    Keeps prompts within a token budget without blocking the request path.
+
+    ``prepare()`` runs on every LLM turn and only does cheap work:
+
+        1. Take the latest finished summary for the conversation (if its
+           covered prefix still matches the history) and build the view
+           ``[summary] + messages[covered:]``.
+        2. Count the view's tokens. Above ``compact_at`` × budget, schedule a
+           background job that folds older turns into a new rolling summary
+           (and archives them to ChromaDB); the job's result is swapped in
+           atomically and used from the next turn on.
+        3. Above the full budget (the background job hasn't caught up), drop
+           the oldest view messages for this turn only.
+
+    Args:
+        llm_engine: Object with ``.generate(messages, …)`` used for summaries.
+        chroma_client: Optional ChromaClient for archival.
+        context_tokens: Model context window in tokens.
+        reserve_tokens: Tokens kept free for the response.
+        compact_at: Fraction of the prompt budget that triggers compaction.
+        keep_ratio: Fraction of the budget the recent, verbatim tail keeps.
+        min_keep: Messages always kept verbatim (never summarised).
+        token_counter: Text → token count (defaults to a ~4 chars/token estimate).
+    """
+
+    def __init__(
+        self,
+        llm_engine,
+        chroma_client=None,
+        context_tokens: int = 8192,
+        reserve_tokens: int = 1024,
+        compact_at: float = 0.75,
+        keep_ratio: float = 0.4,
+        min_keep: int = 2,
+        token_counter: Callable[[str], int] = estimate_tokens,
+        max_conversations: int = 1024,
+    ):
+        self.llm = llm_engine
+        self.chroma_client = chroma_client
+        self.budget = max(1, context_tokens - reserve_tokens)
+        self.compact_at = compact_at
+        self.keep_ratio = keep_ratio
+        self.min_keep = max(1, min_keep)
+        self.count_text = token_counter
+        self.max_conversations = max_conversations
+
+        self._lock = threading.Lock()
+        self._summaries: "OrderedDict[str, _Summary]" = OrderedDict()
+        self._pending: Set[str] = set()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="context-compactor")
+        self._inflight = 0
+        self._idle = threading.Condition(self._lock)
+
+    def count(self, msg: BaseMessage) -> int:
+        content = msg.content if isinstance(msg.content, str) else str(msg.content)
+        return self.count_text(content) + _MESSAGE_OVERHEAD_TOKENS
+
+    def prompt_tokens(self, messages: Sequence[BaseMessage], extra_tokens: int = 0) -> int:
+        """Token size of a prepared prompt (messages plus e.g. tool schemas)."""
+        return extra_tokens + sum(self.count(msg) for msg in messages)
+
+    def prepare(
+        self,
+        messages: Sequence[BaseMessage],
+        conversation_id: str = "unknown",
+        extra_tokens: int = 0,
+    ) -> List[BaseMessage]:
+        """
+        Prompt messages for this turn (never waits on summarisation).
+
+        Args:
+            messages: Full conversation history (append-only).
+            conversation_id: Thread the history belongs to.
+            extra_tokens: Prompt tokens outside the messages (e.g. tool schemas).
+        """
+        with self._lock:
+            stored = self._summaries.get(conversation_id)
+            if stored is not None:
+                self._summaries.move_to_end(conversation_id)
+
+        summary = stored
+        start = 0
+        if (
+            summary is not None
+            and summary.covered <= len(messages)
+            and _message_key(messages[0]) == summary.first_key
+            and _message_key(messages[summary.covered - 1]) == summary.last_key
+        ):
+            start = summary.covered
+        else:
+            summary = None
+
+        tail = list(messages[start:])
+        tail_tokens = [self.count(msg) for msg in tail]
+        head: List[BaseMessage] = []
+        if summary is not None:
+            head = [SystemMessage(content=f"{_SUMMARY_PREFIX}{summary.text}")]
+        total = extra_tokens + sum(tail_tokens) + sum(self.count(msg) for msg in head)
+
+        if total > self.budget * self.compact_at:
+            self._schedule(conversation_id, messages, start, stored, summary, tail_tokens)
+
+        if total > self.budget:
+            # Over budget before the background summary lands: trim this turn only
+            drop = 0
+            while total > self.budget and drop < len(tail) - 1:
+                total -= tail_tokens[drop]
+                drop += 1
+            while drop < len(tail) - 1 and isinstance(tail[drop], ToolMessage):
+                drop += 1  # don't start on an orphaned tool result
+            logger.info(
+                f"Prompt over budget for {conversation_id}: dropping {drop} oldest "
+                f"messages this turn (summary pending)"
+            )
+            tail = tail[drop:]
+
+        return head + tail
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Block until no compaction or archival job is running."""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._inflight == 0, timeout=timeout)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    def _schedule(
+        self,
+        conversation_id: str,
+        messages: Sequence[BaseMessage],
+        start: int,
+        stored: Optional[_Summary],
+        summary: Optional[_Summary],
+        tail_tokens: List[int],
+    ) -> None:
+        # Keep the newest messages that fit in keep_ratio of the budget
+        keep_budget = self.budget * self.keep_ratio
+        kept, kept_tokens = 0, 0
+        for tokens in reversed(tail_tokens):
+            if kept >= self.min_keep and kept_tokens + tokens > keep_budget:
+                break
+            kept += 1
+            kept_tokens += tokens
+        cut = start + len(tail_tokens) - kept
+        # The kept tail must not start with tool results of an evicted call
+        while cut < len(messages) - 1 and isinstance(messages[cut], ToolMessage):
+            cut += 1
+        if cut <= start:
+            return
+
+        with self._lock:
+            if conversation_id in self._pending:
+                return
+            self._pending.add(conversation_id)
+            self._inflight += 1
+
+        evicted = list(messages[start:cut])
+        keys = (_message_key(messages[0]), _message_key(messages[cut - 1]))
+        self._executor.submit(
+            self._compact, conversation_id, stored, summary, evicted, cut, keys
+        )
+
+    def _compact(
+        self,
+        conversation_id: str,
+        stored: Optional[_Summary],
+        previous: Optional[_Summary],
+        evicted: List[BaseMessage],
+        cut: int,
+        keys: Tuple[Tuple, Tuple],
+    ) -> None:
+        try:
+            transcript = _transcript(evicted)
+            if previous is not None:
+                transcript = f"Earlier summary: {previous.text}\n{transcript}"
+            text = _summarise(transcript, self.llm) if transcript.strip() else (
+                previous.text if previous else ""
+            )
+
+            with self._lock:
+                # Only swap if nobody replaced the summary seen at scheduling
+                if self._summaries.get(conversation_id) is stored:
+                    self._summaries[conversation_id] = _Summary(text, cut, *keys)
+                    self._summaries.move_to_end(conversation_id)
+                    while len(self._summaries) > self.max_conversations:
+                        self._summaries.popitem(last=False)
+            logger.info(f"Compacted {len(evicted)} messages for {conversation_id} (background)")
+
+            if self.chroma_client is not None and transcript.strip():
+                with self._lock:
+                    self._inflight += 1
+                self._executor.submit(
+                    self._archive, conversation_id, _transcript(evicted), text, len(evicted)
+                )
+        except Exception as exc:
+            logger.warning(f"Background compaction failed for {conversation_id}: {exc}")
+        finally:
+            with self._idle:
+                self._pending.discard(conversation_id)
+                self._inflight -= 1
+                self._idle.notify_all()
+
+    def _archive(self, conversation_id: str, transcript: str, summary: str, turn_count: int) -> None:
+        try:
+            _archive_to_chroma(
+                chroma_client=self.chroma_client,
+                transcript=transcript,
+                summary=summary,
+                conversation_id=conversation_id,
+                turn_count=turn_count,
+            )
+        finally:
+            with self._idle:
+                self._inflight -= 1
+                self._idle.notify_all()
+
+
 # ── Internal helpers ──────────────────────────────────────────────────
 
+def _transcript(messages: Sequence[BaseMessage]) -> str:
+    """Plain-text ``Role: content`` transcript, skipping empty messages."""
+    lines: List[str] = []
+    for msg in messages:
+        role = _role_label(msg)
+        text = msg.content if isinstance(msg.content, str) else str(msg.content)
+        if text.strip():
+            lines.append(f"{role}: {text.strip()}")
+    return "\n".join(lines)
+
+
 def _role_label(msg: BaseMessage) -> str:
     """Map message type to a readable role tag."""
     if isinstance(msg, HumanMessage):
@@ -0,0 +1,89 @@
+"""
+Workflow events for incremental (streaming) agent responses.
+
+AgentWorkflow nodes and the orchestrator publish WorkflowEvents to an
+optional sink so streaming RPCs can forward LLM tokens, tool activity and
+validation decisions while the graph is still running.
+
+The sink is passed through the LangGraph run config under
+``configurable.event_sink``; when absent, emitting is a no-op.
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Key used in RunnableConfig["configurable"] to carry the sink
+EVENT_SINK_KEY = "event_sink"
+
+
+class EventType:
+    """Event type names (mirrors agent.proto AgentEvent.EventType)."""
+
+    TOKEN = "token"
+    TOOL_CALL_START = "tool_call_start"
+    TOOL_CALL_END = "tool_call_end"
+    VALIDATION = "validation"
+    FINAL_ANSWER = "final_answer"
+    ERROR = "error"
+
+
+@dataclass
+class WorkflowEvent:
+    """
+    A single incremental event produced while processing a query.
+
+    Attributes:
+        type: One of EventType
+        content: Token text, final answer, or error message
+        tool_name: Tool name for tool events
+        tool_call_id: Tool call ID for tool events
+        status: Tool status, or next_action for validation events
+        payload: Extra structured data (tool args/results, sources, ...)
+        timestamp: Unix time the event was created
+    """
+
+    type: str
+    content: str = ""
+    tool_name: str = ""
+    tool_call_id: str = ""
+    status: str = ""
+    payload: Dict[str, Any] = field(default_factory=dict)
+    timestamp: float = field(default_factory=time.time)
+
+
+EventSink = Callable[[WorkflowEvent], None]
+
+
+def get_event_sink(config: Optional[dict]) -> Optional[EventSink]:
+    """
+    Extract the event sink from a LangGraph run config.
+
+    Args:
+        config: RunnableConfig passed to a graph node (may be None)
+
+    Returns:
+        The sink callable, or None if streaming was not requested
+    """
+    if not config:
+        return None
+    return (config.get("configurable") or {}).get(EVENT_SINK_KEY)
+
+
+def emit(sink: Optional[EventSink], event: WorkflowEvent) -> None:
+    """
+    Publish an event, never letting a broken sink fail the workflow.
+
+    Args:
+        sink: Event sink (None = no-op)
+        event: Event to publish
+    """
+    if sink is None:
+        return
+    try:
+        sink(event)
+    except Exception as e:
+        logger.warning(f"Event sink failed for {event.type} event: {e}")
@@ -6,17 +6,20 @@ error handling, and iteration control. Follows LangGraph best practices
 for state management and graph construction.
 """
 
+import json
 import logging
 import re
-from typing import Literal, Optional
-from datetime import datetime
+from typing import Callable, Literal, Optional
 
 from langgraph.graph import StateGraph, END
 from langgraph.checkpoint.sqlite import SqliteSaver
 from langchain_core.messages import AIMessage, HumanMessage, ToolMessage, SystemMessage
+from langchain_core.runnables import RunnableConfig
 
 from .state import AgentState, WorkflowConfig, ToolExecutionResult
-from .context_compactor import compact_context
+from .context_compactor import ContextCompactor, estimate_tokens
+from .events import EventType, WorkflowEvent, emit, get_event_sink
+from tools.executor import ToolExecutor
 
 logger = logging.getLogger(__name__)
 
@@ -34,6 +37,10 @@ class AgentWorkflow:
     The graph uses SqliteSaver for conversation checkpointing, enabling
     multi-turn conversations with full history persistence.
     
+    When the run config carries an event sink (configurable.event_sink),
+    nodes publish WorkflowEvents as they happen: LLM tokens, tool call
+    start/finish and validation decisions.
+    
     Example:
         >>> workflow = AgentWorkflow(tool_registry, llm_engine, config)
         >>> compiled = workflow.compile(checkpointer)
@@ -46,6 +53,7 @@ class AgentWorkflow:
         llm_engine,  # LlamaEngine
         config: WorkflowConfig,
         chroma_client=None,  # Optional ChromaClient for context archival
+        token_counter: Optional[Callable[[str], int]] = None,
     ):
         """
         Initialize workflow with tool registry and LLM engine.
@@ -55,12 +63,33 @@ class AgentWorkflow:
             llm_engine: LlamaEngine for local inference
             config: WorkflowConfig with iteration limits and LLM params
             chroma_client: Optional ChromaClient for context compaction archival
+            token_counter: Text → token count for the context budget (e.g.
+                LLMEngineWrapper.count_tokens); defaults to an estimate
         """
         self.registry = tool_registry
         self.llm = llm_engine
         self.config = config
         self.chroma_client = chroma_client
         
+        # Token-budget context compaction (summaries built off the request path)
+        self.compactor = ContextCompactor(
+            llm_engine,
+            chroma_client=chroma_client,
+            context_tokens=config.context_tokens,
+            reserve_tokens=config.reserve_tokens,
+            min_keep=config.context_window,
+            token_counter=token_counter or estimate_tokens,
+        )
+        
+        # Concurrent tool dispatch: one pool shared by every request, each
+        # turn limited to max_tool_calls_per_turn running calls
+        self.tool_executor = ToolExecutor(
+            tool_registry,
+            max_workers=config.tool_pool_workers,
+            default_timeout=config.tool_timeout_seconds,
+            max_calls_per_execute=config.max_tool_calls_per_turn,
+        )
+        
         # Build graph structure
         self.graph = self._build_graph()
         
@@ -211,34 +240,25 @@ class AgentWorkflow:
         
         return workflow
     
-    def _llm_node(self, state: AgentState) -> AgentState:
+    def _llm_node(
+        self, state: AgentState, config: Optional[RunnableConfig] = None
+    ) -> AgentState:
         """
         LLM generation node with function calling support.
         
-        Extracts recent messages (context_window), formats with available
-        tools, and generates response. Handles both direct replies and
+        Fits the message history to the token budget (ContextCompactor),
+        formats with available tools, and generates response. Handles both direct replies and
         function calls.
         
         Args:
             state: Current agent state with message history
+            config: LangGraph run config (may carry an event sink)
         
         Returns:
             AgentState: Updated state with AI response and routing decision
         """
         messages = state["messages"]
         
-        # Compact context: summarise + archive evicted turns instead of
-        # silently dropping them.  Falls back to a simple slice when the
-        # LLM summariser or ChromaDB is unavailable.
-        conversation_id = state.get("conversation_id", "unknown")
-        recent_messages = compact_context(
-            messages=messages,
-            max_messages=self.config.context_window,
-            llm_engine=self.llm,
-            chroma_client=self.chroma_client,
-            conversation_id=conversation_id,
-        )
-        
         # Extract last user query to determine if tools are needed
         last_user_message = next(
             (m.content for m in reversed(messages) if isinstance(m, HumanMessage)),
@@ -258,8 +278,31 @@ class AgentWorkflow:
             tools_schema = []  # No tools for simple queries
             logger.info("No tools needed - direct answer expected")
         
+        # Fit the prompt to the token budget: swaps in the latest background
+        # summary of older turns; summarisation/archival never block here
+        conversation_id = state.get("conversation_id", "unknown")
+        tools_tokens = self.compactor.count_text(json.dumps(tools_schema)) if tools_schema else 0
+        recent_messages = self.compactor.prepare(
+            messages,
+            conversation_id=conversation_id,
+            extra_tokens=tools_tokens,
+        )
+        # Size of the context the LLM actually sees (for utilisation metrics)
+        metadata = {
+            **(state.get("metadata") or {}),
+            "prompt_tokens": self.compactor.prompt_tokens(recent_messages, tools_tokens),
+        }
+        
         logger.debug(f"Calling LLM with {len(recent_messages)} messages, {len(tools_schema)} tools")
         
+        # Forward answer tokens to the event sink when streaming was requested
+        sink = get_event_sink(config)
+        stream_kwargs = {}
+        if sink is not None:
+            stream_kwargs["on_token"] = lambda token: emit(
+                sink, WorkflowEvent(type=EventType.TOKEN, content=token)
+            )
+        
         try:
             # Call local LLM via llama.cpp
             response = self.llm.generate(
@@ -268,6 +311,7 @@ class AgentWorkflow:
                 temperature=self.config.temperature,
                 max_tokens=1024,  # ← Increased from 512 to allow detailed responses
                 stream=self.config.enable_streaming,
+                **stream_kwargs,
             )
             
             # Parse LLM response
@@ -297,6 +341,7 @@ class AgentWorkflow:
                 "messages": [ai_message],
                 "next_action": next_action,
                 "error": None,
+                "metadata": metadata,
             }
         
         except Exception as e:
@@ -307,12 +352,16 @@ class AgentWorkflow:
                 "error": f"LLM generation failed: {str(e)}",
             }
     
-    def _tools_node(self, state: AgentState) -> AgentState:
+    def _tools_node(
+        self, state: AgentState, config: Optional[RunnableConfig] = None
+    ) -> AgentState:
         """
         Tool execution node with parallel calls, error handling, and multi-turn support.
         
-        Extracts tool calls from last AI message, executes them in parallel
-        (up to max_tool_calls_per_turn), and creates ToolMessage responses.
+        Extracts tool calls from last AI message, executes them concurrently
+        through ToolExecutor (up to max_tool_calls_per_turn, each bounded by
+        its per-tool timeout), and creates ToolMessage responses in the
+        original call order.
         
         For multi-turn rollouts (Agent0 style), this node can be invoked multiple
         times within a single query, with each invocation adding tool results
@@ -320,6 +369,7 @@ class AgentWorkflow:
         
         Args:
             state: Current state with tool_calls in last message
+            config: LangGraph run config (may carry an event sink)
         
         Returns:
             AgentState: Updated state with tool results and messages
@@ -338,42 +388,45 @@ class AgentWorkflow:
         
         logger.info(f"Executing {len(tool_calls)} tool calls (cumulative: {total_tool_calls})")
         
-        for tool_call in tool_calls:
-            tool_name = tool_call["function"]["name"]
-            tool_args = tool_call["function"]["arguments"]
-            tool_call_id = tool_call.get("id", f"call_{tool_name}")
-            
-            logger.debug("Tool %s called with args: %r", tool_name, tool_args)
-            
-            start_time = datetime.now()
-            
-            # Execute tool
-            tool = self.registry.get(tool_name)
-            if tool:
-                try:
-                    result = tool(**tool_args)
-                    status = result.get("status", "success")
-                except Exception as e:
-                    logger.error(f"Tool {tool_name} error: {e}", exc_info=True)
-                    result = {"status": "error", "error": str(e)}
-                    status = "error"
-            else:
-                result = {
-                    "status": "error",
-                    "error": f"Tool '{tool_name}' not found or circuit breaker open",
-                }
-                status = "error"
-            
-            # Calculate latency
-            latency_ms = (datetime.now() - start_time).total_seconds() * 1000
+        sink = get_event_sink(config)
+        
+        def on_start(tool_name: str, tool_call_id: str, tool_args: dict):
+            emit(sink, WorkflowEvent(
+                type=EventType.TOOL_CALL_START,
+                tool_name=tool_name,
+                tool_call_id=tool_call_id,
+                payload={"arguments": tool_args},
+            ))
+        
+        def on_finish(outcome):
+            emit(sink, WorkflowEvent(
+                type=EventType.TOOL_CALL_END,
+                tool_name=outcome.tool_name,
+                tool_call_id=outcome.tool_call_id,
+                status=outcome.status,
+                payload={
+                    "latency_ms": outcome.latency_ms,
+                    "result": self._format_tool_result(outcome.tool_name, outcome.result),
+                },
+            ))
+        
+        # Independent calls run concurrently; outcomes come back in call order
+        outcomes = self.tool_executor.execute(
+            tool_calls,
+            on_start=on_start if sink else None,
+            on_finish=on_finish if sink else None,
+        )
+        
+        for outcome in outcomes:
+            result = outcome.result
             
             # Record result with metadata
             execution_result = ToolExecutionResult(
-                tool_name=tool_name,
-                status=status,
+                tool_name=outcome.tool_name,
+                status=outcome.status,
                 result=result,
-                latency_ms=latency_ms,
-                error_message=result.get("error") if status == "error" else None,
+                latency_ms=outcome.latency_ms,
+                error_message=result.get("error") if outcome.status != "success" else None,
                 retry_count=state.get("retry_count", 0),
             )
             
@@ -381,12 +434,12 @@ class AgentWorkflow:
             
             # Create tool message for LLM context
             # Format result for better LLM comprehension
-            result_content = self._format_tool_result(tool_name, result)
+            result_content = self._format_tool_result(outcome.tool_name, result)
             tool_messages.append(
                 ToolMessage(
                     content=result_content,
-                    tool_call_id=tool_call_id,
-                    name=tool_name,  # Include tool name for multi-turn context
+                    tool_call_id=outcome.tool_call_id,
+                    name=outcome.tool_name,  # Include tool name for multi-turn context
                 )
             )
             
@@ -446,7 +499,31 @@ class AgentWorkflow:
         else:
             return f"[{tool_name} RESULT]: {str(result)}"
     
-    def _validate_node(self, state: AgentState) -> AgentState:
+    def _validate_node(
+        self, state: AgentState, config: Optional[RunnableConfig] = None
+    ) -> AgentState:
+        """
+        Validation node that publishes its routing decision.
+        
+        Args:
+            state: Current state with retry_count and tool_results
+            config: LangGraph run config (may carry an event sink)
+        
+        Returns:
+            AgentState: Updated state with routing decision
+        """
+        result = self._validate(state)
+        emit(get_event_sink(config), WorkflowEvent(
+            type=EventType.VALIDATION,
+            status=result.get("next_action") or "",
+            payload={
+                "retry_count": result.get("retry_count", 0),
+                "error": result.get("error"),
+            },
+        ))
+        return result
+    
+    def _validate(self, state: AgentState) -> AgentState:
         """
         Validation and iteration control node.
         
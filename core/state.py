@@ -63,20 +63,29 @@ class WorkflowConfig(BaseModel):
     
     Attributes:
         max_iterations: Maximum tool->LLM cycles before forcing termination
-        context_window: Number of recent messages to include in LLM context
+        context_window: Recent messages always kept verbatim in LLM context
+        context_tokens: Model context window in tokens; older turns are
+            summarised in the background once the prompt nears this budget
+        reserve_tokens: Tokens of context_tokens kept free for the response
         temperature: LLM sampling temperature (0.0=deterministic, 1.0=creative)
         model_name: Local GGUF model filename
         enable_streaming: Whether to stream LLM responses token-by-token
         max_tool_calls_per_turn: Limit parallel tool calls to prevent runaway
+        tool_pool_workers: Tool worker threads shared by all concurrent turns
+        tool_timeout_seconds: Default per-tool timeout for concurrent execution
         timeout_seconds: Global timeout for workflow execution
     """
     
     max_iterations: int = Field(default=5, ge=1, le=20)
     context_window: int = Field(default=12, ge=1, le=50)
+    context_tokens: int = Field(default=8192, ge=512)
+    reserve_tokens: int = Field(default=1024, ge=0)
     temperature: float = Field(default=0.15, ge=0.0, le=2.0)
     model_name: str = Field(default="Mistral-Small-24B-Instruct-2501.Q8_0.gguf")
     enable_streaming: bool = Field(default=True)
     max_tool_calls_per_turn: int = Field(default=5, ge=1, le=10)
+    tool_pool_workers: int = Field(default=16, ge=1, le=256)
+    tool_timeout_seconds: float = Field(default=30.0, gt=0, le=600)
     timeout_seconds: int = Field(default=120, ge=10, le=600)
     
     class Config:
@@ -134,7 +143,7 @@ class ToolExecutionResult(BaseModel):
     """
     
     tool_name: str
-    status: Literal["success", "error", "timeout"]
+    status: Literal["success", "error", "timeout", "busy"]
     result: dict
     timestamp: str = Field(default_factory=lambda: datetime.utcnow().isoformat())
     latency_ms: float
@@ -0,0 +1,491 @@
+"""
+Columnar Transaction Store
+
+In-memory columnar index over the enriched CIBC transaction dicts served by
+BankService. Rows keep their load order ("base order", newest first) and are
+addressed by integer row id; the original dicts are only touched to build
+the response page.
+
+Columns:
+- amounts / is_debit: typed arrays
+- date codes: typed array of codes into the sorted distinct timestamps, so
+  date range filters become integer comparisons with exact string semantics
+- category / merchant / account / text / month / year: dictionary-encoded
+  typed arrays, each with an inverted index (code -> ascending row ids)
+
+Aggregates are summed per group in base order, so totals are bit-identical
+to a linear scan. Whole-dataset aggregates per group_by are computed once;
+the per-month and per-year aggregates also serve date-filtered period
+summaries for every period fully covered by the date range.
+"""
+import heapq
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import chain, islice
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+# group_by value -> timestamp prefix length for period grouping
+PERIOD_PREFIX = {"month": 7, "year": 4}
+
+SORT_FIELDS = ("timestamp", "merchant", "description", "amount", "category")
+
+# (name, debits, credits, count) - "total" in responses equals debits
+GroupRow = Tuple[str, float, float, int]
+
+
+class _Dictionary:
+    """Dictionary encoding: distinct values <-> dense integer codes."""
+
+    def __init__(self):
+        self.values: List[Any] = []
+        self._codes: Dict[Any, int] = {}
+
+    def encode(self, value: Any) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self._codes[value] = code
+            self.values.append(value)
+        return code
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+def _postings(codes: Sequence[int], size: int) -> List[array]:
+    """Inverted index: code -> ascending row ids."""
+    index = [array("I") for _ in range(size)]
+    for row, code in enumerate(codes):
+        index[code].append(row)
+    return index
+
+
+def _union(index: List[array], codes: Iterable[int]) -> Sequence[int]:
+    """Ascending row ids present in any of the given postings."""
+    lists = [index[code] for code in codes]
+    if not lists:
+        return []
+    if len(lists) == 1:
+        return lists[0]
+    return sorted(chain.from_iterable(lists))
+
+
+def _dense_rank(keys: Sequence[Any]) -> array:
+    """Map each key to its rank among the sorted distinct keys."""
+    ranks = {value: rank for rank, value in enumerate(sorted(set(keys)))}
+    return array("I", (ranks[key] for key in keys))
+
+
+class _Filter:
+    """One indexed filter: candidate size, candidate rows and row predicate."""
+
+    def __init__(self, size: int, candidates: Callable[[], Sequence[int]],
+                 predicate: Callable[[int], bool]):
+        self.size = size
+        self.candidates = candidates
+        self.predicate = predicate
+
+
+class TransactionStore:
+    """
+    Columnar, indexed view over a list of enriched transaction dicts.
+
+    Filter and ordering semantics mirror the list-scan implementation they
+    replace: case-insensitive category equality, substring account/text
+    matching, lexicographic timestamp bounds, and stable sorts.
+
+    Args:
+        transactions: Enriched transaction dicts in base (load) order
+    """
+
+    def __init__(self, transactions: List[Dict[str, Any]]):
+        self.rows = transactions
+        n = len(transactions)
+
+        self._categories = _Dictionary()
+        self._merchants = _Dictionary()
+        self._accounts = _Dictionary()
+        self._texts = _Dictionary()
+        self._periods = {group: _Dictionary() for group in PERIOD_PREFIX}
+
+        self.amounts = array("d")
+        self.is_debit = array("b")
+        self.category_codes = array("I")
+        self.merchant_codes = array("I")
+        self.account_codes = array("I")
+        self.text_codes = array("I")
+        self.period_codes = {group: array("I") for group in PERIOD_PREFIX}
+        timestamps: List[str] = []
+
+        for txn in transactions:
+            timestamp = txn["timestamp"]
+            category = txn.get("spending_category", "Other")
+            merchant = txn.get("merchant") or ""
+            timestamps.append(timestamp)
+            self.amounts.append(txn["amount"])
+            self.is_debit.append(1 if txn.get("is_debit", True) else 0)
+            self.category_codes.append(self._categories.encode(category))
+            # Grouped as "Other" when missing; search still sees no merchant text
+            self.merchant_codes.append(self._merchants.encode(txn.get("merchant", "Other")))
+            self.account_codes.append(self._accounts.encode(
+                (txn.get("account_type", "").lower(), txn.get("account_id", "").lower())
+            ))
+            self.text_codes.append(self._texts.encode((
+                merchant.lower(),
+                txn.get("description", "").lower(),
+                category.lower(),
+                txn.get("parent_company", "").lower(),
+            )))
+            for group, prefix in PERIOD_PREFIX.items():
+                self.period_codes[group].append(self._periods[group].encode(timestamp[:prefix]))
+
+        # Dates: code order == string order, with a sorted index per code
+        self._dates = sorted(set(timestamps))
+        date_index = {value: code for code, value in enumerate(self._dates)}
+        self.date_codes = array("I", (date_index[t] for t in timestamps))
+        self._date_rows = _postings(self.date_codes, len(self._dates))
+        self._date_offsets = array("I", [0])
+        for rows in self._date_rows:
+            self._date_offsets.append(self._date_offsets[-1] + len(rows))
+        # Loaded newest-first, date ranges are contiguous row ranges
+        self._dates_descending = all(
+            self.date_codes[i] >= self.date_codes[i + 1] for i in range(n - 1)
+        )
+
+        # Amounts: rows ordered by amount (NaN never matches a bound)
+        ordered = sorted(
+            (row for row in range(n) if self.amounts[row] == self.amounts[row]),
+            key=self.amounts.__getitem__,
+        )
+        self._rows_by_amount = array("I", ordered)
+        self._amount_sorted = array("d", (self.amounts[row] for row in ordered))
+
+        self._category_rows = _postings(self.category_codes, len(self._categories))
+        self._account_rows = _postings(self.account_codes, len(self._accounts))
+        self._text_rows = _postings(self.text_codes, len(self._texts))
+        self._period_rows = {
+            group: _postings(self.period_codes[group], len(self._periods[group]))
+            for group in PERIOD_PREFIX
+        }
+        self._category_lower: Dict[str, Set[int]] = {}
+        for code, name in enumerate(self._categories.values):
+            self._category_lower.setdefault(name.lower(), set()).add(code)
+
+        self._sort_ranks: Dict[str, array] = {}
+        self._full_aggregates: Dict[str, Dict[int, list]] = {}
+
+        # Precomputed monthly / yearly aggregates (period summaries)
+        for group in PERIOD_PREFIX:
+            self._aggregates_for(group)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    # -- filtering -------------------------------------------------------
+
+    def select(
+        self,
+        category: Optional[str] = None,
+        account: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        amount_min: Optional[float] = None,
+        amount_max: Optional[float] = None,
+        search: Optional[str] = None,
+    ) -> Sequence[int]:
+        """
+        Row ids matching all filters, in base order.
+
+        The most selective indexed filter produces the candidate rows; the
+        remaining filters are checked per row against the columns.
+        """
+        filters: List[_Filter] = []
+        if category:
+            filters.append(self._category_filter(category))
+        if account:
+            filters.append(self._account_filter(account))
+        if date_from or date_to:
+            filters.append(self._date_filter(date_from, date_to))
+        if amount_min is not None or amount_max is not None:
+            filters.append(self._amount_filter(amount_min, amount_max))
+        if search:
+            filters.append(self._text_filter(search, include_parent=False))
+
+        if not filters:
+            return range(len(self.rows))
+
+        filters.sort(key=lambda f: f.size)
+        if filters[0].size == 0:
+            return []
+
+        rows = filters[0].candidates()
+        for other in filters[1:]:
+            predicate = other.predicate
+            rows = [row for row in rows if predicate(row)]
+        return rows
+
+    def _category_filter(self, category: str) -> _Filter:
+        codes = self._category_lower.get(category.lower(), set())
+        category_codes = self.category_codes
+        return _Filter(
+            size=sum(len(self._category_rows[code]) for code in codes),
+            candidates=lambda: _union(self._category_rows, codes),
+            predicate=lambda row: category_codes[row] in codes,
+        )
+
+    def _account_filter(self, account: str) -> _Filter:
+        needle = account.lower()
+        codes = {
+            code for code, (account_type, account_id) in enumerate(self._accounts.values)
+            if needle in account_type or needle in account_id
+        }
+        account_codes = self.account_codes
+        return _Filter(
+            size=sum(len(self._account_rows[code]) for code in codes),
+            candidates=lambda: _union(self._account_rows, codes),
+            predicate=lambda row: account_codes[row] in codes,
+        )
+
+    def _date_bounds(self, date_from: Optional[str], date_to: Optional[str]) -> Tuple[int, int]:
+        """Half-open range of date codes matching the timestamp bounds."""
+        low = bisect_left(self._dates, date_from) if date_from else 0
+        high = len(self._dates)
+        if date_to:
+            # Include the entire end date
+            date_to_end = date_to + "T23:59:59" if "T" not in date_to else date_to
+            high = bisect_right(self._dates, date_to_end)
+        return low, max(low, high)
+
+    def _date_filter(self, date_from: Optional[str], date_to: Optional[str]) -> _Filter:
+        low, high = self._date_bounds(date_from, date_to)
+        date_codes = self.date_codes
+
+        def candidates() -> Sequence[int]:
+            if low >= high:
+                return []
+            if self._dates_descending:
+                return range(self._date_rows[high - 1][0], self._date_rows[low][-1] + 1)
+            return _union(self._date_rows, range(low, high))
+
+        return _Filter(
+            size=self._date_offsets[high] - self._date_offsets[low],
+            candidates=candidates,
+            predicate=lambda row: low <= date_codes[row] < high,
+        )
+
+    def _amount_filter(self, amount_min: Optional[float], amount_max: Optional[float]) -> _Filter:
+        low = bisect_left(self._amount_sorted, amount_min) if amount_min is not None else 0
+        high = (
+            bisect_right(self._amount_sorted, amount_max)
+            if amount_max is not None else len(self._amount_sorted)
+        )
+        amounts = self.amounts
+
+        def predicate(row: int) -> bool:
+            amount = amounts[row]
+            if amount_min is not None and not amount >= amount_min:
+                return False
+            return amount_max is None or amount <= amount_max
+
+        return _Filter(
+            size=max(0, high - low),
+            candidates=lambda: sorted(self._rows_by_amount[low:high]),
+            predicate=predicate,
+        )
+
+    def _text_codes_matching(self, query: str, include_parent: bool) -> Set[int]:
+        needle = query.lower()
+        fields = 4 if include_parent else 3
+        return {
+            code for code, key in enumerate(self._texts.values)
+            if any(needle in value for value in key[:fields])
+        }
+
+    def _text_filter(self, query: str, include_parent: bool) -> _Filter:
+        codes = self._text_codes_matching(query, include_parent)
+        text_codes = self.text_codes
+        return _Filter(
+            size=sum(len(self._text_rows[code]) for code in codes),
+            candidates=lambda: _union(self._text_rows, codes),
+            predicate=lambda row: text_codes[row] in codes,
+        )
+
+    def search(self, query: str, limit: int) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Substring search over merchant, description, category and parent company.
+
+        Returns:
+            (first `limit` matches in base order, total match count)
+        """
+        codes = self._text_codes_matching(query, include_parent=True)
+        total = sum(len(self._text_rows[code]) for code in codes)
+        if limit < 0:
+            # Slice semantics: everything except the last -limit matches
+            limit = max(0, total + limit)
+        matches = heapq.merge(*(self._text_rows[code] for code in codes))
+        return [self.rows[row] for row in islice(matches, limit)], total
+
+    # -- ordering --------------------------------------------------------
+
+    def _sort_rank(self, field: str) -> array:
+        """Per-row rank of the sort key (ties share a rank)."""
+        ranks = self._sort_ranks.get(field)
+        if ranks is not None:
+            return ranks
+
+        if field == "timestamp":
+            ranks = self.date_codes
+        elif field == "amount":
+            ranks = _dense_rank(self.amounts)
+        else:
+            if field == "merchant":
+                codes, keys = self.merchant_codes, [m.lower() for m in self._merchants.values]
+            elif field == "description":
+                codes, keys = self.text_codes, [key[1] for key in self._texts.values]
+            else:  # category
+                codes, keys = self.category_codes, [c.lower() for c in self._categories.values]
+            code_rank = _dense_rank(keys)
+            ranks = array("I", (code_rank[code] for code in codes))
+
+        self._sort_ranks[field] = ranks
+        return ranks
+
+    def page(
+        self,
+        rows: Sequence[int],
+        sort: Optional[str],
+        sort_dir: str,
+        start: int,
+        end: int,
+    ) -> List[Dict[str, Any]]:
+        """
+        Materialize rows[start:end] after an optional stable sort.
+
+        Unknown sort fields sort by timestamp.
+        """
+        if sort:
+            field = sort if sort in SORT_FIELDS else "timestamp"
+            key = self._sort_rank(field).__getitem__
+            descending = sort_dir == "desc"
+            if 0 <= start and end * 4 < len(rows):
+                # Only the prefix up to the page end is needed
+                select = heapq.nlargest if descending else heapq.nsmallest
+                rows = select(end, rows, key=key)
+            else:
+                rows = sorted(rows, key=key, reverse=descending)
+        return [self.rows[row] for row in rows[start:end]]
+
+    # -- aggregation -----------------------------------------------------
+
+    def _group_codes(self, group_by: str) -> Tuple[array, List[Any]]:
+        """Per-row group codes and code -> group name."""
+        if group_by in PERIOD_PREFIX:
+            return self.period_codes[group_by], self._periods[group_by].values
+        if group_by == "company":
+            return self.merchant_codes, self._merchants.values
+        return self.category_codes, self._categories.values
+
+    def _aggregate(self, rows: Iterable[int], codes: array) -> Dict[int, list]:
+        """
+        Sum rows per group in the given order.
+
+        Returns:
+            code -> [debits, credits, count, first_row], in first-seen order
+        """
+        groups: Dict[int, list] = {}
+        amounts, is_debit = self.amounts, self.is_debit
+        for row in rows:
+            code = codes[row]
+            group = groups.get(code)
+            if group is None:
+                group = groups[code] = [0.0, 0.0, 0, row]
+            group[2] += 1
+            if is_debit[row]:
+                group[0] += amounts[row]
+            else:
+                group[1] += amounts[row]
+        return groups
+
+    def _aggregates_for(self, group_by: str) -> Dict[int, list]:
+        """Whole-dataset aggregates for a grouping (computed once)."""
+        key = group_by if group_by in PERIOD_PREFIX or group_by == "company" else "category"
+        aggregates = self._full_aggregates.get(key)
+        if aggregates is None:
+            codes, _ = self._group_codes(key)
+            aggregates = self._aggregate(range(len(self.rows)), codes)
+            self._full_aggregates[key] = aggregates
+        return aggregates
+
+    def _period_aggregates(self, group_by: str, low: int, high: int) -> Dict[int, list]:
+        """
+        Period aggregates restricted to date codes [low, high).
+
+        Periods entirely inside the range reuse the precomputed aggregates;
+        only the boundary periods are re-summed from their rows.
+        """
+        prefix = PERIOD_PREFIX[group_by]
+        if low >= high:
+            return {}
+        first_period = self._dates[low][:prefix]
+        last_period = self._dates[high - 1][:prefix]
+        full = self._aggregates_for(group_by)
+        period_codes = self.period_codes[group_by]
+        date_codes = self.date_codes
+
+        groups: Dict[int, list] = {}
+        for code, name in enumerate(self._periods[group_by].values):
+            if name < first_period or name > last_period:
+                continue
+            if first_period < name < last_period:
+                groups[code] = full[code]
+                continue
+            # Boundary period: only some of its dates may be in range
+            rows = (
+                row for row in self._period_rows[group_by][code]
+                if low <= date_codes[row] < high
+            )
+            partial = self._aggregate(rows, period_codes)
+            if code in partial:
+                groups[code] = partial[code]
+        return groups
+
+    def summarize(
+        self,
+        group_by: str,
+        category: Optional[str] = None,
+        account: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        search: Optional[str] = None,
+    ) -> Tuple[List[GroupRow], int]:
+        """
+        Aggregate filtered transactions by category, company, month or year.
+
+        Returns:
+            (groups sorted by total descending, number of matching rows)
+        """
+        codes, names = self._group_codes(group_by)
+        only_dates = not (category or account or search)
+
+        if only_dates and not (date_from or date_to):
+            groups = self._aggregates_for(group_by)
+            count = len(self.rows)
+        elif only_dates and group_by in PERIOD_PREFIX:
+            low, high = self._date_bounds(date_from, date_to)
+            groups = self._period_aggregates(group_by, low, high)
+            count = self._date_offsets[high] - self._date_offsets[low]
+        else:
+            rows = self.select(
+                category=category, account=account,
+                date_from=date_from, date_to=date_to, search=search,
+            )
+            groups = self._aggregate(rows, codes)
+            count = len(rows)
+
+        # First-seen order, then a stable sort by total
+        ordered = sorted(groups.items(), key=lambda item: item[1][3])
+        ordered.sort(key=lambda item: item[1][0], reverse=True)
+        return [
+            (names[code], debits, credits, group_count)
+            for code, (debits, credits, group_count, _) in ordered
+        ], count
@@ -28,8 +28,22 @@ class LLMServiceConfig:
         default_temperature: Default temperature for sampling
         host: gRPC server host
         port: gRPC server port
-        max_workers: ThreadPoolExecutor workers
+        max_workers: gRPC threads for RPCs other than scheduled generations
+            (health, model listing, token counts); see grpc_workers
         verbose: Enable verbose model logging
+        scheduler_max_active: Requests admitted at once (time-sliced, one decodes at a time)
+        scheduler_max_queue: Requests allowed to wait for admission
+        scheduler_tokens_per_turn: Tokens decoded per request before rotating
+        scheduler_max_suspended: Requests allowed to hold a suspended model
+            state while another request on the same model decodes
+        prefix_cache_mb: Memory budget for cached prompt-prefix states (0 = off)
+        model_pool_mb: Memory budget for resident models (0 = default model only)
+        draft_models: Speculative decoding pairings, "target=draft" entries
+            separated by commas; a bare draft pairs with model_path. A draft
+            is a GGUF filename next to model_path or "prompt-lookup". Drafts
+            are only used when the scheduler never swaps states (see
+            scheduler_swaps_states).
+        draft_tokens: Tokens proposed per speculative round
     """
     # Model configuration
     model_path: str = "./models/qwen2.5-3b-instruct-q5_k_m.gguf"
@@ -46,6 +60,26 @@ class LLMServiceConfig:
     host: str = "[::]"
     port: int = 50051
     max_workers: int = 4
+
+    # Request scheduler
+    scheduler_max_active: int = 4
+    scheduler_max_queue: int = 32
+    # Each rotation pays a full save_state/load_state (~2-3 tokens of decode
+    # for a 3B model on CPU); see tests/benchmarks/test_llm_scheduler_bench.py
+    scheduler_tokens_per_turn: int = 16
+    # Each suspended request holds a saved state (~0.35 GB for Qwen2.5-3B at
+    # n_batch=512, mostly the scores buffer)
+    scheduler_max_suspended: int = 2
+
+    # Prompt-prefix KV state cache
+    prefix_cache_mb: int = 512
+
+    # Resident model pool (models live next to model_path)
+    model_pool_mb: int = 0
+
+    # Speculative decoding (empty = off)
+    draft_models: str = ""
+    draft_tokens: int = 4
     
     @classmethod
     def from_env(cls) -> "LLMServiceConfig":
@@ -67,6 +101,13 @@ class LLMServiceConfig:
             LLM_PORT: gRPC port
             LLM_MAX_WORKERS: Max workers
             LLM_VERBOSE: Enable verbose logging (1/0)
+            LLM_SCHED_MAX_ACTIVE: Concurrently decoded requests
+            LLM_SCHED_MAX_QUEUE: Max queued requests before rejecting
+            LLM_SCHED_TOKENS_PER_TURN: Decode quantum per request
+            LLM_PREFIX_CACHE_MB: Prompt-prefix state cache budget (0 disables)
+            LLM_MODEL_POOL_MB: Resident model budget (0 keeps one model resident)
+            LLM_DRAFT_MODELS: Speculative draft pairings (target=draft,...)
+            LLM_DRAFT_TOKENS: Draft tokens proposed per round
 
         Returns:
             LLMServiceConfig: Configuration instance
@@ -93,7 +134,48 @@ class LLMServiceConfig:
             port=int(os.getenv("LLM_PORT", str(cls.port))),
             max_workers=int(os.getenv("LLM_MAX_WORKERS", str(cls.max_workers))),
             verbose=bool(int(os.getenv("LLM_VERBOSE", "0"))),
+            scheduler_max_active=int(os.getenv("LLM_SCHED_MAX_ACTIVE", str(cls.scheduler_max_active))),
+            scheduler_max_queue=int(os.getenv("LLM_SCHED_MAX_QUEUE", str(cls.scheduler_max_queue))),
+            scheduler_tokens_per_turn=int(os.getenv("LLM_SCHED_TOKENS_PER_TURN", str(cls.scheduler_tokens_per_turn))),
+            scheduler_max_suspended=int(os.getenv("LLM_SCHED_MAX_SUSPENDED", str(cls.scheduler_max_suspended))),
+            prefix_cache_mb=int(os.getenv("LLM_PREFIX_CACHE_MB", str(cls.prefix_cache_mb))),
+            model_pool_mb=int(os.getenv("LLM_MODEL_POOL_MB", str(cls.model_pool_mb))),
+            draft_models=os.getenv("LLM_DRAFT_MODELS", cls.draft_models),
+            draft_tokens=int(os.getenv("LLM_DRAFT_TOKENS", str(cls.draft_tokens))),
         )
+
+    @property
+    def grpc_workers(self) -> int:
+        """
+        gRPC handler threads for serve().
+
+        Each generation RPC holds a thread while its request is active or
+        queued in the scheduler, so the pool must cover
+        scheduler_max_active + scheduler_max_queue; otherwise the queue
+        never fills and priority ordering never applies.
+        """
+        return self.scheduler_max_active + self.scheduler_max_queue + self.max_workers
+
+    @property
+    def scheduler_swaps_states(self) -> bool:
+        """
+        Whether the scheduler may suspend a request to run another on the same model.
+
+        A model loaded with a speculative draft keeps logits for every
+        position (logits_all: n_ctx x n_vocab floats, ~10 GB for Qwen2.5 at
+        16k context), which each swap would save and restore; set
+        scheduler_max_active=1 or scheduler_max_suspended=0 to use drafts.
+        """
+        return self.scheduler_max_active > 1 and self.scheduler_max_suspended > 0
+
+    def draft_model_for(self, model_id: str) -> Optional[str]:
+        """Speculative draft paired with a model id (None = decode without one)."""
+        try:
+            from llm_service.speculative import parse_draft_models
+        except ImportError:
+            from speculative import parse_draft_models
+
+        return parse_draft_models(self.draft_models, Path(self.model_path).name).get(model_id)
     
     def validate(self) -> None:
         """
@@ -123,6 +205,33 @@ class LLMServiceConfig:
                 f"default_temperature must be in [0.0, 2.0], got {self.default_temperature}"
             )
         
+        if self.scheduler_max_active < 1:
+            raise ValueError(
+                f"scheduler_max_active must be >= 1, got {self.scheduler_max_active}"
+            )
+
+        if self.scheduler_tokens_per_turn < 1:
+            raise ValueError(
+                f"scheduler_tokens_per_turn must be >= 1, got {self.scheduler_tokens_per_turn}"
+            )
+
+        if self.scheduler_max_suspended < 0:
+            raise ValueError(
+                f"scheduler_max_suspended must be >= 0, got {self.scheduler_max_suspended}"
+            )
+
+        if self.prefix_cache_mb < 0:
+            raise ValueError(f"prefix_cache_mb must be >= 0, got {self.prefix_cache_mb}")
+
+        if self.model_pool_mb < 0:
+            raise ValueError(f"model_pool_mb must be >= 0, got {self.model_pool_mb}")
+
+        if self.draft_tokens < 1:
+            raise ValueError(f"draft_tokens must be >= 1, got {self.draft_tokens}")
+
+        # Raises ValueError for malformed pairings
+        self.draft_model_for(Path(self.model_path).name)
+
         if self.port < 1024 or self.port > 65535:
             raise ValueError(f"port must be in [1024, 65535], got {self.port}")
         
@@ -138,7 +247,19 @@ class LLMServiceConfig:
         logger.info(f"  Max Tokens: {self.max_tokens}")
         logger.info(f"  Temperature: {self.default_temperature}")
         logger.info(f"  Server: {self.host}:{self.port}")
-        logger.info(f"  Workers: {self.max_workers}")
+        logger.info(f"  Workers: {self.grpc_workers} ({self.max_workers} beyond the scheduler)")
+        logger.info(
+            f"  Scheduler: {self.scheduler_max_active} active, "
+            f"{self.scheduler_max_queue} queued, "
+            f"{self.scheduler_tokens_per_turn} tokens/turn, "
+            f"{self.scheduler_max_suspended} suspended"
+        )
+        logger.info(f"  Prefix cache: {self.prefix_cache_mb} MB")
+        logger.info(f"  Model pool: {self.model_pool_mb} MB")
+        logger.info(
+            f"  Speculative drafts: {self.draft_models or 'off'}"
+            + (f" ({self.draft_tokens} tokens/round)" if self.draft_models else "")
+        )
 
 
 def get_config() -> LLMServiceConfig:
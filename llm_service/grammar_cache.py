@@ -0,0 +1,292 @@
+"""
+Compiled grammars for structured output.
+
+JSON-mode requests used to re-parse the JSON grammar with
+LlamaGrammar.from_string on every call, and tool argument schemas (as
+produced by LocalToolRegistry._extract_schema) could not constrain
+generation at all. This module provides:
+
+- schema_to_gbnf(): converts a JSON schema into a GBNF grammar, following
+  llama.cpp's json_schema_to_grammar (required properties in declaration
+  order, then any subset of the optional ones, no extra properties)
+- GrammarCache: compiled grammars keyed by the SHA-256 of the canonical
+  schema (or of the GBNF text), so repeated requests for the same tool
+  compile once
+
+Supported schema keywords: type (including type lists), properties,
+required, items, enum, const, anyOf/oneOf and additionalProperties (only
+as "any object" when no properties are given). Length, range and format
+constraints are not enforced by the grammar; $ref is rejected.
+"""
+
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Union
+
+
+class SchemaError(ValueError):
+    """A JSON schema cannot be converted into a grammar."""
+
+
+# Primitive rules and the rules they reference
+_PRIMITIVES: Dict[str, tuple] = {
+    "ws": (r"[ \t\n]*", ()),
+    "char": (r'[^"\\\x7F\x00-\x1F] | "\\" ( ["\\/bfnrt] | "u" hex hex hex hex )', ("hex",)),
+    "hex": (r"[0-9a-fA-F]", ()),
+    "string": (r'"\"" char* "\""', ("char",)),
+    "integer": (r'"-"? ( "0" | [1-9] [0-9]* )', ()),
+    "number": (r'"-"? ( "0" | [1-9] [0-9]* ) ( "." [0-9]+ )? ( [eE] [-+]? [0-9]+ )?', ()),
+    "boolean": (r'"true" | "false"', ()),
+    "null": (r'"null"', ()),
+    "value": (
+        "object | array | string | number | boolean | null",
+        ("object", "array", "string", "number", "boolean", "null"),
+    ),
+    "object": (
+        r'"{" ws ( string ws ":" ws value ( ws "," ws string ws ":" ws value )* )? ws "}"',
+        ("ws", "string", "value"),
+    ),
+    "array": (r'"[" ws ( value ( ws "," ws value )* )? ws "]"', ("ws", "value")),
+}
+
+_JSON_TYPES = ("string", "integer", "number", "boolean", "null", "object", "array")
+_RULE_NAME = re.compile(r"[^a-zA-Z0-9-]+")
+
+
+def _literal(text: str) -> str:
+    """Quote text as a GBNF string literal."""
+    escaped = (
+        text.replace("\\", "\\\\")
+        .replace('"', '\\"')
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+        .replace("\t", "\\t")
+    )
+    return f'"{escaped}"'
+
+
+def _json_literal(value: Any) -> str:
+    """GBNF literal matching exactly the JSON encoding of value."""
+    return _literal(json.dumps(value, ensure_ascii=False))
+
+
+class _Converter:
+    """Builds the rule set for one schema."""
+
+    def __init__(self):
+        self.rules: "OrderedDict[str, str]" = OrderedDict()
+
+    def convert(self, schema: Dict[str, Any]) -> str:
+        root = self._visit(schema, "root")
+        if root != "root":
+            self.rules["root"] = root
+        self.rules.move_to_end("root", last=False)
+        return "\n".join(f"{name} ::= {body}" for name, body in self.rules.items()) + "\n"
+
+    def _primitive(self, name: str) -> str:
+        if name not in self.rules:
+            body, deps = _PRIMITIVES[name]
+            self.rules[name] = body
+            for dep in deps:
+                self._primitive(dep)
+        return name
+
+    def _add_rule(self, name: str, body: str) -> str:
+        name = _RULE_NAME.sub("-", name).strip("-") or "rule"
+        key, i = name, 0
+        while key in self.rules and self.rules[key] != body:
+            i += 1
+            key = f"{name}{i}"
+        self.rules[key] = body
+        return key
+
+    def _visit(self, schema: Any, name: str) -> str:
+        """Return a GBNF expression for schema (adding rules as needed)."""
+        if schema is True or schema == {}:
+            return self._primitive("value")
+        if not isinstance(schema, dict):
+            raise SchemaError(f"{name}: schema must be an object, got {schema!r}")
+        if "$ref" in schema:
+            raise SchemaError(f"{name}: $ref is not supported")
+
+        if "const" in schema:
+            return _json_literal(schema["const"])
+        if "enum" in schema:
+            if not schema["enum"]:
+                raise SchemaError(f"{name}: empty enum")
+            return "( " + " | ".join(_json_literal(v) for v in schema["enum"]) + " )"
+        for keyword in ("anyOf", "oneOf"):
+            if keyword in schema:
+                alternatives = [
+                    self._visit(sub, f"{name}-{i}") for i, sub in enumerate(schema[keyword])
+                ]
+                return "( " + " | ".join(alternatives) + " )"
+
+        schema_type = schema.get("type")
+        if isinstance(schema_type, list):
+            alternatives = [
+                self._visit({**schema, "type": t}, f"{name}-{t}") for t in schema_type
+            ]
+            return "( " + " | ".join(alternatives) + " )"
+        if schema_type is None:
+            if "properties" in schema:
+                schema_type = "object"
+            elif "items" in schema:
+                schema_type = "array"
+            else:
+                return self._primitive("value")
+        if schema_type not in _JSON_TYPES:
+            raise SchemaError(f"{name}: unknown type {schema_type!r}")
+
+        if schema_type == "object":
+            return self._object(schema, name)
+        if schema_type == "array":
+            return self._array(schema, name)
+        return self._primitive(schema_type)
+
+    def _object(self, schema: Dict[str, Any], name: str) -> str:
+        properties = schema.get("properties") or {}
+        if not properties:
+            return self._primitive("object")
+
+        ws = self._primitive("ws")
+        required = [key for key in schema.get("required", []) if key in properties]
+        optional = [key for key in properties if key not in required]
+        kv = {
+            key: self._add_rule(
+                f"{name}-{key}-kv",
+                f'{_literal(json.dumps(key, ensure_ascii=False))} {ws} ":" {ws} '
+                + self._visit(properties[key], f"{name}-{key}"),
+            )
+            for key in required + optional
+        }
+        comma = f'{ws} "," {ws}'
+
+        def rest(keys: List[str]) -> str:
+            # Any subset of keys, in declaration order, each after a comma
+            [key, *tail] = keys
+            body = f"( {comma} {kv[key]} )?"
+            if tail:
+                body += " " + rest(tail)
+            return self._add_rule(f"{name}-{key}-rest", body)
+
+        if required:
+            members = f" {comma} ".join(kv[key] for key in required)
+            if optional:
+                members += " " + rest(optional)
+        else:
+            # The first member present has no leading comma
+            alternatives = [
+                kv[key] + (" " + rest(optional[i + 1:]) if i + 1 < len(optional) else "")
+                for i, key in enumerate(optional)
+            ]
+            members = "( " + " | ".join(alternatives) + " )?"
+        return self._add_rule(name, f'"{{" {ws} {members} {ws} "}}"')
+
+    def _array(self, schema: Dict[str, Any], name: str) -> str:
+        items = schema.get("items")
+        if items is None:
+            return self._primitive("array")
+        ws = self._primitive("ws")
+        item = self._visit(items, f"{name}-item")
+        return self._add_rule(name, f'"[" {ws} ( {item} ( {ws} "," {ws} {item} )* )? {ws} "]"')
+
+
+def schema_to_gbnf(schema: Union[str, Dict[str, Any]]) -> str:
+    """
+    Convert a JSON schema (dict or JSON text) into a GBNF grammar.
+
+    Raises:
+        SchemaError: If the schema is malformed or uses unsupported keywords
+    """
+    if isinstance(schema, str):
+        try:
+            schema = json.loads(schema)
+        except json.JSONDecodeError as e:
+            raise SchemaError(f"Schema is not valid JSON: {e}") from e
+    return _Converter().convert(schema)
+
+
+def schema_hash(schema: Union[str, Dict[str, Any]]) -> str:
+    """SHA-256 of the canonical JSON encoding (key order and spacing ignored)."""
+    if isinstance(schema, str):
+        try:
+            schema = json.loads(schema)
+        except json.JSONDecodeError as e:
+            raise SchemaError(f"Schema is not valid JSON: {e}") from e
+    canonical = json.dumps(schema, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class GrammarCache:
+    """
+    LRU cache of compiled grammars.
+
+    Args:
+        compile: Callable compiling GBNF text (e.g. LlamaGrammar.from_string)
+        max_entries: Compiled grammars kept before the least recently used
+            is dropped
+
+    Example:
+        >>> cache = GrammarCache(LlamaGrammar.from_string)
+        >>> grammar = cache.for_schema(registry.tool_call_schema("web_search"))
+    """
+
+    def __init__(self, compile: Callable[[str], Any], max_entries: int = 64):
+        self._compile = compile
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()  # oldest first
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def for_schema(self, schema: Union[str, Dict[str, Any]]) -> Any:
+        """
+        Compiled grammar constraining output to schema.
+
+        Raises:
+            SchemaError: If the schema cannot be converted
+        """
+        key = "schema:" + schema_hash(schema)
+        return self._get(key, lambda: schema_to_gbnf(schema))
+
+    def compile(self, gbnf: str) -> Any:
+        """Compiled grammar for GBNF text."""
+        key = "gbnf:" + hashlib.sha256(gbnf.encode()).hexdigest()
+        return self._get(key, lambda: gbnf)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                **self._counters,
+                "hit_rate": self._counters["hits"] / lookups if lookups else 0.0,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _get(self, key: str, source: Callable[[], str]) -> Any:
+        with self._lock:
+            grammar = self._entries.get(key)
+            if grammar is not None:
+                self._entries.move_to_end(key)
+                self._counters["hits"] += 1
+                return grammar
+            self._counters["misses"] += 1
+
+        # Compile outside the lock; a concurrent miss on the same key only
+        # costs a duplicate compilation
+        grammar = self._compile(source())
+        with self._lock:
+            self._entries[key] = grammar
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+        return grammar
@@ -0,0 +1,270 @@
+"""
+Incremental JSON validation for streamed generations.
+
+Generate used to call json.loads() on the whole accumulated output after
+every token, which is quadratic in the output length. JSONStreamValidator
+is a pushdown state machine that consumes each token once and tracks:
+
+- complete: the text so far is exactly one JSON document (json.loads would
+  accept it)
+- error: the text can no longer become valid JSON, whatever follows; set
+  at the first offending character so generation can stop early
+
+It follows Python's json module: NaN, Infinity and -Infinity are accepted
+and control characters are rejected inside strings.
+"""
+
+import re
+from typing import List, Optional
+
+_WS = " \t\n\r"
+_DIGITS = "0123456789"
+_HEX = frozenset("0123456789abcdefABCDEF")
+_ESCAPES = frozenset('"\\/bfnrt')
+_LITERALS = {"t": "rue", "f": "alse", "n": "ull", "N": "aN", "I": "nfinity"}
+
+# Runs of characters that need no per-character handling
+_STRING_RUN = re.compile(r'[^"\\\x00-\x1f]+')
+_WS_RUN = re.compile(r"[ \t\n\r]+")
+_DIGIT_RUN = re.compile(r"[0-9]+")
+
+# Parser states
+_VALUE = 0            # expecting a value
+_ARRAY_FIRST = 1      # after '[': value or ']'
+_ARRAY_NEXT = 2       # after an array element: ',' or ']'
+_OBJECT_FIRST = 3     # after '{': key or '}'
+_OBJECT_KEY = 4       # after ',' in an object: key
+_COLON = 5            # after a key: ':'
+_OBJECT_NEXT = 6      # after a member value: ',' or '}'
+_STRING = 7
+_ESCAPE = 8           # after a backslash
+_UNICODE = 9          # inside \uXXXX
+_LITERAL = 10         # inside true/false/null/NaN/Infinity
+_MINUS = 11           # after a leading '-'
+_ZERO = 12            # integer part is '0'
+_INTEGER = 13
+_FRACTION_START = 14  # after '.'
+_FRACTION = 15
+_EXPONENT_START = 16  # after 'e'/'E'
+_EXPONENT_SIGN = 17   # after the exponent sign
+_EXPONENT = 18
+_DONE = 19            # top-level value finished; only whitespace may follow
+
+# Number states in which the number may end
+_NUMBER_END = frozenset((_ZERO, _INTEGER, _FRACTION, _EXPONENT))
+_NUMBER_STATES = frozenset(range(_MINUS, _EXPONENT + 1))
+_DIGIT_STATES = frozenset((_INTEGER, _FRACTION, _EXPONENT))
+
+_OBJECT = "{"
+_ARRAY = "["
+
+
+class JSONStreamValidator:
+    """
+    Validates JSON text fed in arbitrary chunks, O(1) amortized per character.
+
+    Example:
+        >>> validator = JSONStreamValidator()
+        >>> for token in ('{"a', '": [1, ', "2]}"):
+        ...     validator.feed(token)
+        >>> validator.complete
+        True
+    """
+
+    __slots__ = ("_stack", "_state", "_is_key", "_pending", "error", "position")
+
+    def __init__(self):
+        self._stack: List[str] = []
+        self._state = _VALUE
+        self._is_key = False     # current string is an object key
+        self._pending = ""       # remaining characters of a literal / \u escape
+        self.error: Optional[str] = None
+        self.position = 0        # characters consumed
+
+    @property
+    def complete(self) -> bool:
+        """True if the text so far parses as one JSON document."""
+        if self.error is not None or self._stack:
+            return False
+        return self._state == _DONE or self._state in _NUMBER_END
+
+    @property
+    def failed(self) -> bool:
+        return self.error is not None
+
+    def feed(self, text: str) -> bool:
+        """
+        Consume the next chunk of output.
+
+        Returns:
+            bool: False once the text is unrecoverably invalid
+        """
+        if self.error is not None:
+            return False
+        i, n = 0, len(text)
+        while i < n:
+            state = self._state
+            c = text[i]
+
+            if state == _STRING:
+                run = _STRING_RUN.match(text, i)
+                if run:
+                    i = run.end()
+                    continue
+                if c == '"':
+                    if self._is_key:
+                        self._is_key = False
+                        self._state = _COLON
+                    else:
+                        self._end_value()
+                elif c == "\\":
+                    self._state = _ESCAPE
+                else:
+                    return self._fail(i, "control character in string")
+                i += 1
+                continue
+
+            if c in _WS and (state < _STRING or state == _DONE):
+                i = _WS_RUN.match(text, i).end()
+                continue
+
+            if state == _VALUE or state == _ARRAY_FIRST:
+                if state == _ARRAY_FIRST and c == "]":
+                    self._stack.pop()
+                    self._end_value()
+                elif not self._start_value(c):
+                    return self._fail(i, f"unexpected {c!r}, expected a value")
+            elif state == _ARRAY_NEXT:
+                if c == ",":
+                    self._state = _VALUE
+                elif c == "]":
+                    self._stack.pop()
+                    self._end_value()
+                else:
+                    return self._fail(i, f"unexpected {c!r} in array")
+            elif state == _OBJECT_FIRST or state == _OBJECT_KEY:
+                if c == '"':
+                    self._is_key = True
+                    self._state = _STRING
+                elif state == _OBJECT_FIRST and c == "}":
+                    self._stack.pop()
+                    self._end_value()
+                else:
+                    return self._fail(i, f"unexpected {c!r}, expected an object key")
+            elif state == _COLON:
+                if c != ":":
+                    return self._fail(i, f"unexpected {c!r}, expected ':'")
+                self._state = _VALUE
+            elif state == _OBJECT_NEXT:
+                if c == ",":
+                    self._state = _OBJECT_KEY
+                elif c == "}":
+                    self._stack.pop()
+                    self._end_value()
+                else:
+                    return self._fail(i, f"unexpected {c!r} in object")
+            elif state == _ESCAPE:
+                if c == "u":
+                    self._pending = "xxxx"
+                    self._state = _UNICODE
+                elif c in _ESCAPES:
+                    self._state = _STRING
+                else:
+                    return self._fail(i, f"invalid escape \\{c}")
+            elif state == _UNICODE:
+                if c not in _HEX:
+                    return self._fail(i, "invalid \\u escape")
+                self._pending = self._pending[1:]
+                if not self._pending:
+                    self._state = _STRING
+            elif state == _LITERAL:
+                if c != self._pending[0]:
+                    return self._fail(i, f"unexpected {c!r} in literal")
+                self._pending = self._pending[1:]
+                if not self._pending:
+                    self._end_value()
+            elif state in _NUMBER_STATES:
+                if not self._number(c):
+                    if state not in _NUMBER_END:
+                        return self._fail(i, f"unexpected {c!r} in number")
+                    # The number ended; this character belongs to what follows
+                    self._end_value()
+                    continue
+                i += 1
+                if self._state in _DIGIT_STATES:
+                    run = _DIGIT_RUN.match(text, i)
+                    if run:
+                        i = run.end()
+                continue
+            else:  # _DONE
+                return self._fail(i, f"unexpected {c!r} after the document")
+            i += 1
+
+        self.position += n
+        return True
+
+    # -- transitions ---------------------------------------------------
+
+    def _start_value(self, c: str) -> bool:
+        if c == "{":
+            self._stack.append(_OBJECT)
+            self._state = _OBJECT_FIRST
+        elif c == "[":
+            self._stack.append(_ARRAY)
+            self._state = _ARRAY_FIRST
+        elif c == '"':
+            self._state = _STRING
+        elif c == "-":
+            self._state = _MINUS
+        elif c == "0":
+            self._state = _ZERO
+        elif c in _DIGITS:
+            self._state = _INTEGER
+        elif c in _LITERALS:
+            self._pending = _LITERALS[c]
+            self._state = _LITERAL
+        else:
+            return False
+        return True
+
+    def _number(self, c: str) -> bool:
+        """Advance the number state machine; False if c does not continue it."""
+        state = self._state
+        if state == _MINUS:
+            if c == "0":
+                self._state = _ZERO
+            elif c in _DIGITS:
+                self._state = _INTEGER
+            elif c == "I":
+                self._pending = _LITERALS["I"]
+                self._state = _LITERAL
+            else:
+                return False
+        elif c in _DIGITS:
+            if state == _ZERO:
+                return False
+            if state == _FRACTION_START:
+                self._state = _FRACTION
+            elif state in (_EXPONENT_START, _EXPONENT_SIGN):
+                self._state = _EXPONENT
+        elif c == "." and state in (_ZERO, _INTEGER):
+            self._state = _FRACTION_START
+        elif c in "eE" and state in (_ZERO, _INTEGER, _FRACTION):
+            self._state = _EXPONENT_START
+        elif c in "+-" and state == _EXPONENT_START:
+            self._state = _EXPONENT_SIGN
+        else:
+            return False
+        return True
+
+    def _end_value(self) -> None:
+        if not self._stack:
+            self._state = _DONE
+        elif self._stack[-1] == _OBJECT:
+            self._state = _OBJECT_NEXT
+        else:
+            self._state = _ARRAY_NEXT
+
+    def _fail(self, index: int, message: str) -> bool:
+        self.error = f"{message} at position {self.position + index}"
+        return False
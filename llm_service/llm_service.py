@@ -3,10 +3,12 @@ import grpc
 import logging
 import sys
 import os
+import queue
 import threading
+import time
 from concurrent import futures
+from typing import Optional
 import json
-from json.decoder import JSONDecodeError
 from pathlib import Path
 
 from llama_cpp import Llama, LlamaGrammar
@@ -26,9 +28,65 @@ except ImportError:
 
 # Import model registry for introspection RPCs
 try:
-    from .model_registry import resolve_model_spec, MODEL_SPECS, list_all_models
+    from .model_registry import resolve_model_spec, MODEL_SPECS, auto_configure, estimate_context_bytes
 except ImportError:
-    from model_registry import resolve_model_spec, MODEL_SPECS, list_all_models
+    from model_registry import resolve_model_spec, MODEL_SPECS, auto_configure, estimate_context_bytes
+
+# Import request scheduler (time-slices decoding across concurrent requests)
+try:
+    from .scheduler import (
+        DeadlineExceeded,
+        GenerationRequest,
+        LlamaDecodeBackend,
+        RequestCancelled,
+        RequestScheduler,
+        SchedulerOverloaded,
+    )
+except ImportError:
+    from scheduler import (
+        DeadlineExceeded,
+        GenerationRequest,
+        LlamaDecodeBackend,
+        RequestCancelled,
+        RequestScheduler,
+        SchedulerOverloaded,
+    )
+
+# Import prompt-prefix state cache
+try:
+    from .prefix_cache import PrefixStateCache
+except ImportError:
+    from prefix_cache import PrefixStateCache
+
+# Import resident model pool (several models loaded within a RAM budget)
+try:
+    from .model_pool import ModelLoadError, ModelPool
+except ImportError:
+    from model_pool import ModelLoadError, ModelPool
+
+# Import incremental JSON validator (streamed JSON-mode output)
+try:
+    from .json_stream import JSONStreamValidator
+except ImportError:
+    from json_stream import JSONStreamValidator
+
+# Speculative decoding drafts
+try:
+    from .speculative import PROMPT_LOOKUP, DraftModel, PromptLookupDraft
+except ImportError:
+    from speculative import PROMPT_LOOKUP, DraftModel, PromptLookupDraft
+
+# Exact token accounting
+try:
+    from .token_accounting import TokenAccountant
+except ImportError:
+    from token_accounting import TokenAccountant
+
+# Compiled grammar cache (structured output)
+try:
+    from .grammar_cache import GrammarCache, SchemaError
+except ImportError:
+    from grammar_cache import GrammarCache, SchemaError
 
 # Import self-consistency from core (consolidated logic)
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
@@ -54,11 +112,11 @@ CONFIG.log_config()
 # CONCURRENCY MANAGEMENT
 # =============================================================================
 # llama-cpp-python is NOT thread-safe for concurrent inference on a single
-# model instance. We use a threading.Lock to serialize all inference requests.
-# This prevents GGML_ASSERT crashes and thread pool check failures.
+# model instance. All inference runs on the RequestScheduler's worker thread,
+# which time-slices decode steps across concurrent requests (swapping per-request
+# KV state) instead of serializing whole requests behind a global lock.
 # See: https://github.com/ggml-org/llama.cpp/discussions/499
 # =============================================================================
-_inference_lock = threading.Lock()
 
 JSON_GRAMMAR = r'''
 root ::= object
@@ -75,60 +133,175 @@ class ModelManager:
     """
     Manages LLM model lifecycle: load, switch, and introspection.
 
-    Replaces the old @lru_cache load_model() approach with explicit
-    state management and thread-safe model switching.
+    Models are held in a ModelPool: several GGUF files from the model
+    directory stay resident within LLM_MODEL_POOL_MB, requests are routed
+    by model id (filename), and switching the default model loads the new
+    one in the background while the current one keeps serving.
+
+    Models paired with a draft in LLM_DRAFT_MODELS are loaded with it for
+    speculative decoding; draft models are loaded once and shared by the
+    models they draft for. A draft is charged to the pool budget with each
+    of its targets and released when the last of them is evicted.
+    Speculation is refused while the scheduler may swap states, since it
+    would copy the target's logits_all scores on every swap.
     """
 
     def __init__(self, config):
         self._config = config
-        self._model = None
-        self._model_path = config.model_path
-        self._lock = threading.Lock()
-
-    def get_model(self) -> Llama:
-        """Get the currently loaded model, loading it if necessary."""
-        if self._model is None:
-            with self._lock:
-                if self._model is None:
-                    self._load()
-        return self._model
-
-    def _load(self):
-        """Load model from the current model path."""
-        logger.info("Loading model from %s", self._model_path)
-        self._model = Llama(
-            model_path=self._model_path,
-            n_ctx=self._config.n_ctx,
-            n_threads=self._config.n_threads,
-            n_batch=self._config.n_batch,
-            verbose=self._config.verbose,
+        self._models_dir = Path(config.model_path).parent
+        self.pool = ModelPool(
+            loader=self._load,
+            default_model=Path(config.model_path).name,
+            max_bytes=config.model_pool_mb * 1024 * 1024,
+            size_of=self._size_of,
+            on_evict=self._on_evict,
         )
-        logger.info("Model loaded successfully: %s", Path(self._model_path).name)
-
-    def switch_model(self, new_model_path: str):
+        self._drafts = {}  # draft model id -> Llama
+        self._draft_users = {}  # draft model id -> ids of targets loaded with it
+        self._drafts_lock = threading.Lock()
+
+    def get_model(self, model_id: Optional[str] = None) -> Llama:
+        """Get a resident model (default if model_id is None), loading it if necessary."""
+        return self.pool.get(model_id)
+
+    def acquire(self, model_id: Optional[str] = None, timeout: Optional[float] = None):
+        """Lease a model for a request; see ModelPool.acquire."""
+        return self.pool.acquire(model_id or None, timeout=timeout)
+
+    def model_path(self, model_id: str) -> Path:
+        """Path of a model id inside the model directory."""
+        return self._models_dir / Path(model_id).name
+
+    def _n_ctx(self, model_id: str) -> int:
+        """Context size a model is loaded with."""
+        model_path = self.model_path(model_id)
+        if model_path == Path(self._config.model_path):
+            return self._config.n_ctx
+        return auto_configure(str(model_path))["n_ctx"]
+
+    def _size_of(self, model_id: str) -> int:
+        """
+        Pool charge for a model: weights plus the KV cache and scores
+        buffer for its n_ctx, and the same for its draft model if any.
+        """
+        n_ctx, n_batch = self._n_ctx(model_id), self._config.n_batch
+        draft_id = self._draft_id(model_id)
+        model_path = self.model_path(model_id)
+        size = model_path.stat().st_size + estimate_context_bytes(
+            str(model_path), n_ctx, n_batch, logits_all=draft_id is not None
+        )
+        if draft_id not in (None, PROMPT_LOOKUP):
+            # Shared drafts are charged to each target (conservative)
+            draft_path = self.model_path(draft_id)
+            size += draft_path.stat().st_size + estimate_context_bytes(str(draft_path), n_ctx, n_batch)
+        return size
+
+    def _on_evict(self, model_id: str, model: Llama) -> None:
+        _prefix_cache.forget(model)
+        self._release_draft(model_id)
+
+    def _load(self, model_id: str) -> Llama:
+        """Load a model by id (runs on a ModelPool loader thread)."""
+        model_path = self.model_path(model_id)
+        n_ctx = self._n_ctx(model_id)
+        draft = self._draft_for(model_id, n_ctx)
+        logger.info("Loading model from %s", model_path)
+        try:
+            model = Llama(
+                model_path=str(model_path),
+                n_ctx=n_ctx,
+                n_threads=self._config.n_threads,
+                n_batch=self._config.n_batch,
+                verbose=self._config.verbose,
+                draft_model=draft,
+            )
+        except Exception:
+            self._release_draft(model_id)
+            raise
+        if isinstance(draft, DraftModel) and draft.model.n_vocab() != model.n_vocab():
+            # Proposals would be meaningless token ids; decode without the draft
+            logger.error("Draft %s does not share the vocabulary of %s; speculative decoding disabled", draft.name, model_id)
+            model.draft_model = None
+            self._release_draft(model_id)
+        logger.info("Model loaded successfully: %s", model_path.name)
+        return model
+
+    def load_vocab(self, model_id: str) -> Llama:
+        """Load only a model's tokenizer (no weights), for token counting."""
+        model_path = self.model_path(model_id)
+        if not model_path.is_file():
+            raise FileNotFoundError(f"Model file not found: {model_path}")
+        return Llama(model_path=str(model_path), vocab_only=True, verbose=self._config.verbose)
+
+    def _draft_id(self, model_id: str) -> Optional[str]:
+        """Draft paired with a target model, or None (also when speculation is refused)."""
+        draft_id = self._config.draft_model_for(model_id)
+        if draft_id is not None and self._config.scheduler_swaps_states:
+            return None
+        return draft_id
+
+    def _draft_for(self, model_id: str, n_ctx: int):
+        """Speculative draft for a target model, or None."""
+        draft_id = self._draft_id(model_id)
+        if draft_id is None:
+            if self._config.draft_model_for(model_id) is not None:
+                logger.error(
+                    "Speculative decoding for %s disabled: the scheduler would swap its "
+                    "logits_all state; set LLM_SCHED_MAX_SUSPENDED=0 or LLM_SCHED_MAX_ACTIVE=1",
+                    model_id,
+                )
+            return None
+        num_pred_tokens = self._config.draft_tokens
+        logger.info("Speculative decoding for %s with %s (%d tokens/round)", model_id, draft_id, num_pred_tokens)
+        if draft_id == PROMPT_LOOKUP:
+            return PromptLookupDraft(num_pred_tokens=num_pred_tokens)
+
+        with self._drafts_lock:
+            draft = self._drafts.get(draft_id)
+            if draft is None:
+                draft_path = self.model_path(draft_id)
+                logger.info("Loading draft model from %s", draft_path)
+                draft = Llama(
+                    model_path=str(draft_path),
+                    n_ctx=n_ctx,
+                    n_threads=self._config.n_threads,
+                    n_batch=self._config.n_batch,
+                    verbose=self._config.verbose,
+                )
+                self._drafts[draft_id] = draft
+            self._draft_users.setdefault(draft_id, set()).add(model_id)
+        return DraftModel(draft, num_pred_tokens=num_pred_tokens, name=draft_id)
+
+    def _release_draft(self, model_id: str) -> None:
+        """Drop a target's claim on its draft model; the last claim releases it."""
+        with self._drafts_lock:
+            for draft_id, users in list(self._draft_users.items()):
+                users.discard(model_id)
+                if not users:
+                    # Freed once the evicted targets holding it are collected
+                    logger.info("Releasing draft model %s", draft_id)
+                    del self._draft_users[draft_id]
+                    del self._drafts[draft_id]
+
+    def switch_model(self, new_model_path: str, wait: bool = False):
         """
-        Switch to a different model. Acquires inference lock to block
-        all concurrent inference during the switch (~10-30s).
+        Switch the default model. The new model loads in the background and
+        takes over default traffic once ready; in-flight and queued requests
+        keep running on the current model meanwhile.
         """
-        with _inference_lock:
-            with self._lock:
-                logger.info("Switching model from %s to %s",
-                            Path(self._model_path).name,
-                            Path(new_model_path).name)
-                # Release old model
-                del self._model
-                self._model = None
-                self._model_path = new_model_path
-                self._config.model_path = new_model_path
-                self._load()
+        model_id = Path(new_model_path).name
+        logger.info("Switching model from %s to %s", self.active_model_filename, model_id)
+        ready = self.pool.set_default(model_id)
+        if wait:
+            ready.wait()
 
     @property
     def active_model_path(self) -> str:
-        return self._model_path
+        return str(self.model_path(self.pool.default_model))
 
     @property
     def active_model_filename(self) -> str:
-        return Path(self._model_path).name
+        return self.pool.default_model
 
 
 class HealthServicer(health.HealthServicer):
@@ -141,52 +314,150 @@ class HealthServicer(health.HealthServicer):
 # Global model manager
 _model_manager = ModelManager(CONFIG)
 
+# Cached prompt-prefix states (system prompt / tool schema reuse)
+_prefix_cache = PrefixStateCache(max_bytes=CONFIG.prefix_cache_mb * 1024 * 1024)
+
+# Token counts from the resident model's tokenizer, or a vocab-only load
+_token_accountant = TokenAccountant(
+    resident=_model_manager.pool.peek,
+    load_vocab=_model_manager.load_vocab,
+)
+
+# Compiled grammars for JSON mode and per-tool schemas, keyed by schema hash.
+# LlamaGrammar only holds the grammar text; each generation builds its own
+# sampler from it, so one instance can serve concurrent requests.
+_grammar_cache = GrammarCache(compile=LlamaGrammar.from_string)
+
+# Global request scheduler (sole owner of inference on the loaded model)
+_scheduler = RequestScheduler(
+    LlamaDecodeBackend(_model_manager.get_model, prefix_cache=_prefix_cache),
+    max_active=CONFIG.scheduler_max_active,
+    max_queue=CONFIG.scheduler_max_queue,
+    tokens_per_turn=CONFIG.scheduler_tokens_per_turn,
+    max_suspended=CONFIG.scheduler_max_suspended,
+)
+
+
+def _request_deadline(context) -> Optional[float]:
+    """Translate the gRPC deadline into an absolute time.monotonic() deadline."""
+    remaining = context.time_remaining()
+    if remaining is None:
+        return None
+    return time.monotonic() + remaining
+
+
+def _abort_scheduler_error(context, error: Exception):
+    """Map scheduler errors onto gRPC status codes."""
+    if isinstance(error, SchedulerOverloaded):
+        context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, str(error))
+    elif isinstance(error, DeadlineExceeded):
+        context.abort(grpc.StatusCode.DEADLINE_EXCEEDED, str(error))
+    else:
+        context.abort(grpc.StatusCode.CANCELLED, str(error))
+
+
+def _lease_model(model_id: str, context):
+    """Lease the requested model, waiting (within the deadline) for it to load."""
+    return _model_manager.acquire(model_id or None, timeout=context.time_remaining())
+
+
+def _release_when_done(lease, handles) -> None:
+    """Keep the leased model resident until every handle has finished."""
+    remaining = [len(handles)]
+    lock = threading.Lock()
+
+    def done(_):
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            lease.release()
+
+    for handle in handles:
+        handle.add_done_callback(done)
+
+
+def _abort_model_error(context, error: Exception):
+    """Map model pool errors onto gRPC status codes."""
+    if isinstance(error, FileNotFoundError):
+        context.abort(grpc.StatusCode.NOT_FOUND, f"Unknown model: {error}")
+    elif isinstance(error, TimeoutError):
+        context.abort(grpc.StatusCode.DEADLINE_EXCEEDED, str(error))
+    else:
+        context.abort(grpc.StatusCode.UNAVAILABLE, str(error))
+
 
 class LLMServiceServicer(llm_pb2_grpc.LLMServiceServicer):
     def Generate(self, request, context):
+        handle = None
+        lease = None
         try:
-            llm = _model_manager.get_model()
-            gen_config = {
-                "max_tokens": min(request.max_tokens, CONFIG.max_tokens),
-                "temperature": max(0.1, min(request.temperature, 1.0)),
-                "stream": True
-            }
-
-            # Only add grammar if response_format is "json"
-            if request.response_format == "json":
-                gen_config["grammar"] = self._get_json_grammar()
-
-            # Acquire inference lock to prevent concurrent access to llama model
-            # llama-cpp-python is NOT thread-safe for concurrent inference
-            with _inference_lock:
-                # Generation loop with JSON validation
-                output_buffer = ""
-                json_valid = True
-                for output in llm(request.prompt, **gen_config):
-                    token = output["choices"][0]["text"]
-                    output_buffer += token
-
-
-                    # Validate JSON incrementally
-                    if request.response_format == "json":
-                        try:
-                            json.loads(output_buffer)
-                            json_valid = True
-                        except JSONDecodeError:
-                            json_valid = False
-
-                    yield llm_pb2.GenerateResponse(
-                        token=token,
-                        is_final=False,
-                        is_valid_json=json_valid
-                    )
+            # json_schema constrains output to that schema; response_format
+            # "json" to any JSON value
+            grammar = self._get_grammar(request.response_format, request.json_schema)
+
+            # Blocks this request only while its model loads in the background
+            lease = _lease_model(request.model, context)
+            handle = _scheduler.submit(GenerationRequest(
+                prompt=request.prompt,
+                max_tokens=self._clamp_max_tokens(request.max_tokens),
+                temperature=max(0.1, min(request.temperature, 1.0)),
+                grammar=grammar,
+                priority=request.priority,
+                deadline=_request_deadline(context),
+                model=lease.model_id,
+            ))
+            _release_when_done(lease, [handle])
+            # Stop decoding as soon as the client goes away
+            context.add_callback(handle.cancel)
+
+            # Generation loop with JSON validation
+            validator = JSONStreamValidator() if grammar is not None else None
+            json_valid = True
+            for token in handle:
+                # Validate JSON incrementally (each token is scanned once)
+                if validator is not None:
+                    if not validator.feed(token):
+                        # No continuation can make this valid JSON; stop decoding
+                        logger.warning(f"Aborting generation: invalid JSON ({validator.error})")
+                        handle.cancel()
+                        json_valid = False
+                        break
+                    json_valid = validator.complete
 
                 yield llm_pb2.GenerateResponse(
-                    token="",
-                    is_final=True,
+                    token=token,
+                    is_final=False,
                     is_valid_json=json_valid
                 )
 
+            stats = handle.stats
+            speculation = stats.get("speculation", {})
+            if speculation:
+                logger.info(
+                    f"Speculative acceptance {speculation['acceptance_rate']:.0%} "
+                    f"({speculation['accepted']}/{speculation['drafted']} draft tokens)"
+                )
+            yield llm_pb2.GenerateResponse(
+                token="",
+                is_final=True,
+                is_valid_json=json_valid,
+                draft_tokens=speculation.get("drafted", 0),
+                accepted_draft_tokens=speculation.get("accepted", 0),
+                prompt_tokens=stats.get("prompt_tokens", 0),
+                # Stopped early (invalid JSON): the session has not reported yet
+                completion_tokens=stats.get("completion_tokens", handle.tokens_generated),
+            )
+
+        except (SchedulerOverloaded, DeadlineExceeded, RequestCancelled) as e:
+            logger.warning(f"Generation not completed: {e}")
+            _abort_scheduler_error(context, e)
+        except (FileNotFoundError, TimeoutError, ModelLoadError) as e:
+            logger.warning(f"Model {request.model or 'default'} unavailable: {e}")
+            _abort_model_error(context, e)
+        except SchemaError as e:
+            logger.warning(f"Rejected json_schema: {e}")
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, f"Invalid json_schema: {e}")
         except Exception as e:
             import traceback
             tb = traceback.format_exc()
@@ -196,51 +467,70 @@ class LLMServiceServicer(llm_pb2_grpc.LLMServiceServicer):
                 grpc.StatusCode.INTERNAL,
                 f"Generation error ({type(e).__name__}): {str(e) or 'No message'}"
             )
+        finally:
+            if handle is not None:
+                handle.cancel()
+            elif lease is not None:
+                lease.release()
 
     def GenerateBatch(self, request, context):
         """
         Generate k samples for self-consistency scoring (Agent0 Phase 2).
         Returns all responses plus majority voting metrics.
         """
+        handles = []
         try:
-            llm = _model_manager.get_model()
-            num_samples = max(1, min(request.num_samples, 10))  # Clamp 1-10
-            responses = []
-
-            gen_config = {
-                "max_tokens": min(request.max_tokens, CONFIG.max_tokens),
-                "temperature": max(0.1, min(request.temperature, 1.0)),
-                "stream": False  # Non-streaming for batch
-            }
-
-            if request.response_format == "json":
-                gen_config["grammar"] = self._get_json_grammar()
-
-            # Acquire inference lock - llama-cpp-python is NOT thread-safe
-            with _inference_lock:
-                # Generate k samples sequentially (single model instance)
-                for i in range(num_samples):
-                    logger.info(f"Generating sample {i+1}/{num_samples}")
-                    output = llm(request.prompt, **gen_config)
-                    text = output["choices"][0]["text"].strip()
-                    responses.append(text)
-
-            # Compute self-consistency via consolidated module
-            if compute_self_consistency is not None:
-                consistency_score, majority_answer, majority_count = compute_self_consistency(responses)
-            else:
-                # Fallback if core module not available
-                majority_answer, majority_count, consistency_score = self._compute_majority_vote_fallback(responses)
-
-            logger.info(f"Self-consistency: {consistency_score:.2f} ({majority_count}/{num_samples} agree)")
-
-            return llm_pb2.GenerateBatchResponse(
-                responses=responses,
-                self_consistency_score=consistency_score,
-                majority_answer=majority_answer,
-                majority_count=majority_count
+            handles = self._submit_batch(request, context)
+            responses = [handle.result().strip() for handle in handles]
+            return self._batch_summary(responses, handles)
+
+        except (SchedulerOverloaded, DeadlineExceeded, RequestCancelled) as e:
+            logger.warning(f"Batch generation not completed: {e}")
+            _abort_scheduler_error(context, e)
+        except (FileNotFoundError, TimeoutError, ModelLoadError) as e:
+            logger.warning(f"Model {request.model or 'default'} unavailable: {e}")
+            _abort_model_error(context, e)
+        except Exception as e:
+            import traceback
+            tb = traceback.format_exc()
+            logger.error(f"Batch generation failed: {tb}")
+            context.abort(
+                grpc.StatusCode.INTERNAL,
+                f"Batch generation error ({type(e).__name__}): {str(e) or 'No message'}"
             )
+        finally:
+            for handle in handles:
+                handle.cancel()
+
+    def GenerateBatchStream(self, request, context):
+        """
+        GenerateBatch, streaming each sample as soon as it completes.
 
+        Samples arrive in completion order (BatchSample.index gives their
+        position); the last message carries the full GenerateBatchResponse.
+        """
+        handles = []
+        try:
+            handles = self._submit_batch(request, context)
+            done = queue.Queue()
+            for index, handle in enumerate(handles):
+                handle.add_done_callback(lambda _, i=index: done.put(i))
+
+            responses = [""] * len(handles)
+            for _ in handles:
+                index = done.get()
+                responses[index] = handles[index].result().strip()
+                yield llm_pb2.GenerateBatchStreamResponse(
+                    sample=llm_pb2.BatchSample(index=index, response=responses[index])
+                )
+            yield llm_pb2.GenerateBatchStreamResponse(summary=self._batch_summary(responses, handles))
+
+        except (SchedulerOverloaded, DeadlineExceeded, RequestCancelled) as e:
+            logger.warning(f"Batch generation not completed: {e}")
+            _abort_scheduler_error(context, e)
+        except (FileNotFoundError, TimeoutError, ModelLoadError) as e:
+            logger.warning(f"Model {request.model or 'default'} unavailable: {e}")
+            _abort_model_error(context, e)
         except Exception as e:
             import traceback
             tb = traceback.format_exc()
@@ -249,6 +539,62 @@ class LLMServiceServicer(llm_pb2_grpc.LLMServiceServicer):
                 grpc.StatusCode.INTERNAL,
                 f"Batch generation error ({type(e).__name__}): {str(e) or 'No message'}"
             )
+        finally:
+            for handle in handles:
+                handle.cancel()
+
+    def _submit_batch(self, request, context):
+        """
+        Queue k samples of the prompt as one prompt-sharing group.
+
+        The prompt is evaluated once and every sample decodes from that
+        state with its own seed, interleaved with other clients' requests.
+        """
+        num_samples = max(1, min(request.num_samples, 10))  # Clamp 1-10
+        lease = _lease_model(request.model, context)
+        try:
+            handles = _scheduler.submit_batch(
+                GenerationRequest(
+                    prompt=request.prompt,
+                    max_tokens=self._clamp_max_tokens(request.max_tokens),
+                    temperature=max(0.1, min(request.temperature, 1.0)),
+                    grammar=self._get_grammar(request.response_format),
+                    priority=request.priority,
+                    deadline=_request_deadline(context),
+                    seed=request.seed or None,
+                    model=lease.model_id,
+                ),
+                num_samples,
+            )
+        except BaseException:
+            lease.release()
+            raise
+        _release_when_done(lease, handles)
+        for handle in handles:
+            context.add_callback(handle.cancel)
+        logger.info(f"Generating {num_samples} samples")
+        return handles
+
+    def _batch_summary(self, responses, handles):
+        # Compute self-consistency via consolidated module
+        if compute_self_consistency is not None:
+            consistency_score, majority_answer, majority_count = compute_self_consistency(responses)
+        else:
+            # Fallback if core module not available
+            majority_answer, majority_count, consistency_score = self._compute_majority_vote_fallback(responses)
+
+        logger.info(f"Self-consistency: {consistency_score:.2f} ({majority_count}/{len(responses)} agree)")
+
+        # The prompt is evaluated once for the whole batch
+        stats = [handle.stats for handle in handles]
+        return llm_pb2.GenerateBatchResponse(
+            responses=responses,
+            self_consistency_score=consistency_score,
+            majority_answer=majority_answer,
+            majority_count=majority_count,
+            prompt_tokens=max((s.get("prompt_tokens", 0) for s in stats), default=0),
+            completion_tokens=sum(s.get("completion_tokens", 0) for s in stats),
+        )
 
     def GetActiveModel(self, request, context):
         """Return information about the currently loaded model."""
@@ -279,7 +625,7 @@ class LLMServiceServicer(llm_pb2_grpc.LLMServiceServicer):
     def ListModels(self, request, context):
         """Return all known models from the registry."""
         models = []
-        for spec in list_all_models():
+        for model_id, spec in MODEL_SPECS.items():
             models.append(llm_pb2.ModelInfo(
                 filename=spec.name,  # For GGUF, use registry key; for AirLLM, use name
                 name=spec.name,
@@ -287,6 +633,7 @@ class LLMServiceServicer(llm_pb2_grpc.LLMServiceServicer):
                 recommended_ctx=spec.recommended_ctx,
                 capabilities=list(spec.capabilities),
                 tier=spec.tier,
+                resident=_model_manager.pool.is_resident(model_id),
             ))
 
         return llm_pb2.ListModelsResponse(
@@ -294,6 +641,18 @@ class LLMServiceServicer(llm_pb2_grpc.LLMServiceServicer):
             active_model=_model_manager.active_model_filename,
         )
 
+    def CountTokens(self, request, context):
+        """Count tokens with a model's own tokenizer (the active model by default)."""
+        model_id = request.model or _model_manager.active_model_filename
+        try:
+            counts = _token_accountant.count(list(request.texts), model_id)
+        except FileNotFoundError as e:
+            context.abort(grpc.StatusCode.NOT_FOUND, f"Unknown model: {e}")
+        except Exception as e:
+            logger.error(f"Token counting failed: {e}")
+            context.abort(grpc.StatusCode.INTERNAL, f"Token counting failed: {e}")
+        return llm_pb2.CountTokensResponse(counts=counts, total=sum(counts), model=model_id)
+
     def _compute_majority_vote_fallback(self, responses: list) -> tuple:
         """
         Fallback majority voting if core module not available.
@@ -333,12 +692,30 @@ class LLMServiceServicer(llm_pb2_grpc.LLMServiceServicer):
         consistency_score = count / len(responses)
         return majority_answer, count, consistency_score
 
-    def _get_json_grammar(self):
-        """Build LlamaGrammar from the module-level JSON_GRAMMAR constant."""
-        return LlamaGrammar.from_string(JSON_GRAMMAR)
+    def _clamp_max_tokens(self, requested: int) -> int:
+        """Apply the service-wide limit (0/unset means the limit itself)."""
+        if requested <= 0:
+            return CONFIG.max_tokens
+        return min(requested, CONFIG.max_tokens)
+
+    def _get_grammar(self, response_format: str, json_schema: str = ""):
+        """
+        Compiled grammar for the requested output format (None = free text).
+
+        Grammars come from _grammar_cache, so each schema is converted and
+        compiled once.
+
+        Raises:
+            SchemaError: If json_schema cannot be converted into a grammar
+        """
+        if json_schema:
+            return _grammar_cache.for_schema(json_schema)
+        if response_format == "json":
+            return _grammar_cache.compile(JSON_GRAMMAR)
+        return None
 
 def serve():
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=CONFIG.max_workers))
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=CONFIG.grpc_workers))
     llm_pb2_grpc.add_LLMServiceServicer_to_server(LLMServiceServicer(), server)
     health_pb2_grpc.add_HealthServicer_to_server(HealthServicer(), server)
 
@@ -349,6 +726,7 @@ def serve():
     ], server)
 
     server.add_insecure_port(f"{CONFIG.host}:{CONFIG.port}")
+    _scheduler.start()
     logger.info(f"LLM Service operational on {CONFIG.host}:{CONFIG.port}")
     server.start()
 
@@ -0,0 +1,291 @@
+"""
+Resident model pool for the LLM service.
+
+Keeps several models loaded at once within a memory budget so the LIDM
+tiers in MODEL_SPECS can be served from one process:
+
+- Requests name a model id (registry filename); None means the default model
+- Least-recently-used idle models are evicted to make room for a load
+- Loads run on background threads: a caller waiting for a model blocks only
+  itself, and resident models keep serving in the meantime
+- Switching the default model loads the new one in the background and only
+  routes default traffic to it once it is ready
+- Leased models (in use by a request) and the default model are never
+  evicted; if they push the pool over budget, the excess idle models are
+  evicted as soon as their leases are released
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ModelLoadError(RuntimeError):
+    """A model could not be loaded."""
+
+
+class _Resident:
+    """A pool slot: a loaded (or loading) model."""
+
+    def __init__(self, model_id: str, size: int):
+        self.model_id = model_id
+        self.size = size
+        self.model: Any = None
+        self.error: Optional[BaseException] = None
+        self.ready = threading.Event()
+        self.leases = 0
+        self.promote = False  # become the default model once loaded
+        self.loaded_at: Optional[float] = None
+
+
+class ModelLease:
+    """
+    Keeps a model resident while a request uses it.
+
+    Example:
+        >>> with pool.acquire("qwen2.5-3b-instruct-q5_k_m.gguf") as lease:
+        ...     lease.model.generate(...)
+    """
+
+    def __init__(self, pool: "ModelPool", entry: _Resident):
+        self._pool = pool
+        self._entry = entry
+        self._released = False
+
+    @property
+    def model_id(self) -> str:
+        return self._entry.model_id
+
+    @property
+    def model(self) -> Any:
+        return self._entry.model
+
+    def release(self) -> None:
+        """Allow the model to be evicted again (idempotent)."""
+        if not self._released:
+            self._released = True
+            self._pool._release(self._entry)
+
+    def __enter__(self) -> "ModelLease":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+class ModelPool:
+    """
+    LRU pool of resident models bounded by a byte budget.
+
+    Args:
+        loader: Callable loading a model by id (runs on a background thread)
+        default_model: Model id served when a request names none
+        max_bytes: Memory budget for resident models. The default model and
+            leased models may exceed it; 0 keeps only those resident.
+        size_of: Callable returning a model's size in bytes before loading
+        on_evict: Called as on_evict(model_id, model) after an eviction
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[str], Any],
+        default_model: str,
+        max_bytes: int,
+        size_of: Callable[[str], int],
+        on_evict: Optional[Callable[[str, Any], None]] = None,
+    ):
+        self.loader = loader
+        self.default_model = default_model
+        self.max_bytes = max(0, max_bytes)
+        self.size_of = size_of
+        self.on_evict = on_evict
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _Resident]" = OrderedDict()  # oldest first
+        self._counters: Dict[str, int] = {
+            "hits": 0, "misses": 0, "loads": 0, "load_failures": 0, "evictions": 0,
+        }
+
+    # -- public API ----------------------------------------------------
+
+    def acquire(self, model_id: Optional[str] = None, timeout: Optional[float] = None) -> ModelLease:
+        """
+        Lease a model, loading it in the background if it is not resident.
+
+        Raises:
+            TimeoutError: If the model is not loaded within timeout
+            ModelLoadError: If loading failed
+            FileNotFoundError: If the model id is unknown (from size_of)
+        """
+        # The lease is taken before waiting so the model cannot be evicted
+        # between finishing its load and being handed out
+        entry = self._ensure(model_id, lease=True)
+        if not entry.ready.wait(timeout):
+            self._release(entry)
+            raise TimeoutError(f"Model {entry.model_id} not loaded within {timeout:.1f}s")
+        if entry.error is not None:
+            raise ModelLoadError(f"Failed to load {entry.model_id}: {entry.error}") from entry.error
+        return ModelLease(self, entry)
+
+    def get(self, model_id: Optional[str] = None) -> Any:
+        """Return a resident model, loading it first if needed (blocks the caller)."""
+        with self.acquire(model_id) as lease:
+            return lease.model
+
+    def prefetch(self, model_id: str) -> threading.Event:
+        """Start loading a model in the background; returns its ready event."""
+        return self._ensure(model_id).ready
+
+    def set_default(self, model_id: str) -> threading.Event:
+        """
+        Route default traffic to model_id once it has loaded.
+
+        The current default keeps serving until then. Returns the new
+        model's ready event.
+        """
+        with self._lock:
+            entry = self._entries.get(model_id)
+            if entry is not None and entry.ready.is_set() and entry.error is None:
+                self._promote(entry)
+                return entry.ready
+        entry = self._ensure(model_id)
+        with self._lock:
+            if entry.ready.is_set():
+                if entry.error is None:
+                    self._promote(entry)
+            else:
+                entry.promote = True
+        return entry.ready
+
+    def peek(self, model_id: Optional[str] = None) -> Any:
+        """A loaded model without leasing or loading it (None if not resident)."""
+        with self._lock:
+            entry = self._entries.get(model_id or self.default_model)
+            return entry.model if entry is not None else None
+
+    def is_resident(self, model_id: str) -> bool:
+        with self._lock:
+            entry = self._entries.get(model_id)
+            return entry is not None and entry.model is not None
+
+    def resident(self) -> List[Dict[str, Any]]:
+        """Loaded and loading models, least recently used first."""
+        with self._lock:
+            return [
+                {
+                    "model_id": entry.model_id,
+                    "size": entry.size,
+                    "loaded": entry.model is not None,
+                    "leases": entry.leases,
+                    "default": entry.model_id == self.default_model,
+                }
+                for entry in self._entries.values()
+            ]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "resident": len(self._entries),
+                "bytes": self._bytes(),
+                "max_bytes": self.max_bytes,
+                **self._counters,
+            }
+
+    # -- internals -----------------------------------------------------
+
+    def _ensure(self, model_id: Optional[str], lease: bool = False) -> _Resident:
+        """Pool entry for model_id, starting a background load if needed."""
+        with self._lock:
+            model_id = model_id or self.default_model
+            entry = self._entries.get(model_id)
+            if entry is not None:
+                self._entries.move_to_end(model_id)
+                self._counters["hits"] += 1
+                entry.leases += lease
+                return entry
+            entry = _Resident(model_id, self.size_of(model_id))
+            entry.leases += lease
+            self._entries[model_id] = entry
+            self._counters["misses"] += 1
+            evicted = self._make_room()
+
+        self._after_evict(evicted)
+        logger.info(f"Loading model {model_id} in the background ({entry.size / 2**20:.0f} MB)")
+        threading.Thread(
+            target=self._load, args=(entry,), name=f"model-load-{model_id}", daemon=True
+        ).start()
+        return entry
+
+    def _load(self, entry: _Resident) -> None:
+        started = time.monotonic()
+        try:
+            model = self.loader(entry.model_id)
+        except Exception as e:
+            logger.error(f"Model {entry.model_id} failed to load: {e}")
+            with self._lock:
+                entry.error = e
+                self._counters["load_failures"] += 1
+                if self._entries.get(entry.model_id) is entry:
+                    del self._entries[entry.model_id]
+            entry.ready.set()
+            return
+
+        with self._lock:
+            entry.model = model
+            entry.loaded_at = time.monotonic()
+            self._counters["loads"] += 1
+            if entry.promote:
+                self._promote(entry)
+            evicted = self._make_room()
+        entry.ready.set()
+        logger.info(f"Model {entry.model_id} loaded in {time.monotonic() - started:.1f}s")
+        self._after_evict(evicted)
+
+    def _release(self, entry: _Resident) -> None:
+        with self._lock:
+            entry.leases -= 1
+            evicted = self._make_room()
+        self._after_evict(evicted)
+
+    def _promote(self, entry: _Resident) -> None:
+        """Make entry the default model (lock held)."""
+        entry.promote = False
+        if self.default_model != entry.model_id:
+            logger.info(f"Default model switched from {self.default_model} to {entry.model_id}")
+            self.default_model = entry.model_id
+
+    def _bytes(self) -> int:
+        return sum(entry.size for entry in self._entries.values())
+
+    def _make_room(self) -> List[_Resident]:
+        """Evict idle models, oldest first, until within budget (lock held)."""
+        evicted = []
+        used = self._bytes()
+        for model_id, entry in list(self._entries.items()):
+            if used <= self.max_bytes:
+                break
+            if (
+                entry.leases
+                or entry.model is None  # still loading
+                or model_id == self.default_model
+            ):
+                continue
+            del self._entries[model_id]
+            used -= entry.size
+            self._counters["evictions"] += 1
+            evicted.append(entry)
+        return evicted
+
+    def _after_evict(self, evicted: List[_Resident]) -> None:
+        for entry in evicted:
+            logger.info(f"Evicted model {entry.model_id} ({entry.size / 2**20:.0f} MB)")
+            model, entry.model = entry.model, None
+            if self.on_evict is not None:
+                try:
+                    self.on_evict(entry.model_id, model)
+                except Exception as e:
+                    logger.warning(f"on_evict for {entry.model_id} failed: {e}")
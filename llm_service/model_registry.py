@@ -30,6 +30,8 @@ class ModelSpec:
     capabilities: Tuple[str, ...] = ()
     tier: str = "standard"  # heavy, standard, light, micro, ultra
     backend: str = "llama-cpp"  # llama-cpp, airllm
+    kv_bytes_per_token: int = 0  # f16 K+V over all layers (0 = unknown)
+    n_vocab: int = 0  # vocabulary size (0 = unknown)
 
 
 # ── Known models ──────────────────────────────────────────────────────
@@ -44,6 +46,8 @@ MODEL_SPECS: Dict[str, ModelSpec] = {
         capabilities=("reasoning", "coding", "analysis", "verification"),
         tier="heavy",
         backend="llama-cpp",
+        kv_bytes_per_token=40 * 2 * 8 * 128 * 2,  # layers x (k, v) x kv heads x head dim x f16
+        n_vocab=131_072,
     ),
     "Qwen2.5-14B-Instruct-Q4_K.gguf": ModelSpec(
         name="Qwen2.5-14B-Instruct",
@@ -55,6 +59,8 @@ MODEL_SPECS: Dict[str, ModelSpec] = {
         capabilities=("coding", "multilingual", "reasoning", "math", "finance"),
         tier="standard",
         backend="llama-cpp",
+        kv_bytes_per_token=48 * 2 * 8 * 128 * 2,
+        n_vocab=152_064,
     ),
     "qwen2.5-3b-instruct-q5_k_m.gguf": ModelSpec(
         name="Qwen2.5-3B-Instruct",
@@ -66,6 +72,8 @@ MODEL_SPECS: Dict[str, ModelSpec] = {
         capabilities=("routing", "classification", "fast_response"),
         tier="light",
         backend="llama-cpp",
+        kv_bytes_per_token=36 * 2 * 2 * 128 * 2,
+        n_vocab=151_936,
     ),
     "qwen2.5-0.5b-instruct-q5_k_m.gguf": ModelSpec(
         name="Qwen2.5-0.5B-Instruct",
@@ -77,6 +85,8 @@ MODEL_SPECS: Dict[str, ModelSpec] = {
         capabilities=("routing", "classification", "extraction"),
         tier="micro",
         backend="llama-cpp",
+        kv_bytes_per_token=24 * 2 * 2 * 64 * 2,
+        n_vocab=151_936,
     ),
     # AirLLM model (HuggingFace safetensors, not GGUF)
     "Llama-3.1-70B-Instruct": ModelSpec(
@@ -89,6 +99,8 @@ MODEL_SPECS: Dict[str, ModelSpec] = {
         capabilities=("reasoning", "verification", "analysis", "deep_research"),
         tier="ultra",
         backend="airllm",
+        kv_bytes_per_token=80 * 2 * 8 * 128 * 2,
+        n_vocab=128_256,
     ),
 }
 
@@ -133,6 +145,28 @@ def auto_configure(model_path: str, *, override_ctx: Optional[int] = None) -> di
     }
 
 
+# Assumed for models missing from the registry (a 7-8B GQA model)
+_FALLBACK_KV_BYTES_PER_TOKEN = 32 * 2 * 8 * 128 * 2
+_FALLBACK_N_VOCAB = 152_064
+
+
+def estimate_context_bytes(
+    model_path: str, n_ctx: int, n_batch: int, *, logits_all: bool = False
+) -> int:
+    """
+    Memory a loaded llama.cpp model needs beyond its weights.
+
+    Counts the f16 KV cache for n_ctx tokens and the float32 scores buffer
+    (n_batch rows, or n_ctx rows with logits_all, as for models loaded
+    with a speculative draft). Unknown models use a 7-8B estimate.
+    """
+    spec = MODEL_SPECS.get(Path(model_path).name)
+    kv_bytes_per_token = (spec and spec.kv_bytes_per_token) or _FALLBACK_KV_BYTES_PER_TOKEN
+    n_vocab = (spec and spec.n_vocab) or _FALLBACK_N_VOCAB
+    score_rows = n_ctx if logits_all else min(n_batch, n_ctx)
+    return n_ctx * kv_bytes_per_token + score_rows * n_vocab * 4
+
+
 def find_models_by_capability(capability: str) -> List[ModelSpec]:
     """Return all models that have the given capability, sorted by tier priority."""
     tier_order = {"ultra": 0, "heavy": 1, "standard": 2, "light": 3, "micro": 4}
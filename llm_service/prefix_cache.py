@@ -0,0 +1,233 @@
+"""
+Prompt-prefix state cache for the LLM service.
+
+Saves the llama.cpp evaluation state (KV cache + input ids) after a prompt
+has been evaluated and restores it for later prompts that start with the
+same tokens, e.g. the long system prompt and tool schema the orchestrator
+prepends on every tool-loop iteration. Llama.generate() then only evaluates
+the tokens after the longest common prefix.
+
+Prefixes are matched on token blocks: every entry is indexed under the hash
+of each BLOCK_TOKENS-aligned prefix of its tokens, so a lookup walks the
+prompt's block hashes and picks the longest one that is cached. Entries are
+kept in an LRU bounded by a byte budget.
+
+A state is only valid for the model that produced it, so entries and the
+block index are scoped by model: with several resident models the requests
+routed to each one reuse that model's prefixes, and all models share one
+byte budget and LRU.
+"""
+
+import hashlib
+import logging
+import sys
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Granularity of prefix matching (tokens)
+BLOCK_TOKENS = 64
+
+
+def _state_size(state: Any) -> int:
+    """
+    Bytes held by a saved state.
+
+    A LlamaState holds the llama.cpp state blob (llama_state_size) plus
+    numpy copies of scores (up to n_batch x n_vocab float32 rows, ~311 MB
+    at n_batch 512 with a 152k vocabulary) and input_ids; all count.
+    """
+    size = getattr(state, "llama_state_size", None)
+    if size is None:
+        return sys.getsizeof(state)
+    arrays = (getattr(state, name, None) for name in ("scores", "input_ids"))
+    return int(size) + sum(int(getattr(array, "nbytes", 0)) for array in arrays)
+
+
+def _block_hashes(tokens: Sequence[int]) -> List[bytes]:
+    """Hash of tokens[:BLOCK_TOKENS * (i + 1)] for every full block i."""
+    hasher = hashlib.blake2b(digest_size=16)
+    hashes = []
+    for end in range(BLOCK_TOKENS, len(tokens) + 1, BLOCK_TOKENS):
+        hasher.update(
+            b"".join(t.to_bytes(4, "little", signed=True) for t in tokens[end - BLOCK_TOKENS:end])
+        )
+        hashes.append(hasher.copy().digest())
+    return hashes
+
+
+def common_prefix(a: Sequence[int], b: Sequence[int]) -> int:
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return n
+
+
+@dataclass
+class _Entry:
+    model: int
+    tokens: Tuple[int, ...]
+    state: Any
+    size: int
+    blocks: List[bytes]
+
+
+class PrefixStateCache:
+    """
+    LRU cache of evaluated-prompt states keyed by token-prefix hashes.
+
+    restore() and save() run on the scheduler worker thread, which owns the
+    model; forget() and clear() may come from gRPC or model-pool threads,
+    so the entries are guarded by a lock.
+
+    Example:
+        >>> cache = PrefixStateCache(max_bytes=512 * 2**20)
+        >>> cache.restore(llm, prompt_tokens)   # before llm.generate()
+        >>> cache.save(llm, prompt_tokens)      # once the prompt is evaluated
+
+    Args:
+        max_bytes: Memory budget for saved states (0 disables the cache)
+        min_tokens: Prompts shorter than this are not saved
+        size_of: Bytes of a saved state (defaults to LlamaState's own size)
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        min_tokens: int = BLOCK_TOKENS,
+        size_of: Callable[[Any], int] = _state_size,
+    ):
+        self.max_bytes = max(0, max_bytes)
+        self.min_tokens = max(BLOCK_TOKENS, min_tokens)
+        self.size_of = size_of
+        # Keys are (model, hash): states never cross models
+        self._entries: "OrderedDict[Tuple[int, bytes], _Entry]" = OrderedDict()
+        self._blocks: Dict[Tuple[int, bytes], Tuple[int, bytes]] = {}  # block -> entry key
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.tokens_reused = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def restore(self, llm, tokens: Sequence[int]) -> int:
+        """
+        Load the cached state sharing the longest prefix with tokens.
+
+        Only restores when that prefix is longer than what the model's
+        current state already shares with the prompt.
+
+        Returns:
+            int: Prompt tokens covered by the model state afterwards
+        """
+        if not self.enabled:
+            return 0
+        model = id(llm)
+        current = common_prefix(_evaluated(llm), tokens[:-1])
+
+        with self._lock:
+            entry = None
+            for block_hash in reversed(_block_hashes(tokens)):
+                key = self._blocks.get((model, block_hash))
+                if key is not None:
+                    entry = self._entries[key]
+                    self._entries.move_to_end(key)
+                    break
+
+            # llama.cpp always re-evaluates the last prompt token
+            matched = common_prefix(entry.tokens, tokens[:-1]) if entry else 0
+            if matched <= current:
+                # Nothing better cached than the state already in the model
+                self.tokens_reused += current
+                if current < BLOCK_TOKENS:
+                    self.misses += 1
+                return current
+            self.hits += 1
+            self.tokens_reused += matched
+
+        llm.load_state(entry.state)
+        logger.debug(f"Prefix cache hit: {matched}/{len(tokens)} prompt tokens restored")
+        return matched
+
+    def save(self, llm, tokens: Sequence[int]) -> None:
+        """Save the model state right after tokens were evaluated."""
+        if not self.enabled or len(tokens) < self.min_tokens:
+            return
+        model = id(llm)
+        blocks = _block_hashes(tokens)
+        key = (model, blocks[-1] + len(tokens).to_bytes(4, "little"))
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return
+
+        # Copying the KV cache is slow; don't hold the lock for it
+        state = llm.save_state()
+        size = self.size_of(state)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = _Entry(model, tuple(tokens), state, size, blocks)
+            self.bytes += size
+            for block_hash in blocks:
+                self._blocks[(model, block_hash)] = key  # newest entry wins
+            while self.bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._blocks.clear()
+            self.bytes = 0
+
+    def forget(self, llm) -> None:
+        """Drop the saved states of llm (e.g. it was unloaded); other models keep theirs."""
+        model = id(llm)
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry.model == model]:
+                self._drop(key)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "models": len({entry.model for entry in self._entries.values()}),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "tokens_reused": self.tokens_reused,
+            }
+
+    def _drop(self, key: Tuple[int, bytes]) -> None:
+        """Remove an entry (lock held)."""
+        entry = self._entries.pop(key)
+        self.bytes -= entry.size
+        orphaned = {
+            (entry.model, h) for h in entry.blocks if self._blocks.get((entry.model, h)) == key
+        }
+        for block in orphaned:
+            del self._blocks[block]
+        # Re-point shared prefixes at another entry of the same model that still holds them
+        for other_key, other in reversed(self._entries.items()):
+            if other.model != entry.model:
+                continue
+            for block in orphaned.intersection((other.model, h) for h in other.blocks):
+                self._blocks.setdefault(block, other_key)
+
+
+def _evaluated(llm) -> Sequence[int]:
+    """Tokens currently evaluated in the model's context."""
+    return llm.input_ids[: llm.n_tokens]
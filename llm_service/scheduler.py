@@ -0,0 +1,727 @@
+"""
+Time-slicing request scheduler for the LLM service.
+
+Replaces the global inference lock: a single worker thread owns the loaded
+model and gives each in-flight request a turn of decode steps in rotation,
+so a short request no longer waits for every long request queued ahead of
+it. This is not batching: one sequence decodes at a time, and switching
+sessions on a model swaps its evaluation state out and back in, so
+aggregate throughput never exceeds the serialized rate.
+
+Features:
+- Priority queue (higher priority admitted first, FIFO within a priority)
+- Admission control (bounded queue, bounded number of active sessions)
+- Per-request deadlines (checked while queued and between decode turns)
+- Cancellation (e.g. when the gRPC context goes away)
+- Round-robin time slices of decode turns across active sessions, with a
+  cap on how many sessions may sit suspended (each holds a saved state)
+- Prompt-sharing sample groups (submit_batch): the prompt is evaluated once
+  and each sample branches from that state with its own seed
+- Per-request decode metrics (e.g. speculative acceptance) on the handle
+
+The scheduler talks to the model through a DecodeBackend. LlamaDecodeBackend
+adapts llama_cpp.Llama by saving/restoring the evaluation state whenever the
+worker switches between sessions on the same model (sessions on different
+models never swap); with a single active session no state is ever swapped,
+matching the old serialized behaviour. With a
+PrefixStateCache it also restores cached prompt-prefix states before
+evaluating a new prompt, and for models with a speculative draft it tracks
+each request's draft acceptance.
+"""
+
+import codecs
+import heapq
+import itertools
+import logging
+import queue
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field, replace
+from typing import Any, Callable, Dict, Iterator, List, Optional, Protocol
+
+try:
+    import llama_cpp
+except ImportError:  # scheduler core is usable without llama.cpp (tests)
+    llama_cpp = None
+
+try:
+    from .speculative import SpeculationStats
+except ImportError:
+    from speculative import SpeculationStats
+
+logger = logging.getLogger(__name__)
+
+
+def _unseeded() -> int:
+    """Seed for requests without one: llama.cpp's random default."""
+    if llama_cpp is not None:
+        return llama_cpp.LLAMA_DEFAULT_SEED
+    return random.randrange(2**31)
+
+
+class SchedulerError(Exception):
+    """Base class for scheduler errors surfaced to callers."""
+
+
+class SchedulerOverloaded(SchedulerError):
+    """Raised by submit() when the wait queue is full."""
+
+
+class RequestCancelled(SchedulerError):
+    """Raised while iterating a handle whose request was cancelled."""
+
+
+class DeadlineExceeded(SchedulerError):
+    """Raised while iterating a handle whose deadline passed."""
+
+
+class SharedPrompt:
+    """
+    Prompt state shared by the samples of one submit_batch() call.
+
+    The first sample to run evaluates the prompt and stores the model state
+    here; the others start from it. The state is dropped once every sample
+    has started.
+    """
+
+    def __init__(self, size: int):
+        self.remaining = size
+        self.state: Any = None
+
+
+@dataclass
+class GenerationRequest:
+    """
+    A single generation request.
+
+    Attributes:
+        prompt: Prompt text
+        max_tokens: Maximum tokens to generate
+        temperature: Sampling temperature
+        grammar: Optional backend-specific grammar (e.g. LlamaGrammar)
+        priority: Higher values are admitted first
+        deadline: Absolute time.monotonic() deadline (None = no deadline)
+        seed: Sampling seed (None = backend default)
+        model: Model id to generate with (None = the default model)
+        shared_prompt: Set by submit_batch() for samples sharing the prompt
+        request_id: Identifier used in logs
+    """
+
+    prompt: str
+    max_tokens: int
+    temperature: float = 0.7
+    grammar: Any = None
+    priority: int = 0
+    deadline: Optional[float] = None
+    seed: Optional[int] = None
+    model: Optional[str] = None
+    shared_prompt: Optional[SharedPrompt] = None
+    request_id: str = field(default_factory=lambda: uuid.uuid4().hex[:8])
+
+
+_DONE = object()
+
+
+class GenerationHandle:
+    """
+    Caller-side view of a scheduled request.
+
+    Iterating yields generated text pieces as the worker produces them and
+    raises RequestCancelled / DeadlineExceeded (or the backend's exception)
+    if the request did not complete normally.
+    """
+
+    def __init__(self, request: GenerationRequest, on_cancel: Callable[[], None]):
+        self.request = request
+        self.status = "queued"
+        self.tokens_generated = 0
+        self.submitted_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.stats: Dict[str, Any] = {}  # backend decode metrics, set on completion
+        self._chunks: "queue.Queue" = queue.Queue()
+        self._cancelled = threading.Event()
+        self._on_cancel = on_cancel
+        self._callbacks: List[Callable[["GenerationHandle"], None]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self) -> None:
+        """Request cancellation (idempotent, safe after completion)."""
+        if self.finished_at is None and not self._cancelled.is_set():
+            self._cancelled.set()
+            self._on_cancel()
+
+    def __iter__(self) -> Iterator[str]:
+        while True:
+            item = self._chunks.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+    def result(self) -> str:
+        """Block until completion and return the full generated text."""
+        return "".join(self)
+
+    def add_done_callback(self, fn: Callable[["GenerationHandle"], None]) -> None:
+        """Call fn(handle) once the request finishes (immediately if it has)."""
+        with self._lock:
+            if self.finished_at is None:
+                self._callbacks.append(fn)
+                return
+        fn(self)
+
+    # -- worker side ---------------------------------------------------
+
+    def _put(self, text: str) -> None:
+        self.tokens_generated += 1
+        self._chunks.put(text)
+
+    def _finish(self, status: str, error: Optional[BaseException] = None) -> None:
+        self.status = status
+        if error is not None:
+            self._chunks.put(error)
+        self._chunks.put(_DONE)
+        with self._lock:
+            self.finished_at = time.monotonic()
+            callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            try:
+                fn(self)
+            except Exception as e:
+                logger.warning(f"[{self.request.request_id}] done callback failed: {e}")
+
+
+class DecodeBackend(Protocol):
+    """
+    Step-wise decoding interface used by RequestScheduler.
+
+    All methods are called from the scheduler's worker thread only.
+    """
+
+    def start(self, request: GenerationRequest) -> Any:
+        """Create a decode session for a request (no model work required)."""
+
+    def step(self, session: Any) -> Optional[str]:
+        """Decode one token; return its text ('' allowed) or None at end of sequence."""
+
+    def suspend(self, session: Any) -> None:
+        """Save the session's model state before another session runs."""
+
+    def resume(self, session: Any) -> None:
+        """Restore the session's model state after another session ran."""
+
+    def close(self, session: Any) -> None:
+        """Release the session's resources."""
+
+    def stats(self, session: Any) -> Dict[str, Any]:
+        """Decode metrics for the session's request (optional; {} if none)."""
+
+
+class _LlamaSession:
+    """Per-request decode state for LlamaDecodeBackend."""
+
+    def __init__(self, model, request: GenerationRequest):
+        self.model = model
+        self.request = request
+        self.generator = None
+        self.sampler = None
+        self.state = None
+        self.prompt_tokens = None
+        self.shares_prompt = False
+        self.speculation = None
+        self.prompt_token_count = 0
+        self.completion_tokens = 0
+        self.decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+
+class LlamaDecodeBackend:
+    """
+    DecodeBackend for llama_cpp.Llama.
+
+    Each session drives its own Llama.generate() token generator. When the
+    worker switches sessions, the outgoing session's evaluation state (KV
+    cache, input ids) and sampler are saved and the incoming session's are
+    restored, so sessions never see each other's context.
+
+    Samples of a SharedPrompt group start from the state saved after the
+    first sample evaluated the prompt; generate() then only re-evaluates the
+    last prompt token before sampling with the sample's own seed.
+
+    Sessions report exact prompt and completion token counts (prompt
+    tokens include BOS; the end-of-generation token is not counted).
+
+    Models loaded with a speculative draft (Llama.draft_model) verify its
+    proposals inside generate(); each session records how many were
+    accepted (see speculative.SpeculationStats).
+
+    Args:
+        get_model: Callable returning the currently loaded Llama instance;
+            called with the request's model id when one is set
+        prefix_cache: Optional PrefixStateCache for prompt-prefix reuse
+    """
+
+    def __init__(self, get_model: Callable[[], Any], prefix_cache=None):
+        self._get_model = get_model
+        self.prefix_cache = prefix_cache
+
+    def start(self, request: GenerationRequest) -> _LlamaSession:
+        if request.model is None:
+            return _LlamaSession(self._get_model(), request)
+        return _LlamaSession(self._get_model(request.model), request)
+
+    def step(self, session: _LlamaSession) -> Optional[str]:
+        llm = session.model
+        request = session.request
+        if session.generator is None:
+            prompt_tokens = llm.tokenize(
+                request.prompt.encode("utf-8"), add_bos=True, special=True
+            )
+            session.prompt_token_count = len(prompt_tokens)
+            shared = request.shared_prompt
+            if shared is not None and shared.state is not None:
+                llm.load_state(shared.state)
+            else:
+                if self.prefix_cache is not None:
+                    self.prefix_cache.restore(llm, prompt_tokens)
+                    session.prompt_tokens = prompt_tokens
+                session.shares_prompt = shared is not None
+            # Llama keeps the last seed (set_seed, load_state): unseeded
+            # requests must not inherit one from an earlier seeded batch
+            llm.set_seed(request.seed if request.seed is not None else _unseeded())
+            if getattr(llm, "draft_model", None) is not None:
+                session.speculation = SpeculationStats()
+                llm.draft_model.take_proposal()  # drop another session's leftover
+            session.generator = llm.generate(
+                prompt_tokens,
+                temp=session.request.temperature,
+                top_k=40,
+                top_p=0.95,
+                min_p=0.05,
+                repeat_penalty=1.0,
+                grammar=session.request.grammar,
+            )
+
+        try:
+            token = next(session.generator)
+        except StopIteration:
+            return None
+        finally:
+            # generate() installs its sampler on the model; keep our own copy
+            session.sampler = llm._sampler
+
+        if session.speculation is not None:
+            proposal = llm.draft_model.take_proposal()
+            if proposal is not None:
+                session.speculation.propose(proposal)
+            session.speculation.observe(token)
+
+        if session.prompt_tokens is not None:
+            # The prompt has just been evaluated; this is its cacheable state
+            self.prefix_cache.save(llm, session.prompt_tokens)
+            session.prompt_tokens = None
+        if session.shares_prompt:
+            session.shares_prompt = False
+            if request.shared_prompt.remaining > 1:
+                request.shared_prompt.state = llm.save_state()
+
+        if self._is_end(llm, token):
+            return None
+        session.completion_tokens += 1
+        return session.decoder.decode(llm.detokenize([token]))
+
+    @staticmethod
+    def _is_end(llm, token: int) -> bool:
+        """End-of-generation check (covers chat end tokens such as <|im_end|>)."""
+        if llama_cpp is not None and hasattr(llm, "_model"):
+            return bool(llama_cpp.llama_vocab_is_eog(llm._model.vocab, token))
+        return token == llm.token_eos()
+
+    def suspend(self, session: _LlamaSession) -> None:
+        if session.generator is not None:
+            session.state = session.model.save_state()
+            session.sampler = session.model._sampler
+
+    def resume(self, session: _LlamaSession) -> None:
+        if session.state is not None:
+            session.model.load_state(session.state)
+            session.model._sampler = session.sampler
+            session.state = None
+
+    def close(self, session: _LlamaSession) -> None:
+        shared = session.request.shared_prompt
+        if shared is not None:
+            shared.remaining -= 1
+            if shared.remaining <= 0:
+                shared.state = None
+        if session.generator is not None:
+            session.generator.close()
+        session.generator = None
+        session.state = None
+        session.sampler = None
+        if session.speculation is not None:
+            session.speculation.finish()
+
+    def stats(self, session: _LlamaSession) -> Dict[str, Any]:
+        stats = {
+            "prompt_tokens": session.prompt_token_count,
+            "completion_tokens": session.completion_tokens,
+        }
+        if session.speculation is not None:
+            stats["speculation"] = session.speculation.as_dict()
+        return stats
+
+
+@dataclass
+class _Active:
+    handle: GenerationHandle
+    session: Any
+    tokens: int = 0
+    suspended: bool = False  # holds a saved state (backend.suspend ran)
+
+    @property
+    def model_key(self) -> int:
+        """Sessions with the same key share one model's evaluation state."""
+        return id(getattr(self.session, "model", None))
+
+
+class RequestScheduler:
+    """
+    Time-slices decode steps of concurrent requests.
+
+    Each model has at most one resident session whose state is live in the
+    model; running another session on that model suspends the resident one
+    (saving its state) first. Suspended states can be large (a llama.cpp
+    state includes the n_batch x n_vocab scores buffer, ~0.3 GB for
+    Qwen2.5-3B), so max_suspended caps how many sessions may hold one: at
+    the cap, sessions that have not started wait for a turn until one of
+    the running sessions finishes.
+
+    Example:
+        >>> scheduler = RequestScheduler(LlamaDecodeBackend(manager.get_model))
+        >>> scheduler.start()
+        >>> handle = scheduler.submit(GenerationRequest(prompt="Hi", max_tokens=32))
+        >>> for piece in handle:
+        ...     print(piece, end="")
+
+    Args:
+        backend: DecodeBackend that owns the model
+        max_active: Maximum sessions decoding concurrently
+        max_queue: Maximum requests waiting for admission (0 = unbounded)
+        tokens_per_turn: Tokens decoded for a session before rotating to the
+            next one (amortizes state swaps)
+        max_suspended: Maximum sessions holding a suspended state
+            (None = up to max_active - 1, 0 = run sessions on a model one
+            at a time)
+    """
+
+    def __init__(
+        self,
+        backend: DecodeBackend,
+        max_active: int = 4,
+        max_queue: int = 32,
+        tokens_per_turn: int = 16,
+        max_suspended: Optional[int] = None,
+    ):
+        if max_active < 1:
+            raise ValueError("max_active must be >= 1")
+        if tokens_per_turn < 1:
+            raise ValueError("tokens_per_turn must be >= 1")
+        if max_suspended is not None and max_suspended < 0:
+            raise ValueError("max_suspended must be >= 0")
+
+        self.backend = backend
+        self.max_active = max_active
+        self.max_queue = max_queue
+        self.tokens_per_turn = tokens_per_turn
+        self.max_suspended = max_suspended
+
+        self._cond = threading.Condition()
+        self._pending: List[tuple] = []  # heap of (-priority, seq, handle)
+        self._seq = itertools.count()
+        self._active: List[_Active] = []
+        self._resident: Dict[int, _Active] = {}  # model_key -> live session
+        self._paused = 0
+        self._running = False
+        self._worker: Optional[threading.Thread] = None
+        self._counters: Dict[str, int] = {
+            "submitted": 0, "completed": 0, "rejected": 0,
+            "cancelled": 0, "expired": 0, "failed": 0, "swaps": 0,
+        }
+
+    # -- lifecycle -----------------------------------------------------
+
+    def start(self) -> "RequestScheduler":
+        """Start the worker thread (idempotent)."""
+        with self._cond:
+            if self._running:
+                return self
+            self._running = True
+        self._worker = threading.Thread(
+            target=self._run, name="llm-scheduler", daemon=True
+        )
+        self._worker.start()
+        return self
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Stop the worker; queued and active requests are cancelled."""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._worker is not None:
+            self._worker.join(timeout=timeout)
+            self._worker = None
+
+    # -- public API ----------------------------------------------------
+
+    def submit(self, request: GenerationRequest) -> GenerationHandle:
+        """
+        Queue a request for generation.
+
+        Raises:
+            SchedulerOverloaded: If the wait queue is full
+        """
+        handle = GenerationHandle(request, on_cancel=self._notify)
+        with self._cond:
+            if self.max_queue and len(self._pending) >= self.max_queue:
+                self._counters["rejected"] += 1
+                raise SchedulerOverloaded(
+                    f"Scheduler queue full ({len(self._pending)} waiting)"
+                )
+            heapq.heappush(self._pending, (-request.priority, next(self._seq), handle))
+            self._counters["submitted"] += 1
+            self._cond.notify_all()
+        logger.debug(f"[{request.request_id}] queued (priority={request.priority})")
+        return handle
+
+    def submit_batch(
+        self,
+        request: GenerationRequest,
+        num_samples: int,
+        seeds: Optional[List[int]] = None,
+    ) -> List[GenerationHandle]:
+        """
+        Queue num_samples samples of one prompt that share its evaluation.
+
+        The prompt is evaluated once; every sample then decodes from that
+        state with its own seed (request.seed + i by default).
+
+        Raises:
+            SchedulerOverloaded: If the wait queue cannot hold the batch
+        """
+        if num_samples < 1:
+            raise ValueError("num_samples must be >= 1")
+        if seeds is None:
+            base = request.seed if request.seed is not None else random.randrange(2**31)
+            seeds = [base + i for i in range(num_samples)]
+        elif len(seeds) != num_samples:
+            raise ValueError("seeds must have num_samples entries")
+
+        shared = SharedPrompt(num_samples)
+        handles = [
+            GenerationHandle(
+                replace(
+                    request,
+                    seed=seed,
+                    shared_prompt=shared,
+                    request_id=f"{request.request_id}/{i}",
+                ),
+                on_cancel=self._notify,
+            )
+            for i, seed in enumerate(seeds)
+        ]
+        with self._cond:
+            if self.max_queue and len(self._pending) + num_samples > self.max_queue:
+                self._counters["rejected"] += num_samples
+                raise SchedulerOverloaded(
+                    f"Scheduler queue full ({len(self._pending)} waiting)"
+                )
+            for handle in handles:
+                heapq.heappush(self._pending, (-request.priority, next(self._seq), handle))
+            self._counters["submitted"] += num_samples
+            self._cond.notify_all()
+        logger.debug(f"[{request.request_id}] queued batch of {num_samples}")
+        return handles
+
+    @contextmanager
+    def exclusive(self, timeout: Optional[float] = None):
+        """
+        Pause admission and wait for in-flight sessions to drain.
+
+        Used for operations that replace the model (e.g. model switching).
+        Queued requests stay queued and are admitted after the block exits.
+        """
+        with self._cond:
+            self._paused += 1
+            try:
+                drained = self._cond.wait_for(lambda: not self._active, timeout=timeout)
+                if not drained:
+                    raise TimeoutError("In-flight requests did not drain in time")
+            except BaseException:
+                self._paused -= 1
+                self._cond.notify_all()
+                raise
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._paused -= 1
+                self._cond.notify_all()
+
+    def stats(self) -> Dict[str, int]:
+        """Snapshot of queue depth, active/suspended sessions and lifetime counters."""
+        with self._cond:
+            return {
+                "queue_depth": len(self._pending),
+                "active": len(self._active),
+                "suspended": self._suspended_count(),
+                **self._counters,
+            }
+
+    # -- worker --------------------------------------------------------
+
+    def _notify(self) -> None:
+        with self._cond:
+            self._cond.notify_all()
+
+    def _admit(self) -> None:
+        """Move queued requests into active sessions (lock held)."""
+        now = time.monotonic()
+        while self._pending and len(self._active) < self.max_active and not self._paused:
+            _, _, handle = heapq.heappop(self._pending)
+            if handle.cancelled:
+                self._counters["cancelled"] += 1
+                handle._finish("cancelled", RequestCancelled("Request cancelled while queued"))
+                continue
+            deadline = handle.request.deadline
+            if deadline is not None and now >= deadline:
+                self._counters["expired"] += 1
+                handle._finish("expired", DeadlineExceeded("Deadline exceeded while queued"))
+                continue
+            try:
+                session = self.backend.start(handle.request)
+            except Exception as e:
+                logger.error(f"[{handle.request.request_id}] start failed: {e}")
+                self._counters["failed"] += 1
+                handle._finish("failed", e)
+                continue
+            handle.status = "running"
+            handle.started_at = now
+            self._active.append(_Active(handle=handle, session=session))
+
+    def _retire(self, entry: _Active, status: str, error: Optional[BaseException] = None) -> None:
+        """Close a session and complete its handle."""
+        try:
+            self.backend.close(entry.session)
+        except Exception as e:
+            logger.warning(f"[{entry.handle.request.request_id}] close failed: {e}")
+        stats = getattr(self.backend, "stats", None)
+        if stats is not None:
+            try:
+                entry.handle.stats = stats(entry.session)
+            except Exception as e:
+                logger.warning(f"[{entry.handle.request.request_id}] stats failed: {e}")
+        with self._cond:
+            if entry in self._active:
+                self._active.remove(entry)
+            if self._resident.get(entry.model_key) is entry:
+                del self._resident[entry.model_key]
+            self._counters[status] += 1
+            entry.handle._finish(status, error)
+            self._cond.notify_all()
+
+    def _run(self) -> None:
+        turn = 0
+        while True:
+            with self._cond:
+                self._admit()
+                while self._running and not self._active:
+                    self._cond.wait()
+                    self._admit()
+                if not self._running:
+                    break
+                entry, turn = self._next_turn(turn)
+
+            self._run_turn(entry)
+
+        # Shutdown: fail everything still in flight
+        with self._cond:
+            leftovers = list(self._active)
+            pending = [h for _, _, h in self._pending]
+            self._pending.clear()
+        for entry in leftovers:
+            self._retire(entry, "cancelled", RequestCancelled("Scheduler shut down"))
+        for handle in pending:
+            handle._finish("cancelled", RequestCancelled("Scheduler shut down"))
+
+    def _suspended_count(self) -> int:
+        return sum(1 for entry in self._active if entry.suspended)
+
+    def _next_turn(self, turn: int) -> tuple:
+        """
+        Pick the next session round-robin (lock held); returns (entry, turn).
+
+        Starting a fresh session on a model with a resident one would add a
+        suspended state, so at the max_suspended cap those are skipped. The
+        resident sessions themselves are always eligible.
+        """
+        n = len(self._active)
+        at_cap = (
+            self.max_suspended is not None
+            and self._suspended_count() >= self.max_suspended
+        )
+        for offset in range(n):
+            entry = self._active[(turn + offset) % n]
+            resident = self._resident.get(entry.model_key)
+            if at_cap and not entry.suspended and resident not in (None, entry):
+                continue
+            return entry, turn + offset + 1
+        return self._active[turn % n], turn + 1  # not reached: residents qualify
+
+    def _run_turn(self, entry: _Active) -> None:
+        """Decode up to tokens_per_turn tokens for one session."""
+        handle = entry.handle
+        request = handle.request
+
+        try:
+            resident = self._resident.get(entry.model_key)
+            if resident is not entry:
+                if resident is not None:
+                    self.backend.suspend(resident.session)
+                    resident.suspended = True
+                    self._counters["swaps"] += 1
+                self.backend.resume(entry.session)
+                entry.suspended = False
+                self._resident[entry.model_key] = entry
+
+            for _ in range(self.tokens_per_turn):
+                if handle.cancelled:
+                    self._retire(entry, "cancelled", RequestCancelled("Request cancelled"))
+                    return
+                if request.deadline is not None and time.monotonic() >= request.deadline:
+                    self._retire(entry, "expired", DeadlineExceeded("Deadline exceeded"))
+                    return
+
+                piece = self.backend.step(entry.session)
+                if piece is None:
+                    self._retire(entry, "completed")
+                    return
+
+                entry.tokens += 1
+                if piece:
+                    handle._put(piece)
+                if entry.tokens >= request.max_tokens:
+                    self._retire(entry, "completed")
+                    return
+
+        except Exception as e:
+            logger.error(f"[{request.request_id}] decode failed: {e}", exc_info=True)
+            self._retire(entry, "failed", e)
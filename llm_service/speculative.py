@@ -0,0 +1,199 @@
+"""
+Speculative decoding for the LLM service.
+
+A cheap draft proposes the next few tokens and the target model checks
+them all in one forward pass. Verification is llama-cpp-python's own
+(Llama(draft_model=...)): the target samples every position as usual and a
+draft token is kept only while it equals the target's sample, so the output
+is exactly what the target alone would produce with the same seed; the
+draft only saves target forward passes.
+
+Drafts:
+- DraftModel: greedy proposals from a small GGUF model sharing the
+  target's vocabulary (e.g. Qwen2.5-0.5B for Qwen2.5-3B/14B)
+- PromptLookupDraft: copies the tokens that followed an earlier occurrence
+  of the last n-gram (no second model; suits extraction and code edits)
+
+Pairings come from LLMServiceConfig.draft_models, e.g.
+"Qwen2.5-14B-Instruct-Q4_K.gguf=qwen2.5-0.5b-instruct-q5_k_m.gguf".
+
+Every draft records its latest proposal; LlamaDecodeBackend feeds it and
+the tokens the target then produced into a per-request SpeculationStats.
+
+Note: llama-cpp-python keeps logits for every position of a model that has
+a draft (logits_all), i.e. n_ctx * n_vocab floats, and saved states grow
+accordingly. The service therefore only loads drafts when the scheduler
+never swaps states (LLMServiceConfig.scheduler_swaps_states); pair drafts
+with models run at a modest n_ctx.
+"""
+
+import itertools
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+PROMPT_LOOKUP = "prompt-lookup"
+
+
+def parse_draft_models(spec: str, default_model: str) -> Dict[str, str]:
+    """
+    Parse a draft pairing spec into {target model id: draft}.
+
+    The spec is a comma-separated list of target=draft pairs; a bare draft
+    (no '=') pairs with default_model. A draft is a GGUF filename from the
+    model directory or "prompt-lookup".
+
+    Raises:
+        ValueError: If an entry is malformed
+    """
+    pairs: Dict[str, str] = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        target, sep, draft = entry.partition("=")
+        if not sep:
+            target, draft = default_model, target
+        target, draft = target.strip(), draft.strip()
+        if not target or not draft:
+            raise ValueError(f"Invalid draft model pairing {entry!r} (expected target=draft)")
+        if target == draft:
+            raise ValueError(f"Model {target} cannot draft for itself")
+        pairs[target] = draft
+    return pairs
+
+
+@dataclass
+class SpeculationStats:
+    """
+    Per-request acceptance accounting.
+
+    drafted counts draft tokens the target verified (proposals still
+    pending when generation stopped are not counted); accepted counts those
+    that matched the target's own choice.
+    """
+
+    drafted: int = 0
+    accepted: int = 0
+    rounds: int = 0  # proposals made (one target forward pass each)
+    _pending: List[int] = field(default_factory=list, repr=False)
+
+    @property
+    def acceptance_rate(self) -> float:
+        return self.accepted / self.drafted if self.drafted else 0.0
+
+    def propose(self, tokens: List[int]) -> None:
+        """Record a new proposal (the target verifies it from its next token)."""
+        self._pending = list(tokens)
+        if self._pending:
+            self.rounds += 1
+
+    def observe(self, token: int) -> None:
+        """Record a token the target produced."""
+        if not self._pending:
+            return
+        if token == self._pending[0]:
+            self.drafted += 1
+            self.accepted += 1
+            self._pending.pop(0)
+        else:
+            # The target evaluated the rest of the proposal and discarded it
+            self.drafted += len(self._pending)
+            self._pending = []
+
+    def finish(self) -> None:
+        self._pending = []
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "drafted": self.drafted,
+            "accepted": self.accepted,
+            "rounds": self.rounds,
+            "acceptance_rate": self.acceptance_rate,
+        }
+
+
+class _Draft:
+    """
+    Base for llama-cpp-python draft models (LlamaDraftModel interface).
+
+    Llama.generate calls draft(input_ids) with the context so far and
+    verifies the returned tokens.
+    """
+
+    name = "draft"
+
+    def __init__(self, num_pred_tokens: int = 4):
+        if num_pred_tokens < 1:
+            raise ValueError("num_pred_tokens must be >= 1")
+        self.num_pred_tokens = num_pred_tokens
+        self._proposal: Optional[List[int]] = None
+
+    def __call__(self, input_ids, /, **kwargs) -> np.ndarray:
+        try:
+            tokens = self.propose([int(t) for t in input_ids])[: self.num_pred_tokens]
+        except Exception as e:
+            # A failing draft only costs speed; the target decodes alone
+            logger.warning(f"{self.name} draft failed: {e}")
+            tokens = []
+        self._proposal = tokens
+        return np.asarray(tokens, dtype=np.intc)
+
+    def take_proposal(self) -> Optional[List[int]]:
+        """The proposal made since the last call, if any."""
+        proposal, self._proposal = self._proposal, None
+        return proposal
+
+    def propose(self, context: List[int]) -> List[int]:
+        raise NotImplementedError
+
+
+class DraftModel(_Draft):
+    """
+    Greedy proposals from a small Llama sharing the target's vocabulary.
+
+    The draft's generate() reuses the longest common prefix of its own
+    context, so each round only evaluates the tokens the target accepted
+    since the previous one.
+    """
+
+    def __init__(self, model, num_pred_tokens: int = 4, name: str = "draft"):
+        super().__init__(num_pred_tokens)
+        self.model = model
+        self.name = name
+
+    def propose(self, context: List[int]) -> List[int]:
+        if len(context) + self.num_pred_tokens > self.model.n_ctx():
+            return []
+        generator = self.model.generate(
+            context, temp=0.0, top_k=1, repeat_penalty=1.0, reset=True
+        )
+        try:
+            return list(itertools.islice(generator, self.num_pred_tokens))
+        finally:
+            generator.close()
+
+
+class PromptLookupDraft(_Draft):
+    """
+    Proposes the tokens that followed the earliest earlier occurrence of the
+    context's last n-gram (longest n-gram first), as llama.cpp's prompt
+    lookup decoding does.
+    """
+
+    name = PROMPT_LOOKUP
+
+    def __init__(self, num_pred_tokens: int = 4, max_ngram_size: int = 2):
+        super().__init__(num_pred_tokens)
+        self.max_ngram_size = max_ngram_size
+
+    def propose(self, context: List[int]) -> List[int]:
+        ids = np.asarray(context)
+        for size in range(min(self.max_ngram_size, len(ids) - 1), 0, -1):
+            windows = np.lib.stride_tricks.sliding_window_view(ids[:-1], size)
+            matches = np.nonzero(np.all(windows == ids[-size:], axis=1))[0]
+            if len(matches):
+                start = int(matches[0]) + size
+                return ids[start:start + self.num_pred_tokens].tolist()
+        return []
@@ -0,0 +1,89 @@
+"""
+Exact token accounting for the LLM service.
+
+Token counts come from the model's own tokenizer rather than a
+characters-per-token estimate:
+
+- a resident model's tokenizer when the model is loaded
+- otherwise a vocab-only copy of the model (llama.cpp loads just the
+  vocabulary, no weights), kept in a small LRU, so counting for a model
+  that is not resident costs one vocabulary load
+
+Tokenizing only reads the vocabulary, so it runs on the gRPC threads
+alongside decoding on the scheduler worker.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+def count_tokens(tokenizer: Any, text: str, add_bos: bool = False) -> int:
+    """Number of tokens the model sees for text (as Generate tokenizes prompts)."""
+    return len(tokenizer.tokenize(text.encode("utf-8"), add_bos=add_bos, special=True))
+
+
+class TokenAccountant:
+    """
+    Counts tokens with the tokenizer of a given model.
+
+    Args:
+        resident: Returns the loaded model for a model id, or None
+        load_vocab: Loads a tokenizer-only model by id (e.g.
+            Llama(path, vocab_only=True)); may raise FileNotFoundError
+        max_tokenizers: Vocab-only tokenizers kept loaded
+    """
+
+    def __init__(
+        self,
+        resident: Callable[[str], Optional[Any]],
+        load_vocab: Callable[[str], Any],
+        max_tokenizers: int = 4,
+    ):
+        self._resident = resident
+        self._load_vocab = load_vocab
+        self.max_tokenizers = max(1, max_tokenizers)
+        self._lock = threading.Lock()
+        self._vocabs: "OrderedDict[str, Any]" = OrderedDict()  # oldest first
+        self._counters = {"resident": 0, "vocab_hits": 0, "vocab_loads": 0}
+
+    def tokenizer(self, model_id: str) -> Any:
+        """Tokenizer for model_id: the resident model, else a cached vocab-only load."""
+        model = self._resident(model_id)
+        if model is not None:
+            with self._lock:
+                self._counters["resident"] += 1
+            return model
+
+        with self._lock:
+            vocab = self._vocabs.get(model_id)
+            if vocab is not None:
+                self._vocabs.move_to_end(model_id)
+                self._counters["vocab_hits"] += 1
+                return vocab
+
+        logger.info(f"Loading tokenizer for {model_id} (vocab only)")
+        vocab = self._load_vocab(model_id)
+        with self._lock:
+            self._counters["vocab_loads"] += 1
+            self._vocabs[model_id] = vocab
+            while len(self._vocabs) > self.max_tokenizers:
+                self._vocabs.popitem(last=False)
+        return vocab
+
+    def count(self, texts: Sequence[str], model_id: str, add_bos: bool = False) -> List[int]:
+        """
+        Token counts of texts under model_id's tokenizer.
+
+        Raises:
+            FileNotFoundError: If the model is unknown
+        """
+        tokenizer = self.tokenizer(model_id)
+        return [count_tokens(tokenizer, text, add_bos=add_bos) for text in texts]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"vocab_tokenizers": len(self._vocabs), **self._counters}
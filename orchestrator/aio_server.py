@@ -0,0 +1,304 @@
+"""
+grpc.aio server mode for the orchestrator (ORCHESTRATOR_SERVER_MODE=async).
+
+The thread-mode server (serve()) runs every RPC on a fixed pool of 10
+gRPC worker threads: an in-flight query holds a thread for its whole
+lifetime, further RPCs queue inside gRPC without a bound, and the queue
+is invisible to the orchestrator. In async mode RPCs are coroutines on
+one event loop, and the blocking LangGraph workflow is fenced off behind
+explicit admission:
+
+- QueryLimiter: at most max_concurrent_queries workflows run at once on a
+  dedicated thread pool of the same size; up to max_pending_queries more
+  wait as coroutines (a few KB each, no thread) in FIFO order
+- backpressure: a query arriving with the wait queue full is rejected with
+  RESOURCE_EXHAUSTED, and a query whose deadline passes while waiting
+  fails with DEADLINE_EXCEEDED instead of occupying a slot late
+- same servicer semantics: QueryAgent and QueryAgentStream call the
+  OrchestratorService code that the thread-mode server uses, and the
+  observability interceptor has an aio twin with identical instrumentation
+
+A slot is held until the workflow thread finishes, even if the client
+cancels, so max_concurrent_queries really bounds the work in progress.
+
+Example:
+    >>> config = OrchestratorConfig(server_mode="async", max_concurrent_queries=32)
+    >>> asyncio.run(serve_async(config))
+"""
+
+import asyncio
+import contextvars
+import logging
+import os
+import threading
+import uuid
+from concurrent import futures
+from typing import Dict, Optional, Sequence, Tuple
+
+import grpc
+from grpc_health.v1 import health_pb2, health_pb2_grpc
+from grpc_health.v1.health import aio as health_aio
+from grpc_reflection.v1alpha import reflection
+
+from shared.generated import agent_pb2, agent_pb2_grpc
+from shared.observability import shutdown_observability
+from shared.observability.grpc_interceptor import AsyncObservabilityServerInterceptor
+
+from .config import OrchestratorConfig
+from .orchestrator_service import SERVER_OPTIONS, OrchestratorService
+
+logger = logging.getLogger(__name__)
+
+
+class QueryLimiter:
+    """
+    Bounded admission for blocking queries on an asyncio server.
+
+    Args:
+        max_concurrent: Queries allowed to run at once
+        max_pending: Queries allowed to wait for a slot; beyond that new
+            queries are rejected with RESOURCE_EXHAUSTED
+
+    Example:
+        >>> limiter = QueryLimiter(max_concurrent=32, max_pending=256)
+        >>> await limiter.acquire(context)
+        >>> try:
+        ...     await run_blocking_query()
+        ... finally:
+        ...     limiter.release()
+    """
+
+    def __init__(self, max_concurrent: int = 32, max_pending: int = 256):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_pending = max(0, max_pending)
+        self._slots = asyncio.Semaphore(self.max_concurrent)
+        self.running = 0
+        self.pending = 0
+        self.peak_in_flight = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    async def acquire(self, context: grpc.aio.ServicerContext) -> None:
+        """
+        Wait for a slot, bounded by the RPC deadline.
+
+        Aborts the RPC with RESOURCE_EXHAUSTED when the wait queue is full
+        and with DEADLINE_EXCEEDED when the deadline passes while waiting.
+        """
+        if self._slots.locked() and self.pending >= self.max_pending:
+            self.rejected += 1
+            logger.warning(f"Query rejected: {self.running} running, {self.pending} waiting")
+            await context.abort(
+                grpc.StatusCode.RESOURCE_EXHAUSTED,
+                f"Orchestrator busy ({self.running} queries running, {self.pending} waiting)",
+            )
+
+        self.pending += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.running + self.pending)
+        try:
+            await asyncio.wait_for(self._slots.acquire(), context.time_remaining())
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            await context.abort(
+                grpc.StatusCode.DEADLINE_EXCEEDED, "Deadline exceeded waiting for a query slot"
+            )
+        finally:
+            self.pending -= 1
+
+        self.running += 1
+        self.admitted += 1
+
+    def release(self) -> None:
+        """Free the slot taken by acquire()."""
+        self.running -= 1
+        self._slots.release()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "running": self.running,
+            "pending": self.pending,
+            "peak_in_flight": self.peak_in_flight,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "max_concurrent": self.max_concurrent,
+            "max_pending": self.max_pending,
+        }
+
+
+class _ThreadContext:
+    """
+    Synchronous ServicerContext view of an aio context for worker threads.
+
+    OrchestratorService handlers read metadata, poll is_active() and set
+    the status code; writes are handed to the event loop thread.
+    """
+
+    def __init__(self, context: grpc.aio.ServicerContext, loop: asyncio.AbstractEventLoop):
+        self._context = context
+        self._loop = loop
+        self._metadata = context.invocation_metadata()
+        self._done = threading.Event()
+        context.add_done_callback(lambda _: self._done.set())
+
+    def invocation_metadata(self):
+        return self._metadata
+
+    def is_active(self) -> bool:
+        return not self._done.is_set()
+
+    def set_code(self, code: grpc.StatusCode) -> None:
+        self._loop.call_soon_threadsafe(self._context.set_code, code)
+
+    def set_details(self, details: str) -> None:
+        self._loop.call_soon_threadsafe(self._context.set_details, details)
+
+
+class AsyncAgentServicer(agent_pb2_grpc.AgentServiceServicer):
+    """
+    AgentService for grpc.aio, delegating to OrchestratorService.
+
+    Args:
+        service: The OrchestratorService whose handlers do the work
+        max_concurrent_queries: Workflow threads (and running-query limit)
+        max_pending_queries: Queries allowed to wait for a thread
+    """
+
+    def __init__(
+        self,
+        service: OrchestratorService,
+        max_concurrent_queries: int = 32,
+        max_pending_queries: int = 256,
+    ):
+        self.service = service
+        self.limiter = QueryLimiter(max_concurrent_queries, max_pending_queries)
+        self._executor = futures.ThreadPoolExecutor(
+            max_workers=self.limiter.max_concurrent, thread_name_prefix="query"
+        )
+
+    def _submit(self, fn, *args) -> asyncio.Future:
+        """
+        Run fn on the workflow pool; the limiter slot is freed when it returns.
+
+        fn runs in a copy of the RPC's context, so the span and correlation
+        ID set by the interceptor are visible to the workflow.
+        """
+        context = contextvars.copy_context()
+        future = asyncio.get_running_loop().run_in_executor(self._executor, context.run, fn, *args)
+        future.add_done_callback(lambda _: self.limiter.release())
+        return future
+
+    async def QueryAgent(self, request, context):
+        await self.limiter.acquire(context)
+        thread_context = _ThreadContext(context, asyncio.get_running_loop())
+        future = self._submit(self.service.QueryAgent, request, thread_context)
+        # shield: a cancelled RPC must not hide the still-running workflow
+        return await asyncio.shield(future)
+
+    async def QueryAgentStream(self, request, context):
+        request_id = str(uuid.uuid4())
+        thread_id = self.service._get_thread_id(context) or request_id
+        await self.limiter.acquire(context)
+
+        loop = asyncio.get_running_loop()
+        events: "asyncio.Queue" = asyncio.Queue()
+        finished = object()
+
+        def emit(event) -> None:
+            loop.call_soon_threadsafe(events.put_nowait, event)
+
+        def run() -> None:
+            try:
+                self.service._run_stream_query(request, request_id, thread_id, emit)
+            finally:
+                emit(finished)
+
+        self._submit(run)
+
+        sequence = 0
+        while True:
+            event = await events.get()
+            if event is finished:
+                break
+            yield self.service._to_agent_event(event, sequence)
+            sequence += 1
+
+    async def GetMetrics(self, request, context):
+        await context.abort(grpc.StatusCode.UNIMPLEMENTED, "Method not implemented!")
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the workflow pool (after the server has stopped)."""
+        self._executor.shutdown(wait=wait)
+
+
+async def create_aio_server(
+    service: OrchestratorService,
+    max_concurrent_queries: int = 32,
+    max_pending_queries: int = 256,
+    interceptors: Optional[Sequence[grpc.aio.ServerInterceptor]] = None,
+) -> Tuple[grpc.aio.Server, AsyncAgentServicer]:
+    """
+    Build a grpc.aio server with AgentService, health and reflection.
+
+    The caller adds a port and starts it.
+    """
+    server = grpc.aio.server(interceptors=list(interceptors or []), options=SERVER_OPTIONS)
+
+    servicer = AsyncAgentServicer(service, max_concurrent_queries, max_pending_queries)
+    agent_pb2_grpc.add_AgentServiceServicer_to_server(servicer, server)
+
+    health_servicer = health_aio.HealthServicer()
+    await health_servicer.set("", health_pb2.HealthCheckResponse.SERVING)
+    health_pb2_grpc.add_HealthServicer_to_server(health_servicer, server)
+
+    SERVICE_NAMES = (
+        agent_pb2.DESCRIPTOR.services_by_name['AgentService'].full_name,
+        health_pb2.DESCRIPTOR.services_by_name['Health'].full_name,
+        reflection.SERVICE_NAME,
+    )
+    reflection.enable_server_reflection(SERVICE_NAMES, server)
+    return server, servicer
+
+
+async def serve_async(config: OrchestratorConfig) -> None:
+    """Start the orchestrator on a grpc.aio server and run until terminated."""
+    observability_enabled = os.getenv("ENABLE_OBSERVABILITY", "false").lower() == "true"
+
+    interceptors = []
+    if observability_enabled:
+        interceptors.append(AsyncObservabilityServerInterceptor())
+        logger.info("Observability server interceptor enabled")
+
+    orchestrator_service = OrchestratorService(config)
+    server, servicer = await create_aio_server(
+        orchestrator_service,
+        max_concurrent_queries=config.max_concurrent_queries,
+        max_pending_queries=config.max_pending_queries,
+        interceptors=interceptors,
+    )
+
+    server.add_insecure_port(f'{config.host}:{config.port}')
+    await server.start()
+    logger.info(
+        f"Orchestrator aio server started on {config.host}:{config.port} "
+        f"(max_concurrent_queries={config.max_concurrent_queries}, "
+        f"max_pending_queries={config.max_pending_queries})"
+    )
+
+    # Start admin API for dynamic routing config (daemon thread)
+    from .admin_api import start_admin_server
+    admin_port = int(os.getenv("ADMIN_API_PORT", "8003"))
+    start_admin_server(orchestrator_service.config_manager, port=admin_port)
+
+    try:
+        await server.wait_for_termination()
+    finally:
+        logger.info("Shutting down orchestrator server...")
+        await server.stop(grace=5)
+        servicer.shutdown()
+
+        # Shutdown observability gracefully
+        if observability_enabled:
+            logger.info("Shutting down observability stack...")
+            shutdown_observability()
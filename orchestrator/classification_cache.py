@@ -0,0 +1,241 @@
+"""
+LIDM: Cache of query classifications.
+
+DelegationManager classifies every query with a full LLM call, although
+many queries repeat ("what's my balance", "What's my balance?").
+ClassificationCache reuses earlier classifications in two tiers:
+
+- exact: keyed by the normalized query text (case, punctuation and
+  whitespace folded)
+- similar (optional): with an embed function, a query whose embedding
+  has cosine similarity >= similarity_threshold with a cached query
+  reuses that query's classification
+
+Entries expire after ttl_seconds and the least recently used entry is
+evicted beyond max_entries. Classifications depend on the routing config
+(tiers, thresholds), so on_config_changed() flushes the cache; a
+classification that was in flight during the change is not stored.
+
+Failed classifications are not cached: classify should raise instead of
+returning defaults.
+"""
+
+import logging
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Sequence
+
+from .routing_config import RoutingConfig
+
+# Optional import — metrics may not be available if observability is off
+try:
+    from shared.observability.metrics import LIDMMetrics
+except ImportError:
+    LIDMMetrics = None  # type: ignore[misc,assignment]
+
+logger = logging.getLogger(__name__)
+
+_APOSTROPHES = str.maketrans({"’": "'", "‘": "'", "`": "'"})
+_NON_WORD = re.compile(r"[^\w\s']+")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Exact-match cache key: lowercase, punctuation dropped, whitespace collapsed."""
+    text = _NON_WORD.sub(" ", query.translate(_APOSTROPHES).lower())
+    return _SPACES.sub(" ", text).strip()
+
+
+def cosine_similarity(a: Sequence[float], b: Sequence[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+@dataclass
+class _Entry:
+    classification: dict
+    expires_at: float
+    vector: Optional[Sequence[float]] = None
+
+
+class ClassificationCache:
+    """
+    TTL- and size-bounded cache of query classifications.
+
+    Args:
+        max_entries: Entries kept (0 disables caching)
+        ttl_seconds: Lifetime of an entry
+        embed: Optional text -> vector function enabling the similarity tier
+        similarity_threshold: Minimum cosine similarity for a similarity hit
+        metrics: Optional LIDMMetrics for hit/miss counts
+        clock: Time source (seconds)
+
+    Example:
+        >>> cache = ClassificationCache(max_entries=1024, ttl_seconds=600)
+        >>> classification = cache.get_or_classify(query, classify_with_llm)
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float = 600.0,
+        embed: Optional[Callable[[str], Sequence[float]]] = None,
+        similarity_threshold: float = 0.92,
+        metrics: Optional["LIDMMetrics"] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.embed = embed
+        self._metrics = metrics
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._generation = 0
+        self.configure(max_entries, ttl_seconds, similarity_threshold)
+
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_config(
+        cls,
+        config: Optional[RoutingConfig],
+        embed: Optional[Callable[[str], Sequence[float]]] = None,
+        metrics: Optional["LIDMMetrics"] = None,
+    ) -> "ClassificationCache":
+        cache = cls(embed=embed, metrics=metrics)
+        if config is not None:
+            cache._apply(config)
+        return cache
+
+    def configure(self, max_entries: int, ttl_seconds: float, similarity_threshold: float) -> None:
+        with self._lock:
+            self.max_entries = max(0, max_entries)
+            self.ttl_seconds = ttl_seconds
+            self.similarity_threshold = similarity_threshold
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_classify(self, query: str, classify: Callable[[str], dict]) -> dict:
+        """
+        Cached classification of query, calling classify(query) on a miss.
+
+        Exceptions from classify propagate and nothing is cached.
+        """
+        if self.max_entries == 0:
+            return classify(query)
+
+        key = normalize_query(query)
+        vector = None
+        with self._lock:
+            generation = self._generation
+            cached = self._lookup_exact(key)
+        if cached is not None:
+            self._record("exact")
+            return cached
+
+        if self.embed is not None:
+            vector = self._embed(query)
+            if vector is not None:
+                with self._lock:
+                    cached = self._lookup_similar(vector)
+                if cached is not None:
+                    self._record("similar")
+                    return cached
+
+        self._record("miss")
+        classification = classify(query)
+        with self._lock:
+            if generation == self._generation:  # config unchanged while classifying
+                self._entries[key] = _Entry(dict(classification), self._clock() + self.ttl_seconds, vector)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return classification
+
+    def _lookup_exact(self, key: str) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= self._clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return dict(entry.classification)
+
+    def _lookup_similar(self, vector: Sequence[float]) -> Optional[dict]:
+        now = self._clock()
+        best_key, best_score = None, self.similarity_threshold
+        for key, entry in list(self._entries.items()):
+            if entry.expires_at <= now:
+                del self._entries[key]
+                continue
+            if entry.vector is None:
+                continue
+            score = cosine_similarity(vector, entry.vector)
+            if score >= best_score:
+                best_key, best_score = key, score
+        if best_key is None:
+            return None
+        self._entries.move_to_end(best_key)
+        self.similar_hits += 1
+        logger.debug(f"Classification cache similarity hit ({best_score:.3f}): '{best_key}'")
+        return dict(self._entries[best_key].classification)
+
+    def _embed(self, query: str) -> Optional[Sequence[float]]:
+        try:
+            return self.embed(query)
+        except Exception as e:
+            logger.warning(f"Query embedding failed, similarity cache skipped: {e}")
+            return None
+
+    def _record(self, result: str) -> None:
+        if result == "miss":
+            with self._lock:
+                self.misses += 1
+        if self._metrics is not None:
+            self._metrics.classification_cache_lookups_total.add(1, {"result": result})
+
+    def clear(self) -> None:
+        """Drop all entries and discard classifications still in flight."""
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+            self.invalidations += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "similar_hits": self.similar_hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
+
+    def _apply(self, config: RoutingConfig) -> None:
+        perf = config.performance
+        self.configure(
+            perf.classification_cache_size,
+            perf.classification_cache_ttl_seconds,
+            perf.classification_similarity_threshold,
+        )
+
+    # ── Observer ────────────────────────────────────────────────────────
+
+    def on_config_changed(self, config: RoutingConfig) -> None:
+        """Called by ConfigManager when routing config is updated."""
+        self._apply(config)
+        self.clear()
+        logger.info(f"Classification cache flushed on config change (size={self.max_entries}, "
+                    f"ttl={self.ttl_seconds}s)")
@@ -12,6 +12,7 @@ Supports multiple LLM providers:
 - openclaw: Uses OpenClaw Gateway (gpt-5.x via Copilot proxy)
 """
 
+import json
 import os
 from typing import Optional, Dict, Any
 from dataclasses import dataclass, field
@@ -27,6 +28,11 @@ class OrchestratorConfig:
     # Service settings
     host: str = "0.0.0.0"
     port: int = 50054
+    # "thread": grpc.server on a thread pool; "async": grpc.aio server with
+    # query admission in front of the blocking workflow (see aio_server.py)
+    server_mode: str = "thread"
+    max_concurrent_queries: int = 32  # async mode: workflows running at once
+    max_pending_queries: int = 256  # async mode: queries waiting; beyond -> RESOURCE_EXHAUSTED
     
     # LLM Provider settings (NEW)
     provider_type: str = "local"  # local, perplexity, openai, anthropic, openclaw
@@ -46,14 +52,20 @@ class OrchestratorConfig:
     # Workflow settings
     max_iterations: int = 5
     context_window: int = 12
+    context_tokens: int = 8192
     temperature: float = 0.15
     model_name: str = "qwen2.5-3b-instruct-q5_k_m.gguf"
     enable_streaming: bool = True
     max_tool_calls_per_turn: int = 5
+    tool_pool_workers: int = 16
     timeout_seconds: int = 120
     
     # Checkpoint settings
     checkpoint_db_path: str = "agent_memory.sqlite"
+    # Checkpoint retention (0 = no limit); each thread keeps its latest checkpoint
+    checkpoint_max_age_days: float = 30.0
+    checkpoint_max_per_thread: int = 50
+    checkpoint_max_total_mb: float = 512.0
     
     # Sandbox service connection
     sandbox_host: str = "sandbox_service"
@@ -69,6 +81,13 @@ class OrchestratorConfig:
     llm_heavy_host: str = "llm_service:50051"
     llm_standard_host: str = "llm_service_standard:50051"
     llm_ultra_host: str = ""
+
+    # Response cache for repeated tool-free questions
+    enable_response_cache: bool = False
+    response_cache_size: int = 512
+    response_cache_ttl_seconds: float = 3600.0  # categories without their own TTL
+    response_cache_intent_ttls: Dict[str, float] = field(default_factory=dict)
+    response_cache_similarity_threshold: float = 0.95
     
     @classmethod
     def from_env(cls) -> "OrchestratorConfig":
@@ -110,6 +129,9 @@ class OrchestratorConfig:
         return cls(
             host=os.getenv("ORCHESTRATOR_HOST", "0.0.0.0"),
             port=int(os.getenv("ORCHESTRATOR_PORT", "50054")),
+            server_mode=os.getenv("ORCHESTRATOR_SERVER_MODE", "thread").lower(),
+            max_concurrent_queries=int(os.getenv("ORCHESTRATOR_MAX_CONCURRENT_QUERIES", "32")),
+            max_pending_queries=int(os.getenv("ORCHESTRATOR_MAX_PENDING_QUERIES", "256")),
             # Provider settings
             provider_type=provider_type,
             provider_api_key=api_key,
@@ -123,12 +145,17 @@ class OrchestratorConfig:
             chroma_port=int(os.getenv("CHROMA_PORT", "50052")),
             max_iterations=int(os.getenv("AGENT_MAX_ITERATIONS", "5")),
             context_window=int(os.getenv("AGENT_CONTEXT_WINDOW", "3")),
+            context_tokens=int(os.getenv("AGENT_CONTEXT_TOKENS", "8192")),
             temperature=float(os.getenv("AGENT_TEMPERATURE", "0.7")),
             model_name=os.getenv("AGENT_MODEL_NAME", "qwen2.5-0.5b-instruct-q5_k_m.gguf"),
             enable_streaming=os.getenv("AGENT_ENABLE_STREAMING", "true").lower() == "true",
             max_tool_calls_per_turn=int(os.getenv("AGENT_MAX_TOOL_CALLS", "5")),
+            tool_pool_workers=int(os.getenv("AGENT_TOOL_POOL_WORKERS", "16")),
             timeout_seconds=int(os.getenv("AGENT_TIMEOUT", "120")),
             checkpoint_db_path=os.getenv("CHECKPOINT_DB_PATH", "agent_memory.sqlite"),
+            checkpoint_max_age_days=float(os.getenv("CHECKPOINT_MAX_AGE_DAYS", "30")),
+            checkpoint_max_per_thread=int(os.getenv("CHECKPOINT_MAX_PER_THREAD", "50")),
+            checkpoint_max_total_mb=float(os.getenv("CHECKPOINT_MAX_TOTAL_MB", "512")),
             sandbox_host=os.getenv("SANDBOX_HOST", "sandbox_service"),
             sandbox_port=int(os.getenv("SANDBOX_PORT", "50057")),
             enable_self_consistency=os.getenv("ENABLE_SELF_CONSISTENCY", "false").lower() == "true",
@@ -139,4 +166,14 @@ class OrchestratorConfig:
             llm_heavy_host=os.getenv("LLM_HEAVY_HOST", "llm_service:50051"),
             llm_standard_host=os.getenv("LLM_STANDARD_HOST", "llm_service_standard:50051"),
             llm_ultra_host=os.getenv("LLM_ULTRA_HOST", ""),
+            # Response cache
+            enable_response_cache=os.getenv("ENABLE_RESPONSE_CACHE", "false").lower() == "true",
+            response_cache_size=int(os.getenv("RESPONSE_CACHE_SIZE", "512")),
+            response_cache_ttl_seconds=float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3600")),
+            # e.g. RESPONSE_CACHE_INTENT_TTLS='{"code": 3600, "general": 0}'
+            response_cache_intent_ttls={
+                category: float(ttl)
+                for category, ttl in json.loads(os.getenv("RESPONSE_CACHE_INTENT_TTLS", "{}")).items()
+            },
+            response_cache_similarity_threshold=float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0.95")),
         )
@@ -11,11 +11,13 @@ import logging
 import time
 import uuid
 from dataclasses import dataclass, field
-from typing import List, Optional, Dict, Any
+from typing import Callable, List, Optional, Dict, Any, Sequence
 
 from shared.clients.llm_client import LLMClientPool
 from .capability_map import get_tier_for_capability, get_required_tier
-from .routing_config import RoutingConfig
+from .classification_cache import ClassificationCache
+from .routing_config import RoutingConfig, TierConfig
+from .task_graph import TaskGraphExecutor
 
 # Optional import — metrics may not be available if observability is off
 try:
@@ -63,6 +65,7 @@ class DelegationManager:
         client_pool: LLMClientPool,
         metrics: Optional["LIDMMetrics"] = None,
         config: Optional[RoutingConfig] = None,
+        embed: Optional[Callable[[str], Sequence[float]]] = None,
     ):
         self.pool = client_pool
         self._classify_tier = "standard"  # Use standard model for routing decisions
@@ -74,6 +77,16 @@ class DelegationManager:
         self._consistency_threshold = perf.self_consistency_threshold if perf else 0.6
         self._max_sub_tasks = perf.max_sub_tasks if perf else 5
 
+        # Sub-tasks run as a dependency graph, capped per tier
+        self._executor = TaskGraphExecutor(
+            self._run_sub_task,
+            tier_limits=self._tier_limits(config),
+            default_limit=TierConfig().max_concurrent_requests,
+        )
+
+        # Repeated (or, with embed, similar) queries reuse their classification
+        self.classification_cache = ClassificationCache.from_config(config, embed=embed, metrics=metrics)
+
     def analyze_and_route(self, query: str, context: str = "") -> TaskDecomposition:
         """
         Main entry point: analyze query and produce a routing plan.
@@ -125,84 +138,44 @@ class DelegationManager:
         """
         Execute all sub-tasks in dependency order, collecting results.
 
+        Independent sub-tasks run concurrently on their tiers (see
+        TaskGraphExecutor); each starts as soon as its dependencies finish.
+
         Returns aggregated result dict.
         """
-        completed = {}
-        results = []
-
-        # Sort by priority, then execute in dependency order
-        pending = list(decomposition.sub_tasks)
-
-        max_rounds = len(pending) + 2  # Safety limit
-        round_count = 0
-
-        while pending and round_count < max_rounds:
-            round_count += 1
-            executed_this_round = []
-
-            for task in pending:
-                # Check dependencies
-                deps_met = all(dep_id in completed for dep_id in task.depends_on)
-                if not deps_met:
-                    continue
-
-                # Build context from dependency results
-                dep_context = ""
-                for dep_id in task.depends_on:
-                    dep_result = completed.get(dep_id, "")
-                    if dep_result:
-                        dep_context += f"\n[Previous result]: {dep_result}\n"
-
-                # Execute sub-task
-                task.status = "running"
-                start = time.time()
-
-                try:
-                    prompt = task.instruction
-                    if dep_context:
-                        prompt = f"{dep_context}\n\n{prompt}"
-
-                    result = self.pool.generate(
-                        prompt=prompt,
-                        tier=task.target_tier,
-                        max_tokens=1024,
-                    )
-                    task.result = result
-                    task.status = "completed"
-                except Exception as e:
-                    logger.error(f"Sub-task {task.task_id} failed: {e}")
-                    task.result = f"Error: {e}"
-                    task.status = "failed"
-
-                task.duration_ms = (time.time() - start) * 1000
-                completed[task.task_id] = task.result
-                executed_this_round.append(task)
-                results.append({
+        start = time.time()
+        finished = self._executor.execute(decomposition.sub_tasks)
+
+        return {
+            "sub_results": [
+                {
                     "task_id": task.task_id,
                     "tier": task.target_tier,
                     "status": task.status,
                     "duration_ms": task.duration_ms,
-                })
-
-                logger.info(f"Sub-task {task.task_id} [{task.target_tier}]: "
-                             f"{task.status} in {task.duration_ms:.0f}ms")
+                }
+                for task in finished
+            ],
+            "completed": {task.task_id: task.result for task in finished},
+            "wall_ms": (time.time() - start) * 1000,
+        }
 
-            # Remove executed tasks from pending
-            for task in executed_this_round:
-                pending.remove(task)
+    def _run_sub_task(self, task: SubTask, dep_results: Dict[str, str]) -> str:
+        """Run one sub-task on its tier, prefixed with its dependencies' results."""
+        dep_context = ""
+        for dep_result in dep_results.values():
+            if dep_result:
+                dep_context += f"\n[Previous result]: {dep_result}\n"
 
-            # If no tasks executed this round, we have a dependency deadlock
-            if not executed_this_round:
-                logger.error("Dependency deadlock: no tasks could execute")
-                for task in pending:
-                    task.status = "failed"
-                    task.result = "Dependency deadlock"
-                break
+        prompt = task.instruction
+        if dep_context:
+            prompt = f"{dep_context}\n\n{prompt}"
 
-        return {
-            "sub_results": results,
-            "completed": completed,
-        }
+        return self.pool.generate(
+            prompt=prompt,
+            tier=task.target_tier,
+            max_tokens=1024,
+        )
 
     def aggregate_results(
         self, query: str, sub_results: Dict[str, str], decomposition: TaskDecomposition
@@ -333,8 +306,21 @@ Is this answer correct and complete? Respond with a JSON object:
         """
         Classify query using LLM to determine capabilities and complexity.
 
-        Always uses LLM (standard tier) for classification.
+        Always uses LLM (standard tier) for classification; results are
+        cached per query, failures fall back to defaults (not cached).
         """
+        try:
+            return self.classification_cache.get_or_classify(query, self._classify_with_llm)
+        except (json.JSONDecodeError, Exception) as e:
+            logger.warning(f"Classification failed, using defaults: {e}")
+            return {
+                "task_type": "general",
+                "capabilities": ["fast_response"],
+                "complexity": 0.3,
+            }
+
+    def _classify_with_llm(self, query: str) -> dict:
+        """Single LLM classification call; raises on failure."""
         classify_prompt = f"""Analyze this query and respond with JSON only.
 
 Query: "{query}"
@@ -346,28 +332,20 @@ Respond with:
 
 JSON:"""
 
-        try:
-            response = self.pool.generate(
-                prompt=classify_prompt,
-                tier=self._classify_tier,
-                max_tokens=256,
-                temperature=0.1,
-                response_format="json",
-            )
+        response = self.pool.generate(
+            prompt=classify_prompt,
+            tier=self._classify_tier,
+            max_tokens=256,
+            temperature=0.1,
+            response_format="json",
+        )
 
-            parsed = json.loads(response)
-            return {
-                "task_type": parsed.get("task_type", "general"),
-                "capabilities": parsed.get("capabilities", ["fast_response"]),
-                "complexity": float(parsed.get("complexity", 0.3)),
-            }
-        except (json.JSONDecodeError, Exception) as e:
-            logger.warning(f"Classification failed, using defaults: {e}")
-            return {
-                "task_type": "general",
-                "capabilities": ["fast_response"],
-                "complexity": 0.3,
-            }
+        parsed = json.loads(response)
+        return {
+            "task_type": parsed.get("task_type", "general"),
+            "capabilities": parsed.get("capabilities", ["fast_response"]),
+            "complexity": float(parsed.get("complexity", 0.3)),
+        }
 
     def _decompose_task(self, query: str, classification: dict) -> List[SubTask]:
         """
@@ -431,6 +409,12 @@ JSON:"""
             task.target_tier = get_required_tier(task.required_capabilities)
             logger.debug(f"Routed {task.task_id}: {task.required_capabilities} → {task.target_tier}")
 
+    @staticmethod
+    def _tier_limits(config: Optional[RoutingConfig]) -> Dict[str, int]:
+        if config is None:
+            return {}
+        return {name: tier.max_concurrent_requests for name, tier in config.tiers.items()}
+
     # ── Observer ────────────────────────────────────────────────────────
 
     def on_config_changed(self, config: RoutingConfig) -> None:
@@ -439,6 +423,8 @@ JSON:"""
         self._complexity_threshold = perf.complexity_threshold_direct
         self._consistency_threshold = perf.self_consistency_threshold
         self._max_sub_tasks = perf.max_sub_tasks
+        self._executor.set_tier_limits(self._tier_limits(config))
+        self.classification_cache.on_config_changed(config)
         logger.info(
             f"DelegationManager reconfigured: complexity_threshold={self._complexity_threshold}, "
             f"consistency_threshold={self._consistency_threshold}, max_sub_tasks={self._max_sub_tasks}"
@@ -6,6 +6,7 @@ Key Features:
 - Destination alias resolution (office/work/home)
 - Multi-tool intent detection
 - Guardrails for incomplete tool sequences
+- Cacheability signals (tool, time-sensitive, live-data, follow-up queries)
 """
 from typing import Dict, List, Set, Optional, Tuple
 from dataclasses import dataclass, field
@@ -144,6 +145,53 @@ MULTI_TOOL_INTENTS: Dict[str, IntentPattern] = {
 }
 
 
+# =============================================================================
+# CACHEABILITY SIGNALS
+# =============================================================================
+
+# Answers that change with the clock ("today", "latest", prices, news)
+TIME_SENSITIVE_PATTERN = re.compile(
+    r"\b(now|today|tonight|tomorrow|yesterday|current(ly)?|latest|recent(ly)?|"
+    r"this (morning|afternoon|evening|week|weekend|month|year)|next (week|month)|"
+    r"news|price|stock|score|schedule|traffic)\b",
+    re.IGNORECASE,
+)
+
+# Answers that depend on the user's own data or on a live lookup
+LIVE_DATA_PATTERN = re.compile(
+    r"\b(my|mine|our|search|look up|lookup|google|browse)\b|https?://|www\.",
+    re.IGNORECASE,
+)
+
+# Follow-ups whose meaning depends on earlier turns of the conversation
+CONTEXT_REFERENCE_PATTERN = re.compile(
+    r"\b(it|that|this|these|those|them|above|previous|again|earlier)\b",
+    re.IGNORECASE,
+)
+
+# Tool-free knowledge categories (first match wins); used e.g. for cache TTLs
+KNOWLEDGE_CATEGORIES: List[Tuple[str, re.Pattern]] = [
+    ("code", re.compile(
+        r"\b(code|function|class|python|javascript|typescript|java|rust|sql|regex|"
+        r"algorithm|compile|syntax)\b", re.IGNORECASE)),
+    ("math", re.compile(
+        r"\b(calculate|solve|equation|integral|derivative|prime|factorial|sum of|"
+        r"square root)\b|\d+\s*[-+*/^]\s*\d+", re.IGNORECASE)),
+    ("how_to", re.compile(r"\b(how (do|can|to|does|should)|steps to)\b", re.IGNORECASE)),
+    ("definition", re.compile(
+        r"\b(what (is|are)|define|definition|meaning of|explain|difference between)\b",
+        re.IGNORECASE)),
+]
+
+
+def knowledge_category(query: str) -> str:
+    """Coarse tool-free category of a query ("general" if none matches)."""
+    for name, pattern in KNOWLEDGE_CATEGORIES:
+        if pattern.search(query):
+            return name
+    return "general"
+
+
 @dataclass
 class IntentAnalysis:
     """Result of intent analysis."""
@@ -153,6 +201,30 @@ class IntentAnalysis:
     clarifying_question: str = ""
     completed_tools: Set[str] = field(default_factory=set)
     missing_tools: List[str] = field(default_factory=list)
+    time_sensitive: bool = False
+    needs_live_data: bool = False
+    references_context: bool = False
+    category: str = "general"
+
+    @property
+    def requires_tools(self) -> bool:
+        """Whether the detected intent needs tool calls."""
+        return self.intent is not None and bool(self.intent.required_tools)
+
+    @property
+    def cache_bypass_reason(self) -> Optional[str]:
+        """Why an answer to this query must not be served from cache, if it must not."""
+        if self.needs_clarification:
+            return "clarification"
+        if self.requires_tools:
+            return "tool_intent"
+        if self.time_sensitive:
+            return "time_sensitive"
+        if self.needs_live_data:
+            return "live_data"
+        if self.references_context:
+            return "context_reference"
+        return None
 
 
 def detect_intent(query: str) -> Optional[IntentPattern]:
@@ -191,7 +263,13 @@ def analyze_intent(
         IntentAnalysis with all relevant information
     """
     completed = completed_tools or set()
-    analysis = IntentAnalysis(completed_tools=completed)
+    analysis = IntentAnalysis(
+        completed_tools=completed,
+        time_sensitive=bool(TIME_SENSITIVE_PATTERN.search(query)),
+        needs_live_data=bool(LIVE_DATA_PATTERN.search(query)),
+        references_context=bool(CONTEXT_REFERENCE_PATTERN.search(query)),
+        category=knowledge_category(query),
+    )
     
     # Detect intent
     intent = detect_intent(query)
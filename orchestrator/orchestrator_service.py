@@ -5,12 +5,15 @@ Routes queries to appropriate tools/services, manages agent workflows,
 handles conversation persistence, and provides crash recovery.
 """
 
+import asyncio
 import uuid
+import hashlib
 import json
+from dataclasses import dataclass
 import time
 import logging
 from concurrent import futures
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable, List
 
 import grpc
 from grpc_reflection.v1alpha import reflection
@@ -31,6 +34,7 @@ from shared.observability import (
     increment_active_requests,
     decrement_active_requests,
     update_context_utilization,
+    record_token_usage,
     RequestMetrics,
     ToolMetrics,
     ProviderMetrics,
@@ -56,10 +60,14 @@ from .intent_patterns import (
 # Import shared JSON parser for robust tool response parsing
 from shared.utils.json_parser import extract_tool_json, safe_parse_arguments
 
-from shared.clients.llm_client import LLMClient, LLMClientPool
+from shared.clients.llm_client import Completion, LLMClient, LLMClientPool
+from shared.clients.token_counter import TokenCounter
 from core.checkpointing import CheckpointManager, RecoveryManager
+from core.checkpoint_store import RetentionPolicy
+from core.context_compactor import estimate_tokens
 from core import AgentWorkflow, WorkflowConfig
 from core.state import create_initial_state
+from core.events import EVENT_SINK_KEY, EventSink, EventType, WorkflowEvent
 from core.self_consistency import SelfConsistencyVerifier
 from tools.registry import LocalToolRegistry
 from tools.builtin.web_search import web_search
@@ -86,9 +94,10 @@ from shared.providers import (
     ChatMessage,
     BaseProvider,
 )
+from shared.providers.loop_runner import LoopRunner, get_loop_runner
 
 import os
-import asyncio
+import queue
 import threading
 
 # LIDM imports
@@ -96,6 +105,8 @@ from .delegation_manager import DelegationManager
 from .capability_map import get_lidm_endpoints, set_config_manager
 from .config_manager import ConfigManager
 from .routing_config import RoutingConfig
+from .tier_admission import AdmittedClientPool, TierAdmission
+from .response_cache import ResponseCache
 
 # Protobuf imports
 from shared.generated import agent_pb2
@@ -109,6 +120,14 @@ logging.basicConfig(
 logger = logging.getLogger("orchestrator")
 
 
+@dataclass
+class StreamResponse:
+    """Streamed chunk from an online provider (shaped like llm_pb2.GenerateResponse)."""
+
+    token: str
+    is_final: bool = False
+
+
 class OnlineProviderWrapper:
     """
     Thread-safe wrapper that adapts async OnlineProvider interface to sync LLMClient interface.
@@ -116,8 +135,9 @@ class OnlineProviderWrapper:
     This enables seamless switching between local gRPC-based LLM and cloud APIs
     (Perplexity, OpenAI, Anthropic) without changing the orchestrator code.
 
-    Uses thread-local event loops to ensure thread safety when called from
-    multiple gRPC worker threads concurrently.
+    Calls from the gRPC worker threads run on the shared LoopRunner: one
+    long-lived event loop whose pooled HTTP sessions keep connections to the
+    provider alive between requests.
     """
 
     def __init__(
@@ -127,6 +147,7 @@ class OnlineProviderWrapper:
         temperature: float = 0.7,
         provider_metrics: Optional[ProviderMetrics] = None,
         provider_name: str = "unknown",
+        loop_runner: Optional[LoopRunner] = None,
     ):
         """
         Initialize the wrapper.
@@ -137,33 +158,19 @@ class OnlineProviderWrapper:
             temperature: Default temperature setting
             provider_metrics: Optional metrics for tracking provider calls
             provider_name: Name of the provider for metrics labels
+            loop_runner: Event loop to run the provider on (default: the shared one)
         """
         self.provider = provider
         self.model = model
         self.temperature = temperature
         self.provider_metrics = provider_metrics
         self.provider_name = provider_name
-        # Thread-local storage for event loops (thread-safe with concurrent requests)
-        self._thread_local = threading.local()
+        self._runner = loop_runner or get_loop_runner()
         logger.info(f"OnlineProviderWrapper initialized: model={model}, temp={temperature}")
 
-    def _get_loop(self) -> asyncio.AbstractEventLoop:
-        """Get or create thread-local event loop."""
-        if not hasattr(self._thread_local, 'loop') or self._thread_local.loop.is_closed():
-            self._thread_local.loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(self._thread_local.loop)
-        return self._thread_local.loop
-
     def _run_async(self, coro):
-        """Run async coroutine in thread-local event loop.
-
-        Wraps coroutine in a task to ensure proper async context
-        for aiohttp's timeout context manager.
-        """
-        loop = self._get_loop()
-        # Wrap in task to ensure proper async context for aiohttp timeout
-        task = loop.create_task(coro)
-        return loop.run_until_complete(task)
+        """Run async coroutine on the shared event loop and wait for its result."""
+        return self._runner.run(coro)
     
     def generate(
         self,
@@ -186,6 +193,16 @@ class OnlineProviderWrapper:
         Returns:
             Generated text content
         """
+        return self.complete(prompt, max_tokens, temperature, response_format).text
+
+    def complete(
+        self,
+        prompt: str,
+        max_tokens: int = 2048,
+        temperature: float = None,
+        response_format: str = None,
+    ) -> Completion:
+        """Like generate(), with the token usage the provider reports."""
         temp = temperature if temperature is not None else self.temperature
         start_time = time.time()
 
@@ -204,6 +221,10 @@ class OnlineProviderWrapper:
             # Run async generate
             response = self._run_async(self.provider.generate(request))
 
+            usage = response.usage or {}
+            prompt_tokens = int(usage.get("prompt_tokens") or 0)
+            completion_tokens = int(usage.get("completion_tokens") or 0)
+
             # Record provider metrics
             if self.provider_metrics:
                 duration_ms = (time.time() - start_time) * 1000
@@ -213,8 +234,18 @@ class OnlineProviderWrapper:
                 self.provider_metrics.provider_latency_ms.record(
                     duration_ms, {"provider": self.provider_name, "model": self.model}
                 )
+                record_token_usage(
+                    self.provider_metrics.tokens_total,
+                    prompt_tokens,
+                    completion_tokens,
+                    {"provider": self.provider_name, "model": self.model},
+                )
 
-            return response.content
+            return Completion(
+                text=response.content,
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+            )
 
         except Exception as e:
             # Record error metrics
@@ -228,9 +259,9 @@ class OnlineProviderWrapper:
         """
         Generate streaming completion using online provider.
         
-        Matches LLMClient.generate_stream() interface.
-        
-        Note: Returns a generator that yields response-like objects with 'token' and 'is_final'.
+        Matches LLMClient.generate_stream() interface: yields response-like
+        objects with 'token' and 'is_final' as the provider sends them, then
+        a final empty one. Stopping early cancels the provider request.
         """
         temp = temperature if temperature is not None else self.temperature
         
@@ -241,32 +272,26 @@ class OnlineProviderWrapper:
             max_tokens=max_tokens,
             stream=True,
         )
-        
-        # For streaming, we need to adapt the async iterator
-        # This is a simplified implementation - yields tokens as they come
-        async def _stream():
-            collected = []
-            async for token in self.provider.generate_stream(request):
-                collected.append(token)
-                yield token
-        
-        # Run in sync context
-        class StreamResponse:
-            def __init__(self, token, is_final=False):
-                self.token = token
-                self.is_final = is_final
-        
-        async def collect_stream():
-            tokens = []
-            async for token in self.provider.generate_stream(request):
-                tokens.append(StreamResponse(token, False))
-            if tokens:
-                tokens[-1].is_final = True
-            return tokens
-        
-        results = self._run_async(collect_stream())
-        for r in results:
-            yield r
+
+        start_time = time.time()
+        try:
+            for token in self._runner.stream(self.provider.generate_stream(request)):
+                yield StreamResponse(token)
+        except Exception as e:
+            if self.provider_metrics:
+                self.provider_metrics.provider_errors_total.add(
+                    1, {"provider": self.provider_name, "model": self.model, "error_type": type(e).__name__}
+                )
+            raise
+
+        if self.provider_metrics:
+            self.provider_metrics.provider_requests_total.add(
+                1, {"provider": self.provider_name, "model": self.model, "status": "success"}
+            )
+            self.provider_metrics.provider_latency_ms.record(
+                (time.time() - start_time) * 1000, {"provider": self.provider_name, "model": self.model}
+            )
+        yield StreamResponse("", is_final=True)
 
 
 class LLMEngineWrapper:
@@ -295,13 +320,20 @@ class LLMEngineWrapper:
         self.max_tool_iterations = max_tool_iterations
         self.sandbox_client = sandbox_client
         self.pipeline_metrics = pipeline_metrics
+        # Exact counts from the service's tokenizer (clients without the
+        # CountTokens RPC, e.g. online providers, use the estimate). Looked up
+        # on the class so duck-typed clients only need generate()
+        self._reports_usage = hasattr(type(llm_client), "complete")
+        counts_tokens = hasattr(type(llm_client), "count_tokens")
+        self.token_counter = TokenCounter(llm_client.count_tokens) if counts_tokens else None
         logger.debug(
             f"LLMEngineWrapper initialized: temp={temperature}, "
             f"max_tokens={max_tokens}, max_tool_iterations={max_tool_iterations}"
         )
     
     def generate(self, messages: list, tools: list = None, temperature: float = None, 
-                 max_tokens: int = None, stream: bool = False) -> dict:
+                 max_tokens: int = None, stream: bool = False,
+                 on_token: Optional[Callable[[str], None]] = None) -> dict:
         """
         Generate response from LLM with optional tool calling.
         
@@ -311,6 +343,8 @@ class LLMEngineWrapper:
             temperature: Optional temperature override
             max_tokens: Optional max_tokens override
             stream: Whether to stream response (not implemented)
+            on_token: Optional callback receiving plain-text answer tokens as they
+                are generated (JSON tool-calling output is never streamed)
         
         Returns:
             dict with 'content' and optionally 'tool_calls'
@@ -323,11 +357,79 @@ class LLMEngineWrapper:
         
         # Route to appropriate generation method
         if tools and len(tools) > 0:
-            return self._generate_with_tools(messages, tools, temp, max_tok)
+            return self._generate_with_tools(messages, tools, temp, max_tok, on_token)
         else:
-            return self._generate_direct(messages, temp, max_tok)
+            return self._generate_direct(messages, temp, max_tok, on_token)
     
-    def _generate_direct(self, messages: list, temperature: float, max_tokens: int) -> dict:
+    def count_tokens(self, text: str) -> int:
+        """Token count of text under the model's tokenizer (cached; estimated if unavailable)."""
+        if self.token_counter is None:
+            return estimate_tokens(text)
+        return self.token_counter.count(text)
+
+    def _complete(self, prompt: str, max_tokens: int, temperature: float,
+                  response_format: str = "") -> Completion:
+        """Single completion with token usage (when the client reports it)."""
+        if self._reports_usage:
+            return self.client.complete(
+                prompt=prompt,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                response_format=response_format,
+            )
+        return Completion(text=self.client.generate(
+            prompt=prompt,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            response_format=response_format,
+        ))
+
+    def _complete_text(self, prompt: str, max_tokens: int, temperature: float,
+                       on_token: Optional[Callable[[str], None]] = None) -> Completion:
+        """
+        Plain-text completion, streamed token by token when on_token is set.
+        
+        Args:
+            prompt: Prompt text
+            max_tokens: Maximum tokens to generate
+            temperature: Sampling temperature
+            on_token: Optional per-token callback
+        
+        Returns:
+            Full generated text with token usage
+        """
+        if on_token is None:
+            return self._complete(prompt, max_tokens, temperature)
+        
+        chunks = []
+        completion = Completion(text="")
+        for chunk in self.client.generate_stream(
+            prompt, max_tokens, temperature=temperature
+        ):
+            if chunk.token:
+                chunks.append(chunk.token)
+                on_token(chunk.token)
+            if chunk.is_final:
+                completion.prompt_tokens = getattr(chunk, "prompt_tokens", 0)
+                completion.completion_tokens = getattr(chunk, "completion_tokens", 0)
+                break
+        completion.text = "".join(chunks)
+        return completion
+
+    def _record_usage(self, prompt: str, completion: Completion, infer_ms: float, mode: str) -> None:
+        """Record token throughput and usage, counting locally what the client did not report."""
+        if not self.pipeline_metrics:
+            return
+        completion_tokens = completion.completion_tokens or self.count_tokens(completion.text)
+        prompt_tokens = completion.prompt_tokens or self.count_tokens(prompt)
+        if infer_ms > 0:
+            self.pipeline_metrics.token_generation_rate.record(
+                completion_tokens / (infer_ms / 1000), {"mode": mode})
+        record_token_usage(
+            self.pipeline_metrics.tokens_total, prompt_tokens, completion_tokens, {"mode": mode})
+    
+    def _generate_direct(self, messages: list, temperature: float, max_tokens: int,
+                         on_token: Optional[Callable[[str], None]] = None) -> dict:
         """Generate direct response without tools."""
         prompt = self._format_messages(messages)
 
@@ -340,23 +442,17 @@ class LLMEngineWrapper:
 
         try:
             infer_start = time.perf_counter()
-            response_text = self.client.generate(
-                prompt=prompt,
-                max_tokens=max_tokens,
-                temperature=temperature
+            completion = self._complete_text(
+                prompt, max_tokens, temperature, on_token
             )
             infer_ms = (time.perf_counter() - infer_start) * 1000
+            response_text = completion.text
 
             # Record inference metrics
             if self.pipeline_metrics:
                 self.pipeline_metrics.inference_duration_ms.record(
                     infer_ms, {"mode": "direct"})
-                # Approximate token count (~4 chars/token) and record rate
-                approx_tokens = max(len(response_text) // 4, 1)
-                if infer_ms > 0:
-                    tps = approx_tokens / (infer_ms / 1000)
-                    self.pipeline_metrics.token_generation_rate.record(
-                        tps, {"mode": "direct"})
+                self._record_usage(prompt, completion, infer_ms, "direct")
 
             return {
                 "content": response_text.strip(),
@@ -369,7 +465,8 @@ class LLMEngineWrapper:
                 "tool_calls": []
             }
     
-    def _generate_with_tools(self, messages: list, tools: list, temperature: float, max_tokens: int) -> dict:
+    def _generate_with_tools(self, messages: list, tools: list, temperature: float, max_tokens: int,
+                             on_token: Optional[Callable[[str], None]] = None) -> dict:
         """
         Generate response with tool calling using Agent0-style multi-turn rollouts.
         
@@ -395,7 +492,9 @@ class LLMEngineWrapper:
         # If we have tool results, use plain-text synthesis instead of JSON
         # This is far more reliable across model sizes
         if has_tool_results:
-            return self._synthesize_with_results(messages, conversation, temperature, max_tokens)
+            return self._synthesize_with_results(
+                messages, conversation, temperature, max_tokens, on_token
+            )
 
         # Track multi-turn context
         rollout_context = conversation
@@ -430,16 +529,15 @@ Your response (JSON only):"""
             try:
                 # Generate with JSON grammar constraint
                 infer_start = time.perf_counter()
-                response_text = self.client.generate(
-                    prompt=prompt,
-                    max_tokens=max_tokens,
-                    temperature=temperature,
-                    response_format="json"
+                completion = self._complete(
+                    prompt, max_tokens, temperature, response_format="json"
                 )
                 infer_ms = (time.perf_counter() - infer_start) * 1000
+                response_text = completion.text
                 if self.pipeline_metrics:
                     self.pipeline_metrics.inference_duration_ms.record(
                         infer_ms, {"mode": "tool_calling"})
+                    self._record_usage(prompt, completion, infer_ms, "tool_calling")
 
                 # Parse response
                 parsed = self._parse_tool_response(response_text)
@@ -491,7 +589,9 @@ Your response (JSON only):"""
             }
         }
     
-    def _synthesize_with_results(self, messages: list, conversation: str, temperature: float, max_tokens: int) -> dict:
+    def _synthesize_with_results(self, messages: list, conversation: str, temperature: float,
+                                 max_tokens: int,
+                                 on_token: Optional[Callable[[str], None]] = None) -> dict:
         """
         Synthesize a final answer from tool results using plain-text output.
 
@@ -531,21 +631,16 @@ Answer:"""
 
         try:
             infer_start = time.perf_counter()
-            response_text = self.client.generate(
-                prompt=prompt,
-                max_tokens=max_tokens,
-                temperature=temperature,
-                # No response_format="json" — plain text output
+            # No response_format="json" — plain text output
+            completion = self._complete_text(
+                prompt, max_tokens, temperature, on_token
             )
             infer_ms = (time.perf_counter() - infer_start) * 1000
+            response_text = completion.text
             if self.pipeline_metrics:
                 self.pipeline_metrics.inference_duration_ms.record(
                     infer_ms, {"mode": "synthesis"})
-                approx_tokens = max(len(response_text) // 4, 1)
-                if infer_ms > 0:
-                    tps = approx_tokens / (infer_ms / 1000)
-                    self.pipeline_metrics.token_generation_rate.record(
-                        tps, {"mode": "synthesis"})
+                self._record_usage(prompt, completion, infer_ms, "synthesis")
 
             content = response_text.strip()
             logger.info(f"Tool result synthesis complete: {len(content)} chars")
@@ -860,7 +955,11 @@ class OrchestratorService(agent_pb2_grpc.AgentServiceServicer):
             # Guard: verify at least one non-heavy endpoint is reachable
             reachable = self._check_lidm_endpoints(endpoints)
             if reachable:
-                self.llm_pool = LLMClientPool(reachable)
+                # Tier concurrency/queue limits are enforced in front of the pool
+                self.llm_pool = AdmittedClientPool(
+                    LLMClientPool(reachable),
+                    TierAdmission(routing_config, metrics=self.lidm_metrics),
+                )
                 self.delegation_manager = DelegationManager(
                     self.llm_pool,
                     metrics=self.lidm_metrics,
@@ -868,6 +967,7 @@ class OrchestratorService(agent_pb2_grpc.AgentServiceServicer):
                 )
                 # Register observers for hot-reload
                 self.config_manager.register_observer(self.delegation_manager.on_config_changed)
+                self.config_manager.register_observer(self.llm_pool.on_config_changed)
                 self.config_manager.register_observer(self._on_routing_config_changed)
                 logger.info(f"LIDM delegation enabled with tiers: {self.llm_pool.available_tiers}")
             else:
@@ -918,17 +1018,26 @@ class OrchestratorService(agent_pb2_grpc.AgentServiceServicer):
         logger.info(f"Total tools registered: {len(self.tool_registry.tools)}")
     
         # Initialize Checkpoint Manager
-        self.checkpoint_manager = CheckpointManager(self.config.checkpoint_db_path)
+        self.checkpoint_manager = CheckpointManager(
+            self.config.checkpoint_db_path,
+            retention=RetentionPolicy(
+                max_age_days=self.config.checkpoint_max_age_days or None,
+                max_checkpoints_per_thread=self.config.checkpoint_max_per_thread or None,
+                max_total_bytes=int(self.config.checkpoint_max_total_mb * 1024 * 1024) or None,
+            ),
+        )
         self.checkpointer = self.checkpoint_manager.create_checkpointer()
         
         # Initialize workflow config
         self.workflow_config = WorkflowConfig(
             max_iterations=self.config.max_iterations,
             context_window=self.config.context_window,
+            context_tokens=self.config.context_tokens,
             temperature=self.config.temperature,
             model_name=self.config.model_name,
             enable_streaming=self.config.enable_streaming,
             max_tool_calls_per_turn=self.config.max_tool_calls_per_turn,
+            tool_pool_workers=self.config.tool_pool_workers,
             timeout_seconds=self.config.timeout_seconds
         )
         
@@ -938,11 +1047,28 @@ class OrchestratorService(agent_pb2_grpc.AgentServiceServicer):
             llm_engine=self.llm_engine,
             config=self.workflow_config,
             chroma_client=self.chroma_client,
+            token_counter=self.llm_engine.count_tokens,
         )
         
         # Compile workflow with checkpointing
         self.compiled_workflow = self.workflow.compile(checkpointer=self.checkpointer)
         logger.info("AgentWorkflow compiled with checkpointing")
+
+        # Response cache for repeated tool-free questions (bypass rules in analyze_intent)
+        self.response_cache: Optional[ResponseCache] = None
+        if self.config.enable_response_cache:
+            self.response_cache = ResponseCache(
+                max_entries=self.config.response_cache_size,
+                default_ttl_seconds=self.config.response_cache_ttl_seconds,
+                intent_ttls=self.config.response_cache_intent_ttls,
+                embed=self._embed_query if self.chroma_client is not None else None,
+                similarity_threshold=self.config.response_cache_similarity_threshold,
+                version=self._response_cache_version(self.config_manager.get_config()),
+                metrics=self.pipeline_metrics,
+            )
+            self.config_manager.register_observer(self._on_response_cache_config_changed)
+            logger.info(f"Response cache enabled: size={self.config.response_cache_size}, "
+                        f"version={self.response_cache.version}")
         
         # Initialize recovery manager
         self.recovery_manager = RecoveryManager(self.checkpoint_manager)
@@ -1024,6 +1150,22 @@ class OrchestratorService(agent_pb2_grpc.AgentServiceServicer):
             self.llm_pool.reconfigure(new_endpoints)
             logger.info(f"LLMClientPool reconfigured: tiers={self.llm_pool.available_tiers}")
 
+    def _embed_query(self, text: str) -> Optional[List[float]]:
+        """Query embedding from chroma_service (None when unavailable)."""
+        vectors = self.chroma_client.embed([text])
+        return vectors[0] if vectors else None
+
+    def _response_cache_version(self, routing_config: RoutingConfig) -> str:
+        """Model/config identity for response cache keys."""
+        model = self.config.provider_model or self.config.model_name
+        digest = hashlib.blake2b(routing_config.model_dump_json().encode(), digest_size=6).hexdigest()
+        return f"{self.config.provider_type}:{model}:{routing_config.version}:{digest}"
+
+    def _on_response_cache_config_changed(self, config: RoutingConfig) -> None:
+        """Observer callback: cached answers are dropped when the routing config changes."""
+        if self.response_cache is not None:
+            self.response_cache.set_version(self._response_cache_version(config))
+
     @staticmethod
     def _check_lidm_endpoints(endpoints: Dict[str, str]) -> Dict[str, str]:
         """
@@ -1228,13 +1370,138 @@ class OrchestratorService(agent_pb2_grpc.AgentServiceServicer):
             if self.observability_enabled:
                 decrement_active_requests()
     
+    def QueryAgentStream(self, request, context):
+        """
+        Process user query and stream incremental events.
+
+        Runs the same pipeline as QueryAgent on a worker thread and yields
+        AgentEvent messages as they are produced: LLM token chunks, tool call
+        start/finish, validation decisions, and finally the answer with its
+        sources (or an ERROR event).
+        """
+        request_id = str(uuid.uuid4())
+        thread_id = self._get_thread_id(context) or request_id
+
+        events: "queue.Queue" = queue.Queue()
+        finished = object()
+
+        def run():
+            try:
+                self._run_stream_query(request, request_id, thread_id, events.put)
+            finally:
+                events.put(finished)
+
+        worker = threading.Thread(
+            target=run, name=f"query-stream-{request_id[:8]}", daemon=True
+        )
+        worker.start()
+
+        sequence = 0
+        while True:
+            event = events.get()
+            if event is finished:
+                break
+            if not context.is_active():
+                # Client went away; the workflow finishes in the background
+                logger.info(f"[{request_id}] Client cancelled stream")
+                break
+            yield self._to_agent_event(event, sequence)
+            sequence += 1
+
+    def _run_stream_query(
+        self,
+        request,
+        request_id: str,
+        thread_id: str,
+        emit: EventSink,
+    ) -> None:
+        """
+        Run the QueryAgentStream pipeline, passing each WorkflowEvent to emit.
+
+        Blocks until the workflow finishes; the last event is FINAL_ANSWER
+        or ERROR. Shared by the thread-pool and asyncio servers.
+        """
+        start_time = time.time()
+        logger.info(f"[{request_id}] Streaming query: '{request.user_query}'")
+
+        if self.observability_enabled:
+            set_correlation_id(request_id)
+            increment_active_requests()
+            if self.request_metrics:
+                self.request_metrics.requests_total.add(
+                    1, {"method": "QueryAgentStream", "type": "stream"}
+                )
+
+        status = "ok"
+        try:
+            self.checkpoint_manager.mark_thread_incomplete(thread_id)
+            result = self._process_query(
+                query=request.user_query,
+                thread_id=thread_id,
+                event_sink=emit,
+            )
+            self.checkpoint_manager.mark_thread_complete(thread_id)
+
+            content = result.get("content") or "Sorry, I couldn't generate a response."
+            emit(WorkflowEvent(
+                type=EventType.FINAL_ANSWER,
+                content=content,
+                payload=self._build_sources_metadata(result, thread_id),
+            ))
+        except Exception as e:
+            status = "error"
+            logger.exception(f"[{request_id}] Streaming error: {e}")
+            if self.observability_enabled and self.request_metrics:
+                self.request_metrics.errors_total.add(
+                    1, {"method": "QueryAgentStream", "error_type": type(e).__name__}
+                )
+            emit(WorkflowEvent(
+                type=EventType.ERROR,
+                content=f"Sorry, an error occurred. (Request ID: {request_id})",
+                payload={"error": str(e), "request_id": request_id},
+            ))
+        finally:
+            elapsed = time.time() - start_time
+            logger.info(f"[{request_id}] Stream completed in {elapsed:.2f}s")
+            if self.observability_enabled:
+                if self.request_metrics:
+                    self.request_metrics.request_duration_ms.record(
+                        elapsed * 1000, {"method": "QueryAgentStream", "status": status}
+                    )
+                decrement_active_requests()
+
+    @staticmethod
+    def _to_agent_event(event: WorkflowEvent, sequence: int) -> "agent_pb2.AgentEvent":
+        """Convert a WorkflowEvent into its protobuf representation."""
+        return agent_pb2.AgentEvent(
+            type=agent_pb2.AgentEvent.EventType.Value(event.type.upper()),
+            sequence=sequence,
+            content=event.content,
+            tool_name=event.tool_name,
+            tool_call_id=event.tool_call_id,
+            status=event.status,
+            payload=json.dumps(event.payload, default=str) if event.payload else "",
+            timestamp=event.timestamp,
+        )
+
     def _process_query(
         self,
         query: str,
-        thread_id: str
+        thread_id: str,
+        event_sink: Optional[EventSink] = None,
     ) -> Dict[str, Any]:
-        """Process query through agent workflow with intent-based guardrails."""
-        
+        """
+        Process query through agent workflow with intent-based guardrails.
+
+        Repeated tool-free questions are answered from the response cache
+        when it is enabled; see _run_query for the uncached path.
+
+        Args:
+            query: User query
+            thread_id: Conversation thread (checkpoint key)
+            event_sink: Optional callback receiving WorkflowEvents as the
+                workflow runs (used by QueryAgentStream)
+        """
         # Analyze intent for multi-tool queries
         intent_analysis = analyze_intent(query)
 
@@ -1244,6 +1511,50 @@ class OrchestratorService(agent_pb2_grpc.AgentServiceServicer):
             self.pipeline_metrics.classification_total.add(
                 1, {"category": intent_name, "tier": "standard"})
 
+        if self.response_cache is None:
+            return self._run_query(query, thread_id, intent_analysis, event_sink)
+
+        lookup = self.response_cache.lookup(query, intent_analysis)
+        if lookup.hit:
+            logger.info(f"Response cache {lookup.decision} (category={lookup.category})")
+            self._persist_cached_turn(query, lookup.content, thread_id)
+            return {
+                "content": lookup.content,
+                "messages": [],
+                "tool_results": [],
+                "iteration": 0,
+                "cached": True,
+            }
+
+        result = self._run_query(query, thread_id, intent_analysis, event_sink)
+        # Answers that used tools depend on tool output; don't reuse them
+        if not result.get("tool_results") and not result.get("needs_clarification"):
+            self.response_cache.store(lookup, result.get("content") or "")
+        return result
+
+    def _persist_cached_turn(self, query: str, content: str, thread_id: str) -> None:
+        """Append a cache-served question and answer to the thread's checkpoint."""
+        if getattr(self.compiled_workflow, "checkpointer", None) is None:
+            return
+        # update_state addresses the root graph; checkpoint_ns would name a subgraph
+        config = {"configurable": {"thread_id": thread_id}}
+        try:
+            self.compiled_workflow.update_state(
+                config,
+                {"messages": [HumanMessage(content=query), AIMessage(content=content)]},
+                as_node="validate",
+            )
+        except Exception as e:
+            logger.warning(f"Could not save cached turn to thread {thread_id}: {e}")
+
+    def _run_query(
+        self,
+        query: str,
+        thread_id: str,
+        intent_analysis: IntentAnalysis,
+        event_sink: Optional[EventSink] = None,
+    ) -> Dict[str, Any]:
+        """Run query through LIDM delegation or the agent workflow (uncached)."""
         # Check if clarification is needed (e.g., missing destination)
         if intent_analysis.needs_clarification:
             logger.info(f"Intent requires clarification: {intent_analysis.clarifying_question}")
@@ -1370,6 +1681,8 @@ class OrchestratorService(agent_pb2_grpc.AgentServiceServicer):
                 "checkpoint_ns": "orchestrator"
             }
         }
+        if event_sink is not None:
+            config["configurable"][EVENT_SINK_KEY] = event_sink
 
         # Invoke compiled workflow with tracing
         if self.observability_enabled:
@@ -1388,13 +1701,11 @@ class OrchestratorService(agent_pb2_grpc.AgentServiceServicer):
         messages = final_state.get("messages", [])
         last_message = messages[-1] if messages else None
 
-        # Update context window utilization gauge
-        if self.observability_enabled and self.pipeline_metrics:
-            total_chars = sum(len(str(m.content)) for m in messages if hasattr(m, "content"))
-            # Approximate context usage: ~4 chars/token, config context_window is in K tokens
-            max_tokens = self.config.context_window * 1024
-            approx_tokens_used = total_chars // 4
-            update_context_utilization(approx_tokens_used / max(max_tokens, 1))
+        # Update context window utilization gauge: the last (compacted) prompt
+        # the LLM saw, against the model context size in tokens
+        prompt_tokens = (final_state.get("metadata") or {}).get("prompt_tokens")
+        if self.observability_enabled and self.pipeline_metrics and prompt_tokens is not None:
+            update_context_utilization(prompt_tokens / max(self.config.context_tokens, 1))
 
         content = ""
         if last_message:
@@ -1445,6 +1756,8 @@ class OrchestratorService(agent_pb2_grpc.AgentServiceServicer):
             "iterations": result.get("iteration", 0),
             "tools_used": []
         };
+        if result.get("cached"):
+            sources["cached"] = True
         
         for tr in tool_results:
             if isinstance(tr, dict):
@@ -1459,10 +1772,21 @@ class OrchestratorService(agent_pb2_grpc.AgentServiceServicer):
         return sources
 
 
+SERVER_OPTIONS = [
+    ('grpc.max_send_message_length', 50 * 1024 * 1024),
+    ('grpc.max_receive_message_length', 50 * 1024 * 1024),
+]
+
+
 def serve(config: Optional[OrchestratorConfig] = None):
     """Start the orchestrator gRPC server."""
     config = config or OrchestratorConfig.from_env()
 
+    if config.server_mode == "async":
+        from .aio_server import serve_async
+        asyncio.run(serve_async(config))
+        return
+
     # Check if observability is enabled
     observability_enabled = os.getenv("ENABLE_OBSERVABILITY", "false").lower() == "true"
 
@@ -1475,10 +1799,7 @@ def serve(config: Optional[OrchestratorConfig] = None):
     server = grpc.server(
         futures.ThreadPoolExecutor(max_workers=10),
         interceptors=interceptors,
-        options=[
-            ('grpc.max_send_message_length', 50 * 1024 * 1024),
-            ('grpc.max_receive_message_length', 50 * 1024 * 1024),
-        ]
+        options=SERVER_OPTIONS,
     )
 
     # Add orchestrator service
@@ -0,0 +1,256 @@
+"""
+Cache of agent answers for repeated knowledge-style queries.
+
+_process_query runs the full LangGraph workflow for every query, although
+questions like "what is a monad" or "how do I reverse a list in Python"
+get the same answer each time and need no tools. ResponseCache serves
+repeats from memory:
+
+- key: (model/config version, intent category, query text lowercased with
+  whitespace collapsed and trailing "?"/"!" dropped); operators and symbols
+  are kept, so "2+2" and "2*2" or "C#" and "C++" never share an answer. A
+  version change (new model, routing config reload) makes all earlier
+  answers unreachable and flushes them
+- similar (optional): with an embed function, a query whose embedding has
+  cosine similarity >= similarity_threshold with a cached query of the same
+  category and version reuses its answer
+- TTL per intent category (intent_ttls, e.g. definitions live longer than
+  general chat); a TTL of 0 disables caching for that category
+- bypass: queries that analyze_intent marks as needing tools, time-
+  sensitive, dependent on the user's live data, referring to earlier turns
+  or needing clarification are never looked up or stored
+
+Only answers produced without tool calls are stored (see store()).
+"""
+
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+from .classification_cache import cosine_similarity
+from .intent_patterns import IntentAnalysis
+
+# Optional import — metrics may not be available if observability is off
+try:
+    from shared.observability.metrics import DecisionPipelineMetrics
+except ImportError:
+    DecisionPipelineMetrics = None  # type: ignore[misc,assignment]
+
+logger = logging.getLogger(__name__)
+
+# Seconds an answer stays valid, by knowledge category (see intent_patterns)
+DEFAULT_INTENT_TTLS: Dict[str, float] = {
+    "math": 7 * 24 * 3600.0,
+    "definition": 24 * 3600.0,
+    "how_to": 24 * 3600.0,
+    "code": 6 * 3600.0,
+}
+
+_Key = Tuple[str, str, str]  # (version, category, cache_key_text(query))
+
+_SPACES = re.compile(r"\s+")
+_TRAILING = re.compile(r"[\s?!]+$")
+
+
+def cache_key_text(query: str) -> str:
+    """Lossless cache key text: lowercase, whitespace collapsed, trailing ?/! dropped."""
+    return _TRAILING.sub("", _SPACES.sub(" ", query.strip().lower()))
+
+
+@dataclass
+class _Entry:
+    content: str
+    expires_at: float
+    vector: Optional[Sequence[float]] = None
+
+
+@dataclass
+class CacheLookup:
+    """Outcome of ResponseCache.lookup(); pass it back to store() on a miss."""
+    decision: str  # "hit", "similar", "miss" or "bypass"
+    category: str
+    reason: str = ""
+    content: Optional[str] = None
+    key: Optional[_Key] = None
+    vector: Optional[Sequence[float]] = None
+    generation: int = 0
+
+    @property
+    def hit(self) -> bool:
+        return self.decision in ("hit", "similar")
+
+
+class ResponseCache:
+    """
+    TTL- and size-bounded cache of tool-free agent answers.
+
+    Args:
+        max_entries: Answers kept (least recently used evicted first)
+        default_ttl_seconds: TTL for categories not in intent_ttls
+        intent_ttls: TTL per knowledge category (overrides DEFAULT_INTENT_TTLS)
+        embed: Optional text -> vector function enabling similarity matches
+        similarity_threshold: Minimum cosine similarity for a similarity hit
+        version: Model/config identity that every key includes
+        metrics: Optional DecisionPipelineMetrics for lookup counts
+        clock: Time source (seconds)
+
+    Example:
+        >>> cache = ResponseCache(version="local:qwen2.5-3b:1.0")
+        >>> lookup = cache.lookup(query, analyze_intent(query))
+        >>> if lookup.hit:
+        ...     return lookup.content
+        >>> answer = run_workflow(query)
+        >>> cache.store(lookup, answer)
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        default_ttl_seconds: float = 3600.0,
+        intent_ttls: Optional[Dict[str, float]] = None,
+        embed: Optional[Callable[[str], Sequence[float]]] = None,
+        similarity_threshold: float = 0.95,
+        version: str = "",
+        metrics: Optional["DecisionPipelineMetrics"] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max(0, max_entries)
+        self.default_ttl_seconds = default_ttl_seconds
+        self.intent_ttls = {**DEFAULT_INTENT_TTLS, **(intent_ttls or {})}
+        self.embed = embed
+        self.similarity_threshold = similarity_threshold
+        self.version = version
+        self._metrics = metrics
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[_Key, _Entry]" = OrderedDict()
+        self._generation = 0
+        self.counts: Dict[str, int] = {"hit": 0, "similar": 0, "miss": 0, "bypass": 0}
+
+    def ttl_for(self, category: str) -> float:
+        return self.intent_ttls.get(category, self.default_ttl_seconds)
+
+    def lookup(self, query: str, analysis: IntentAnalysis) -> CacheLookup:
+        """Decide whether query may use the cache and, if so, find its answer."""
+        category = analysis.category
+        reason = analysis.cache_bypass_reason
+        if reason is None and (self.max_entries == 0 or self.ttl_for(category) <= 0):
+            reason = "disabled"
+        if reason is not None:
+            return self._record(CacheLookup("bypass", category, reason=reason))
+
+        with self._lock:
+            key = (self.version, category, cache_key_text(query))
+            generation = self._generation
+            content = self._get(key)
+        if content is not None:
+            return self._record(CacheLookup("hit", category, content=content, key=key))
+
+        vector = None
+        if self.embed is not None:
+            vector = self._embed(query)
+            if vector is not None:
+                with self._lock:
+                    content = self._get_similar(key, vector)
+                if content is not None:
+                    return self._record(CacheLookup("similar", category, content=content, key=key))
+
+        return self._record(CacheLookup(
+            "miss", category, key=key, vector=vector, generation=generation
+        ))
+
+    def store(self, lookup: CacheLookup, content: str) -> bool:
+        """
+        Cache content as the answer for a missed lookup.
+
+        Returns:
+            True if stored (not for bypassed lookups, empty answers, or
+            lookups made before a version change/clear)
+        """
+        if lookup.decision != "miss" or not content or not content.strip():
+            return False
+        with self._lock:
+            if lookup.generation != self._generation:
+                return False
+            self._entries[lookup.key] = _Entry(
+                content, self._clock() + self.ttl_for(lookup.category), lookup.vector
+            )
+            self._entries.move_to_end(lookup.key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return True
+
+    def _get(self, key: _Key) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= self._clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry.content
+
+    def _get_similar(self, key: _Key, vector: Sequence[float]) -> Optional[str]:
+        now = self._clock()
+        best_key, best_score = None, self.similarity_threshold
+        for other, entry in list(self._entries.items()):
+            if entry.expires_at <= now:
+                del self._entries[other]
+                continue
+            if other[:2] != key[:2] or entry.vector is None:
+                continue
+            score = cosine_similarity(vector, entry.vector)
+            if score >= best_score:
+                best_key, best_score = other, score
+        if best_key is None:
+            return None
+        self._entries.move_to_end(best_key)
+        logger.debug(f"Response cache similarity hit ({best_score:.3f}): '{best_key[2]}'")
+        return self._entries[best_key].content
+
+    def _embed(self, query: str) -> Optional[Sequence[float]]:
+        try:
+            return self.embed(query)
+        except Exception as e:
+            logger.warning(f"Query embedding failed, similarity lookup skipped: {e}")
+            return None
+
+    def _record(self, lookup: CacheLookup) -> CacheLookup:
+        with self._lock:
+            self.counts[lookup.decision] += 1
+        if self._metrics is not None:
+            attributes = {"result": lookup.decision, "category": lookup.category}
+            if lookup.reason:
+                attributes["reason"] = lookup.reason
+            self._metrics.response_cache_lookups_total.add(1, attributes)
+        return lookup
+
+    def set_version(self, version: str) -> None:
+        """Switch to a new model/config version; earlier answers are dropped."""
+        if version != self.version:
+            logger.info(f"Response cache version changed ({self.version} -> {version}), flushing")
+            self.version = version
+            self.clear()
+
+    def clear(self) -> None:
+        """Drop all answers and discard answers still being generated."""
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = sum(self.counts.values())
+            hits = self.counts["hit"] + self.counts["similar"]
+            return {
+                "entries": len(self._entries),
+                **self.counts,
+                "hit_rate": hits / lookups if lookups else 0.0,
+            }
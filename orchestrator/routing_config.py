@@ -26,6 +26,22 @@ class TierConfig(BaseModel):
     max_concurrent_requests: int = 10
     priority: int = 1
     enabled: bool = True
+    max_queue_depth: int = Field(
+        default=32,
+        description="Requests allowed to wait for a slot; further requests are refused.",
+    )
+    queue_timeout_ms: int = Field(
+        default=30000,
+        description="Longest a request waits for a slot before it is refused.",
+    )
+    spillover_tier: Optional[str] = Field(
+        default=None,
+        description="Tier to try when a request has waited spillover_after_ms.",
+    )
+    spillover_after_ms: Optional[int] = Field(
+        default=None,
+        description="Wait after which a request moves to spillover_tier if it has a free slot.",
+    )
 
 
 class PerformanceConstraints(BaseModel):
@@ -46,6 +62,19 @@ class PerformanceConstraints(BaseModel):
         default=5,
         description="Cap on sub-tasks from LLM decomposition.",
     )
+    classification_cache_size: int = Field(
+        default=1024,
+        description="Query classifications kept in memory (0 disables the cache).",
+    )
+    classification_cache_ttl_seconds: float = Field(
+        default=600.0,
+        description="How long a cached query classification stays valid.",
+    )
+    classification_similarity_threshold: float = Field(
+        default=0.92,
+        description="Cosine similarity a query needs to reuse a cached classification "
+                    "of a different phrasing (only when an embedder is configured).",
+    )
 
 
 class RoutingConfig(BaseModel):
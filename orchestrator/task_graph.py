@@ -0,0 +1,183 @@
+"""
+Dependency-graph execution of LIDM sub-tasks.
+
+DelegationManager used to run decomposed sub-tasks in rounds, one at a
+time, so independent sub-tasks on different tiers waited for each other.
+TaskGraphExecutor schedules them topologically instead:
+
+- every sub-task whose dependencies have finished is started at once, on a
+  worker thread, as long as its tier is below its concurrency cap
+  (TierConfig.max_concurrent_requests)
+- when a sub-task finishes, its result is handed to its dependents, which
+  start immediately rather than at the end of a round
+- ready sub-tasks that are waiting for the same tier start in priority
+  order (1 = highest)
+
+Wall time therefore approaches the critical path (the slowest dependency
+chain) instead of the sum of all sub-tasks.
+
+A failed sub-task still completes: its error text is passed on to its
+dependents, as the round-based executor did. A sub-task depending on an
+unknown task id fails without running ("Unknown dependency: <ids>"), and
+that error is passed on the same way. Sub-tasks in a dependency cycle never
+become ready and are marked failed with "Dependency deadlock".
+"""
+
+import heapq
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional
+
+if TYPE_CHECKING:
+    from .delegation_manager import SubTask
+
+logger = logging.getLogger(__name__)
+
+DEADLOCK_RESULT = "Dependency deadlock"
+UNKNOWN_DEPENDENCY_RESULT = "Unknown dependency"
+
+
+class TaskGraphExecutor:
+    """
+    Runs sub-tasks concurrently in dependency order with per-tier caps.
+
+    Args:
+        run_task: Executes one sub-task given the results of its
+            dependencies ({task_id: result}, in depends_on order) and
+            returns its result; exceptions mark the sub-task failed
+        tier_limits: Maximum sub-tasks running at once per tier
+        default_limit: Cap for tiers not in tier_limits
+
+    Example:
+        >>> executor = TaskGraphExecutor(run_task, tier_limits={"heavy": 1, "standard": 4})
+        >>> finished = executor.execute(decomposition.sub_tasks)
+        >>> [task.task_id for task in finished]  # completion order
+        ['st_2', 'st_1', 'st_3']
+    """
+
+    def __init__(
+        self,
+        run_task: Callable[["SubTask", Dict[str, str]], str],
+        tier_limits: Optional[Dict[str, int]] = None,
+        default_limit: int = 10,
+    ):
+        if default_limit < 1:
+            raise ValueError("default_limit must be >= 1")
+        self._run_task = run_task
+        self.default_limit = default_limit
+        self._lock = threading.Lock()
+        self._tier_limits: Dict[str, int] = {}
+        self.set_tier_limits(tier_limits or {})
+
+    def set_tier_limits(self, tier_limits: Dict[str, int]) -> None:
+        """Replace the per-tier caps (applies from the next execute())."""
+        with self._lock:
+            self._tier_limits = {tier: max(1, limit) for tier, limit in tier_limits.items()}
+
+    def limit_for(self, tier: str) -> int:
+        with self._lock:
+            return self._tier_limits.get(tier, self.default_limit)
+
+    def execute(self, sub_tasks: List["SubTask"]) -> List["SubTask"]:
+        """
+        Run sub_tasks to completion, setting status, result and duration_ms.
+
+        Returns:
+            The sub-tasks that ran, in completion order (sub-tasks with
+            unknown dependencies or in a cycle are marked failed but not
+            included)
+        """
+        tasks = {task.task_id: task for task in sub_tasks}
+        order = {task.task_id: index for index, task in enumerate(sub_tasks)}
+        limits = {task.target_tier: self.limit_for(task.target_tier) for task in sub_tasks}
+
+        # Sub-tasks depending on ids that aren't in the graph can never run
+        unknown = {
+            task.task_id: sorted(set(task.depends_on) - tasks.keys()) for task in sub_tasks
+        }
+        unknown = {task_id: missing for task_id, missing in unknown.items() if missing}
+
+        # In-degree of the runnable sub-tasks, counting only dependencies that exist
+        waiting_on = {
+            task.task_id: len(set(task.depends_on)) for task in sub_tasks if task.task_id not in unknown
+        }
+        dependents: Dict[str, List[str]] = {task_id: [] for task_id in tasks}
+        for task_id in waiting_on:
+            for dep_id in set(tasks[task_id].depends_on):
+                dependents[dep_id].append(task_id)
+
+        ready: Dict[str, list] = {}  # tier -> heap of (priority, order, task_id)
+        running: Dict[str, int] = {tier: 0 for tier in limits}
+        results: Dict[str, str] = {}
+        finished: List["SubTask"] = []
+        in_flight: Dict[Future, tuple] = {}
+
+        def make_ready(task_id: str) -> None:
+            task = tasks[task_id]
+            heapq.heappush(ready.setdefault(task.target_tier, []), (task.priority, order[task_id], task_id))
+
+        def resolve(task_id: str) -> None:
+            for dependent in dependents[task_id]:
+                waiting_on[dependent] -= 1
+                if waiting_on[dependent] == 0:
+                    make_ready(dependent)
+
+        for task_id, missing in unknown.items():
+            logger.error(f"Sub-task {task_id} depends on unknown sub-tasks {missing}")
+            task = tasks[task_id]
+            task.status = "failed"
+            task.result = f"{UNKNOWN_DEPENDENCY_RESULT}: {', '.join(missing)}"
+            results[task_id] = task.result
+
+        for task_id, count in waiting_on.items():
+            if count == 0:
+                make_ready(task_id)
+        # Their dependents get the error, as from any failed dependency
+        for task_id in unknown:
+            resolve(task_id)
+
+        with ThreadPoolExecutor(
+            max_workers=max(1, len(sub_tasks)), thread_name_prefix="lidm-subtask"
+        ) as pool:
+            while True:
+                for tier, heap in ready.items():
+                    while heap and running[tier] < limits[tier]:
+                        _, _, task_id = heapq.heappop(heap)
+                        task = tasks[task_id]
+                        deps = {dep_id: results.get(dep_id, "") for dep_id in task.depends_on}
+                        task.status = "running"
+                        running[tier] += 1
+                        future = pool.submit(self._run_task, task, deps)
+                        in_flight[future] = (task, time.time())
+
+                if not in_flight:
+                    break
+
+                done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+                for future in done:
+                    task, start = in_flight.pop(future)
+                    try:
+                        task.result = future.result()
+                        task.status = "completed"
+                    except Exception as e:
+                        logger.error(f"Sub-task {task.task_id} failed: {e}")
+                        task.result = f"Error: {e}"
+                        task.status = "failed"
+                    task.duration_ms = (time.time() - start) * 1000
+                    running[task.target_tier] -= 1
+                    results[task.task_id] = task.result
+                    finished.append(task)
+                    logger.info(f"Sub-task {task.task_id} [{task.target_tier}]: "
+                                f"{task.status} in {task.duration_ms:.0f}ms")
+
+                    resolve(task.task_id)
+
+        stuck = [task for task_id, task in tasks.items() if task_id not in results]
+        if stuck:
+            logger.error(f"Dependency deadlock: {[task.task_id for task in stuck]} could not execute")
+            for task in stuck:
+                task.status = "failed"
+                task.result = DEADLOCK_RESULT
+        return finished
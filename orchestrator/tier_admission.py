@@ -0,0 +1,400 @@
+"""
+LIDM: Per-tier admission control in front of LLMClientPool.
+
+TierConfig.max_concurrent_requests used to be advisory: a burst of
+heavy-tier work went straight to one backend while the other tiers sat
+idle. TierAdmission enforces it:
+
+- at most max_concurrent_requests calls per tier are in flight
+- further calls wait in a FIFO queue of at most max_queue_depth entries;
+  a call arriving at a full queue is refused at once (TierQueueFullError)
+- a queued call that has not been admitted within queue_timeout_ms is
+  refused (TierAdmissionTimeout)
+- with spillover_tier and spillover_after_ms set, a call that has waited
+  spillover_after_ms moves to the spillover tier if that tier has a free
+  slot (it keeps its place in line otherwise)
+
+Refusals raise, so callers fall back the way they do for other tier
+failures (DelegationManager marks the sub-task failed; the orchestrator
+falls back to its standard workflow).
+
+AdmittedClientPool wraps LLMClientPool with the same interface so
+DelegationManager and the orchestrator use it unchanged.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from shared.clients.llm_client import LLMClientPool
+from .routing_config import RoutingConfig, TierConfig
+
+# Optional import — metrics may not be available if observability is off
+try:
+    from shared.observability.metrics import LIDMMetrics, update_tier_queue_depth
+except ImportError:
+    LIDMMetrics = None  # type: ignore[misc,assignment]
+    update_tier_queue_depth = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+# Spillover is re-checked at least this often while a call waits
+_SPILL_POLL_S = 0.05
+
+
+class TierAdmissionError(RuntimeError):
+    """A call was not admitted to its tier."""
+
+    reason = "rejected"
+
+    def __init__(self, tier: str, message: str):
+        super().__init__(message)
+        self.tier = tier
+
+
+class TierQueueFullError(TierAdmissionError):
+    """The tier's wait queue is full."""
+
+    reason = "queue_full"
+
+
+class TierAdmissionTimeout(TierAdmissionError):
+    """The call waited longer than the tier's queue timeout."""
+
+    reason = "timeout"
+
+
+class _TierGate:
+    """Concurrency limit with a bounded FIFO wait queue for one tier."""
+
+    def __init__(self, name: str, settings: TierConfig, on_depth: Optional[Callable[[str, int], None]]):
+        self.name = name
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiters: "deque[object]" = deque()
+        self._on_depth = on_depth
+        self.counters = {"admitted": 0, "waited": 0, "rejected": 0, "spilled_out": 0, "spilled_in": 0}
+        self.configure(settings)
+
+    def configure(self, settings: TierConfig) -> None:
+        with self._cond:
+            self.limit = max(1, settings.max_concurrent_requests)
+            self.max_queue = max(0, settings.max_queue_depth)
+            self.timeout_s = settings.queue_timeout_ms / 1000
+            self.spillover_tier = settings.spillover_tier if settings.spillover_tier != self.name else None
+            self.spillover_after_s = (
+                settings.spillover_after_ms / 1000 if settings.spillover_after_ms is not None else None
+            )
+            self._cond.notify_all()  # a raised limit may admit waiters
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def depth(self) -> int:
+        return len(self._waiters)
+
+    def try_acquire(self) -> bool:
+        """Take a slot only if one is free and nobody is queued."""
+        with self._cond:
+            if self._active < self.limit and not self._waiters:
+                self._active += 1
+                self.counters["admitted"] += 1
+                self.counters["spilled_in"] += 1
+                return True
+            return False
+
+    def acquire(
+        self,
+        deadline: float,
+        spill: Optional[Callable[[], bool]] = None,
+        spill_at: Optional[float] = None,
+    ) -> bool:
+        """
+        Wait for a slot.
+
+        Returns:
+            True when admitted to this tier, False when spill() took a slot
+            elsewhere instead
+
+        Raises:
+            TierQueueFullError: If the wait queue is full
+            TierAdmissionTimeout: If deadline passes first
+        """
+        with self._cond:
+            if self._active < self.limit and not self._waiters:
+                self._active += 1
+                self.counters["admitted"] += 1
+                return True
+            if len(self._waiters) >= self.max_queue:
+                self.counters["rejected"] += 1
+                raise TierQueueFullError(
+                    self.name, f"Tier '{self.name}' queue full ({self.max_queue} waiting)"
+                )
+
+            token = object()
+            self._waiters.append(token)
+            self.counters["waited"] += 1
+            self._report_depth()
+            try:
+                while True:
+                    if self._waiters[0] is token and self._active < self.limit:
+                        self._waiters.popleft()
+                        self._active += 1
+                        self.counters["admitted"] += 1
+                        return True
+
+                    now = time.monotonic()
+                    if spill is not None and spill_at is not None and now >= spill_at:
+                        # spill() locks the other tier's gate; holding ours meanwhile
+                        # would deadlock two tiers that spill into each other
+                        self._cond.release()
+                        try:
+                            spilled = spill()
+                        finally:
+                            self._cond.acquire()
+                        if spilled:
+                            self._waiters.remove(token)
+                            self.counters["spilled_out"] += 1
+                            return False
+                        # Our turn may have come while the lock was released
+                        if self._waiters[0] is token and self._active < self.limit:
+                            continue
+                        now = time.monotonic()
+                    if now >= deadline:
+                        self.counters["rejected"] += 1
+                        raise TierAdmissionTimeout(
+                            self.name, f"Tier '{self.name}' had no free slot within {self.timeout_s:.1f}s"
+                        )
+
+                    wake_at = deadline
+                    if spill is not None and spill_at is not None:
+                        wake_at = min(wake_at, max(spill_at, now + _SPILL_POLL_S))
+                    self._cond.wait(wake_at - now)
+            finally:
+                if token in self._waiters:
+                    self._waiters.remove(token)
+                self._cond.notify_all()  # the next waiter may now be first in line
+                self._report_depth()
+
+    def release(self) -> None:
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "active": self._active,
+                "queued": len(self._waiters),
+                "limit": self.limit,
+                "max_queue": self.max_queue,
+                **self.counters,
+            }
+
+    def _report_depth(self) -> None:
+        if self._on_depth is not None:
+            self._on_depth(self.name, len(self._waiters))
+
+
+class TierAdmission:
+    """
+    Admission control for all tiers of a RoutingConfig.
+
+    Args:
+        config: Routing config whose TierConfig entries set the limits
+            (tiers not listed use TierConfig defaults)
+        metrics: Optional LIDMMetrics for queue depth, wait time,
+            rejections and spillovers
+
+    Example:
+        >>> admission = TierAdmission(config_manager.get_config())
+        >>> with admission.admit("heavy") as tier:
+        ...     client_pool.clients[tier].generate(prompt)
+    """
+
+    def __init__(self, config: Optional[RoutingConfig] = None, metrics: Optional["LIDMMetrics"] = None):
+        self._metrics = metrics
+        self._lock = threading.Lock()
+        self._gates: Dict[str, _TierGate] = {}
+        self._settings: Dict[str, TierConfig] = {}
+        if config is not None:
+            self.configure(config)
+
+    def configure(self, config: RoutingConfig) -> None:
+        """Apply new tier settings; calls in flight keep their slots."""
+        with self._lock:
+            self._settings = dict(config.tiers)
+            for name, gate in self._gates.items():
+                gate.configure(self._settings.get(name, TierConfig()))
+
+    def _gate(self, tier: str) -> _TierGate:
+        with self._lock:
+            gate = self._gates.get(tier)
+            if gate is None:
+                on_depth = update_tier_queue_depth if self._metrics is not None else None
+                gate = _TierGate(tier, self._settings.get(tier, TierConfig()), on_depth)
+                self._gates[tier] = gate
+            return gate
+
+    @contextmanager
+    def admit(
+        self,
+        tier: str,
+        timeout: Optional[float] = None,
+        can_serve: Callable[[str], bool] = lambda tier: True,
+    ) -> Iterator[str]:
+        """
+        Hold a slot on tier (or its spillover tier) for the duration of the block.
+
+        Args:
+            tier: Tier to run on
+            timeout: Seconds to wait at most (capped by the tier's queue_timeout_ms)
+            can_serve: Whether a tier can take spilled-over calls (e.g. has a client)
+
+        Yields:
+            The tier admitted to
+
+        Raises:
+            TierAdmissionError: If the call is refused
+        """
+        gate = self._gate(tier)
+        start = time.monotonic()
+        wait_s = gate.timeout_s if timeout is None else min(timeout, gate.timeout_s)
+
+        spill = spill_at = None
+        target = gate.spillover_tier
+        if target and gate.spillover_after_s is not None and can_serve(target):
+            spill = self._gate(target).try_acquire
+            spill_at = start + gate.spillover_after_s
+
+        try:
+            admitted_here = gate.acquire(start + wait_s, spill, spill_at)
+        except TierAdmissionError as e:
+            logger.warning(f"Tier admission refused: {e}")
+            self._record_wait(tier, start, e.reason)
+            if self._metrics is not None:
+                self._metrics.tier_admission_rejections_total.add(1, {"tier": tier, "reason": e.reason})
+            raise
+
+        actual = tier if admitted_here else target
+        if not admitted_here:
+            logger.info(f"Tier '{tier}' busy for {time.monotonic() - start:.2f}s, spilled over to '{actual}'")
+            if self._metrics is not None:
+                self._metrics.tier_spillovers_total.add(1, {"from_tier": tier, "to_tier": actual})
+        self._record_wait(tier, start, "admitted" if admitted_here else "spilled")
+
+        try:
+            yield actual
+        finally:
+            self._gate(actual).release()
+
+    def _record_wait(self, tier: str, start: float, outcome: str) -> None:
+        if self._metrics is not None:
+            self._metrics.tier_admission_wait_ms.record(
+                (time.monotonic() - start) * 1000, {"tier": tier, "outcome": outcome}
+            )
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            gates = dict(self._gates)
+        return {name: gate.stats() for name, gate in gates.items()}
+
+    # ── Observer ────────────────────────────────────────────────────────
+
+    def on_config_changed(self, config: RoutingConfig) -> None:
+        """Called by ConfigManager when routing config is updated."""
+        self.configure(config)
+        logger.info(f"TierAdmission reconfigured: tiers={sorted(config.tiers)}")
+
+
+class _AdmittedClient:
+    """
+    LLMClient proxy whose generation calls go through tier admission.
+
+    Streaming calls are admitted when iteration starts and hold their slot
+    until the stream is exhausted or closed.
+    """
+
+    _ADMITTED = frozenset({"generate", "complete", "generate_batch"})
+    _ADMITTED_STREAMS = frozenset({"generate_stream", "generate_batch_stream"})
+
+    def __init__(self, pool: "AdmittedClientPool", tier: str):
+        self._pool = pool
+        self._tier = tier
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._pool.clients[self._tier], name)
+        if name in self._ADMITTED_STREAMS:
+            def admitted_stream(*args, **kwargs):
+                with self._pool.admission.admit(self._tier, can_serve=self._pool.serves) as tier:
+                    yield from getattr(self._pool.clients[tier], name)(*args, **kwargs)
+
+            return admitted_stream
+        if name not in self._ADMITTED:
+            return attr
+
+        def admitted(*args, **kwargs):
+            with self._pool.admission.admit(self._tier, can_serve=self._pool.serves) as tier:
+                return getattr(self._pool.clients[tier], name)(*args, **kwargs)
+
+        return admitted
+
+
+class AdmittedClientPool:
+    """
+    LLMClientPool with per-tier admission control.
+
+    Same interface as LLMClientPool; generate() (and generate/complete/
+    generate_batch and the streaming generate_stream/generate_batch_stream
+    on clients from get_client()) wait for a tier slot.
+
+    Args:
+        pool: Underlying LLMClientPool
+        admission: TierAdmission enforcing the tier limits
+    """
+
+    def __init__(self, pool: LLMClientPool, admission: TierAdmission):
+        self.pool = pool
+        self.admission = admission
+
+    @property
+    def clients(self) -> Dict[str, Any]:
+        return self.pool.clients
+
+    @property
+    def available_tiers(self) -> list:
+        return self.pool.available_tiers
+
+    def serves(self, tier: str) -> bool:
+        return tier in self.pool.clients
+
+    def resolve_tier(self, tier: str) -> Optional[str]:
+        return self.pool.resolve_tier(tier)
+
+    def get_client(self, tier: str) -> Optional[_AdmittedClient]:
+        """Admission-controlled client for tier (with the pool's tier fallback)."""
+        resolved = self.pool.resolve_tier(tier)
+        return _AdmittedClient(self, resolved) if resolved is not None else None
+
+    def generate(self, prompt: str, tier: str = "standard", **kwargs) -> str:
+        """Generate on tier once admitted (may run on its spillover tier)."""
+        resolved = self.pool.resolve_tier(tier)
+        if resolved is None:
+            return self.pool.generate(prompt, tier=tier, **kwargs)
+        with self.admission.admit(resolved, can_serve=self.serves) as actual:
+            return self.pool.clients[actual].generate(prompt, **kwargs)
+
+    def get_active_models(self) -> Dict[str, dict]:
+        return self.pool.get_active_models()
+
+    def reconfigure(self, endpoints: Dict[str, str]) -> None:
+        self.pool.reconfigure(endpoints)
+
+    def on_config_changed(self, config: RoutingConfig) -> None:
+        """Called by ConfigManager when routing config is updated."""
+        self.admission.on_config_changed(config)
@@ -40,6 +40,11 @@ except ModuleNotFoundError:
     ], check=True)
     from shared.generated import sandbox_pb2, sandbox_pb2_grpc
 
+try:
+    from .worker_pool import WorkerError, WorkerPool, WorkerProtocolError, WorkerTimeout
+except ImportError:
+    from worker_pool import WorkerError, WorkerPool, WorkerProtocolError, WorkerTimeout
+
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     level=logging.INFO
@@ -52,6 +57,10 @@ DEFAULT_MEMORY_MB = int(os.getenv("SANDBOX_MEMORY_MB", "256"))
 MAX_TIMEOUT = 60
 MAX_MEMORY_MB = 512
 
+# Warm worker pool (0 disables it and cold-starts an interpreter per request)
+POOL_SIZE = int(os.getenv("SANDBOX_POOL_SIZE", "4"))
+WORKER_MAX_EXECUTIONS = int(os.getenv("SANDBOX_WORKER_MAX_EXECUTIONS", "100"))
+
 # Allowed safe imports (whitelist)
 SAFE_IMPORTS = {
     "math", "random", "datetime", "json", "re", "collections",
@@ -79,18 +88,35 @@ def restricted_import(name: str, allowed_imports: set):
     return __import__(name)
 
 
+def _apply_process_output(result: Dict[str, Any], stdout: str, stderr: str, exit_code: int):
+    """Fill a result dict from a finished interpreter's output and exit code."""
+    result["stdout"] = stdout
+    result["stderr"] = stderr
+    result["exit_code"] = exit_code
+    
+    # Check for memory error
+    if exit_code == 137 or "SANDBOX_MEMORY_ERROR" in stderr:
+        result["memory_exceeded"] = True
+        result["error_message"] = "Memory limit exceeded"
+    elif exit_code != 0:
+        # Extract error from stderr
+        result["error_message"] = stderr.strip() if stderr else f"Exit code: {exit_code}"
+
+
 def execute_in_sandbox(
     code: str,
     language: str,
     timeout_seconds: int,
     memory_limit_mb: int,
     allowed_imports: List[str],
-    environment: Dict[str, str]
+    environment: Dict[str, str],
+    pool: Optional[WorkerPool] = None
 ) -> Dict[str, Any]:
     """
     Execute code in a sandboxed subprocess with resource limits.
     
-    Uses subprocess.run with timeout for more reliable execution in Docker.
+    Runs on a warm worker from the pool when one is given, otherwise uses
+    subprocess.run with timeout for more reliable execution in Docker.
     
     Returns dict with stdout, stderr, exit_code, execution_time, etc.
     """
@@ -117,6 +143,30 @@ def execute_in_sandbox(
     # Merge allowed imports with safe defaults
     allowed = SAFE_IMPORTS.union(set(allowed_imports) if allowed_imports else set())
     
+    if pool is not None:
+        try:
+            run = pool.run(code, allowed, timeout_seconds, memory_limit_mb, environment)
+        except WorkerTimeout:
+            result["timed_out"] = True
+            result["exit_code"] = 124
+            result["error_message"] = f"Execution timed out after {timeout_seconds} seconds"
+            result["execution_time_ms"] = (time.time() - start_time) * 1000
+            return result
+        except WorkerProtocolError as e:
+            # The snippet reached the worker and may have run: never run it twice
+            logger.error(f"Sandbox worker failed after dispatch: {e}")
+            result["exit_code"] = 1
+            result["error_message"] = f"Sandbox worker failed: {e}"
+            result["execution_time_ms"] = (time.time() - start_time) * 1000
+            return result
+        except WorkerError as e:
+            # The snippet never reached a worker: fall through to the cold-start path below
+            logger.warning(f"Worker pool unavailable, cold-starting interpreter: {e}")
+        else:
+            _apply_process_output(result, run.stdout, run.stderr, run.exit_code)
+            result["execution_time_ms"] = (time.time() - start_time) * 1000
+            return result
+
     # Create a wrapper script that executes the code with restrictions
     wrapper_code = f'''
 import sys
@@ -214,17 +264,7 @@ except Exception as e:
             cwd="/tmp"  # Use temp directory for safety
         )
         
-        result["stdout"] = proc.stdout
-        result["stderr"] = proc.stderr
-        result["exit_code"] = proc.returncode
-        
-        # Check for memory error
-        if proc.returncode == 137 or "SANDBOX_MEMORY_ERROR" in proc.stderr:
-            result["memory_exceeded"] = True
-            result["error_message"] = "Memory limit exceeded"
-        elif proc.returncode != 0:
-            # Extract error from stderr
-            result["error_message"] = proc.stderr.strip() if proc.stderr else f"Exit code: {proc.returncode}"
+        _apply_process_output(result, proc.stdout, proc.stderr, proc.returncode)
         
         # Cleanup temp file
         try:
@@ -261,6 +301,9 @@ class HealthServicer(health.HealthServicer):
 class SandboxServiceServicer(sandbox_pb2_grpc.SandboxServiceServicer):
     """Sandbox Service gRPC implementation."""
     
+    def __init__(self, pool: Optional[WorkerPool] = None):
+        self.pool = pool
+    
     def ExecuteCode(self, request, context):
         """Execute code in sandboxed environment."""
         logger.info(f"Executing {request.language} code (timeout={request.timeout_seconds}s)")
@@ -282,7 +325,8 @@ class SandboxServiceServicer(sandbox_pb2_grpc.SandboxServiceServicer):
                 timeout_seconds=timeout,
                 memory_limit_mb=memory_mb,
                 allowed_imports=list(request.allowed_imports),
-                environment=dict(request.environment)
+                environment=dict(request.environment),
+                pool=self.pool
             )
             
             return sandbox_pb2.ExecuteCodeResponse(
@@ -319,8 +363,17 @@ def serve():
         ]
     )
     
+    pool = None
+    if POOL_SIZE > 0:
+        pool = WorkerPool(
+            size=POOL_SIZE,
+            memory_limit_mb=DEFAULT_MEMORY_MB,
+            preload=SAFE_IMPORTS,
+            max_executions=WORKER_MAX_EXECUTIONS,
+        ).start()
+    
     sandbox_pb2_grpc.add_SandboxServiceServicer_to_server(
-        SandboxServiceServicer(), server
+        SandboxServiceServicer(pool=pool), server
     )
     health_pb2_grpc.add_HealthServicer_to_server(
         HealthServicer(), server
@@ -0,0 +1,384 @@
+"""
+Sandbox Worker - warm interpreter process for the sandbox worker pool.
+
+Started by WorkerPool with a fixed memory limit. The worker applies
+RLIMIT_AS once, pre-imports the whitelisted modules and then executes
+snippets sent over stdin, one JSON request per line, answering with one JSON
+result line on stdout.
+
+Each snippet runs with the same restricted builtins and import whitelist as
+the cold-start wrapper, in fresh globals. After every run the worker resets
+interpreter state: top-level attributes of every module loaded at startup
+are restored, and so is the state one level below them (class attributes,
+function defaults, instance attributes, the contents of module-level
+containers and decimal contexts). Modules the snippet imported are unloaded
+(so the next import starts fresh), and the thread's decimal context, the
+recursion limit, the working directory and random state are reset.
+
+State mutated deeper than that can still leak between runs, which is why
+the pool recycles workers after a bounded number of executions and on any
+limit breach. The reset happens after the reply is sent and ends with a
+{"ready": ...} line; a run whose changes cannot be undone (restoring
+raised) is reported as not ready and the pool retires the worker.
+
+Only the standard library is used so the worker starts fast.
+"""
+
+import argparse
+import builtins
+import importlib
+import io
+import json
+import os
+import resource
+import sys
+import types
+from itertools import chain
+from operator import attrgetter, is_, methodcaller
+
+# Exit code reported for MemoryError (matches the cold-start wrapper)
+MEMORY_EXIT_CODE = 137
+
+# Builtins exposed to sandboxed code
+RESTRICTED_BUILTIN_NAMES = (
+    "print", "range", "len", "int", "float", "str", "list", "dict", "tuple",
+    "set", "bool", "abs", "min", "max", "sum", "sorted", "enumerate", "zip",
+    "map", "filter", "isinstance", "type", "round", "pow", "divmod", "hex",
+    "bin", "oct", "chr", "ord", "all", "any", "reversed", "format", "repr",
+)
+
+
+def set_memory_limit(memory_limit_mb: int) -> None:
+    """Apply a hard address-space limit to this process."""
+    memory_bytes = memory_limit_mb * 1024 * 1024
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+    except (ValueError, resource.error):
+        pass  # May fail on some systems
+
+
+def build_builtins(allowed: set) -> dict:
+    """Create a fresh restricted builtins dict for one execution."""
+
+    def restricted_import(name, *args, **kwargs):
+        if name not in allowed:
+            raise ImportError(f"Import of '{name}' is not allowed in sandbox")
+        return builtins.__import__(name, *args, **kwargs)
+
+    restricted = {name: getattr(builtins, name) for name in RESTRICTED_BUILTIN_NAMES}
+    restricted.update({
+        "True": True,
+        "False": False,
+        "None": None,
+        "__import__": restricted_import,
+    })
+    return restricted
+
+
+def execute(code: str, allowed: set, environment: dict) -> dict:
+    """
+    Run one snippet, capturing its output.
+
+    Returns:
+        Dict with stdout, stderr and exit_code
+    """
+    stdout, stderr = io.StringIO(), io.StringIO()
+    saved_env = {key: os.environ.get(key) for key in environment}
+    os.environ.update(environment)
+    saved_streams = sys.stdout, sys.stderr
+    sys.stdout, sys.stderr = stdout, stderr
+    exit_code = 0
+    try:
+        exec(code, {"__builtins__": build_builtins(allowed)})
+    except MemoryError:
+        print("SANDBOX_MEMORY_ERROR", file=stderr)
+        exit_code = MEMORY_EXIT_CODE
+    except SystemExit as e:
+        exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except BaseException as e:
+        print(f"Error: {e}", file=stderr)
+        exit_code = 1
+    finally:
+        sys.stdout, sys.stderr = saved_streams
+        for key, value in saved_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+    return {
+        "stdout": stdout.getvalue(),
+        "stderr": stderr.getvalue(),
+        "exit_code": exit_code,
+    }
+
+
+def snapshot_modules(names) -> dict:
+    """Record the top-level namespace of pre-imported modules."""
+    return {name: dict(vars(sys.modules[name])) for name in names if sys.modules.get(name) is not None}
+
+
+def restore_modules(snapshot: dict) -> None:
+    """Undo top-level attribute changes made by sandboxed code."""
+    for name, saved in snapshot.items():
+        module = sys.modules.get(name)
+        if module is None:
+            continue
+        namespace = vars(module)
+        if len(namespace) != len(saved) or any(
+            namespace.get(key) is not value for key, value in saved.items()
+        ):
+            namespace.clear()
+            namespace.update(saved)
+
+
+# Py_TPFLAGS_IMMUTABLETYPE: built-in types whose attributes cannot be set
+TPFLAGS_IMMUTABLETYPE = 1 << 8
+
+CONTEXT_FIELDS = ("prec", "rounding", "Emin", "Emax", "capitals", "clamp")
+
+# Function state that sandboxed code can replace
+FUNCTION_STATE = attrgetter("__code__", "__defaults__", "__kwdefaults__", "__dict__")
+
+
+def _capture(value):
+    """
+    Copy the state held directly by a module-level object.
+
+    Returns:
+        (kind, state) tuple, or None for objects without restorable state
+    """
+    if isinstance(value, types.ModuleType):
+        return None
+    if isinstance(value, type):
+        if value.__flags__ & TPFLAGS_IMMUTABLETYPE:
+            return None
+        return "attrs", dict(vars(value))
+    if isinstance(value, dict):
+        return "dict", dict(value)
+    if isinstance(value, list):
+        return "list", list(value)
+    if isinstance(value, set):
+        return "set", set(value)
+    decimal = sys.modules.get("decimal")
+    if decimal is not None and isinstance(value, decimal.Context):
+        fields = {name: getattr(value, name) for name in CONTEXT_FIELDS}
+        fields.update(flags=dict(value.flags), traps=dict(value.traps))
+        return "context", fields
+    if isinstance(value, types.FunctionType):
+        return "function", {
+            "__code__": value.__code__,
+            "__defaults__": value.__defaults__,
+            "__kwdefaults__": value.__kwdefaults__,
+            "__dict__": dict(vars(value)),
+        }
+    try:
+        return "instance", dict(vars(value))
+    except TypeError:
+        return None
+
+
+def _same(current, before) -> bool:
+    """Element-wise identity check of two sequences (dicts compare keys and values)."""
+    if len(current) != len(before):
+        return False
+    if isinstance(before, dict):
+        return all(map(is_, current, before)) and all(
+            map(is_, current.values(), before.values())
+        )
+    return all(map(is_, current, before))
+
+
+def _unchanged(value, saved) -> bool:
+    """Check an object against its capture; any doubt counts as changed."""
+    kind, before = saved
+    if kind == "attrs" or kind == "instance":
+        return _same(vars(value), before)
+    if kind == "dict" or kind == "list":
+        return _same(value, before)
+    if kind == "function":
+        return (
+            value.__code__ is before["__code__"]
+            and value.__defaults__ is before["__defaults__"]
+            and value.__kwdefaults__ is before["__kwdefaults__"]
+            and _same(vars(value), before["__dict__"])
+        )
+    return _capture(value) == saved
+
+
+def _restore(value, saved) -> None:
+    """Write a capture back into the object it was taken from."""
+    kind, before = saved
+    if kind == "attrs":
+        for key in set(vars(value)) - set(before):
+            delattr(value, key)
+        for key, item in before.items():
+            if vars(value).get(key) is not item:
+                setattr(value, key, item)
+    elif kind == "list":
+        value[:] = before
+    elif kind in ("dict", "set", "instance"):
+        target = vars(value) if kind == "instance" else value
+        target.clear()
+        target.update(before)
+    elif kind == "context":
+        for name, item in before.items():
+            setattr(value, name, dict(item) if isinstance(item, dict) else item)
+    elif kind == "function":
+        value.__code__ = before["__code__"]
+        value.__defaults__ = before["__defaults__"]
+        value.__kwdefaults__ = before["__kwdefaults__"]
+        vars(value).clear()
+        vars(value).update(before["__dict__"])
+
+
+def _live_parts(objects) -> tuple:
+    """Group captured objects by how their current contents are read."""
+    mappings, instances, sequences, functions, contexts = [], [], [], [], []
+    for value, (kind, _) in objects:
+        if kind == "attrs" or kind == "dict":
+            mappings.append(vars(value) if kind == "attrs" else value)
+        elif kind == "instance":
+            mappings.append(vars(value))
+            instances.append(value)
+        elif kind == "list" or kind == "set":
+            sequences.append(value)
+        elif kind == "function":
+            functions.append(value)
+        else:
+            contexts.append(value)
+    return mappings, instances, sequences, functions, contexts
+
+
+def _fingerprint(live: tuple) -> tuple:
+    """
+    Flat list of every object referenced by the captured state.
+
+    Built with C-level iteration so an unchanged interpreter is confirmed
+    without a Python-level check per object.
+    """
+    mappings, instances, sequences, functions, contexts = live
+    references = list(chain(
+        chain.from_iterable(mappings),
+        chain.from_iterable(map(methodcaller("values"), mappings)),
+        map(vars, instances),
+        chain.from_iterable(sequences),
+        chain.from_iterable(map(FUNCTION_STATE, functions)),
+    ))
+    return references, [_capture(context) for context in contexts]
+
+
+def snapshot_state(names) -> dict:
+    """Record the state held one level below the globals of pre-imported modules."""
+    objects = {}
+    for name in names:
+        module = sys.modules.get(name)
+        if module is None:
+            continue
+        for value in vars(module).values():
+            if id(value) not in objects:
+                saved = _capture(value)
+                if saved is not None:
+                    objects[id(value)] = (value, saved)
+    live = _live_parts(objects.values())
+    return {"objects": list(objects.values()), "live": live, "fingerprint": _fingerprint(live)}
+
+
+def restore_state(state: dict) -> bool:
+    """Undo in-place changes recorded by snapshot_state; False if any could not be undone."""
+    references, contexts = _fingerprint(state["live"])
+    saved_references, saved_contexts = state["fingerprint"]
+    if _same(references, saved_references) and contexts == saved_contexts:
+        return True
+
+    restored = True
+    for value, saved in state["objects"]:
+        try:
+            if _unchanged(value, saved):
+                continue
+        except TypeError:
+            pass
+        try:
+            _restore(value, saved)
+        except (AttributeError, TypeError, ValueError, KeyError):
+            restored = False
+    # Restoring may reorder containers or swap instance dicts
+    state["live"] = _live_parts(state["objects"])
+    state["fingerprint"] = _fingerprint(state["live"])
+    return restored
+
+
+def reset_interpreter(snapshot: dict, state: dict, baseline: dict) -> bool:
+    """
+    Undo per-run interpreter state so the next snippet starts clean.
+
+    Returns:
+        False if some change could not be undone and the worker must be recycled
+    """
+    for name in set(sys.modules) - set(snapshot):
+        sys.modules.pop(name, None)
+    restore_modules(snapshot)
+    clean = restore_state(state)
+
+    if os.getcwd() != baseline["cwd"]:
+        os.chdir(baseline["cwd"])
+    if sys.getrecursionlimit() != baseline["recursion_limit"]:
+        sys.setrecursionlimit(baseline["recursion_limit"])
+    sys.settrace(None)
+    sys.setprofile(None)
+    if baseline["decimal_context"] is not None:
+        sys.modules["decimal"].setcontext(baseline["decimal_context"].copy())
+    if "random" in sys.modules:
+        sys.modules["random"].seed()
+    return clean
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Sandbox warm worker")
+    parser.add_argument("--memory-mb", type=int, required=True)
+    parser.add_argument("--preload", default="")
+    args = parser.parse_args()
+
+    set_memory_limit(args.memory_mb)
+
+    for name in filter(None, args.preload.split(",")):
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+
+    # Protocol channel; sandboxed prints go to per-request buffers instead
+    channel_in = sys.stdin
+    channel_out = sys.stdout
+    sys.stdout = sys.stderr = open(os.devnull, "w")
+
+    # Taken after the stream swap so resets keep the protocol channel private
+    snapshot = snapshot_modules(list(sys.modules))
+    state = snapshot_state(snapshot)
+    decimal = sys.modules.get("decimal")
+    baseline = {
+        "cwd": os.getcwd(),
+        "recursion_limit": sys.getrecursionlimit(),
+        "decimal_context": decimal.getcontext().copy() if decimal else None,
+    }
+
+    channel_out.write(json.dumps({"ready": True}) + "\n")
+    channel_out.flush()
+
+    for line in channel_in:
+        request = json.loads(line)
+        result = execute(
+            request["code"],
+            set(request.get("allowed", ())),
+            request.get("environment") or {},
+        )
+        channel_out.write(json.dumps(result) + "\n")
+        channel_out.flush()
+        # Reset off the request path; the pool waits for this before reusing us
+        ready = reset_interpreter(snapshot, state, baseline)
+        channel_out.write(json.dumps({"ready": ready}) + "\n")
+        channel_out.flush()
+
+
+if __name__ == "__main__":
+    main()
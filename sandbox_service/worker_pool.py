@@ -0,0 +1,363 @@
+"""
+Warm interpreter worker pool for the sandbox service.
+
+Cold-starting a Python interpreter (and importing the whitelisted modules)
+dominates the runtime of small snippets. WorkerPool keeps pre-started
+sandbox_worker.py processes with the safe imports already loaded and
+dispatches snippets to them over a line-delimited JSON pipe.
+
+Isolation guarantees match the cold-start path:
+- RLIMIT_AS is applied once per worker, as a hard limit; workers are
+  grouped by memory limit and only serve requests with that limit
+- Timeouts are enforced by the parent, which kills the worker on expiry
+- Snippets run with the same restricted builtins and import whitelist
+
+After replying, the worker resets interpreter state (module globals and the
+objects directly under them, modules imported by the snippet, the decimal
+context, cwd, random state; see sandbox_worker.py) and then reports ready;
+the pool waits for that before handing the worker out again. Workers are
+recycled (killed and replaced) after max_executions runs, and immediately
+after any timeout, memory breach, crash, malformed reply or a reset that
+could not undo the run's changes.
+"""
+
+import json
+import logging
+import os
+import select
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sandbox_worker.py")
+
+# Exit code the worker reports for MemoryError
+MEMORY_EXIT_CODE = 137
+
+
+class WorkerError(Exception):
+    """Raised when a snippet could not be handed to a worker (it never ran)."""
+
+
+class WorkerProtocolError(Exception):
+    """Raised when a worker's reply is unusable after the snippet was sent."""
+
+
+class WorkerTimeout(Exception):
+    """Raised when a snippet exceeds its timeout (the worker is killed)."""
+
+
+@dataclass
+class WorkerRun:
+    """
+    Raw outcome of one execution in a worker.
+
+    Attributes:
+        stdout: Captured standard output
+        stderr: Captured standard error
+        exit_code: Exit code (137 for memory errors, negative if the worker died)
+    """
+
+    stdout: str
+    stderr: str
+    exit_code: int
+
+
+class _Worker:
+    """A single warm interpreter process."""
+
+    def __init__(self, memory_limit_mb: int, preload: Iterable[str], startup_timeout: float):
+        self.memory_limit_mb = memory_limit_mb
+        self.executions = 0
+        self.resetting = False  # Reset after the last run not yet confirmed
+        self._buffer = b""
+        self.proc = subprocess.Popen(
+            [
+                sys.executable, WORKER_SCRIPT,
+                "--memory-mb", str(memory_limit_mb),
+                "--preload", ",".join(sorted(preload)),
+            ],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            cwd="/tmp",  # Use temp directory for safety
+        )
+        try:
+            ready = self._read_line(startup_timeout)
+        except WorkerTimeout:
+            self.kill()
+            raise WorkerError("Sandbox worker did not start in time")
+        if ready is None or not self._parse(ready).get("ready"):
+            self.kill()
+            raise WorkerError("Sandbox worker failed to start")
+
+    @property
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def run(self, code: str, allowed: Iterable[str], environment: Dict[str, str],
+            timeout_seconds: float) -> WorkerRun:
+        """Execute a snippet; raises WorkerTimeout (worker killed) on expiry."""
+        self.executions += 1
+        self.resetting = True
+        request = {"code": code, "allowed": sorted(allowed), "environment": environment}
+        try:
+            self.proc.stdin.write((json.dumps(request) + "\n").encode("utf-8"))
+            self.proc.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            self.kill()
+            raise WorkerError(f"Sandbox worker unavailable: {e}")
+
+        try:
+            line = self._read_line(timeout_seconds)
+        except WorkerTimeout:
+            self.kill()
+            raise
+
+        if line is None:
+            # Worker died mid-run (e.g. killed by the kernel)
+            returncode = self.proc.wait()
+            return WorkerRun(stdout="", stderr="", exit_code=returncode)
+
+        # The snippet has run: failures from here on must not be retried
+        try:
+            payload = self._parse(line)
+            return WorkerRun(
+                stdout=payload["stdout"],
+                stderr=payload["stderr"],
+                exit_code=payload["exit_code"],
+            )
+        except WorkerError as e:
+            raise WorkerProtocolError(str(e)) from e
+        except (KeyError, TypeError) as e:
+            self.kill()
+            raise WorkerProtocolError(f"Malformed sandbox worker reply: {e!r}")
+
+    def wait_ready(self, timeout: float) -> bool:
+        """
+        Wait for the worker to finish resetting after its last run.
+
+        Returns:
+            False if the worker could not reset its state (or died) and
+            must be recycled
+        """
+        if not self.resetting:
+            return self.alive
+        try:
+            line = self._read_line(timeout)
+        except WorkerTimeout:
+            return False
+        if line is None or not self._parse(line).get("ready"):
+            return False
+        self.resetting = False
+        return True
+
+    def _parse(self, line: str) -> dict:
+        """Decode one protocol line; a corrupted line kills the worker."""
+        try:
+            payload = json.loads(line)
+        except ValueError as e:
+            self.kill()
+            raise WorkerError(f"Malformed sandbox worker reply: {e}")
+        if not isinstance(payload, dict):
+            self.kill()
+            raise WorkerError("Malformed sandbox worker reply: not an object")
+        return payload
+
+    def _read_line(self, timeout: float) -> Optional[str]:
+        """Read one protocol line; None on EOF."""
+        deadline = time.monotonic() + timeout
+        fd = self.proc.stdout.fileno()
+        while b"\n" not in self._buffer:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise WorkerTimeout()
+            readable, _, _ = select.select([fd], [], [], remaining)
+            if not readable:
+                raise WorkerTimeout()
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                return None
+            self._buffer += chunk
+        line, self._buffer = self._buffer.split(b"\n", 1)
+        return line.decode("utf-8")
+
+    def kill(self) -> None:
+        if self.alive:
+            self.proc.kill()
+        try:
+            self.proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            pass
+        for stream in (self.proc.stdin, self.proc.stdout):
+            try:
+                stream.close()
+            except OSError:
+                pass
+
+
+class WorkerPool:
+    """
+    Pool of pre-started, pre-imported sandbox interpreter processes.
+
+    Example:
+        >>> pool = WorkerPool(size=4, memory_limit_mb=256, preload=SAFE_IMPORTS)
+        >>> pool.start()
+        >>> run = pool.run("print(1 + 1)", SAFE_IMPORTS, 30, 256, {})
+        >>> run.stdout
+        '2\\n'
+
+    Args:
+        size: Idle workers kept per memory limit
+        memory_limit_mb: Memory limit of the workers started eagerly
+        preload: Modules imported by every worker at startup
+        max_executions: Runs before a worker is recycled
+        startup_timeout: Seconds to wait for a new worker to become ready
+    """
+
+    def __init__(
+        self,
+        size: int = 4,
+        memory_limit_mb: int = 256,
+        preload: Iterable[str] = (),
+        max_executions: int = 100,
+        startup_timeout: float = 10.0,
+    ):
+        if size < 1:
+            raise ValueError("size must be >= 1")
+        if max_executions < 1:
+            raise ValueError("max_executions must be >= 1")
+
+        self.size = size
+        self.memory_limit_mb = memory_limit_mb
+        self.preload = frozenset(preload)
+        self.max_executions = max_executions
+        self.startup_timeout = startup_timeout
+
+        self._idle: Dict[int, List[_Worker]] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+        self._spawner = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sandbox-spawn")
+        self._counters = {"runs": 0, "spawned": 0, "recycled": 0, "cold_spawns": 0}
+
+    def start(self) -> "WorkerPool":
+        """Pre-start the idle workers for the default memory limit."""
+        for _ in range(self.size):
+            self._release(self._spawn(self.memory_limit_mb))
+        logger.info(
+            f"Sandbox worker pool ready: {self.size} workers, "
+            f"{self.memory_limit_mb}MB, recycle after {self.max_executions} runs"
+        )
+        return self
+
+    def run(
+        self,
+        code: str,
+        allowed_imports: Iterable[str],
+        timeout_seconds: float,
+        memory_limit_mb: int,
+        environment: Optional[Dict[str, str]] = None,
+    ) -> WorkerRun:
+        """
+        Execute a snippet on a warm worker.
+
+        Raises:
+            WorkerTimeout: If the snippet exceeded timeout_seconds
+            WorkerError: If no worker could run the snippet (safe to retry)
+            WorkerProtocolError: If the snippet was sent but its reply was
+                unusable (it may have run; do not retry)
+        """
+        if self._closed:
+            raise WorkerError("Sandbox worker pool is shut down")
+
+        worker = self._acquire(memory_limit_mb)
+        try:
+            result = worker.run(code, allowed_imports, environment or {}, timeout_seconds)
+        except BaseException:
+            self._retire(worker)
+            raise
+
+        with self._lock:
+            self._counters["runs"] += 1
+        if result.exit_code == MEMORY_EXIT_CODE or not worker.alive:
+            self._retire(worker)
+        else:
+            self._release(worker)
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        """Idle worker count and lifetime counters."""
+        with self._lock:
+            idle = sum(len(workers) for workers in self._idle.values())
+            return {"idle": idle, **self._counters}
+
+    def shutdown(self) -> None:
+        """Kill all idle workers; in-flight runs finish and are then discarded."""
+        with self._lock:
+            self._closed = True
+            workers = [w for ws in self._idle.values() for w in ws]
+            self._idle.clear()
+        self._spawner.shutdown(wait=True, cancel_futures=True)
+        for worker in workers:
+            worker.kill()
+
+    # -- internals -----------------------------------------------------
+
+    def _spawn(self, memory_limit_mb: int) -> _Worker:
+        worker = _Worker(memory_limit_mb, self.preload, self.startup_timeout)
+        with self._lock:
+            self._counters["spawned"] += 1
+        return worker
+
+    def _acquire(self, memory_limit_mb: int) -> _Worker:
+        while True:
+            with self._lock:
+                idle = self._idle.get(memory_limit_mb, [])
+                if not idle:
+                    self._counters["cold_spawns"] += 1
+                    break
+                # Least recently used first: it has most likely finished its reset
+                worker = idle.pop(0)
+            try:
+                if worker.wait_ready(self.startup_timeout):
+                    return worker
+            except WorkerError:
+                pass
+            self._retire(worker)
+        # No warm worker available: start one on the request path
+        return self._spawn(memory_limit_mb)
+
+    def _release(self, worker: _Worker) -> None:
+        if worker.executions >= self.max_executions:
+            self._retire(worker)
+            return
+        with self._lock:
+            idle = self._idle.setdefault(worker.memory_limit_mb, [])
+            if not self._closed and len(idle) < self.size:
+                idle.append(worker)
+                return
+        worker.kill()
+
+    def _retire(self, worker: _Worker) -> None:
+        """Kill a worker and start its replacement in the background."""
+        worker.kill()
+        with self._lock:
+            self._counters["recycled"] += 1
+            if self._closed:
+                return
+        try:
+            self._spawner.submit(self._replace, worker.memory_limit_mb)
+        except RuntimeError:
+            pass  # Spawner shut down concurrently
+
+    def _replace(self, memory_limit_mb: int) -> None:
+        try:
+            self._release(self._spawn(memory_limit_mb))
+        except WorkerError as e:
+            logger.warning(f"Could not replace sandbox worker: {e}")
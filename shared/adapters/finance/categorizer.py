@@ -3,9 +3,19 @@ Transaction Categorizer - CIBC Description Pattern Matching
 
 Maps raw bank transaction descriptions to structured company/category data
 using regex patterns derived from historical transaction analysis.
+
+Rules are evaluated first-match-wins in COMPANY_MAPPINGS order. RuleMatcher
+does this in a single scan of the description (see its docstring), and
+results are memoized per description string.
 """
 import re
-from typing import Tuple, Optional
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
 
 from ...schemas.canonical import TransactionCategory
 
@@ -140,6 +150,121 @@ _COMPILED_MAPPINGS = [
     for pattern, company, parent, category in COMPANY_MAPPINGS
 ]
 
+
+def _literal_prefixes(items) -> Tuple[List[str], bool]:
+    """
+    Literal strings one of which starts every match of a parsed pattern.
+
+    Returns (prefixes, complete); complete means the pattern matches exactly
+    those strings, so finding one needs no further confirmation.
+    """
+    prefixes = [""]
+    for position, (op, av) in enumerate(items):
+        if op is sre_parse.LITERAL:
+            prefixes = [prefix + chr(av) for prefix in prefixes]
+        elif op is sre_parse.BRANCH:
+            tails: List[str] = []
+            complete = position == len(items) - 1
+            for branch in av[1]:
+                branch_prefixes, branch_complete = _literal_prefixes(branch)
+                tails.extend(branch_prefixes)
+                complete = complete and branch_complete
+            return [prefix + tail for prefix in prefixes for tail in tails], complete
+        else:
+            return prefixes, False
+    return prefixes, True
+
+
+def _trie_pattern(node: dict) -> str:
+    """Regex for the literals of a character trie ("" marks a word end)."""
+    alternatives = [re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items()) if char]
+    if not alternatives:
+        return ""
+    body = alternatives[0] if len(alternatives) == 1 else "(?:" + "|".join(alternatives) + ")"
+    if "" in node:
+        body = f"(?:{body})?"
+    return body
+
+
+class RuleMatcher:
+    """
+    Single-pass, first-match-wins matcher over case-insensitive regex rules.
+
+    Every rule is reduced to the literal prefixes its matches must start
+    with. One lookahead scan over the uppercased text reports the longest
+    literal at each position (shorter literals at the same position are its
+    prefixes, so they are implied); only the rules owning those literals are
+    candidates, and they are confirmed lowest index first. The result is the
+    same rule the ordered loop would pick.
+
+    Rules without a usable literal are always candidates, and non-ASCII text
+    takes the ordered loop, since case folding beyond ASCII can't be
+    prefiltered with str.upper().
+
+    Args:
+        patterns: Rule regexes in priority order (matched with IGNORECASE)
+        cache_size: Memoized descriptions (0 disables the memo)
+    """
+
+    def __init__(self, patterns: Sequence[str], cache_size: int = 65536):
+        self._rules = [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+        self._always: Set[int] = set()
+        self._exact: Set[int] = set()
+        owners: Dict[str, Set[int]] = {}
+
+        for index, pattern in enumerate(patterns):
+            prefixes, complete = _literal_prefixes(sre_parse.parse(pattern, re.IGNORECASE))
+            literals = {prefix.upper() for prefix in prefixes}
+            if "" in literals or not all(literal.isascii() for literal in literals):
+                self._always.add(index)
+                continue
+            if complete:
+                self._exact.add(index)
+            for literal in literals:
+                owners.setdefault(literal, set()).add(index)
+
+        # Close over same-position prefixes: finding "UBEREATS" also means "UBER"
+        self._owners: Dict[str, Tuple[int, ...]] = {
+            literal: tuple(sorted(set().union(*(
+                rules for other, rules in owners.items() if literal.startswith(other)
+            ))))
+            for literal in owners
+        }
+        # Literals as a trie so each position tries one branch per first char;
+        # the greedy group captures the longest literal starting there
+        trie: dict = {}
+        for literal in owners:
+            node = trie
+            for char in literal:
+                node = node.setdefault(char, {})
+            node[""] = {}
+        self._scan = re.compile(f"(?=({_trie_pattern(trie)}))") if owners else None
+
+        if cache_size:
+            self.match = lru_cache(maxsize=cache_size)(self._match)
+        else:
+            self.match = self._match
+
+    def __len__(self) -> int:
+        return len(self._rules)
+
+    def _match(self, text: str) -> Optional[int]:
+        """Index of the first rule matching text, or None."""
+        if not text.isascii() or self._scan is None:
+            for index, rule in enumerate(self._rules):
+                if rule.search(text):
+                    return index
+            return None
+
+        candidates = set(self._always)
+        for literal in self._scan.findall(text.upper()):
+            candidates.update(self._owners[literal])
+        for index in sorted(candidates):
+            if index in self._exact or self._rules[index].search(text):
+                return index
+        return None
+
+
 # Map spending categories to TransactionCategory enum
 CATEGORY_TO_TRANSACTION_TYPE = {
     'Income': TransactionCategory.INCOME,
@@ -148,6 +273,13 @@ CATEGORY_TO_TRANSACTION_TYPE = {
     'Refund': TransactionCategory.REFUND,
 }
 
+_MATCHER = RuleMatcher([pattern for pattern, _, _, _ in COMPANY_MAPPINGS])
+
+
+def match_rule(description: str) -> Optional[int]:
+    """Index into COMPANY_MAPPINGS of the rule that fires, or None."""
+    return _MATCHER.match(description)
+
 
 def categorize(description: str) -> Tuple[str, str, str]:
     """
@@ -157,10 +289,11 @@ def categorize(description: str) -> Tuple[str, str, str]:
         (company_name, parent_company, spending_category)
         Falls back to ('Other', 'Other', 'Other') if no match.
     """
-    for pattern, company, parent, category in _COMPILED_MAPPINGS:
-        if pattern.search(description):
-            return company, parent, category
-    return 'Other', 'Other', 'Other'
+    index = _MATCHER.match(description)
+    if index is None:
+        return 'Other', 'Other', 'Other'
+    _, company, parent, category = COMPANY_MAPPINGS[index]
+    return company, parent, category
 
 
 def get_transaction_category(spending_category: str, is_debit: bool) -> TransactionCategory:
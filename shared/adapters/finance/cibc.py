@@ -5,21 +5,49 @@ Reads CIBC bank transaction CSV exports (credit card and chequing accounts)
 and transforms them into canonical FinancialTransaction objects.
 
 CSV format: Date, Description, Amount (debit), Payment (credit), Card
+
+Files are ingested incrementally (see csv_ingest): unchanged files are not
+re-read and appended rows are parsed on their own. Parsed records are cached
+in a SQLite file per data_dir under CIBC_CACHE_DIR (default
+~/.cache/cibc_ingest), not in data_dir itself, which is usually mounted
+read-only. The `cache_path` setting overrides this (None disables the
+on-disk cache).
 """
-import csv
 import hashlib
 import os
 from datetime import datetime
 from decimal import Decimal
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 
 from ..base import BaseAdapter, AdapterConfig
 from ..registry import register_adapter
 from ...schemas.canonical import FinancialTransaction, TransactionCategory
-from .categorizer import categorize, get_transaction_category
+from .categorizer import COMPANY_MAPPINGS, categorize, get_transaction_category
+from .csv_ingest import get_ingestor
 
 
 DEFAULT_DATA_DIR = "/app/dashboard_service/Bank"
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "cibc_ingest")
+
+# Bump when _parse_row output changes; categorizer edits are picked up automatically
+PARSER_REVISION = 1
+PARSER_VERSION = hashlib.md5(
+    f"{PARSER_REVISION}:{COMPANY_MAPPINGS!r}".encode()
+).hexdigest()[:16]
+
+
+def default_cache_path(data_dir: str) -> str:
+    """Writable cache file for data_dir (one per directory, under CIBC_CACHE_DIR)."""
+    cache_dir = os.getenv("CIBC_CACHE_DIR", DEFAULT_CACHE_DIR)
+    os.makedirs(cache_dir, exist_ok=True)
+    digest = hashlib.md5(os.path.abspath(data_dir).encode()).hexdigest()[:12]
+    return os.path.join(cache_dir, f"cibc_ingest_{digest}.db")
+
+
+def _row_context(filename: str) -> Dict[str, str]:
+    """Per-file fields added to every row (account type from filename)."""
+    account_type = "chequing" if "chq" in filename.lower() else "credit"
+    return {"_source_file": filename, "_account_type": account_type}
 
 
 @register_adapter(
@@ -48,49 +76,49 @@ class CIBCAdapter(BaseAdapter[FinancialTransaction]):
         )
 
     async def fetch_raw(self, config: AdapterConfig) -> Dict[str, Any]:
-        """Read all CSV files from the data directory."""
-        data_dir = (
-            config.settings.get("data_dir", self._data_dir)
-            if config and config.settings
-            else self._data_dir
+        """Ingest CSV files from the data directory (only new rows are parsed)."""
+        settings = config.settings if config and config.settings else {}
+        data_dir = settings.get("data_dir", self._data_dir)
+        if "cache_path" in settings:
+            cache_path: Optional[str] = settings["cache_path"]
+        else:
+            try:
+                cache_path = default_cache_path(data_dir)
+            except OSError:
+                cache_path = None  # no writable cache dir: in-memory only
+
+        ingestor = get_ingestor(
+            data_dir,
+            self._parse_row,
+            _row_context,
+            cache_path=cache_path,
+            parser_version=PARSER_VERSION,
         )
-
-        transactions = []
-        csv_files = []
-
-        if not os.path.isdir(data_dir):
-            return {"transactions": [], "source_dir": data_dir, "files": []}
-
-        for filename in sorted(os.listdir(data_dir)):
-            if not filename.endswith(".csv"):
-                continue
-
-            filepath = os.path.join(data_dir, filename)
-            csv_files.append(filename)
-
-            # Determine account type from filename
-            account_type = "chequing" if "chq" in filename.lower() else "credit"
-
-            with open(filepath, "r", encoding="utf-8-sig") as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    row["_source_file"] = filename
-                    row["_account_type"] = account_type
-                    transactions.append(row)
+        result = ingestor.ingest()
 
         return {
-            "transactions": transactions,
+            "records": result.records,
+            "raw_count": result.raw_rows,
+            "parsed_rows": result.parsed_rows,
             "source_dir": data_dir,
-            "files": csv_files,
+            "files": result.files,
         }
 
     def transform(self, raw_data: Dict[str, Any]) -> List[FinancialTransaction]:
-        """Transform CSV rows into canonical FinancialTransaction objects."""
+        """
+        Deduplicate and order ingested records.
+
+        Accepts parsed "records" from fetch_raw, or raw CSV row dicts under
+        "transactions".
+        """
         seen_ids: set = set()
         results = []
 
-        for row in raw_data.get("transactions", []):
-            txn = self._parse_row(row)
+        records = raw_data.get("records")
+        if records is None:
+            records = (self._parse_row(row) for row in raw_data.get("transactions", []))
+
+        for txn in records:
             if txn and txn.id not in seen_ids:
                 seen_ids.add(txn.id)
                 results.append(txn)
@@ -163,6 +191,11 @@ class CIBCAdapter(BaseAdapter[FinancialTransaction]):
         except (ValueError, KeyError):
             return None
 
+    def _count_raw_items(self, raw_data: Dict[str, Any]) -> int:
+        if "raw_count" in raw_data:
+            return raw_data["raw_count"]
+        return super()._count_raw_items(raw_data)
+
     def get_capabilities(self) -> Dict[str, bool]:
         return {
             "read": True,
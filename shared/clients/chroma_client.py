@@ -16,16 +16,52 @@ except ModuleNotFoundError:
         import chroma_pb2
         import chroma_pb2_grpc
 
+import logging
+from typing import Dict, List, Optional
+
 import grpc
 from google.protobuf.struct_pb2 import Struct
 
+logger = logging.getLogger(__name__)
+
+# Documents per AddDocuments/UpsertDocuments call (keeps messages well
+# under the 4 MB gRPC default)
+WRITE_BATCH_SIZE = 256
+
+# Embed() serves request-path lookups (e.g. the response cache): fail fast
+EMBED_TIMEOUT_S = 2.0
+
+
+def _struct(values: Optional[dict]) -> Optional[Struct]:
+    if not values:
+        return None
+    struct = Struct()
+    struct.update(values)
+    return struct
+
+
+def _documents(response) -> list:
+    """Normalize a QueryResponse, dropping low-score and empty results."""
+    return [
+        {
+            "id": doc.id,
+            "text": doc.text,
+            "metadata": dict(doc.metadata),
+            "score": doc.score
+        }
+        for doc in response.results
+        if doc.score > 0.2 and doc.text.strip()
+    ]
+
+
 class ChromaClient(BaseClient):
     def __init__(self):
         super().__init__("chroma_service", 50052)
         self.stub = chroma_pb2_grpc.ChromaServiceStub(self.channel)
 
-    def add_document(self, document_id: str, text: str, metadata: dict = None) -> bool:
-        """Add document with automatic retries"""
+    def add_document(self, document_id: str, text: str, metadata: dict = None,
+                     embedding: List[float] = None) -> bool:
+        """Add document with automatic retries (embedding: optional precomputed vector)"""
         try:
             struct_metadata = Struct()
             if metadata:
@@ -36,34 +72,140 @@ class ChromaClient(BaseClient):
                     document=chroma_pb2.Document(
                         id=document_id,
                         text=text,
-                        metadata=struct_metadata
+                        metadata=struct_metadata,
+                        embedding=embedding or []
                     )
                 )
             )
             return response.success
         except grpc.RpcError as e:
-            self.logger.error(f"Document addition failed: {e.details()}")
+            logger.error(f"Document addition failed: {e.details()}")
             return False
 
-    def query(self, query_text: str, top_k: int = 3) -> list:
-        """Query with automatic retry and result normalization"""
+    def add_documents(self, documents: List[Dict], upsert: bool = False) -> bool:
+        """
+        Add (or upsert) many documents in batched calls.
+
+        Args:
+            documents: Dicts with "id", "text" and optional "metadata" and
+                precomputed "embedding"
+            upsert: Overwrite existing ids instead of failing on them
+        """
+        rpc = self.stub.UpsertDocuments if upsert else self.stub.AddDocuments
+        try:
+            for start in range(0, len(documents), WRITE_BATCH_SIZE):
+                batch = [
+                    chroma_pb2.Document(
+                        id=doc["id"],
+                        text=doc["text"],
+                        metadata=_struct(doc.get("metadata")),
+                        embedding=doc.get("embedding") or []
+                    )
+                    for doc in documents[start:start + WRITE_BATCH_SIZE]
+                ]
+                response = rpc(chroma_pb2.BatchDocumentsRequest(documents=batch))
+                if not response.success:
+                    return False
+            return True
+        except grpc.RpcError as e:
+            logger.error(f"Batch document write failed: {e.details()}")
+            return False
+
+    def upsert_documents(self, documents: List[Dict]) -> bool:
+        """Add or overwrite many documents (see add_documents)."""
+        return self.add_documents(documents, upsert=True)
+
+    def delete_documents(self, ids: List[str] = None, where: dict = None) -> bool:
+        """Delete documents by id and/or metadata filter."""
+        try:
+            response = self.stub.DeleteDocuments(
+                chroma_pb2.DeleteDocumentsRequest(ids=ids or [], where=_struct(where))
+            )
+            return response.success
+        except grpc.RpcError as e:
+            logger.error(f"Document delete failed: {e.details()}")
+            return False
+
+    def query(self, query_text: str, top_k: int = 3, where: dict = None,
+              query_embedding: List[float] = None) -> list:
+        """
+        Query with automatic retry and result normalization.
+
+        Args:
+            where: Optional Chroma metadata filter, e.g.
+                {"conversation_id": "thread-1"} or {"$and": [...]}
+            query_embedding: Optional precomputed embedding of query_text
+        """
         try:
             response = self.stub.Query(
                 chroma_pb2.QueryRequest(
                     query_text=query_text,
-                    top_k=min(top_k, 20)
+                    top_k=min(top_k, 20),
+                    where=_struct(where),
+                    query_embedding=query_embedding or []
                 )
             )
             # Filter out low-score results and empty texts
-            return [
-                {
-                    "text": doc.text,
-                    "metadata": dict(doc.metadata),
-                    "score": doc.score
-                }
-                for doc in response.results
-                if doc.score > 0.2 and doc.text.strip()
-            ][:top_k]  # Ensure we don't return more than requested
+            return _documents(response)[:top_k]  # Ensure we don't return more than requested
+        except grpc.RpcError as e:
+            logger.error(f"Vector query failed: {e.code().name}")
+            return []
+
+    def query_many(self, query_texts: List[str], top_k: int = 3, where: dict = None,
+                   query_embeddings: List[List[float]] = None) -> List[list]:
+        """
+        Run several queries in one call; returns one result list per query.
+
+        query_embeddings, if given, holds one precomputed vector per query
+        text (an empty vector means "embed this text").
+        """
+        if not query_texts:
+            return []
+        try:
+            response = self.stub.MultiQuery(
+                chroma_pb2.MultiQueryRequest(
+                    query_texts=query_texts,
+                    top_k=min(top_k, 20),
+                    where=_struct(where),
+                    query_embeddings=[
+                        chroma_pb2.Embedding(values=vector or [])
+                        for vector in query_embeddings or []
+                    ]
+                )
+            )
+            return [_documents(results)[:top_k] for results in response.results]
+        except grpc.RpcError as e:
+            logger.error(f"Vector multi-query failed: {e.code().name}")
+            return [[] for _ in query_texts]
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed texts with the service's model (and embedding cache).
+
+        Returns one vector per text, or [] if the service is unavailable.
+        """
+        if not texts:
+            return []
+        try:
+            response = self.stub.Embed(
+                chroma_pb2.EmbedRequest(texts=texts), timeout=EMBED_TIMEOUT_S
+            )
+            return [list(embedding.values) for embedding in response.embeddings]
+        except grpc.RpcError as e:
+            logger.error(f"Embedding failed: {e.code().name}")
+            return []
+
+    def cache_stats(self) -> dict:
+        """Embedding cache hit/miss counters of the service."""
+        try:
+            response = self.stub.GetCacheStats(chroma_pb2.CacheStatsRequest())
+            return {
+                "hits": response.hits,
+                "disk_hits": response.disk_hits,
+                "misses": response.misses,
+                "entries": response.entries,
+                "hit_rate": response.hit_rate,
+            }
         except grpc.RpcError as e:
-            self.logger.error(f"Vector query failed: {e.code().name}")
-            return []
\ No newline at end of file
+            logger.error(f"Cache stats failed: {e.code().name}")
+            return {}
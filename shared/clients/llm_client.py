@@ -1,6 +1,8 @@
 import grpc
+import json
 import logging
-from typing import Iterator, Optional, Dict, Tuple
+from dataclasses import dataclass
+from typing import Any, Iterator, List, Optional, Dict, Tuple, Union
 from .base_client import BaseClient
 
 # Try local import first (when used as a service), fall back to shared/generated
@@ -21,13 +23,31 @@ except ModuleNotFoundError:
 
 logger = logging.getLogger(__name__)
 
+
+@dataclass
+class Completion:
+    """Generated text with exact token usage (from the model's tokenizer)."""
+
+    text: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+
 class LLMClient(BaseClient):
     def __init__(self, host: str = "llm_service", port: int = 50051):
         super().__init__(host, port)
         self.stub = llm_pb2_grpc.LLMServiceStub(self.channel)
         self._stream_timeout = 120
 
-    def generate(self, prompt: str, max_tokens: int = 512, temperature: float = 0.7, response_format: str = "") -> str:
+    def generate(
+        self,
+        prompt: str,
+        max_tokens: int = 512,
+        temperature: float = 0.7,
+        response_format: str = "",
+        model: str = "",
+        json_schema: Union[str, Dict[str, Any], None] = None,
+    ) -> str:
         """
         Generate text from LLM.
 
@@ -36,17 +56,41 @@ class LLMClient(BaseClient):
             max_tokens: Maximum tokens to generate
             temperature: Sampling temperature
             response_format: Optional format constraint (e.g., "json")
+            model: Resident model id to route to (empty = service default)
+            json_schema: JSON schema the output must follow, e.g.
+                LocalToolRegistry.tool_call_schema(name) (overrides response_format)
 
         Returns:
             Generated text
         """
+        return self.complete(
+            prompt, max_tokens, temperature, response_format, model, json_schema
+        ).text
+
+    def complete(
+        self,
+        prompt: str,
+        max_tokens: int = 512,
+        temperature: float = 0.7,
+        response_format: str = "",
+        model: str = "",
+        json_schema: Union[str, Dict[str, Any], None] = None,
+    ) -> Completion:
+        """
+        Like generate(), but also returns the prompt and completion token
+        counts the service reports in its final message.
+        """
+        if json_schema is not None and not isinstance(json_schema, str):
+            json_schema = json.dumps(json_schema)
         try:
             responses = self.stub.Generate(
                 llm_pb2.GenerateRequest(
                     prompt=prompt,
                     max_tokens=min(max_tokens, 2048),
                     temperature=temperature,
-                    response_format=response_format
+                    response_format=response_format,
+                    model=model,
+                    json_schema=json_schema or "",
                 ),
                 timeout=120
             )
@@ -54,11 +98,33 @@ class LLMClient(BaseClient):
             for response in responses:
                 output += response.token
                 if response.is_final:
-                    break
-            return output.strip()
+                    return Completion(
+                        text=output.strip(),
+                        prompt_tokens=response.prompt_tokens,
+                        completion_tokens=response.completion_tokens,
+                    )
+            return Completion(text=output.strip())
         except grpc.RpcError as e:
             logger.error(f"Generation failed: {e.code().name}")
-            return f"LLM Service Error: {e.details()}"
+            return Completion(text=f"LLM Service Error: {e.details()}")
+
+    def count_tokens(self, texts: List[str], model: str = "") -> List[int]:
+        """
+        Exact token counts of texts under a model's tokenizer.
+
+        Args:
+            texts: Texts to count
+            model: Model id whose tokenizer to use (empty = service default)
+
+        Raises:
+            grpc.RpcError: If the service cannot count (callers fall back to
+                an estimate, see TokenCounter)
+        """
+        response = self.stub.CountTokens(
+            llm_pb2.CountTokensRequest(texts=texts, model=model),
+            timeout=5,
+        )
+        return list(response.counts)
 
     def generate_stream(self, prompt: str, max_tokens: int = 512, *, temperature: float = 0.7) -> Iterator[llm_pb2.GenerateResponse]:
         """Yield streaming `GenerateResponse` messages for real-time consumption."""
@@ -89,36 +155,84 @@ class LLMClient(BaseClient):
         num_samples: int = 5,
         max_tokens: int = 512,
         temperature: float = 0.7,
-        response_format: str = ""
+        response_format: str = "",
+        seed: int = 0,
+        model: str = "",
     ) -> dict:
         """
         Generate k samples for self-consistency scoring (Agent0 Phase 2).
+
+        The service evaluates the prompt once and branches the samples from
+        it; a non-zero seed makes the batch reproducible.
         """
         try:
             response = self.stub.GenerateBatch(
-                llm_pb2.GenerateBatchRequest(
-                    prompt=prompt,
-                    num_samples=min(num_samples, 10),
-                    max_tokens=min(max_tokens, 2048),
-                    temperature=temperature,
-                    response_format=response_format
-                ),
+                self._batch_request(prompt, num_samples, max_tokens, temperature, response_format, seed, model),
                 timeout=120  # Longer timeout for batch generation
             )
-            return {
-                "responses": list(response.responses),
-                "self_consistency_score": response.self_consistency_score,
-                "majority_answer": response.majority_answer,
-                "majority_count": response.majority_count
-            }
+            return self._batch_result(response)
         except grpc.RpcError as e:
             logger.error(f"Batch generation failed: {e.code().name}")
-            return {
-                "responses": [],
-                "self_consistency_score": 0.0,
-                "majority_answer": f"LLM Service Error: {e.details()}",
-                "majority_count": 0
-            }
+            return self._batch_error(e)
+
+    def generate_batch_stream(
+        self,
+        prompt: str,
+        num_samples: int = 5,
+        max_tokens: int = 512,
+        temperature: float = 0.7,
+        response_format: str = "",
+        seed: int = 0,
+        model: str = "",
+    ) -> Iterator[dict]:
+        """
+        Stream a batch: yields {"index", "response"} per sample as it
+        completes, then the same summary dict generate_batch() returns.
+        """
+        try:
+            for message in self.stub.GenerateBatchStream(
+                self._batch_request(prompt, num_samples, max_tokens, temperature, response_format, seed, model),
+                timeout=120,
+            ):
+                if message.HasField("sample"):
+                    yield {"index": message.sample.index, "response": message.sample.response}
+                else:
+                    yield self._batch_result(message.summary)
+        except grpc.RpcError as e:
+            logger.error(f"Batch stream failed: {e.code().name}")
+            yield self._batch_error(e)
+
+    @staticmethod
+    def _batch_request(prompt, num_samples, max_tokens, temperature, response_format, seed, model):
+        return llm_pb2.GenerateBatchRequest(
+            prompt=prompt,
+            num_samples=min(num_samples, 10),
+            max_tokens=min(max_tokens, 2048),
+            temperature=temperature,
+            response_format=response_format,
+            seed=seed,
+            model=model,
+        )
+
+    @staticmethod
+    def _batch_result(response) -> dict:
+        return {
+            "responses": list(response.responses),
+            "self_consistency_score": response.self_consistency_score,
+            "majority_answer": response.majority_answer,
+            "majority_count": response.majority_count,
+            "prompt_tokens": response.prompt_tokens,
+            "completion_tokens": response.completion_tokens,
+        }
+
+    @staticmethod
+    def _batch_error(error: grpc.RpcError) -> dict:
+        return {
+            "responses": [],
+            "self_consistency_score": 0.0,
+            "majority_answer": f"LLM Service Error: {error.details()}",
+            "majority_count": 0
+        }
 
     def get_active_model(self) -> dict:
         """Get information about the currently loaded model on this instance."""
@@ -191,20 +305,25 @@ class LLMClientPool:
         if not self.clients:
             logger.warning("LLMClientPool initialized with no endpoints")
 
-    def get_client(self, tier: str) -> Optional[LLMClient]:
-        """Get client for a specific tier. Falls back to 'standard', then any available."""
+    def resolve_tier(self, tier: str) -> Optional[str]:
+        """Tier that serves requests for tier: itself, else 'standard', else any available."""
         if tier in self.clients:
-            return self.clients[tier]
+            return tier
         if "standard" in self.clients:
             logger.debug(f"Tier '{tier}' not available, falling back to 'standard'")
-            return self.clients["standard"]
-        # Return any available client
+            return "standard"
+        # Return any available tier
         if self.clients:
             fallback_tier = next(iter(self.clients))
             logger.debug(f"Tier '{tier}' not available, falling back to '{fallback_tier}'")
-            return self.clients[fallback_tier]
+            return fallback_tier
         return None
 
+    def get_client(self, tier: str) -> Optional[LLMClient]:
+        """Get client for a specific tier. Falls back to 'standard', then any available."""
+        resolved = self.resolve_tier(tier)
+        return self.clients[resolved] if resolved is not None else None
+
     def generate(self, prompt: str, tier: str = "standard", **kwargs) -> str:
         """Generate using a specific tier's LLM instance."""
         client = self.get_client(tier)
@@ -0,0 +1,143 @@
+"""
+Cached exact token counts for the orchestrator.
+
+Budgets (context compaction, utilisation metrics) used a ~4 characters per
+token estimate, which is off by 30% or more for code, JSON and non-English
+text. TokenCounter asks the LLM service to count with the loaded model's
+tokenizer (LLMClient.count_tokens) and caches the answers, so the same
+message is counted once per conversation rather than once per turn.
+
+When the service cannot count (not reachable, older build without the
+CountTokens RPC) it falls back to an estimate calibrated on the counts seen
+so far, and retries the service after a back-off. Estimates are not cached.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+def _key(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+class TokenCounter:
+    """
+    LRU cache in front of a remote token counter.
+
+    Args:
+        count_remote: Counts a list of texts exactly (e.g.
+            LLMClient.count_tokens); may raise
+        max_entries: Counts kept before the least recently used is dropped
+        chars_per_token: Fallback ratio until exact counts have been seen
+        retry_after: Seconds to use the fallback after a remote failure
+
+    Example:
+        >>> counter = TokenCounter(llm_client.count_tokens)
+        >>> budget_used = counter.count(prompt)
+    """
+
+    def __init__(
+        self,
+        count_remote: Callable[[List[str]], List[int]],
+        max_entries: int = 4096,
+        chars_per_token: float = 4.0,
+        retry_after: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._count_remote = count_remote
+        self.max_entries = max(1, max_entries)
+        self.default_chars_per_token = chars_per_token
+        self.retry_after = retry_after
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[bytes, int]" = OrderedDict()  # oldest first
+        self._retry_at: Optional[float] = None
+        self._observed_chars = 0
+        self._observed_tokens = 0
+        self._counters = {"hits": 0, "misses": 0, "remote_calls": 0, "fallbacks": 0}
+
+    def __call__(self, text: str) -> int:
+        return self.count(text)
+
+    @property
+    def chars_per_token(self) -> float:
+        """Characters per token observed in exact counts (the default until then)."""
+        with self._lock:
+            if self._observed_tokens:
+                return self._observed_chars / self._observed_tokens
+            return self.default_chars_per_token
+
+    def estimate(self, text: str) -> int:
+        """Fallback count from the calibrated characters-per-token ratio."""
+        if not text:
+            return 0
+        return max(1, round(len(text) / self.chars_per_token))
+
+    def count(self, text: str) -> int:
+        return self.count_many([text])[0]
+
+    def count_many(self, texts: Sequence[str]) -> List[int]:
+        """Token counts of texts; cache misses are counted in one remote call."""
+        keys = [_key(text) for text in texts]
+        counts: Dict[bytes, int] = {}
+        missing: Dict[bytes, str] = {}
+        with self._lock:
+            for key, text in zip(keys, texts):
+                if key in counts or key in missing:
+                    continue
+                cached = self._entries.get(key)
+                if cached is None:
+                    missing[key] = text
+                    self._counters["misses"] += 1
+                else:
+                    self._entries.move_to_end(key)
+                    counts[key] = cached
+                    self._counters["hits"] += 1
+            backing_off = self._retry_at is not None and self._clock() < self._retry_at
+
+        if missing and not backing_off:
+            exact = self._fetch(list(missing.values()))
+            if exact is not None:
+                counts.update(zip(missing, exact))
+                missing = {}
+
+        for key, text in missing.items():
+            counts[key] = self.estimate(text)
+        return [counts[key] for key in keys]
+
+    def _fetch(self, texts: List[str]) -> Optional[List[int]]:
+        try:
+            exact = list(self._count_remote(texts))
+            if len(exact) != len(texts):
+                raise ValueError(f"expected {len(texts)} counts, got {len(exact)}")
+        except Exception as e:
+            logger.warning(f"Exact token counting unavailable, estimating for {self.retry_after:.0f}s: {e}")
+            with self._lock:
+                self._retry_at = self._clock() + self.retry_after
+                self._counters["fallbacks"] += 1
+            return None
+
+        with self._lock:
+            self._retry_at = None
+            self._counters["remote_calls"] += 1
+            for text, count in zip(texts, exact):
+                self._entries[_key(text)] = count
+                self._observed_chars += len(text)
+                self._observed_tokens += count
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return exact
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {"entries": len(self._entries), **self._counters}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
@@ -33,6 +33,8 @@ from .metrics import (
     increment_active_requests,
     decrement_active_requests,
     update_context_utilization,
+    record_token_usage,
+    update_tier_queue_depth,
     time_operation,
     MemoryReporter,
 )
@@ -69,6 +71,8 @@ __all__ = [
     "increment_active_requests",
     "decrement_active_requests",
     "update_context_utilization",
+    "record_token_usage",
+    "update_tier_queue_depth",
     "time_operation",
     "MemoryReporter",
     # Tracing
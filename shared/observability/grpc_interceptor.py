@@ -9,10 +9,12 @@ Provides server and client interceptors that automatically:
 """
 import time
 import logging
-from typing import Callable, Any, Optional
+from contextlib import contextmanager
+from typing import Callable, Any, Iterator, Optional
 
 import grpc
 from grpc import ServerInterceptor
+from grpc import aio as grpc_aio
 # ClientInterceptor was added in grpc 1.63.0+, use aio version for compatibility
 try:
     from grpc import ClientInterceptor
@@ -106,6 +108,13 @@ class ObservabilityServerInterceptor(ServerInterceptor):
         request_type: str,
     ):
         """Handle a request with full observability instrumentation."""
+        with self._observe(context, method, request_type):
+            # Call the actual handler
+            return handler(request, context)
+
+    @contextmanager
+    def _observe(self, context, method: str, request_type: str) -> Iterator[None]:
+        """Trace context, correlation ID, span and metrics around one request."""
         start_time = time.perf_counter()
         status = "ok"
 
@@ -136,9 +145,7 @@ class ObservabilityServerInterceptor(ServerInterceptor):
                     "rpc.system": "grpc",
                 },
             ):
-                # Call the actual handler
-                response = handler(request, context)
-                return response
+                yield
 
         except grpc.RpcError as e:
             status = "error"
@@ -162,6 +169,41 @@ class ObservabilityServerInterceptor(ServerInterceptor):
             decrement_active_requests()
 
 
+class AsyncObservabilityServerInterceptor(grpc_aio.ServerInterceptor, ObservabilityServerInterceptor):
+    """
+    ObservabilityServerInterceptor for grpc.aio servers.
+
+    Same instrumentation; handlers are coroutines and run on the event loop.
+    """
+
+    async def intercept_service(self, continuation, handler_call_details):
+        """Intercept the service call to add observability."""
+        method = handler_call_details.method
+
+        handler = await continuation(handler_call_details)
+        if handler is None:
+            return None
+
+        if handler.unary_unary:
+            return self._wrap_unary_handler(handler, method)
+        # Streaming handlers pass through, as in the sync interceptor
+        return handler
+
+    def _wrap_unary_handler(self, handler, method: str):
+        """Wrap a unary-unary coroutine handler with observability."""
+        original_handler = handler.unary_unary
+
+        async def instrumented_handler(request, context):
+            with self._observe(context, method, "unary"):
+                return await original_handler(request, context)
+
+        return grpc.unary_unary_rpc_method_handler(
+            instrumented_handler,
+            request_deserializer=handler.request_deserializer,
+            response_serializer=handler.response_serializer,
+        )
+
+
 class ObservabilityClientInterceptor(ClientInterceptor):
     """
     Client interceptor that adds observability to outgoing gRPC calls.
@@ -219,6 +261,11 @@ def create_server_interceptors() -> list:
     return [ObservabilityServerInterceptor()]
 
 
+def create_async_server_interceptors() -> list:
+    """Create a list of grpc.aio server interceptors for observability."""
+    return [AsyncObservabilityServerInterceptor()]
+
+
 def create_client_interceptors() -> list:
     """Create a list of client interceptors for observability."""
     return [ObservabilityClientInterceptor()]
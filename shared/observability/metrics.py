@@ -96,6 +96,21 @@ class LIDMMetrics:
     # Delegation errors
     delegation_errors_total: Counter
 
+    # Requests waiting for a tier slot, by tier
+    tier_queue_depth: ObservableGauge
+
+    # Time spent waiting for a tier slot, by tier and outcome
+    tier_admission_wait_ms: Histogram
+
+    # Requests refused by tier admission (queue full / wait deadline), by tier and reason
+    tier_admission_rejections_total: Counter
+
+    # Requests moved to a fallback tier after waiting too long
+    tier_spillovers_total: Counter
+
+    # Query classification cache lookups by result (exact/similar/miss)
+    classification_cache_lookups_total: Counter
+
 
 @dataclass
 class DecisionPipelineMetrics:
@@ -110,17 +125,24 @@ class DecisionPipelineMetrics:
     # Token generation throughput (tokens per second per call)
     token_generation_rate: Histogram
 
+    # Prompt/completion tokens by mode (exact counts from the model's tokenizer)
+    tokens_total: Counter
+
     # Context window utilization ratio (0.0–1.0)
     context_utilization: ObservableGauge
 
     # Process memory RSS in bytes
     memory_rss_bytes: ObservableGauge
 
+    # Response cache lookups by result (hit/similar/miss/bypass) and intent category
+    response_cache_lookups_total: Counter
+
 
 # Shared state for observable gauges
 _active_requests: int = 0
 _cumulative_costs: Dict[str, float] = {}
 _context_utilization: float = 0.0
+_tier_queue_depths: Dict[str, int] = {}
 _memory_rss_bytes: int = 0
 
 
@@ -304,11 +326,49 @@ def create_lidm_metrics(meter: Optional[Meter] = None) -> LIDMMetrics:
         unit="1",
     )
 
+    tier_queue_depth = m.create_observable_gauge(
+        name="lidm_tier_queue_depth",
+        description="Requests waiting for a tier slot",
+        unit="1",
+        callbacks=[lambda options: [
+            metrics.Observation(depth, {"tier": tier}) for tier, depth in list(_tier_queue_depths.items())
+        ]],
+    )
+
+    tier_admission_wait_ms = m.create_histogram(
+        name="lidm_tier_admission_wait_ms",
+        description="Time spent waiting for a tier slot in milliseconds",
+        unit="ms",
+    )
+
+    tier_admission_rejections_total = m.create_counter(
+        name="lidm_tier_admission_rejections_total",
+        description="Requests refused by tier admission (queue full or wait deadline)",
+        unit="1",
+    )
+
+    tier_spillovers_total = m.create_counter(
+        name="lidm_tier_spillovers_total",
+        description="Requests moved to a fallback tier after waiting too long",
+        unit="1",
+    )
+
+    classification_cache_lookups_total = m.create_counter(
+        name="lidm_classification_cache_lookups_total",
+        description="Query classification cache lookups (exact/similar hit or miss)",
+        unit="1",
+    )
+
     return LIDMMetrics(
         delegation_requests_total=delegation_requests_total,
         delegation_latency_ms=delegation_latency_ms,
         delegation_fallbacks_total=delegation_fallbacks_total,
         delegation_errors_total=delegation_errors_total,
+        tier_queue_depth=tier_queue_depth,
+        tier_admission_wait_ms=tier_admission_wait_ms,
+        tier_admission_rejections_total=tier_admission_rejections_total,
+        tier_spillovers_total=tier_spillovers_total,
+        classification_cache_lookups_total=classification_cache_lookups_total,
     )
 
 
@@ -339,6 +399,12 @@ def create_decision_pipeline_metrics(meter: Optional[Meter] = None) -> DecisionP
         unit="1",
     )
 
+    tokens_total = m.create_counter(
+        name="pipeline_tokens_total",
+        description="Prompt and completion tokens by mode",
+        unit="1",
+    )
+
     context_utilization = m.create_observable_gauge(
         name="pipeline_context_utilization",
         description="Context window utilisation ratio (0.0–1.0)",
@@ -353,12 +419,20 @@ def create_decision_pipeline_metrics(meter: Optional[Meter] = None) -> DecisionP
         callbacks=[lambda options: [metrics.Observation(_memory_rss_bytes)]],
     )
 
+    response_cache_lookups_total = m.create_counter(
+        name="pipeline_response_cache_lookups_total",
+        description="Agent response cache lookups (hit, similar, miss or bypass)",
+        unit="1",
+    )
+
     return DecisionPipelineMetrics(
         classification_total=classification_total,
         inference_duration_ms=inference_duration_ms,
         token_generation_rate=token_generation_rate,
+        tokens_total=tokens_total,
         context_utilization=context_utilization,
         memory_rss_bytes=memory_rss_bytes,
+        response_cache_lookups_total=response_cache_lookups_total,
     )
 
 
@@ -382,12 +456,31 @@ def add_provider_cost(provider: str, cost_usd: float) -> None:
     _cumulative_costs[provider] = _cumulative_costs.get(provider, 0) + cost_usd
 
 
+def record_token_usage(
+    counter: Counter,
+    prompt_tokens: int,
+    completion_tokens: int,
+    attributes: Optional[Dict] = None,
+) -> None:
+    """Add prompt and completion tokens to a token counter, labelled by type."""
+    attributes = attributes or {}
+    if prompt_tokens:
+        counter.add(prompt_tokens, {**attributes, "type": "prompt"})
+    if completion_tokens:
+        counter.add(completion_tokens, {**attributes, "type": "completion"})
+
+
 def update_context_utilization(ratio: float) -> None:
     """Update context window utilisation gauge (0.0–1.0)."""
     global _context_utilization
     _context_utilization = max(0.0, min(1.0, ratio))
 
 
+def update_tier_queue_depth(tier: str, depth: int) -> None:
+    """Update the queue-depth gauge for an LLM tier."""
+    _tier_queue_depths[tier] = max(0, depth)
+
+
 def update_memory_rss() -> None:
     """Snapshot current process RSS into the gauge."""
     global _memory_rss_bytes
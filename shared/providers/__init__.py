@@ -10,6 +10,7 @@ from .base_provider import (
     ChatRequest,
     ChatResponse,
 )
+from .loop_runner import LoopRunner, get_loop_runner
 from .registry import ProviderRegistry, get_registry, get_provider, register_provider
 from .setup import setup_providers
 from .config import ProviderConfigLoader
@@ -40,6 +41,9 @@ __all__ = [
     "register_provider",
     # Setup
     "setup_providers",
+    # Sync bridge
+    "LoopRunner",
+    "get_loop_runner",
     # Implementations
     "LocalProvider",
     "AnthropicProvider",
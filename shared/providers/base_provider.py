@@ -5,6 +5,8 @@ from dataclasses import dataclass, field
 from typing import AsyncIterator, Iterator, Optional, List, Dict, Any
 from enum import Enum
 
+from .loop_runner import get_loop_runner
+
 
 class ProviderType(str, Enum):
     """Enumeration of provider types."""
@@ -146,8 +148,9 @@ class BaseProvider(ABC):
         """
         Synchronous wrapper for generate().
 
-        Provides sync interface for backward compatibility.
-        Override if a more efficient sync implementation exists.
+        Provides sync interface for backward compatibility. Runs on the
+        shared LoopRunner, so calls reuse one event loop and its pooled
+        HTTP sessions.
 
         Args:
             request: ChatRequest with messages and parameters
@@ -155,18 +158,15 @@ class BaseProvider(ABC):
         Returns:
             ChatResponse with model output
         """
-        import asyncio
-        loop = asyncio.new_event_loop()
-        try:
-            return loop.run_until_complete(self.generate(request))
-        finally:
-            loop.close()
+        return get_loop_runner().run(self.generate(request))
 
     def generate_stream_sync(self, request: ChatRequest) -> Iterator[str]:
         """
         Synchronous wrapper for generate_stream().
 
-        Provides sync interface for backward compatibility.
+        Provides sync interface for backward compatibility. Tokens are
+        yielded as the provider produces them; closing the iterator early
+        cancels the request.
 
         Args:
             request: ChatRequest with messages and parameters
@@ -174,18 +174,7 @@ class BaseProvider(ABC):
         Yields:
             String tokens as they become available
         """
-        import asyncio
-        loop = asyncio.new_event_loop()
-        try:
-            async_gen = self.generate_stream(request)
-            while True:
-                try:
-                    token = loop.run_until_complete(async_gen.__anext__())
-                    yield token
-                except StopAsyncIteration:
-                    break
-        finally:
-            loop.close()
+        yield from get_loop_runner().stream(self.generate_stream(request))
 
     @abstractmethod
     async def get_models(self) -> List[ModelInfo]:
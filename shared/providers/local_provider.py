@@ -1,5 +1,6 @@
 """Local LLM provider wrapping llama.cpp via gRPC."""
 
+import asyncio
 import logging
 from typing import List, AsyncIterator
 from .base_provider import (
@@ -21,6 +22,8 @@ class LocalProvider(BaseProvider):
     Provider for local LLM inference via llama.cpp and gRPC.
 
     Wraps the existing LLMClient to provide a standard provider interface.
+    The client is synchronous, so its calls run in the default executor
+    rather than blocking the (shared) event loop.
     """
 
     def __init__(
@@ -64,8 +67,9 @@ class LocalProvider(BaseProvider):
             # Convert messages to prompt format
             prompt = self._format_messages(request.messages)
 
-            # Call synchronous LLMClient.generate
-            content = self.llm_client.generate(
+            # Call synchronous LLMClient.complete (exact token usage)
+            completion = await asyncio.to_thread(
+                self.llm_client.complete,
                 prompt=prompt,
                 max_tokens=request.max_tokens,
                 temperature=request.temperature,
@@ -73,11 +77,11 @@ class LocalProvider(BaseProvider):
 
             return ChatResponse(
                 model=request.model,
-                content=content,
+                content=completion.text,
                 stop_reason="stop",
                 usage={
-                    "prompt_tokens": len(prompt.split()),
-                    "completion_tokens": len(content.split()),
+                    "prompt_tokens": completion.prompt_tokens,
+                    "completion_tokens": completion.completion_tokens,
                 },
                 raw_response=None,
             )
@@ -101,12 +105,17 @@ class LocalProvider(BaseProvider):
         try:
             prompt = self._format_messages(request.messages)
 
-            # Use synchronous streaming client
-            for response in self.llm_client.generate_stream(
+            # Use synchronous streaming client, one message per executor hop
+            responses = self.llm_client.generate_stream(
                 prompt=prompt,
                 max_tokens=request.max_tokens,
                 temperature=request.temperature,
-            ):
+            )
+            loop = asyncio.get_running_loop()
+            while True:
+                response = await loop.run_in_executor(None, next, responses, None)
+                if response is None:
+                    break
                 yield response.token
                 if response.is_final:
                     break
@@ -146,7 +155,8 @@ class LocalProvider(BaseProvider):
         """
         try:
             # Try a simple generation to verify service is working
-            response = self.llm_client.generate(
+            response = await asyncio.to_thread(
+                self.llm_client.generate,
                 prompt="Health check",
                 max_tokens=10,
                 temperature=0.7,
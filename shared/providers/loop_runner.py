@@ -0,0 +1,210 @@
+"""
+Long-lived asyncio loop for calling async providers from synchronous code.
+
+The orchestrator serves gRPC on worker threads, but providers are async.
+Creating an event loop per call (or per thread) cost a loop and a fresh
+aiohttp session, with a new TCP/TLS handshake, for every request, and
+streams had to be collected in full before the caller saw a token.
+
+LoopRunner runs one event loop on a daemon thread:
+
+- run(coro): runs a coroutine on the loop and blocks for its result
+- stream(agen): bridges an async iterator to a synchronous one through a
+  thread-safe queue, so each chunk reaches the caller as soon as the loop
+  receives it; closing the iterator early cancels the producer
+- session(key, factory): pooled aiohttp sessions owned by the loop, so
+  keep-alive connections are reused across requests and closed with it
+
+Example:
+    >>> runner = get_loop_runner()
+    >>> for token in runner.stream(provider.generate_stream(request)):
+    ...     print(token, end="")
+"""
+
+import asyncio
+import atexit
+import logging
+import queue
+import threading
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_DONE = object()
+_thread_state = threading.local()
+
+
+class _Raise:
+    """Carries a producer exception across the queue."""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def current_runner() -> Optional["LoopRunner"]:
+    """The LoopRunner whose loop is running on this thread, if any."""
+    return getattr(_thread_state, "runner", None)
+
+
+class LoopRunner:
+    """
+    One asyncio event loop on a background thread, shared by sync callers.
+
+    Args:
+        name: Thread name (shows up in thread dumps)
+    """
+
+    def __init__(self, name: str = "provider-loop"):
+        self.name = name
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._sessions: Dict[Any, Any] = {}
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> "LoopRunner":
+        """Start the loop thread (idempotent)."""
+        with self._lock:
+            if self.running:
+                return self
+            ready = threading.Event()
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(
+                target=self._run_loop, args=(ready,), name=self.name, daemon=True
+            )
+            self._thread.start()
+            ready.wait()
+        return self
+
+    def _run_loop(self, ready: threading.Event) -> None:
+        _thread_state.runner = self
+        asyncio.set_event_loop(self._loop)
+        self._loop.call_soon(ready.set)
+        try:
+            self._loop.run_forever()
+        finally:
+            _thread_state.runner = None
+
+    def _submit(self, coro: Awaitable[T]):
+        if not self.running:
+            self.start()
+        if current_runner() is self:
+            coro.close()
+            raise RuntimeError("LoopRunner called from its own loop thread (would deadlock); await instead")
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def run(self, coro: Awaitable[T], timeout: Optional[float] = None) -> T:
+        """Run coro on the loop and return its result (re-raising its exception)."""
+        future = self._submit(coro)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            future.cancel()
+            raise
+
+    def stream(self, agen: AsyncIterator[T], timeout: Optional[float] = None) -> Iterator[T]:
+        """
+        Iterate an async iterator from synchronous code.
+
+        Items are yielded as the loop produces them. If the consumer stops
+        early (break, close() or an exception), the producer is cancelled
+        and its cleanup (e.g. releasing the HTTP connection) runs on the loop.
+
+        Args:
+            agen: Async iterator, e.g. provider.generate_stream(request)
+            timeout: Seconds to wait for each item (None = no limit)
+
+        Raises:
+            queue.Empty: If timeout passes without an item
+        """
+        items: "queue.Queue[Any]" = queue.Queue()
+        future = self._submit(self._pump(agen, items.put_nowait))
+        try:
+            while True:
+                item = items.get(timeout=timeout)
+                if item is _DONE:
+                    return
+                if isinstance(item, _Raise):
+                    raise item.error
+                yield item
+        finally:
+            if not future.done():
+                future.cancel()
+
+    @staticmethod
+    async def _pump(agen: AsyncIterator[Any], put: Callable[[Any], None]) -> None:
+        try:
+            async for item in agen:
+                put(item)
+        except asyncio.CancelledError:
+            raise
+        except BaseException as e:
+            put(_Raise(e))
+        finally:
+            aclose = getattr(agen, "aclose", None)
+            if aclose is not None:
+                await aclose()
+            put(_DONE)
+
+    async def session(self, key: Any, factory: Callable[[], Any]) -> Any:
+        """
+        Pooled session for key on this loop (created with factory on first use).
+
+        Must be awaited on the runner's loop; sessions are closed by close().
+        """
+        session = self._sessions.get(key)
+        if session is None or session.closed:
+            session = factory()
+            self._sessions[key] = session
+        return session
+
+    @property
+    def session_count(self) -> int:
+        return sum(1 for session in self._sessions.values() if not session.closed)
+
+    async def _close_sessions(self) -> None:
+        sessions, self._sessions = list(self._sessions.values()), {}
+        for session in sessions:
+            if not session.closed:
+                await session.close()
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Close pooled sessions, cancel outstanding work and stop the loop."""
+        with self._lock:
+            if not self.running:
+                return
+            loop, thread = self._loop, self._thread
+            try:
+                asyncio.run_coroutine_threadsafe(self._shutdown(), loop).result(timeout)
+            except Exception as e:
+                logger.warning(f"{self.name} shutdown incomplete: {e}")
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout)
+            loop.close()
+            self._loop = self._thread = None
+
+    async def _shutdown(self) -> None:
+        await self._close_sessions()
+        tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+_runner: Optional[LoopRunner] = None
+_runner_lock = threading.Lock()
+
+
+def get_loop_runner() -> LoopRunner:
+    """The process-wide LoopRunner (started on first use, closed at exit)."""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = LoopRunner()
+            atexit.register(_runner.close)
+        return _runner.start()
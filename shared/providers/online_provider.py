@@ -14,6 +14,7 @@ from .base_provider import (
     ProviderAuthError,
     ProviderRateLimitError,
 )
+from .loop_runner import current_runner
 
 logger = logging.getLogger(__name__)
 
@@ -58,13 +59,25 @@ class OnlineProvider(BaseProvider):
         )
 
     async def _get_session(self) -> aiohttp.ClientSession:
-        """Get or create HTTP session."""
+        """
+        Get or create HTTP session.
+
+        On the shared LoopRunner the session comes from its pool (one per
+        provider and base URL, kept alive across requests); elsewhere the
+        provider keeps its own.
+        """
+        runner = current_runner()
+        if runner is not None:
+            return await runner.session(
+                (self.name, self.base_url, self.timeout.total),
+                lambda: aiohttp.ClientSession(timeout=self.timeout),
+            )
         if self._session is None or self._session.closed:
             self._session = aiohttp.ClientSession(timeout=self.timeout)
         return self._session
 
     async def close(self) -> None:
-        """Close HTTP session."""
+        """Close HTTP session (pooled sessions are closed with their LoopRunner)."""
         if self._session and not self._session.closed:
             await self._session.close()
 
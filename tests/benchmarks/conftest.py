@@ -0,0 +1,44 @@
+"""
+pytest configuration for benchmarks.
+
+Benchmarks run at a reduced scale by default so they stay cheap inside the
+regular test run. Set BENCH_SCALE (e.g. BENCH_SCALE=10) to scale up the
+workload sizes for a full measurement.
+"""
+
+import os
+
+import pytest
+
+
+def pytest_configure(config):
+    """Register the benchmark marker."""
+    config.addinivalue_line(
+        "markers",
+        "benchmark: Performance benchmarks (scale with BENCH_SCALE)"
+    )
+
+
+@pytest.fixture(scope="session")
+def bench_scale() -> float:
+    """Workload multiplier from the BENCH_SCALE environment variable."""
+    return float(os.getenv("BENCH_SCALE", "1"))
+
+
+@pytest.fixture
+def bench_report():
+    """
+    Print a single benchmark result line (visible with pytest -s).
+
+    Usage:
+        def test_bench(bench_report):
+            bench_report("tool_fanout", wall_s=0.31, speedup=2.9)
+    """
+    def _report(name: str, **fields) -> None:
+        parts = ", ".join(
+            f"{k}={v:.3f}" if isinstance(v, float) else f"{k}={v}"
+            for k, v in fields.items()
+        )
+        print(f"\n[bench] {name}: {parts}")
+
+    return _report
@@ -0,0 +1,202 @@
+"""
+Benchmark: the grpc.aio server vs the thread-pool server at equal threads.
+
+A stub LLM service (grpc.aio, each Generate sleeps LLM_DELAY_S before its
+token) backs a real LLMClient and AgentWorkflow. A burst of concurrent
+QueryAgent RPCs is sent to the orchestrator served two ways, both with
+WORKFLOW_THREADS threads running workflows:
+
+- thread mode: grpc.server on a WORKFLOW_THREADS-worker pool (RPCs beyond
+  that queue inside gRPC, unbounded and invisible to the orchestrator)
+- async mode: create_aio_server with max_concurrent_queries=WORKFLOW_THREADS
+  (RPCs beyond that wait as coroutines in the QueryLimiter's bounded queue)
+
+Both modes are measured the same way: concurrent calls seen by the stub
+LLM (workflows actually running), wall time, Python threads and RSS
+growth. Neither mode runs more than WORKFLOW_THREADS workflows at once,
+so throughput should match; async mode buys bounded, deadline-aware
+admission (see test_overload_is_rejected_not_queued), not extra
+concurrency. BENCH_SCALE=10 sends 640 queries.
+"""
+
+import asyncio
+import threading
+import time
+from concurrent import futures
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+import grpc
+import pytest
+
+from core.graph import AgentWorkflow
+from core.state import WorkflowConfig
+from orchestrator.aio_server import create_aio_server
+from orchestrator.orchestrator_service import LLMEngineWrapper, OrchestratorService
+from shared.clients.llm_client import LLMClient
+from shared.generated import agent_pb2, agent_pb2_grpc, llm_pb2, llm_pb2_grpc
+from tools.registry import LocalToolRegistry
+
+LLM_DELAY_S = 0.1
+WORKFLOW_THREADS = 16  # thread-mode pool size and async max_concurrent_queries
+
+
+class StubLLM(llm_pb2_grpc.LLMServiceServicer):
+    """Answers every Generate after LLM_DELAY_S; tracks concurrent calls."""
+
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+        self.calls = 0
+
+    async def Generate(self, request, context):
+        self.calls += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(LLM_DELAY_S)
+            yield llm_pb2.GenerateResponse(token="Cats nap a lot.", is_final=True)
+        finally:
+            self.active -= 1
+
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as statm:
+            pages = int(statm.read().split()[1])
+    except OSError:
+        pytest.skip("RSS not available on this platform")
+    return pages * 4096 / 2**20
+
+
+def _make_service(llm_port: int) -> OrchestratorService:
+    engine = LLMEngineWrapper(LLMClient(host="127.0.0.1", port=llm_port), max_tool_iterations=2)
+    workflow = AgentWorkflow(LocalToolRegistry(), engine, WorkflowConfig())
+
+    service = OrchestratorService.__new__(OrchestratorService)
+    service.config = SimpleNamespace(context_window=12)
+    service.observability_enabled = False
+    service.request_metrics = None
+    service.tool_metrics = None
+    service.pipeline_metrics = None
+    service.delegation_enabled = False
+    service.delegation_manager = None
+    service.response_cache = None
+    service.checkpoint_manager = Mock()
+    service.compiled_workflow = workflow.compile()
+    return service
+
+
+async def _burst(port: int, queries: int):
+    """Send queries concurrently, sampling thread count and RSS meanwhile."""
+    peaks = {"threads": threading.active_count(), "rss_mb": _rss_mb()}
+    async with grpc.aio.insecure_channel(f"127.0.0.1:{port}") as channel:
+        stub = agent_pb2_grpc.AgentServiceStub(channel)
+        start = time.perf_counter()
+        calls = asyncio.gather(*(
+            stub.QueryAgent(agent_pb2.AgentRequest(user_query=f"tell me a joke about cats #{i}"))
+            for i in range(queries)
+        ))
+        while not calls.done():
+            peaks["threads"] = max(peaks["threads"], threading.active_count())
+            peaks["rss_mb"] = max(peaks["rss_mb"], _rss_mb())
+            await asyncio.sleep(0.005)
+        replies = await calls
+        return replies, time.perf_counter() - start, peaks
+
+
+async def _run(mode: str, queries: int):
+    llm = StubLLM()
+    llm_server = grpc.aio.server()
+    llm_pb2_grpc.add_LLMServiceServicer_to_server(llm, llm_server)
+    llm_port = llm_server.add_insecure_port("127.0.0.1:0")
+    await llm_server.start()
+
+    service = _make_service(llm_port)
+    threads_before, rss_before = threading.active_count(), _rss_mb()
+
+    if mode == "thread":
+        pool = futures.ThreadPoolExecutor(max_workers=WORKFLOW_THREADS)
+        server = grpc.server(pool)
+        agent_pb2_grpc.add_AgentServiceServicer_to_server(service, server)
+        port = server.add_insecure_port("127.0.0.1:0")
+        server.start()
+        replies, wall, peaks = await _burst(port, queries)
+        server.stop(None).wait()
+        pool.shutdown()
+    else:
+        server, servicer = await create_aio_server(
+            service, max_concurrent_queries=WORKFLOW_THREADS, max_pending_queries=queries
+        )
+        port = server.add_insecure_port("127.0.0.1:0")
+        await server.start()
+        replies, wall, peaks = await _burst(port, queries)
+        await server.stop(None)
+        servicer.shutdown()
+
+    await llm_server.stop(None)
+    assert all(reply.final_answer == "Cats nap a lot." for reply in replies)
+    return {
+        "wall_s": wall,
+        "qps": queries / wall,
+        "peak_llm_concurrency": llm.peak,
+        "threads_added": peaks["threads"] - threads_before,
+        "rss_growth_mb": peaks["rss_mb"] - rss_before,
+        "llm_calls": llm.calls,
+    }
+
+
+@pytest.mark.benchmark
+def test_async_mode_matches_thread_mode(bench_scale, bench_report):
+    queries = int(64 * bench_scale)
+    threaded = asyncio.run(_run("thread", queries))
+    aio = asyncio.run(_run("async", queries))
+
+    bench_report("orchestrator_thread_mode", queries=queries, threads=WORKFLOW_THREADS, **threaded)
+    bench_report("orchestrator_async_mode", queries=queries, threads=WORKFLOW_THREADS, **aio,
+                 wall_ratio=aio["wall_s"] / threaded["wall_s"])
+
+    # Same thread budget, same cap on running workflows
+    assert threaded["peak_llm_concurrency"] <= WORKFLOW_THREADS
+    assert aio["peak_llm_concurrency"] <= WORKFLOW_THREADS
+    assert aio["threads_added"] <= WORKFLOW_THREADS + 2  # + gRPC channel polling threads
+    # Waiting queries are coroutines: no per-query memory growth
+    assert aio["rss_growth_mb"] < 64
+    # The event loop and admission add no meaningful overhead
+    assert aio["wall_s"] < threaded["wall_s"] * 1.25
+
+
+@pytest.mark.benchmark
+def test_overload_is_rejected_not_queued(bench_report):
+    async def scenario():
+        llm = StubLLM()
+        llm_server = grpc.aio.server()
+        llm_pb2_grpc.add_LLMServiceServicer_to_server(llm, llm_server)
+        llm_port = llm_server.add_insecure_port("127.0.0.1:0")
+        await llm_server.start()
+
+        server, servicer = await create_aio_server(
+            _make_service(llm_port), max_concurrent_queries=4, max_pending_queries=12
+        )
+        port = server.add_insecure_port("127.0.0.1:0")
+        await server.start()
+        async with grpc.aio.insecure_channel(f"127.0.0.1:{port}") as channel:
+            stub = agent_pb2_grpc.AgentServiceStub(channel)
+            results = await asyncio.gather(*(
+                stub.QueryAgent(agent_pb2.AgentRequest(user_query="tell me a joke about cats"))
+                for _ in range(48)
+            ), return_exceptions=True)
+        stats = servicer.limiter.stats()
+        await server.stop(None)
+        servicer.shutdown()
+        await llm_server.stop(None)
+        return results, stats
+
+    results, stats = asyncio.run(scenario())
+    rejected = [r for r in results if isinstance(r, grpc.aio.AioRpcError)]
+    bench_report("orchestrator_overload", sent=len(results), admitted=stats["admitted"],
+                 rejected=len(rejected), peak_in_flight=stats["peak_in_flight"])
+
+    assert all(r.code() == grpc.StatusCode.RESOURCE_EXHAUSTED for r in rejected)
+    assert stats["peak_in_flight"] <= 4 + 12
+    assert stats["admitted"] + len(rejected) == 48 and len(rejected) > 0
@@ -0,0 +1,91 @@
+"""
+Benchmark: BankService queries on the columnar transaction store.
+
+Generates synthetic CIBC CSV exports, loads them through the real adapter
+and times the hot dashboard queries. BENCH_SCALE=10 runs the full 1M-row
+set (loading alone takes about a minute).
+
+Latency targets (per call, 1M rows):
+- pagination, filtered and sorted (category + date range, page 1): < 50 ms
+- summaries (monthly over a date range, whole-set categories): < 50 ms
+"""
+
+import asyncio
+import csv
+import random
+import time
+
+import pytest
+
+from dashboard_service.bank_service import BankService
+
+DESCRIPTIONS = [
+    "TIM HORTONS #1234 TORONTO ON", "AMAZON.CA*AB12 WWW.AMAZON.CA",
+    "UBER CANADA/UBERTRIP TORONTO", "LOBLAWS 1012", "PAYMENT THANK YOU",
+    "NETFLIX.COM", "SHELL C12345", "STARBUCKS 0422", "E-TRANSFER SENT",
+    "ROGERS *WIRELESS", "SPOTIFY P1234", "COSTCO WHOLESALE W530",
+]
+
+TARGET_MS = 50.0
+
+
+def _write_csvs(directory, n_rows: int) -> None:
+    rng = random.Random(42)
+    per_file = n_rows // 4
+    for index in range(4):
+        account = "chq" if index % 2 else "credit"
+        with open(directory / f"cibc_{account}_{index}.csv", "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["Date", "Description", "Amount", "Payment", "Card"])
+            for i in range(per_file):
+                date = f"20{rng.randint(15, 24)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+                amount = f"{rng.uniform(1, 900):.2f}"
+                debit = rng.random() < 0.85
+                writer.writerow([
+                    date,
+                    f"{rng.choice(DESCRIPTIONS)} {index}-{i}",
+                    amount if debit else "",
+                    "" if debit else amount,
+                    f"4500********{index:04d}",
+                ])
+
+
+def _best_ms(fn, repeats: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        asyncio.run(fn())
+        best = min(best, (time.perf_counter() - start) * 1000)
+    return best
+
+
+@pytest.mark.benchmark
+def test_bank_store_latency(tmp_path, bench_scale, bench_report):
+    n_rows = int(100_000 * bench_scale)
+    _write_csvs(tmp_path, n_rows)
+
+    service = BankService(data_dir=str(tmp_path))
+    start = time.perf_counter()
+    asyncio.run(service._ensure_loaded())
+    load_s = time.perf_counter() - start
+    category = service._transactions[0]["spending_category"]
+
+    timings = {
+        "page_unfiltered_ms": _best_ms(lambda: service.get_transactions(page=3)),
+        "page_filtered_ms": _best_ms(lambda: service.get_transactions(
+            category=category, date_from="2019-01-01", date_to="2021-06-30", page=1,
+        )),
+        "page_sorted_ms": _best_ms(lambda: service.get_transactions(
+            category=category, date_from="2019-01-01", sort="amount", page=1,
+        )),
+        "summary_month_range_ms": _best_ms(lambda: service.get_summary(
+            group_by="month", date_from="2018-03-15", date_to="2022-09-10",
+        )),
+        "summary_category_ms": _best_ms(lambda: service.get_summary()),
+        "categories_ms": _best_ms(lambda: service.get_categories()),
+    }
+
+    bench_report("bank_store", rows=len(service._transactions), load_s=load_s, **timings)
+
+    for name, elapsed_ms in timings.items():
+        assert elapsed_ms < TARGET_MS, name
@@ -0,0 +1,110 @@
+"""
+Benchmark: GenerateBatch with k=5 samples of a long prompt.
+
+The stub model charges a fixed cost per evaluated token and, like
+llama_cpp.Llama.generate(), only evaluates what differs from its current
+context. A long request from another client holds one of the two active
+slots, so each sample is admitted after a turn of that request: when
+samples are submitted independently the model holds the other client's
+context and the whole prompt is evaluated again for every sample. A
+prompt-sharing batch evaluates it once and branches every sample from the
+saved state. BENCH_SCALE scales the prompt length.
+"""
+
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from llm_service.scheduler import GenerationRequest, LlamaDecodeBackend, RequestScheduler
+
+EVAL_COST_S = 0.00002  # per evaluated token
+SAMPLES = 5
+SAMPLE_TOKENS = 24
+
+
+class TimedStubLlama:
+    def __init__(self):
+        self.input_ids = []
+        self.n_tokens = 0
+        self.evaluated = 0
+        self._sampler = None
+
+    def tokenize(self, text, add_bos=True, special=False):
+        return list(text)
+
+    def detokenize(self, tokens):
+        return bytes(tokens)
+
+    def token_eos(self):
+        return 0
+
+    def set_seed(self, seed):
+        pass
+
+    def save_state(self):
+        return SimpleNamespace(input_ids=list(self.input_ids[:self.n_tokens]))
+
+    def load_state(self, state):
+        self.input_ids = list(state.input_ids)
+        self.n_tokens = len(state.input_ids)
+
+    def generate(self, tokens, reset=True, **kwargs):
+        self._sampler = object()
+        if reset and self.n_tokens > 0:
+            longest = 0
+            for a, b in zip(self.input_ids[:self.n_tokens], tokens[:-1]):
+                if a != b:
+                    break
+                longest += 1
+            tokens = tokens[longest:]
+            self.n_tokens = longest
+        while True:
+            time.sleep(EVAL_COST_S * len(tokens))
+            self.evaluated += len(tokens)
+            self.input_ids = self.input_ids[:self.n_tokens] + list(tokens)
+            self.n_tokens = len(self.input_ids)
+            yield 97
+            tokens = [97]
+
+
+def _run_batch(prompt: str, shared: bool):
+    model = TimedStubLlama()
+    scheduler = RequestScheduler(
+        LlamaDecodeBackend(lambda: model), max_active=2, tokens_per_turn=4
+    ).start()
+    try:
+        other = scheduler.submit(GenerationRequest(prompt="other client " * 20, max_tokens=10_000))
+        request = GenerationRequest(prompt=prompt, max_tokens=SAMPLE_TOKENS, temperature=0.7)
+        start = time.perf_counter()
+        if shared:
+            handles = scheduler.submit_batch(request, SAMPLES)
+        else:
+            handles = [scheduler.submit(request) for _ in range(SAMPLES)]
+        responses = [handle.result() for handle in handles]
+        elapsed = time.perf_counter() - start
+        other.cancel()
+    finally:
+        scheduler.shutdown()
+    assert all(len(r) == SAMPLE_TOKENS for r in responses)
+    return elapsed, model.evaluated
+
+
+@pytest.mark.benchmark
+def test_batch_sampling_speedup(bench_scale, bench_report):
+    prompt = "You are a helpful assistant. " * int(50 * bench_scale)
+
+    independent_s, independent_tokens = _run_batch(prompt, shared=False)
+    shared_s, shared_tokens = _run_batch(prompt, shared=True)
+
+    bench_report(
+        "batch_sampling_k5",
+        prompt_tokens=len(prompt),
+        independent_s=independent_s,
+        shared_s=shared_s,
+        speedup=independent_s / shared_s,
+        evaluated_independent=independent_tokens,
+        evaluated_shared=shared_tokens,
+    )
+    assert shared_tokens < independent_tokens
+    assert shared_s < independent_s
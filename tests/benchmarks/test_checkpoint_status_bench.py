@@ -0,0 +1,83 @@
+"""
+Benchmark: concurrent thread-status writes in CheckpointManager.
+
+Ten request threads each mark their conversation incomplete, then complete,
+as QueryAgent does per request. Baseline is the previous behaviour (a new
+connection and a commit per update); the pooled manager buffers the updates
+and group-commits them from a single writer. BENCH_SCALE scales the number
+of requests per thread.
+"""
+
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from core.checkpointing import CheckpointManager
+
+THREADS = 10
+
+
+def _connect_per_update(db_path: str, thread_id: str, status: str) -> None:
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        conn.execute(
+            "INSERT OR REPLACE INTO thread_status (thread_id, status, last_updated) "
+            "VALUES (?, ?, datetime('now'))",
+            (thread_id, status),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _run(requests: int, mark) -> float:
+    barrier = threading.Barrier(THREADS)
+
+    def worker(n: int) -> None:
+        barrier.wait()
+        for i in range(requests):
+            thread_id = f"w{n}-r{i}"
+            mark(thread_id, "incomplete")
+            mark(thread_id, "complete")
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(THREADS)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+
+@pytest.mark.benchmark
+def test_concurrent_status_writes(tmp_path, bench_scale, bench_report):
+    requests = int(100 * bench_scale)
+    updates = THREADS * requests * 2
+
+    baseline_db = str(tmp_path / "baseline.sqlite")
+    CheckpointManager(baseline_db).close()
+    baseline_s = _run(requests, lambda tid, status: _connect_per_update(baseline_db, tid, status))
+
+    pooled_db = str(tmp_path / "pooled.sqlite")
+    manager = CheckpointManager(pooled_db)
+    marks = {"incomplete": manager.mark_thread_incomplete, "complete": manager.mark_thread_complete}
+    pooled_s = _run(requests, lambda tid, status: marks[status](tid))
+    manager.flush_thread_status()
+    commits = manager._status_writer.commits
+
+    assert manager.get_incomplete_threads(older_than_minutes=-1) == []
+    conn = sqlite3.connect(pooled_db)
+    assert conn.execute("SELECT COUNT(*) FROM thread_status").fetchone()[0] == THREADS * requests
+    conn.close()
+    manager.close()
+
+    bench_report(
+        "checkpoint_status_writes", threads=THREADS, updates=updates,
+        baseline_s=baseline_s, pooled_s=pooled_s,
+        baseline_updates_per_s=updates / baseline_s,
+        pooled_updates_per_s=updates / pooled_s,
+        group_commits=commits,
+    )
+    assert pooled_s < baseline_s
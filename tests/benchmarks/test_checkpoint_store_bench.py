@@ -0,0 +1,79 @@
+"""
+Benchmark: database size of compressed checkpoints with retention.
+
+Writes synthetic agent checkpoints (a growing conversation per thread, as
+each turn checkpoints the full message history) through a plain SqliteSaver
+and through CheckpointManager's compressed checkpointer, then applies a
+retention pass. BENCH_SCALE=10 writes the full 10k checkpoints.
+"""
+
+import os
+import sqlite3
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+from core.checkpoint_store import RetentionPolicy
+from core.checkpointing import CheckpointManager
+
+THREADS = 50
+
+
+def _write(saver, count: int) -> None:
+    parents = {}
+    history = {}
+    for i in range(count):
+        thread_id = f"thread-{i % THREADS}"
+        messages = history.setdefault(thread_id, [])
+        messages.append(HumanMessage(content=f"Turn {i}: how much did I spend on groceries last week?"))
+        messages.append(AIMessage(content=f"You spent ${i % 300}.42 across {i % 7 + 1} grocery transactions."))
+        checkpoint = empty_checkpoint()
+        checkpoint["channel_values"] = {"messages": list(messages), "conversation_id": thread_id}
+        config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+        if thread_id in parents:
+            config["configurable"]["checkpoint_id"] = parents[thread_id]
+        parents[thread_id] = saver.put(config, checkpoint, {"step": len(messages)}, {})[
+            "configurable"]["checkpoint_id"]
+
+
+def _size(path: str) -> int:
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.execute("VACUUM")
+    conn.close()
+    return os.path.getsize(path)
+
+
+@pytest.mark.benchmark
+def test_checkpoint_db_size(tmp_path, bench_scale, bench_report):
+    count = int(1_000 * bench_scale)
+
+    plain_path = str(tmp_path / "plain.sqlite")
+    conn = sqlite3.connect(plain_path, check_same_thread=False)
+    _write(SqliteSaver(conn), count)
+    conn.close()
+    plain_bytes = _size(plain_path)
+
+    compressed_path = str(tmp_path / "compressed.sqlite")
+    manager = CheckpointManager(
+        compressed_path,
+        retention=RetentionPolicy(max_checkpoints_per_thread=10, interval_seconds=3600),
+    )
+    _write(manager.create_checkpointer(), count)
+    compressed_bytes = _size(compressed_path)
+
+    result = manager.compact()
+    manager.close()
+    retained_bytes = _size(compressed_path)
+
+    bench_report(
+        "checkpoint_db_size", checkpoints=count,
+        plain_mb=plain_bytes / 2**20, compressed_mb=compressed_bytes / 2**20,
+        retained_mb=retained_bytes / 2**20, deleted=result["deleted"],
+        compression_ratio=plain_bytes / compressed_bytes,
+    )
+    assert compressed_bytes < plain_bytes / 2
+    assert result["deleted"] == count - THREADS * 10
+    assert retained_bytes < compressed_bytes
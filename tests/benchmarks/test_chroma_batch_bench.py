@@ -0,0 +1,79 @@
+"""
+Benchmark: batched vs per-document ingestion into chroma_service.
+
+Ingests text chunks through the servicer into an in-memory Chroma
+collection with the service's MiniLM embedder, once with one AddDocument
+call per chunk and once with AddDocuments batches. BENCH_SCALE=10 runs the
+full 50k chunks. Needs chromadb and sentence-transformers (the
+chroma_service requirements); skipped otherwise.
+"""
+
+import random
+import time
+import uuid
+from unittest.mock import Mock
+
+import pytest
+
+chromadb = pytest.importorskip("chromadb")
+pytest.importorskip("sentence_transformers")
+
+from chroma_service import chroma_pb2
+from chroma_service.chroma_service import ChromaService, ChromaServiceServicer
+
+WORDS = (
+    "budget invoice summary meeting notes travel itinerary recipe workout "
+    "quarterly revenue forecast deployment incident review roadmap design"
+).split()
+
+
+def _chunks(n: int):
+    rng = random.Random(3)
+    return [
+        chroma_pb2.Document(
+            id=f"chunk-{i}",
+            text=" ".join(rng.choice(WORDS) for _ in range(60)),
+            metadata={"source": "bulk", "conversation_id": f"t{i % 50}"},
+        )
+        for i in range(n)
+    ]
+
+
+def _servicer(embedder):
+    collection = chromadb.EphemeralClient().create_collection(
+        name=f"bench_{uuid.uuid4().hex[:8]}", metadata={"hnsw:space": "cosine"}
+    )
+    return ChromaServiceServicer(ChromaService(collection=collection, embedder=embedder))
+
+
+@pytest.mark.benchmark
+def test_batched_ingest_throughput(bench_scale, bench_report):
+    from chromadb.utils.embedding_functions import SentenceTransformerEmbeddingFunction
+
+    embedder = SentenceTransformerEmbeddingFunction(
+        model_name="sentence-transformers/all-MiniLM-L6-v2"
+    )
+    documents = _chunks(int(5_000 * bench_scale))
+
+    servicer = _servicer(embedder)
+    start = time.perf_counter()
+    for document in documents:
+        servicer.AddDocument(chroma_pb2.AddDocumentRequest(document=document), Mock())
+    single_s = time.perf_counter() - start
+
+    servicer = _servicer(embedder)
+    start = time.perf_counter()
+    for offset in range(0, len(documents), 256):
+        servicer.AddDocuments(
+            chroma_pb2.BatchDocumentsRequest(documents=documents[offset:offset + 256]), Mock()
+        )
+    batched_s = time.perf_counter() - start
+
+    assert servicer.chroma.collection.count() == len(documents)
+    bench_report(
+        "chroma_batch_ingest", chunks=len(documents),
+        per_document_s=single_s, batched_s=batched_s,
+        per_document_docs_per_s=len(documents) / single_s,
+        batched_docs_per_s=len(documents) / batched_s,
+    )
+    assert batched_s < single_s
@@ -0,0 +1,65 @@
+"""
+Benchmark: incremental CIBC CSV ingestion.
+
+Times a cold ingest of synthetic exports, a restart served from the on-disk
+cache, and a re-ingest after appending one row. BENCH_SCALE=10 runs 1M rows.
+"""
+
+import csv
+import time
+
+import pytest
+
+from shared.adapters.finance.cibc import CIBCAdapter, PARSER_VERSION, _row_context
+from shared.adapters.finance.csv_ingest import CSVIngestor
+
+
+def _write_csv(path, n_rows: int) -> None:
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(["Date", "Description", "Amount", "Payment", "Card"])
+        for i in range(n_rows):
+            writer.writerow([f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}",
+                             f"AMAZON.CA*{i}", f"{1 + i % 500}.99", "", "4500********1234"])
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+@pytest.mark.benchmark
+def test_append_costs_one_row(tmp_path, bench_scale, bench_report):
+    n_rows = int(100_000 * bench_scale)
+    bank = tmp_path / "bank"
+    bank.mkdir()
+    path = bank / "cibc_credit.csv"
+    _write_csv(path, n_rows)
+
+    parse_row = CIBCAdapter()._parse_row
+    cache_path = str(tmp_path / "cache.db")
+
+    def new_ingestor():
+        return CSVIngestor(str(bank), parse_row, _row_context,
+                           cache_path=cache_path, parser_version=PARSER_VERSION)
+
+    ingestor = new_ingestor()
+    cold, cold_ms = _timed(ingestor.ingest)
+    ingestor.close()
+
+    restarted = new_ingestor()
+    _, restart_ms = _timed(restarted.ingest)
+
+    with open(path, "a", newline="") as f:
+        f.write("2025-01-01,NEW ROW,9.99,,4500********1234\n")
+    appended, append_ms = _timed(restarted.ingest)
+
+    bench_report(
+        "cibc_ingest", rows=n_rows,
+        cold_ms=cold_ms, restart_from_cache_ms=restart_ms, append_one_row_ms=append_ms,
+    )
+
+    assert cold.parsed_rows == n_rows
+    assert appended.parsed_rows == 1 and len(appended.records) == n_rows + 1
+    assert append_ms < cold_ms / 10
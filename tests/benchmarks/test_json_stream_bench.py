@@ -0,0 +1,76 @@
+"""
+Benchmark: JSON validation of a streamed 8k-token generation.
+
+Baseline is the previous Generate loop, which re-parsed the whole
+accumulated output with json.loads() after every token; the incremental
+validator scans each token once. Tokens are ~4 characters, as for a
+llama.cpp tokenizer on JSON. BENCH_SCALE scales the output length.
+"""
+
+import json
+import time
+
+import pytest
+
+from llm_service.json_stream import JSONStreamValidator
+
+CHARS_PER_TOKEN = 4
+
+
+def _output(tokens: int) -> str:
+    rows = []
+    document = {"tool_calls": rows, "content": ""}
+    while len(json.dumps(document, indent=2)) < tokens * CHARS_PER_TOKEN:
+        rows.append({
+            "name": "finance_query",
+            "arguments": {"account": len(rows), "query": "monthly spend by category", "limit": 25},
+            "score": 0.875,
+        })
+    return json.dumps(document, indent=2)
+
+
+def _tokens(text: str):
+    return [text[i:i + CHARS_PER_TOKEN] for i in range(0, len(text), CHARS_PER_TOKEN)]
+
+
+def _reparse(tokens) -> bool:
+    buffer = ""
+    valid = False
+    for token in tokens:
+        buffer += token
+        try:
+            json.loads(buffer)
+            valid = True
+        except json.JSONDecodeError:
+            valid = False
+    return valid
+
+
+def _incremental(tokens) -> bool:
+    validator = JSONStreamValidator()
+    for token in tokens:
+        validator.feed(token)
+    return validator.complete
+
+
+@pytest.mark.benchmark
+def test_streaming_validation_8k_tokens(bench_scale, bench_report):
+    tokens = _tokens(_output(int(8192 * bench_scale)))
+
+    start = time.perf_counter()
+    assert _reparse(tokens)
+    reparse_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    assert _incremental(tokens)
+    incremental_s = time.perf_counter() - start
+
+    bench_report(
+        "json_stream_validation",
+        tokens=len(tokens),
+        reparse_s=reparse_s,
+        incremental_s=incremental_s,
+        per_token_us=incremental_s / len(tokens) * 1e6,
+        speedup=reparse_s / incremental_s,
+    )
+    assert incremental_s < reparse_s
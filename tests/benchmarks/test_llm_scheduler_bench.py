@@ -0,0 +1,172 @@
+"""
+Benchmark: short-request latency vs throughput in llm_service's scheduler.
+
+Long generations are queued ahead of short ones on a stub model. With a
+single active session (the old global-lock behaviour) a short request waits
+for every long request ahead of it; with time-sliced decoding its latency
+tracks its own length, but every session switch pays for a full
+Llama.save_state() of the outgoing session and load_state() of the
+incoming one.
+
+Costs are modelled on the compose default (Qwen2.5-3B Q5_K_M, n_batch=512,
+4 CPU threads) and run at TIME_SCALE of real time:
+
+- decode: REAL_TOKEN_COST_S per token
+- save_state: copies the n_batch x n_vocab float scores buffer into a new
+  array plus the used KV cache; load_state copies both back. Copy times
+  are calibrated on this machine (fresh-allocation copy for save, in-place
+  copy for load) and scaled linearly to those sizes.
+
+The sweep over tokens_per_turn reports throughput (efficiency = decode
+time / wall time) and short-request p99 in real-time seconds; the
+scheduler_tokens_per_turn default in llm_service/config.py is picked from
+it. Suspended states are not capped here (max_suspended bounds memory, not
+swap cost). BENCH_SCALE scales the long generations.
+"""
+
+import time
+
+import numpy as np
+import pytest
+
+from llm_service.config import LLMServiceConfig
+from llm_service.scheduler import GenerationRequest, LlamaDecodeBackend, RequestScheduler
+
+TIME_SCALE = 0.01  # benchmark seconds per real second
+REAL_TOKEN_COST_S = 0.075  # 3B Q5_K_M decode on 4 CPU threads
+N_BATCH = 512
+N_VOCAB = 151936  # Qwen2.5
+KV_BYTES_PER_TOKEN = 36 * 2 * 2 * 128 * 2  # layers x (k, v) x kv heads x head dim x f16
+SCORES_BYTES = N_BATCH * N_VOCAB * 4
+PROMPT_TOKENS = 512
+
+N_LONG, N_SHORT, SHORT_TOKENS = 4, 4, 8
+
+
+def _spend(seconds: float) -> None:
+    """Busy-wait (sleep() overshoots sub-millisecond costs by too much)."""
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def _copy_rates(sample_mb: int = 64):
+    """Seconds per byte for a fresh-allocation copy (save) and an in-place copy (load)."""
+    source = np.ones(sample_mb * 2**20 // 4, dtype=np.single)
+    target = np.empty_like(source)
+    save = load = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        source.copy()
+        save = min(save, time.perf_counter() - start)
+        start = time.perf_counter()
+        np.copyto(target, source)
+        load = min(load, time.perf_counter() - start)
+    return save / source.nbytes, load / source.nbytes
+
+
+class SwapCostStubLlama:
+    """Stub llama_cpp.Llama charging scaled decode and state save/load costs."""
+
+    save_rate = load_rate = 0.0  # seconds per byte, set by the benchmark
+
+    def __init__(self):
+        self._sampler = None
+        self.n_tokens = 0
+
+    def tokenize(self, text, add_bos=True, special=False):
+        return [97] * PROMPT_TOKENS
+
+    def detokenize(self, tokens):
+        return b"a" * len(tokens)
+
+    def token_eos(self):
+        return 0
+
+    def set_seed(self, seed):
+        pass
+
+    def _state_bytes(self):
+        return SCORES_BYTES + KV_BYTES_PER_TOKEN * self.n_tokens
+
+    def save_state(self):
+        _spend(self._state_bytes() * self.save_rate * TIME_SCALE)
+        return self.n_tokens
+
+    def load_state(self, state):
+        self.n_tokens = state
+        _spend(self._state_bytes() * self.load_rate * TIME_SCALE)
+
+    def generate(self, tokens, **kwargs):
+        self._sampler = object()
+        self.n_tokens = len(tokens)
+        while True:
+            _spend(REAL_TOKEN_COST_S * TIME_SCALE)
+            yield 97
+            self.n_tokens += 1
+
+
+def _run(max_active: int, tokens_per_turn: int, long_tokens: int) -> dict:
+    scheduler = RequestScheduler(
+        LlamaDecodeBackend(SwapCostStubLlama),
+        max_active=max_active,
+        tokens_per_turn=tokens_per_turn,
+        max_suspended=max_active - 1,
+    )
+    try:
+        longs = [
+            scheduler.submit(GenerationRequest(prompt="long", max_tokens=long_tokens))
+            for _ in range(N_LONG)
+        ]
+        shorts = [
+            scheduler.submit(GenerationRequest(prompt="short", max_tokens=SHORT_TOKENS))
+            for _ in range(N_SHORT)
+        ]
+        start = time.monotonic()
+        scheduler.start()
+        for handle in longs + shorts:
+            handle.result()
+        wall = max(h.finished_at for h in longs + shorts) - start
+        swaps = scheduler.stats()["swaps"]
+    finally:
+        scheduler.shutdown()
+
+    tokens = N_LONG * long_tokens + N_SHORT * SHORT_TOKENS
+    short_latency = sorted(h.finished_at - h.submitted_at for h in shorts)
+    return {
+        "efficiency": tokens * REAL_TOKEN_COST_S * TIME_SCALE / wall,
+        "tokens_per_s": tokens / (wall / TIME_SCALE),
+        "short_p99_s": short_latency[-1] / TIME_SCALE,
+        "swaps": swaps,
+    }
+
+
+@pytest.mark.benchmark
+def test_tokens_per_turn_sweep(bench_scale, bench_report):
+    SwapCostStubLlama.save_rate, SwapCostStubLlama.load_rate = _copy_rates()
+    swap_s = (SCORES_BYTES + KV_BYTES_PER_TOKEN * PROMPT_TOKENS) * (
+        SwapCostStubLlama.save_rate + SwapCostStubLlama.load_rate
+    )
+    long_tokens = int(200 * bench_scale)
+    active = N_LONG + N_SHORT
+
+    serialized = _run(1, 8, long_tokens)
+    bench_report("llm_scheduler_serialized", swap_s=swap_s,
+                 token_s=REAL_TOKEN_COST_S, **serialized)
+    results = {}
+    for tokens_per_turn in (1, 4, 8, 16, 32, 64):
+        results[tokens_per_turn] = _run(active, tokens_per_turn, long_tokens)
+        bench_report(f"llm_scheduler_tokens_per_turn_{tokens_per_turn}",
+                     **results[tokens_per_turn])
+
+    default = LLMServiceConfig.scheduler_tokens_per_turn
+    chosen = results[default]
+    # Serialized: every short request waits for all long generations
+    assert serialized["short_p99_s"] >= N_LONG * long_tokens * REAL_TOKEN_COST_S
+    assert serialized["swaps"] == 0
+    # Swap cost dominates small quanta
+    assert results[1]["efficiency"] < results[64]["efficiency"]
+    # The default keeps most of the serialized throughput and still cuts
+    # short-request latency by a large factor
+    assert chosen["efficiency"] >= 0.8 * serialized["efficiency"]
+    assert chosen["short_p99_s"] < serialized["short_p99_s"] / 2.5
@@ -0,0 +1,84 @@
+"""
+Benchmark: response cache hit rate on a replayed query log.
+
+Replays a synthetic agent query log: knowledge questions drawn with a
+Zipf-like skew (a few questions are asked very often) in varying case and
+punctuation, mixed with queries the cache must bypass (tool intents,
+time-sensitive, personal data, follow-ups). Reports the hit rate, the
+workflow runs avoided and the lookup overhead. BENCH_SCALE=10 replays
+100k queries.
+"""
+
+import random
+import time
+
+import pytest
+
+from orchestrator.intent_patterns import analyze_intent
+from orchestrator.response_cache import ResponseCache, cache_key_text
+
+TOPICS = [
+    "monad", "functor", "closure", "mutex", "deadlock", "b-tree", "bloom filter", "tcp handshake",
+    "dns", "raft consensus", "garbage collection", "tail call", "big o notation", "hash map",
+    "quicksort", "dependency injection", "event loop", "coroutine", "semaphore", "cap theorem",
+]
+TEMPLATES = [
+    "what is a {topic}", "explain {topic} simply", "how does {topic} work",
+    "define {topic}", "write python code for a {topic}",
+]
+BYPASS = [
+    "what's the weather like", "when should I leave for work", "what is on the news today",
+    "what is my account balance", "search for {topic} tutorials", "explain that again",
+    "what is the latest {topic} release",
+]
+
+
+def _variant(rng, text):
+    text = rng.choice([text, text.capitalize(), text.upper()])
+    return text + rng.choice(["", "?", "!", " ?"])
+
+
+def _query_log(n: int, bypass_share: float = 0.3):
+    rng = random.Random(11)
+    weights = [1 / (rank + 1) for rank in range(len(TOPICS))]
+    log = []
+    for _ in range(n):
+        topic = rng.choices(TOPICS, weights)[0]
+        template = rng.choice(BYPASS if rng.random() < bypass_share else TEMPLATES)
+        log.append(_variant(rng, template.format(topic=topic)))
+    return log
+
+
+@pytest.mark.benchmark
+def test_replay_hit_rate(bench_scale, bench_report):
+    log = _query_log(int(10_000 * bench_scale))
+    analyses = [analyze_intent(query) for query in log]
+    cache = ResponseCache(max_entries=10_000)
+
+    start = time.perf_counter()
+    decisions = []
+    for query, analysis in zip(log, analyses):
+        lookup = cache.lookup(query, analysis)
+        if lookup.decision == "miss":
+            cache.store(lookup, f"answer to {query}")
+        decisions.append(lookup)
+    elapsed = time.perf_counter() - start
+
+    stats = cache.stats()
+    cacheable = [
+        (analysis.category, cache_key_text(query))
+        for query, analysis in zip(log, analyses) if analysis.cache_bypass_reason is None
+    ]
+    bench_report(
+        "response_cache_replay", queries=len(log), hit_rate=stats["hit_rate"],
+        cacheable_hit_rate=stats["hit"] / max(len(cacheable), 1),
+        bypass_rate=stats["bypass"] / len(log), workflow_runs_avoided=stats["hit"],
+        lookup_us=elapsed / len(log) * 1e6,
+    )
+
+    # Every repeat of a cacheable question hits; bypassed queries never do
+    assert stats["miss"] == len(set(cacheable))
+    assert stats["hit"] == len(cacheable) - len(set(cacheable))
+    for lookup, analysis in zip(decisions, analyses):
+        assert (lookup.decision == "bypass") == (analysis.cache_bypass_reason is not None)
+    assert stats["hit_rate"] > 0.5
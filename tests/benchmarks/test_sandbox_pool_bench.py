@@ -0,0 +1,67 @@
+"""
+Benchmark: sandbox warm worker pool vs cold-start interpreter.
+
+Runs trivial snippets (the shape of math_solver / execute_code calls)
+through execute_in_sandbox with and without the pool and compares p50/p99
+latency. BENCH_SCALE=10 runs the full 1,000-snippet comparison.
+"""
+
+import statistics
+import time
+
+import pytest
+
+from sandbox_service.sandbox_service import SAFE_IMPORTS, execute_in_sandbox
+from sandbox_service.worker_pool import WorkerPool
+
+SNIPPETS = [
+    "print(2 + 2)",
+    "import math\nprint(math.sqrt(144))",
+    "print(sum(range(100)))",
+    "import statistics\nprint(statistics.mean([1, 2, 3]))",
+]
+
+
+def _latencies(n: int, pool) -> list:
+    latencies = []
+    for i in range(n):
+        start = time.perf_counter()
+        result = execute_in_sandbox(
+            code=SNIPPETS[i % len(SNIPPETS)],
+            language="python",
+            timeout_seconds=10,
+            memory_limit_mb=256,
+            allowed_imports=[],
+            environment={},
+            pool=pool,
+        )
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert result["exit_code"] == 0, result["error_message"]
+    return sorted(latencies)
+
+
+def _p(latencies: list, q: float) -> float:
+    return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+
+@pytest.mark.benchmark
+def test_pool_vs_cold_start_latency(bench_scale, bench_report):
+    n = int(100 * bench_scale)
+
+    cold = _latencies(n, pool=None)
+
+    pool = WorkerPool(size=2, memory_limit_mb=256, preload=SAFE_IMPORTS).start()
+    try:
+        warm = _latencies(n, pool=pool)
+    finally:
+        pool.shutdown()
+
+    bench_report(
+        "sandbox_pool",
+        snippets=n,
+        cold_p50_ms=_p(cold, 0.50), cold_p99_ms=_p(cold, 0.99),
+        warm_p50_ms=_p(warm, 0.50), warm_p99_ms=_p(warm, 0.99),
+        p50_speedup=statistics.median(cold) / statistics.median(warm),
+    )
+
+    assert _p(warm, 0.50) < _p(cold, 0.50) / 3
@@ -0,0 +1,70 @@
+"""
+Benchmark: concurrent tool fan-out in AgentWorkflow._tools_node.
+
+Three fake I/O-bound tools (stand-ins for web_search, fetch_context_sync and
+finance_query) sleep for different durations. Sequential execution costs the
+sum of their latencies; concurrent execution should track the slowest one.
+"""
+
+import time
+from typing import Any, Dict
+
+import pytest
+from unittest.mock import Mock
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from core.graph import AgentWorkflow
+from core.state import WorkflowConfig, create_initial_state
+from tools.registry import LocalToolRegistry
+
+LATENCIES = {"web_search": 0.20, "fetch_context_sync": 0.15, "finance_query": 0.30}
+
+
+def _sleeping_tool(name: str, delay: float):
+    def _tool(query: str) -> Dict[str, Any]:
+        """
+        Fake I/O-bound tool.
+
+        Args:
+            query (str): Ignored
+        """
+        time.sleep(delay)
+        return {"status": "success", "data": name}
+
+    _tool.__name__ = name
+    return _tool
+
+
+@pytest.mark.benchmark
+def test_wall_time_tracks_slowest_tool(bench_scale, bench_report):
+    registry = LocalToolRegistry()
+    latencies = {name: delay * bench_scale for name, delay in LATENCIES.items()}
+    for name, delay in latencies.items():
+        registry.register(_sleeping_tool(name, delay))
+
+    workflow = AgentWorkflow(registry, Mock(), WorkflowConfig())
+    state = create_initial_state("bench")
+    state["messages"] = [
+        HumanMessage(content="briefing"),
+        AIMessage(content="", additional_kwargs={"tool_calls": [
+            {"id": f"call_{i}", "function": {"name": name, "arguments": {"query": "q"}}}
+            for i, name in enumerate(latencies)
+        ]}),
+    ]
+
+    start = time.monotonic()
+    result = workflow._tools_node(state)
+    wall = time.monotonic() - start
+
+    slowest = max(latencies.values())
+    total = sum(latencies.values())
+    bench_report(
+        "tools_node_fanout",
+        wall_s=wall, slowest_s=slowest, sequential_s=total, speedup=total / wall,
+    )
+
+    assert len(result["messages"]) == 3
+    assert wall >= slowest
+    # Allow generous scheduling overhead, but stay well below the sum
+    assert wall < slowest + 0.5 * (total - slowest)
@@ -0,0 +1,173 @@
+"""
+Unit tests for the streaming QueryAgentStream RPC.
+
+Builds an OrchestratorService around a real AgentWorkflow driven by a fake
+LLM client, and checks event ordering plus that events reach the caller
+while generation is still in progress.
+"""
+
+import json
+import threading
+from types import SimpleNamespace
+from typing import Any, Dict
+from unittest.mock import Mock
+
+from core.graph import AgentWorkflow
+from core.state import WorkflowConfig
+from orchestrator.orchestrator_service import LLMEngineWrapper, OrchestratorService
+from shared.generated import agent_pb2
+from tools.registry import LocalToolRegistry
+
+EventType = agent_pb2.AgentEvent.EventType
+
+
+class FakeLLMClient:
+    """
+    Fake LLM client with a gated token stream.
+
+    generate_stream yields the first token, then blocks until release() is
+    called, so a test can prove the first event is delivered mid-generation.
+    """
+
+    def __init__(self, tokens, tool_call: Dict[str, Any] = None):
+        self.tokens = tokens
+        self.tool_call = tool_call
+        self.gate = threading.Event()
+        self.finished = threading.Event()
+
+    def release(self):
+        self.gate.set()
+
+    def generate(self, prompt, max_tokens=512, temperature=0.7, response_format=""):
+        if response_format == "json" and self.tool_call:
+            return json.dumps(self.tool_call)
+        return "".join(self.tokens)
+
+    def generate_stream(self, prompt, max_tokens=512, *, temperature=0.7):
+        for i, token in enumerate(self.tokens):
+            yield SimpleNamespace(token=token, is_final=False)
+            if i == 0:
+                self.gate.wait(timeout=5)
+        self.finished.set()
+        yield SimpleNamespace(token="", is_final=True)
+
+
+def _make_service(client: FakeLLMClient) -> OrchestratorService:
+    """Create an OrchestratorService without connecting to any backend."""
+    registry = LocalToolRegistry()
+
+    @registry.register
+    def math_solver(expression: str) -> Dict[str, Any]:
+        """
+        Evaluate an expression.
+
+        Args:
+            expression (str): Expression to evaluate
+        """
+        return {"status": "success", "result": 4}
+
+    engine = LLMEngineWrapper(client, max_tool_iterations=2)
+    workflow = AgentWorkflow(registry, engine, WorkflowConfig())
+
+    service = OrchestratorService.__new__(OrchestratorService)
+    service.config = SimpleNamespace(context_window=12)
+    service.observability_enabled = False
+    service.request_metrics = None
+    service.tool_metrics = None
+    service.pipeline_metrics = None
+    service.delegation_enabled = False
+    service.delegation_manager = None
+    service.response_cache = None
+    service.checkpoint_manager = Mock()
+    service.compiled_workflow = workflow.compile()
+    return service
+
+
+def _context():
+    context = Mock()
+    context.invocation_metadata.return_value = []
+    context.is_active.return_value = True
+    return context
+
+
+class TestQueryAgentStream:
+    """Tests for OrchestratorService.QueryAgentStream"""
+
+    def test_first_event_arrives_before_generation_completes(self):
+        client = FakeLLMClient(["Hello", " there", "!"])
+        service = _make_service(client)
+
+        stream = service.QueryAgentStream(
+            agent_pb2.AgentRequest(user_query="hey there"), _context()
+        )
+
+        first = next(stream)
+        assert first.type == EventType.TOKEN
+        assert first.content == "Hello"
+        assert not client.finished.is_set()
+
+        client.release()
+        rest = list(stream)
+
+        tokens = [first.content] + [e.content for e in rest if e.type == EventType.TOKEN]
+        assert tokens == ["Hello", " there", "!"]
+        final = rest[-1]
+        assert final.type == EventType.FINAL_ANSWER
+        assert final.content == "Hello there!"
+        assert json.loads(final.payload)["thread_id"]
+        assert [e.sequence for e in [first] + rest] == list(range(len(rest) + 1))
+
+    def test_tool_event_order(self):
+        client = FakeLLMClient(
+            ["The answer", " is 4."],
+            tool_call={"type": "tool_call", "tool": "math_solver",
+                       "arguments": {"expression": "2+2"}},
+        )
+        client.release()
+        service = _make_service(client)
+
+        events = list(service.QueryAgentStream(
+            agent_pb2.AgentRequest(user_query="calculate 2+2"), _context()
+        ))
+        types = [e.type for e in events]
+
+        start = types.index(EventType.TOOL_CALL_START)
+        end = types.index(EventType.TOOL_CALL_END)
+        first_validation = types.index(EventType.VALIDATION)
+        first_token = types.index(EventType.TOKEN)
+
+        assert start < end < first_validation < first_token
+        assert types[-1] == EventType.FINAL_ANSWER
+
+        assert events[start].tool_name == "math_solver"
+        assert json.loads(events[start].payload)["arguments"] == {"expression": "2+2"}
+        assert events[end].status == "success"
+        assert events[first_validation].status == "llm"
+
+        final = events[-1]
+        assert final.content == "The answer is 4."
+        sources = json.loads(final.payload)
+        assert sources["tools_used"] == [{"tool": "math_solver", "status": "success"}]
+
+    def test_error_event(self):
+        client = FakeLLMClient(["unused"])
+        service = _make_service(client)
+        service.checkpoint_manager.mark_thread_incomplete.side_effect = RuntimeError("db down")
+
+        events = list(service.QueryAgentStream(
+            agent_pb2.AgentRequest(user_query="hey"), _context()
+        ))
+
+        assert len(events) == 1
+        assert events[0].type == EventType.ERROR
+        assert json.loads(events[0].payload)["error"] == "db down"
+
+    def test_unary_path_does_not_stream(self):
+        client = Mock()
+        client.generate.return_value = "plain answer"
+        service = _make_service(client)
+
+        result = service._process_query("hey there", thread_id="t-1")
+
+        assert result["content"] == "plain answer"
+        client.generate_stream.assert_not_called()
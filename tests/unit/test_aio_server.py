@@ -0,0 +1,240 @@
+"""
+Unit tests for the grpc.aio orchestrator server.
+
+Serves an OrchestratorService (real AgentWorkflow, gated fake LLM client)
+on a grpc.aio server over localhost and checks that unary and streaming
+RPCs behave as in thread mode, and that QueryLimiter bounds running
+queries, queues the rest without threads, and pushes back with
+RESOURCE_EXHAUSTED / DEADLINE_EXCEEDED.
+"""
+
+import asyncio
+import json
+import threading
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+import grpc
+import pytest
+
+from core.graph import AgentWorkflow
+from core.state import WorkflowConfig
+from orchestrator.aio_server import create_aio_server
+from orchestrator.orchestrator_service import LLMEngineWrapper, OrchestratorService
+from shared.generated import agent_pb2, agent_pb2_grpc
+from shared.observability.grpc_interceptor import AsyncObservabilityServerInterceptor
+from shared.observability.tracing import get_correlation_id
+from tools.registry import LocalToolRegistry
+
+EventType = agent_pb2.AgentEvent.EventType
+
+QUERY = agent_pb2.AgentRequest(user_query="tell me a joke about cats")
+
+
+class GatedClient:
+    """Fake LLM client whose calls block until release()."""
+
+    def __init__(self, tokens=("Why", " not", "?"), open_gate=False):
+        self.tokens = list(tokens)
+        self.gate = threading.Event()
+        if open_gate:
+            self.gate.set()
+
+    def release(self):
+        self.gate.set()
+
+    def generate(self, prompt, max_tokens=512, temperature=0.7, response_format=""):
+        self.gate.wait(timeout=5)
+        return "".join(self.tokens)
+
+    def generate_stream(self, prompt, max_tokens=512, *, temperature=0.7):
+        self.gate.wait(timeout=5)
+        for token in self.tokens:
+            yield SimpleNamespace(token=token, is_final=False)
+        yield SimpleNamespace(token="", is_final=True)
+
+
+def _make_service(client) -> OrchestratorService:
+    engine = LLMEngineWrapper(client, max_tool_iterations=2)
+    workflow = AgentWorkflow(LocalToolRegistry(), engine, WorkflowConfig())
+
+    service = OrchestratorService.__new__(OrchestratorService)
+    service.config = SimpleNamespace(context_window=12)
+    service.observability_enabled = False
+    service.request_metrics = None
+    service.tool_metrics = None
+    service.pipeline_metrics = None
+    service.delegation_enabled = False
+    service.delegation_manager = None
+    service.response_cache = None
+    service.checkpoint_manager = Mock()
+    service.compiled_workflow = workflow.compile()
+    return service
+
+
+@asynccontextmanager
+async def _serving(service, interceptors=None, **limits):
+    server, servicer = await create_aio_server(service, interceptors=interceptors, **limits)
+    port = server.add_insecure_port("127.0.0.1:0")
+    await server.start()
+    channel = grpc.aio.insecure_channel(f"127.0.0.1:{port}")
+    try:
+        yield agent_pb2_grpc.AgentServiceStub(channel), servicer
+    finally:
+        await channel.close()
+        await server.stop(None)
+        servicer.shutdown()
+
+
+async def _until(predicate, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "condition not reached"
+        await asyncio.sleep(0.01)
+
+
+class TestServicerSemantics:
+    def test_query_agent(self):
+        async def scenario():
+            async with _serving(_make_service(GatedClient(open_gate=True))) as (stub, _):
+                return await stub.QueryAgent(QUERY, metadata=(("thread-id", "t-9"),))
+
+        reply = asyncio.run(scenario())
+        assert reply.final_answer == "Why not?"
+        assert json.loads(reply.sources)["thread_id"] == "t-9"
+
+    def test_query_agent_stream(self):
+        async def scenario():
+            async with _serving(_make_service(GatedClient(open_gate=True))) as (stub, _):
+                return [event async for event in stub.QueryAgentStream(QUERY)]
+
+        events = asyncio.run(scenario())
+        assert [e.content for e in events if e.type == EventType.TOKEN] == ["Why", " not", "?"]
+        assert events[-1].type == EventType.FINAL_ANSWER
+        assert [e.sequence for e in events] == list(range(len(events)))
+
+    def test_workflow_error_sets_internal_status(self):
+        service = _make_service(GatedClient(open_gate=True))
+        service._process_query = Mock(side_effect=RuntimeError("boom"))
+
+        async def scenario():
+            async with _serving(service) as (stub, _):
+                with pytest.raises(grpc.aio.AioRpcError) as error:
+                    await stub.QueryAgent(QUERY)
+                return error.value
+
+        error = asyncio.run(scenario())
+        assert error.code() == grpc.StatusCode.INTERNAL
+        assert "Internal error" in error.details()
+
+    def test_observability_interceptor(self):
+        metrics = Mock()
+
+        async def scenario():
+            interceptors = [AsyncObservabilityServerInterceptor(metrics=metrics)]
+            async with _serving(_make_service(GatedClient(open_gate=True)), interceptors) as (stub, _):
+                await stub.QueryAgent(QUERY)
+
+        asyncio.run(scenario())
+        metrics.requests_total.add.assert_called_once_with(
+            1, {"method": "/agent.AgentService/QueryAgent", "type": "unary"}
+        )
+        duration_attributes = metrics.request_duration_ms.record.call_args.args[1]
+        assert duration_attributes["status"] == "ok"
+
+    def test_workflow_sees_request_context(self):
+        seen = []
+
+        class RecordingClient(GatedClient):
+            def generate(self, *args, **kwargs):
+                seen.append(get_correlation_id())
+                return super().generate(*args, **kwargs)
+
+        async def scenario():
+            interceptors = [AsyncObservabilityServerInterceptor(metrics=Mock())]
+            async with _serving(_make_service(RecordingClient(open_gate=True)), interceptors) as (stub, _):
+                await stub.QueryAgent(QUERY, metadata=(("x-correlation-id", "corr-42"),))
+
+        asyncio.run(scenario())
+        # The interceptor's correlation ID reaches the workflow thread
+        assert seen and set(seen) == {"corr-42"}
+
+
+class TestAdmission:
+    def test_waiting_queries_hold_no_thread(self):
+        client = GatedClient()
+
+        async def scenario():
+            async with _serving(_make_service(client), max_concurrent_queries=1,
+                                max_pending_queries=4) as (stub, servicer):
+                calls = [asyncio.ensure_future(stub.QueryAgent(QUERY)) for _ in range(3)]
+                await _until(lambda: servicer.limiter.pending == 2)
+                assert servicer.limiter.running == 1
+                assert len(servicer._executor._threads) == 1
+
+                client.release()
+                replies = await asyncio.gather(*calls)
+                return replies, servicer.limiter.stats()
+
+        replies, stats = asyncio.run(scenario())
+        assert all(reply.final_answer == "Why not?" for reply in replies)
+        assert stats["peak_in_flight"] == 3
+        assert (stats["running"], stats["pending"], stats["admitted"]) == (0, 0, 3)
+
+    def test_full_queue_is_rejected(self):
+        client = GatedClient()
+
+        async def scenario():
+            async with _serving(_make_service(client), max_concurrent_queries=1,
+                                max_pending_queries=1) as (stub, servicer):
+                calls = [asyncio.ensure_future(stub.QueryAgent(QUERY)) for _ in range(2)]
+                await _until(lambda: servicer.limiter.pending == 1)
+
+                with pytest.raises(grpc.aio.AioRpcError) as error:
+                    await stub.QueryAgent(QUERY)
+                client.release()
+                await asyncio.gather(*calls)
+                return error.value, servicer.limiter.stats()
+
+        error, stats = asyncio.run(scenario())
+        assert error.code() == grpc.StatusCode.RESOURCE_EXHAUSTED
+        assert stats["rejected"] == 1 and stats["admitted"] == 2
+
+    def test_deadline_passes_while_waiting(self):
+        client = GatedClient()
+
+        async def scenario():
+            async with _serving(_make_service(client), max_concurrent_queries=1) as (stub, servicer):
+                first = asyncio.ensure_future(stub.QueryAgent(QUERY))
+                await _until(lambda: servicer.limiter.running == 1)
+
+                with pytest.raises(grpc.aio.AioRpcError) as error:
+                    await stub.QueryAgent(QUERY, timeout=0.2)
+                await _until(lambda: servicer.limiter.pending == 0)
+                client.release()
+                await first
+                return error.value, servicer.limiter.stats()
+
+        error, stats = asyncio.run(scenario())
+        assert error.code() == grpc.StatusCode.DEADLINE_EXCEEDED
+        assert stats["admitted"] == 1
+
+    def test_cancelled_query_holds_slot_until_workflow_ends(self):
+        client = GatedClient()
+
+        async def scenario():
+            async with _serving(_make_service(client), max_concurrent_queries=1) as (stub, servicer):
+                call = stub.QueryAgent(QUERY)
+                task = asyncio.ensure_future(call)
+                await _until(lambda: servicer.limiter.running == 1)
+                call.cancel()
+                await asyncio.sleep(0.1)
+                still_running = servicer.limiter.running
+
+                client.release()
+                await _until(lambda: servicer.limiter.running == 0)
+                assert task.cancelled() or task.done()
+                return still_running
+
+        assert asyncio.run(scenario()) == 1
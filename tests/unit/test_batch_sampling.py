@@ -0,0 +1,196 @@
+"""
+Unit tests for prompt-sharing batch sampling in the LLM service scheduler.
+
+SeededLlama mimics llama_cpp.Llama's prefix reuse in generate() and counts
+how often a prompt is evaluated; its sampled tokens depend on the seed and
+the evaluated context, so branched samples can be compared with
+independently generated ones.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from llm_service.scheduler import (
+    GenerationRequest,
+    LlamaDecodeBackend,
+    RequestScheduler,
+    SchedulerOverloaded,
+)
+
+EOS = 0
+PROMPT = "Answer with one word. What colour is the sky on a clear day?"
+
+
+class SeededLlama:
+    def __init__(self):
+        self.input_ids = []
+        self.n_tokens = 0
+        self.evaluated = 0
+        self.prompt_evals = 0
+        self.seed = 0
+        self._sampler = None
+
+    def tokenize(self, text: bytes, add_bos: bool = True, special: bool = False):
+        return list(text)
+
+    def detokenize(self, tokens):
+        return bytes(tokens)
+
+    def token_eos(self):
+        return EOS
+
+    def set_seed(self, seed):
+        self.seed = seed
+
+    def save_state(self):
+        # Like llama_cpp.LlamaState, the seed is part of the saved state
+        return SimpleNamespace(input_ids=list(self.input_ids[:self.n_tokens]), seed=self.seed)
+
+    def load_state(self, state):
+        self.input_ids = list(state.input_ids)
+        self.n_tokens = len(state.input_ids)
+        self.seed = state.seed
+
+    def _eval(self, tokens):
+        if len(tokens) > 1:
+            self.prompt_evals += 1
+        self.evaluated += len(tokens)
+        self.input_ids = self.input_ids[:self.n_tokens] + list(tokens)
+        self.n_tokens = len(self.input_ids)
+
+    def generate(self, tokens, reset=True, **kwargs):
+        seed = self.seed
+        self._sampler = object()
+        if reset and self.n_tokens > 0:
+            longest = 0
+            for a, b in zip(self.input_ids[:self.n_tokens], tokens[:-1]):
+                if a != b:
+                    break
+                longest += 1
+            tokens = tokens[longest:]
+            self.n_tokens = longest
+        produced = 0
+        while True:
+            self._eval(tokens)
+            # Sample lengths vary with the seed so samples finish out of order
+            if produced >= 3 + seed % 4:
+                token = EOS
+            else:
+                token = 97 + (sum(self.input_ids) + 7 * seed) % 26
+            produced += 1
+            yield token
+            tokens = [token]
+
+
+@pytest.fixture
+def model():
+    return SeededLlama()
+
+
+@pytest.fixture
+def scheduler(model):
+    scheduler = RequestScheduler(LlamaDecodeBackend(lambda: model), tokens_per_turn=2).start()
+    yield scheduler
+    scheduler.shutdown()
+
+
+def _request(**kwargs):
+    return GenerationRequest(prompt=PROMPT, max_tokens=16, **kwargs)
+
+
+class TestSharedPrompt:
+    def test_prompt_evaluated_once_per_batch(self, scheduler, model):
+        handles = scheduler.submit_batch(_request(seed=1), num_samples=5)
+        responses = [handle.result() for handle in handles]
+
+        assert model.prompt_evals == 1
+        generated = sum(len(r) + 1 for r in responses)  # + EOS
+        # Prompt once, then one re-evaluated prompt token per extra sample
+        assert model.evaluated <= len(PROMPT) + 1 + 4 + generated
+
+    def test_samples_match_independent_generations(self, scheduler, model):
+        seeds = [3, 8, 13]
+        batch = [h.result() for h in scheduler.submit_batch(_request(), 3, seeds=seeds)]
+        independent = []
+        for seed in seeds:
+            # Replace the model's context so nothing is shared
+            scheduler.submit(GenerationRequest(prompt="reset " * 5, max_tokens=4)).result()
+            independent.append(scheduler.submit(_request(seed=seed)).result())
+
+        assert batch == independent
+        assert len(set(batch)) > 1
+
+    def test_default_seeds_follow_base_seed(self, scheduler):
+        handles = scheduler.submit_batch(_request(seed=40), num_samples=3)
+        assert [h.request.seed for h in handles] == [40, 41, 42]
+        assert [h.result() for h in handles] == [
+            h.result() for h in scheduler.submit_batch(_request(seed=40), num_samples=3)
+        ]
+
+    def test_unseeded_request_does_not_inherit_batch_seed(self, scheduler, model):
+        seeds = [40, 41, 42]
+        for handle in scheduler.submit_batch(_request(), 3, seeds=seeds):
+            handle.result()
+
+        used = []
+        for _ in range(2):
+            scheduler.submit(_request()).result()
+            used.append(model.seed)
+        assert not set(used) & set(seeds)
+        assert used[0] != used[1]
+
+    def test_shared_state_released(self, scheduler):
+        handles = scheduler.submit_batch(_request(seed=1), num_samples=4)
+        for handle in handles:
+            handle.result()
+        shared = handles[0].request.shared_prompt
+        assert shared.remaining == 0 and shared.state is None
+
+    def test_cancelled_first_sample_still_shares(self, model):
+        scheduler = RequestScheduler(LlamaDecodeBackend(lambda: model))
+        handles = scheduler.submit_batch(_request(seed=2), num_samples=3)
+        handles[0].cancel()  # before the worker admits it
+        scheduler.start()
+        try:
+            assert all(handle.result() for handle in handles[1:])
+        finally:
+            scheduler.shutdown()
+        assert model.prompt_evals == 1
+
+
+class TestBatchApi:
+    def test_done_callbacks_fire_in_completion_order(self, model):
+        scheduler = RequestScheduler(LlamaDecodeBackend(lambda: model), tokens_per_turn=2)
+        order = []
+        handles = scheduler.submit_batch(_request(), 4, seeds=[3, 0, 2, 1])
+        for i, handle in enumerate(handles):
+            handle.add_done_callback(lambda _, i=i: order.append(i))
+        scheduler.start()
+        try:
+            for handle in handles:
+                handle.result()
+        finally:
+            scheduler.shutdown()
+        # The shortest sample (seed 0) completes first, not in submit order
+        assert order[0] == 1
+        assert sorted(order) == [0, 1, 2, 3]
+
+    def test_callback_after_finish_runs_immediately(self, scheduler):
+        handle = scheduler.submit(_request(seed=1))
+        handle.result()
+        seen = []
+        handle.add_done_callback(seen.append)
+        assert seen == [handle]
+
+    def test_batch_rejected_as_a_whole(self, model):
+        scheduler = RequestScheduler(LlamaDecodeBackend(lambda: model), max_queue=3)
+        with pytest.raises(SchedulerOverloaded):
+            scheduler.submit_batch(_request(), num_samples=4)
+        assert scheduler.submit_batch(_request(), num_samples=3)
+
+    def test_invalid_arguments(self, scheduler):
+        with pytest.raises(ValueError):
+            scheduler.submit_batch(_request(), num_samples=0)
+        with pytest.raises(ValueError):
+            scheduler.submit_batch(_request(), num_samples=2, seeds=[1])
@@ -0,0 +1,77 @@
+"""
+Unit tests for the single-pass transaction categorizer.
+
+RuleMatcher must pick the same rule as trying COMPANY_MAPPINGS in order.
+"""
+
+import random
+
+import pytest
+
+from shared.adapters.finance.categorizer import (
+    COMPANY_MAPPINGS,
+    _COMPILED_MAPPINGS,
+    RuleMatcher,
+    categorize,
+    match_rule,
+)
+
+
+def ordered_match(description):
+    for index, (pattern, _, _, _) in enumerate(_COMPILED_MAPPINGS):
+        if pattern.search(description):
+            return index
+    return None
+
+
+FRAGMENTS = [
+    "UBER", "EATS", "TRIP", "AMZN", " Mktp", "amazon.ca", "AFFIRM", "SHELL",
+    "PAYMENT THANK YOU", "E-TRANSFER", "MACLAREN'S", "MACLARENS", "tim hortons",
+    "METRO 12", "COACH 5", "7-ELEVEN", "HYDRO OTTAWA", "THALI", "COCONUT",
+    "CASH ADVANCE", "BUILDING_STACK", " ", "#1234", "TORONTO ON", "Ünïcode", "K",
+]
+
+
+def random_description(rng):
+    return "".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 5)))
+
+
+class TestRuleMatcher:
+    def test_matches_ordered_loop(self):
+        rng = random.Random(11)
+        for _ in range(5000):
+            description = random_description(rng)
+            assert match_rule(description) == ordered_match(description), description
+
+    @pytest.mark.parametrize("description,company", [
+        # Earlier rule wins even though the later one matches further left
+        ("AFFIRM * UBER EATS", "Uber Eats"),
+        ("SHELL AMAZON.CA", "Amazon Marketplace"),
+        ("UBERTRIP", "Uber Trip"),
+        ("uber canada/ubereats", "Uber Eats"),
+        ("AMZN MKTP CA", "Amazon Marketplace"),
+        ("AMZNMKTP", "Amazon Marketplace"),
+        ("COACH STORE", "Other"),
+        ("", "Other"),
+    ])
+    def test_priority(self, description, company):
+        assert categorize(description)[0] == company
+
+    def test_rules_without_literal_prefix(self):
+        matcher = RuleMatcher([r"\d{4} FEE", "FEE", r"[AB]X"], cache_size=0)
+        assert matcher.match("X 1234 FEE") == 0
+        assert matcher.match("FEE 12") == 1
+        assert matcher.match("bx") == 2
+        assert matcher.match("nothing") is None
+
+    def test_non_ascii_text(self):
+        # The Kelvin sign folds to "k" under IGNORECASE
+        matcher = RuleMatcher(["PARK"], cache_size=0)
+        assert matcher.match("PAR\u212a") == 0
+        assert match_rule("Café TIM HORTONS") == ordered_match("Café TIM HORTONS")
+
+    def test_memo(self):
+        matcher = RuleMatcher([pattern for pattern, _, _, _ in COMPANY_MAPPINGS], cache_size=8)
+        for _ in range(3):
+            assert matcher.match("TIM HORTONS #12") == ordered_match("TIM HORTONS #12")
+        assert matcher.match.cache_info().hits == 2
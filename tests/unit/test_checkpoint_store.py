@@ -0,0 +1,240 @@
+"""
+Unit tests for compressed checkpoint storage, migration, integrity checks
+and retention (core/checkpoint_store.py via CheckpointManager).
+"""
+
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.graph import END, StateGraph
+
+from core.checkpoint_store import (
+    MAGIC,
+    RetentionPolicy,
+    check_blob,
+    checkpoint_time,
+    decode_blob,
+    encode_blob,
+)
+from core.checkpointing import CheckpointManager
+from core.state import AgentState, create_initial_state
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "agent_memory.sqlite")
+
+
+def _conversation(turns: int):
+    messages = []
+    for i in range(turns):
+        messages += [
+            HumanMessage(content=f"What is my balance for account {i}? " * 5, id=f"h{i}"),
+            AIMessage(
+                content="",
+                id=f"a{i}",
+                tool_calls=[{"name": "finance_query", "args": {"account": i}, "id": f"c{i}"}],
+            ),
+            ToolMessage(content='{"balance": %d.50}' % i, tool_call_id=f"c{i}", name="finance_query", id=f"t{i}"),
+            AIMessage(content=f"Account {i} has a balance of ${i}.50.", id=f"r{i}"),
+        ]
+    return messages
+
+
+def _put(saver, thread_id, messages, parent=None):
+    checkpoint = empty_checkpoint()
+    checkpoint["channel_values"] = {"messages": messages, "conversation_id": thread_id}
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    if parent:
+        config["configurable"]["checkpoint_id"] = parent
+    return saver.put(config, checkpoint, {"step": len(messages)}, {})
+
+
+def _rows(db_path, sql):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(sql).fetchall()
+    finally:
+        conn.close()
+
+
+class TestFormat:
+    def test_blob_round_trip(self):
+        for data in (b"", b"small", b"x" * 10_000, bytes(range(256)) * 4):
+            blob = encode_blob(data)
+            assert blob.startswith(MAGIC)
+            assert check_blob(blob) is None
+            assert decode_blob(blob) == data
+        assert len(encode_blob(b"x" * 10_000)) < 200
+
+    def test_legacy_blob_passes_through(self):
+        assert decode_blob(b"\x81\xa1a\x01") == b"\x81\xa1a\x01"
+        assert check_blob(b"\x81\xa1a\x01") is None
+        assert check_blob(b"") == "empty blob"
+
+    def test_corruption_detected_without_deserializing(self):
+        blob = bytearray(encode_blob(b"payload " * 100))
+        blob[-5] ^= 0xFF
+        assert check_blob(bytes(blob)) == "checksum mismatch"
+        with pytest.raises(ValueError):
+            decode_blob(bytes(blob))
+        assert check_blob(bytes(blob[:8])) == "truncated header"
+
+    def test_checkpoint_time_from_id(self):
+        checkpoint = empty_checkpoint()
+        created = checkpoint_time(checkpoint["id"])
+        assert abs(created - datetime.fromisoformat(checkpoint["ts"])) < timedelta(seconds=1)
+        assert checkpoint_time("not-a-uuid") is None
+
+
+class TestRoundTrip:
+    def test_agent_state_messages_survive(self, db_path):
+        manager = CheckpointManager(db_path)
+        saver = manager.create_checkpointer()
+
+        def respond(state):
+            return {"messages": _conversation(3)}
+
+        graph = StateGraph(AgentState)
+        graph.add_node("respond", respond)
+        graph.set_entry_point("respond")
+        graph.add_edge("respond", END)
+        app = graph.compile(checkpointer=saver)
+
+        config = {"configurable": {"thread_id": "conv-1"}}
+        state = create_initial_state("conv-1")
+        state["messages"] = [HumanMessage(content="hi", id="start")]
+        result = app.invoke(state, config)
+
+        restored = app.get_state(config).values
+        assert restored["messages"] == result["messages"]
+        assert restored["messages"][2].tool_calls[0]["args"] == {"account": 0}
+        assert isinstance(restored["messages"][3], ToolMessage)
+        assert restored["conversation_id"] == "conv-1"
+
+        blobs = _rows(db_path, "SELECT checkpoint FROM checkpoints")
+        assert blobs and all(blob.startswith(MAGIC) for (blob,) in blobs)
+        assert manager.validate_checkpoint_integrity("conv-1") == (True, None)
+        loaded = manager.load_checkpoint_state("conv-1")
+        assert loaded["channel_values"]["messages"] == result["messages"]
+        manager.close()
+
+
+class TestMigration:
+    def test_uncompressed_rows_migrated_in_place(self, db_path):
+        conn = sqlite3.connect(db_path, check_same_thread=False)
+        legacy = SqliteSaver(conn)
+        messages = _conversation(5)
+        config = _put(legacy, "old", messages)
+        legacy.put_writes(config, [("messages", [AIMessage(content="pending")])], "task-1")
+        expected = legacy.get_tuple({"configurable": {"thread_id": "old"}})
+
+        manager = CheckpointManager(db_path)
+        saver = manager.create_checkpointer()
+        # Legacy rows are readable before migration
+        assert saver.get_tuple({"configurable": {"thread_id": "old"}}).checkpoint == expected.checkpoint
+
+        manager._compactor.join(5)  # startup migration
+        assert all(blob.startswith(MAGIC) for (blob,) in _rows(db_path, "SELECT checkpoint FROM checkpoints"))
+        assert all(blob.startswith(MAGIC) for (blob,) in _rows(db_path, "SELECT value FROM writes"))
+        assert manager.migrate_checkpoints() == 0
+
+        migrated = saver.get_tuple({"configurable": {"thread_id": "old"}})
+        assert migrated.checkpoint == expected.checkpoint
+        assert migrated.pending_writes == expected.pending_writes
+        manager.close()
+        conn.close()
+
+
+class TestRetention:
+    def _manager(self, db_path, **policy):
+        manager = CheckpointManager(db_path, retention=RetentionPolicy(**policy))
+        return manager, manager.create_checkpointer()
+
+    def _fill(self, saver, threads=3, per_thread=10):
+        latest = {}
+        for t in range(threads):
+            parent = None
+            for i in range(per_thread):
+                config = _put(saver, f"t{t}", _conversation(i + 1), parent)
+                parent = config["configurable"]["checkpoint_id"]
+                saver.put_writes(config, [("messages", [AIMessage(content="w")])], f"task-{i}")
+            latest[f"t{t}"] = parent
+        return latest
+
+    def _counts(self, db_path):
+        return dict(_rows(db_path, "SELECT thread_id, COUNT(*) FROM checkpoints GROUP BY thread_id"))
+
+    def test_count_per_thread(self, db_path):
+        manager, saver = self._manager(db_path, max_checkpoints_per_thread=4)
+        latest = self._fill(saver)
+        result = manager.compact()
+        assert result["deleted"] == 18
+        assert self._counts(db_path) == {"t0": 4, "t1": 4, "t2": 4}
+        assert manager.get_thread_history("t1")[0]["checkpoint_id"] == latest["t1"]
+        # Pending writes of removed checkpoints are gone too
+        assert _rows(db_path, "SELECT COUNT(*) FROM writes")[0][0] == 12
+        manager.close()
+
+    def test_age_keeps_latest(self, db_path):
+        manager, saver = self._manager(db_path, max_age_days=1)
+        latest = self._fill(saver, threads=2, per_thread=3)
+        assert manager.compact()["deleted"] == 0
+        manager.compact(now=datetime.now(timezone.utc) + timedelta(days=2))
+        assert self._counts(db_path) == {"t0": 1, "t1": 1}
+        assert manager.validate_checkpoint_integrity("t0") == (True, None)
+        assert manager.get_thread_history("t0")[0]["checkpoint_id"] == latest["t0"]
+        manager.close()
+
+    def test_byte_budgets(self, db_path):
+        manager, saver = self._manager(db_path, max_bytes_per_thread=2_000)
+        self._fill(saver, threads=2, per_thread=10)
+        manager.compact()
+        sizes = _rows(
+            db_path,
+            "SELECT thread_id, SUM(length(checkpoint) + length(metadata)) FROM checkpoints GROUP BY thread_id",
+        )
+        counts = self._counts(db_path)
+        assert all(counts[t] < 10 for t in counts)
+        assert all(size <= 2_000 + 1_000 for _, size in sizes)
+        manager.close()
+
+    def test_total_budget_drops_oldest_first(self, db_path):
+        manager, saver = self._manager(db_path, max_total_bytes=1)
+        latest = self._fill(saver, threads=3, per_thread=5)
+        manager.compact()
+        # Only each thread's latest checkpoint survives an impossible budget
+        remaining = dict(_rows(db_path, "SELECT thread_id, checkpoint_id FROM checkpoints"))
+        assert remaining == latest
+        manager.close()
+
+    def test_background_compactor(self, db_path):
+        manager, saver = self._manager(db_path, max_checkpoints_per_thread=2, interval_seconds=0.02)
+        self._fill(saver, threads=1, per_thread=6)
+        deadline = datetime.now() + timedelta(seconds=3)
+        while self._counts(db_path)["t0"] > 2 and datetime.now() < deadline:
+            manager._stop.wait(0.02)
+        assert self._counts(db_path) == {"t0": 2}
+        manager.close()
+
+    def test_no_policy_keeps_everything(self, db_path):
+        manager = CheckpointManager(db_path)
+        saver = manager.create_checkpointer()
+        self._fill(saver, threads=1, per_thread=3)
+        assert manager.compact() == {"deleted": 0, "bytes_freed": 0}
+        assert self._counts(db_path) == {"t0": 3}
+        manager.close()
+
+
+def test_cleanup_old_threads_uses_checkpoint_age(db_path):
+    manager = CheckpointManager(db_path)
+    saver = manager.create_checkpointer()
+    _put(saver, "recent", _conversation(1))
+    assert manager.cleanup_old_threads(days=1) == 0
+    assert manager.cleanup_old_threads(days=-1) == 1
+    assert manager.list_threads() == []
+    manager.close()
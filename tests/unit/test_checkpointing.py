@@ -0,0 +1,131 @@
+"""
+Unit tests for CheckpointManager connection pooling and group-committed
+thread-status writes.
+"""
+
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from core.checkpointing import CheckpointManager, RecoveryManager
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "agent_memory.sqlite")
+
+
+def _statuses(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return dict(conn.execute("SELECT thread_id, status FROM thread_status"))
+    finally:
+        conn.close()
+
+
+class TestPooledConnections:
+    def test_connection_reused_per_thread(self, db_path):
+        manager = CheckpointManager(db_path)
+        with manager._get_connection() as first:
+            pass
+        with manager._get_connection() as second:
+            pass
+        assert first is second
+
+        other = []
+        thread = threading.Thread(
+            target=lambda: other.append(manager._get_connection().__enter__())
+        )
+        thread.start()
+        thread.join()
+        assert other[0] is not first
+        manager.close()
+
+    def test_failed_write_rolled_back(self, db_path):
+        manager = CheckpointManager(db_path)
+        with pytest.raises(RuntimeError):
+            with manager._get_connection() as conn:
+                conn.execute(
+                    "INSERT INTO thread_status VALUES ('t', 'incomplete', datetime('now'))"
+                )
+                raise RuntimeError("boom")
+        with manager._get_connection() as conn:
+            assert not conn.in_transaction
+        assert _statuses(db_path) == {}
+        manager.close()
+
+
+class TestGroupCommit:
+    def test_updates_committed_within_interval(self, db_path):
+        manager = CheckpointManager(db_path, status_flush_interval=0.02)
+        manager.mark_thread_incomplete("t1")
+        deadline = time.monotonic() + 2
+        while "t1" not in _statuses(db_path) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert _statuses(db_path) == {"t1": "incomplete"}
+        manager.close()
+
+    def test_updates_coalesced_last_status_wins(self, db_path):
+        manager = CheckpointManager(db_path, status_flush_interval=60)
+        commits = manager._status_writer.commits
+        for i in range(50):
+            manager.mark_thread_incomplete(f"t{i}")
+            manager.mark_thread_complete(f"t{i}")
+        manager.mark_thread_incomplete("t0")
+        manager.flush_thread_status()
+
+        assert manager._status_writer.commits == commits + 1
+        statuses = _statuses(db_path)
+        assert len(statuses) == 50
+        assert statuses["t0"] == "incomplete" and statuses["t1"] == "complete"
+        manager.close()
+
+    def test_close_flushes_pending(self, db_path):
+        manager = CheckpointManager(db_path, status_flush_interval=60)
+        manager.mark_thread_complete("t1")
+        manager.close()
+        assert _statuses(db_path) == {"t1": "complete"}
+        with pytest.raises(RuntimeError):
+            manager.mark_thread_complete("t2")
+
+
+class TestCrashRecovery:
+    def test_recovery_finds_interrupted_threads(self, db_path):
+        # A process marks two threads in flight, finishes one, then dies
+        # without closing the manager
+        crashed = CheckpointManager(db_path, status_flush_interval=0.02)
+        crashed.mark_thread_incomplete("done")
+        crashed.mark_thread_incomplete("interrupted")
+        crashed.mark_thread_complete("done")
+        time.sleep(0.2)  # Let the group commit land
+
+        restarted = CheckpointManager(db_path)
+        recovery = RecoveryManager(restarted)
+        # Negative age: treat every incomplete thread as stale
+        assert recovery.scan_for_crashed_threads(older_than_minutes=-1) == ["interrupted"]
+        # Recent threads are not reported as crashed yet
+        assert recovery.scan_for_crashed_threads(older_than_minutes=5) == []
+        crashed.close()
+        restarted.close()
+
+    def test_scan_sees_own_buffered_updates(self, db_path):
+        manager = CheckpointManager(db_path, status_flush_interval=60)
+        manager.mark_thread_incomplete("t1")
+        assert manager.get_incomplete_threads(older_than_minutes=-1) == ["t1"]
+        manager.mark_thread_complete("t1")
+        assert manager.get_incomplete_threads(older_than_minutes=-1) == []
+        manager.close()
+
+    def test_timestamps_compare_with_sqlite_now(self, db_path):
+        manager = CheckpointManager(db_path)
+        manager.mark_thread_incomplete("t1")
+        manager.flush_thread_status()
+        with manager._get_connection() as conn:
+            fresh = conn.execute(
+                "SELECT COUNT(*) FROM thread_status "
+                "WHERE last_updated > datetime('now', '-1 minutes')"
+            ).fetchone()[0]
+        assert fresh == 1
+        manager.close()
@@ -0,0 +1,308 @@
+"""
+Unit tests for chroma_service batch, filtered and multi-query RPCs and the
+embedding cache.
+
+The servicer runs over an in-memory collection and a deterministic
+embedder; ChromaClient is wired to it through a direct stub.
+"""
+
+import math
+from unittest.mock import Mock
+
+import grpc
+import pytest
+
+from chroma_service import chroma_pb2
+from chroma_service.chroma_service import ChromaService, ChromaServiceServicer
+from chroma_service.embedding_cache import EmbeddingCache
+from shared.clients.chroma_client import ChromaClient
+
+
+class FakeEmbedder:
+    """Bag-of-letters vectors; records every call."""
+
+    def __init__(self):
+        self.calls = []
+        self.texts = []
+
+    def __call__(self, texts):
+        self.calls.append(len(texts))
+        self.texts.extend(texts)
+        vectors = []
+        for text in texts:
+            vector = [0.0] * 26
+            for char in text.lower():
+                if "a" <= char <= "z":
+                    vector[ord(char) - 97] += 1.0
+            norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+            vectors.append([v / norm for v in vector])
+        return vectors
+
+
+def _matches(metadata, where):
+    if where is None:
+        return True
+    if "$and" in where:
+        return all(_matches(metadata, clause) for clause in where["$and"])
+    return all((metadata or {}).get(key) == value for key, value in where.items())
+
+
+class FakeCollection:
+    """In-memory stand-in for a cosine Chroma collection (equality/$and filters)."""
+
+    def __init__(self):
+        self.rows = {}
+
+    def add(self, ids, embeddings, documents, metadatas):
+        for doc_id in ids:
+            if doc_id in self.rows:
+                raise ValueError(f"Duplicate id {doc_id}")
+        self.upsert(ids, embeddings, documents, metadatas)
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        metadatas = metadatas or [None] * len(ids)
+        for row in zip(ids, embeddings, documents, metadatas):
+            self.rows[row[0]] = row[1:]
+
+    def delete(self, ids=None, where=None):
+        for doc_id, (_, _, metadata) in list(self.rows.items()):
+            if (ids is None or doc_id in ids) and _matches(metadata, where):
+                del self.rows[doc_id]
+
+    def query(self, query_embeddings, n_results, where, include):
+        result = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        for query in query_embeddings:
+            scored = sorted(
+                (1 - sum(a * b for a, b in zip(query, embedding)), doc_id, text, metadata)
+                for doc_id, (embedding, text, metadata) in self.rows.items()
+                if _matches(metadata, where)
+            )[:n_results]
+            result["ids"].append([row[1] for row in scored])
+            result["documents"].append([row[2] for row in scored])
+            result["metadatas"].append([row[3] for row in scored])
+            result["distances"].append([row[0] for row in scored])
+        return result
+
+
+class DirectStub:
+    """Calls servicer methods in-process, raising RpcError on abort."""
+
+    def __init__(self, servicer):
+        self.servicer = servicer
+
+    def __getattr__(self, name):
+        def call(request, **kwargs):
+            context = Mock()
+            context.abort.side_effect = lambda code, details: (_ for _ in ()).throw(
+                type("Aborted", (grpc.RpcError,), {
+                    "code": lambda self: code, "details": lambda self: details,
+                })()
+            )
+            return getattr(self.servicer, name)(request, context)
+        return call
+
+
+@pytest.fixture
+def chroma():
+    return ChromaService(collection=FakeCollection(), embedder=FakeEmbedder(), batch_size=4)
+
+
+@pytest.fixture
+def client(chroma):
+    client = ChromaClient()
+    client.stub = DirectStub(ChromaServiceServicer(chroma))
+    return client
+
+
+DOCS = [
+    {"id": "a1", "text": "apple banana", "metadata": {"conversation_id": "t1", "kind": "note"}},
+    {"id": "a2", "text": "banana bread", "metadata": {"conversation_id": "t1", "kind": "archive"}},
+    {"id": "b1", "text": "apple pie", "metadata": {"conversation_id": "t2", "kind": "note"}},
+    {"id": "b2", "text": "cherry tart", "metadata": {"conversation_id": "t2"}},
+    {"id": "c1", "text": "zucchini soup"},
+]
+
+
+class TestBatchWrites:
+    def test_add_documents_embeds_in_batches(self, client, chroma):
+        assert client.add_documents(DOCS)
+        assert len(chroma.collection.rows) == 5
+        assert chroma.embedder.calls == [4, 1]
+        assert chroma.collection.rows["a1"][2] == {"conversation_id": "t1", "kind": "note"}
+        assert chroma.collection.rows["c1"][2] is None
+
+    def test_add_duplicate_fails_upsert_overwrites(self, client, chroma):
+        client.add_documents(DOCS)
+        assert not client.add_documents([{"id": "a1", "text": "changed"}])
+        assert client.upsert_documents([{"id": "a1", "text": "changed"}])
+        assert chroma.collection.rows["a1"][1] == "changed"
+
+    def test_missing_id_rejected(self, client):
+        assert not client.add_documents([{"id": "", "text": "x"}])
+
+    def test_delete_by_ids_and_where(self, client, chroma):
+        client.add_documents(DOCS)
+        assert client.delete_documents(ids=["c1"])
+        assert client.delete_documents(where={"conversation_id": "t2"})
+        assert sorted(chroma.collection.rows) == ["a1", "a2"]
+        assert not client.delete_documents()
+
+    def test_single_add_still_works(self, client, chroma):
+        assert client.add_document("x1", "apple", {"source": "user"})
+        assert chroma.collection.rows["x1"][2] == {"source": "user"}
+
+
+class TestQueries:
+    def test_where_scopes_results(self, client):
+        client.add_documents(DOCS)
+        results = client.query("apple", top_k=5, where={"conversation_id": "t2"})
+        assert [r["id"] for r in results] == ["b1", "b2"][:len(results)]
+        assert all(r["metadata"]["conversation_id"] == "t2" for r in results)
+
+        scoped = client.query("apple", top_k=5, where={"$and": [{"conversation_id": "t1"}, {"kind": "note"}]})
+        assert [r["id"] for r in scoped] == ["a1"]
+
+    def test_query_many_matches_single_queries(self, client, chroma):
+        client.add_documents(DOCS)
+        queries = ["apple", "banana", "soup"]
+        chroma.embedder.calls.clear()
+
+        many = client.query_many(queries, top_k=2)
+
+        assert chroma.embedder.calls == [3]
+        assert many == [client.query(q, top_k=2) for q in queries]
+        assert many[2][0]["id"] == "c1"
+
+    def test_query_many_empty(self, client):
+        assert client.query_many([]) == []
+
+    def test_query_error_returns_empty(self, client, chroma):
+        chroma.collection.query = Mock(side_effect=RuntimeError("boom"))
+        assert client.query("apple") == []
+        assert client.query_many(["a", "b"]) == [[], []]
+
+    def test_request_without_where(self, chroma):
+        servicer = ChromaServiceServicer(chroma)
+        servicer.AddDocuments(chroma_pb2.BatchDocumentsRequest(documents=[
+            chroma_pb2.Document(id="a", text="apple")
+        ]), Mock())
+        response = servicer.Query(chroma_pb2.QueryRequest(query_text="apple", top_k=0), Mock())
+        assert [d.id for d in response.results] == ["a"]
+
+
+class TestEmbeddingCache:
+    def test_repeated_query_skips_model(self, client, chroma):
+        client.add_documents(DOCS)
+        first = client.query("apple banana", top_k=3)
+        calls = list(chroma.embedder.calls)
+
+        # Same text as a stored document and as the previous query
+        assert client.query("apple banana", top_k=3) == first
+        client.add_document("dup", "apple banana")
+        assert chroma.embedder.calls == calls
+
+        stats = client.cache_stats()
+        assert stats["hits"] == 3 and stats["misses"] == 5
+        assert stats["hit_rate"] == pytest.approx(3 / 8)
+
+    def test_hit_returns_same_vector_as_miss(self):
+        cache = EmbeddingCache("fake", max_entries=10)
+        embedder = FakeEmbedder()
+        miss = cache.get_or_compute(["cherry"], embedder)
+        hit = cache.get_or_compute(["cherry"], embedder)
+        assert hit == miss and embedder.calls == [1]
+
+    def test_duplicates_in_batch_embedded_once(self):
+        cache = EmbeddingCache("fake", max_entries=10)
+        embedder = FakeEmbedder()
+        vectors = cache.get_or_compute(["a", "b", "a", "a"], embedder)
+        assert embedder.texts == ["a", "b"]
+        assert vectors[0] == vectors[2] == vectors[3]
+
+    def test_lru_eviction(self):
+        cache = EmbeddingCache("fake", max_entries=2)
+        embedder = FakeEmbedder()
+        for text in ["a", "b", "a", "c", "a", "b"]:
+            cache.get_or_compute([text], embedder)
+        # "b" was evicted by "c"; "a" stayed hot
+        assert embedder.texts == ["a", "b", "c", "b"]
+        assert cache.stats()["entries"] == 2
+
+    def test_disk_tier_survives_restart(self, tmp_path):
+        path = str(tmp_path / "embeddings.db")
+        embedder = FakeEmbedder()
+        cache = EmbeddingCache("fake", max_entries=10, disk_path=path)
+        expected = cache.get_or_compute(["apple", "pear"], embedder)
+        cache.close()
+
+        restarted = EmbeddingCache("fake", max_entries=10, disk_path=path)
+        assert restarted.get_or_compute(["pear", "apple"], embedder) == expected[::-1]
+        assert embedder.calls == [2]
+        assert restarted.stats()["disk_hits"] == 2
+        # Refilled into memory
+        restarted.get_or_compute(["apple"], embedder)
+        assert restarted.stats()["hits"] == 1
+
+    def test_disk_only_tier(self, tmp_path):
+        cache = EmbeddingCache("fake", max_entries=0, disk_path=str(tmp_path / "e.db"))
+        embedder = FakeEmbedder()
+        cache.get_or_compute(["a"], embedder)
+        cache.get_or_compute(["a"], embedder)
+        assert embedder.calls == [1] and cache.stats()["disk_hits"] == 1
+
+    def test_namespace_separates_models(self, tmp_path):
+        path = str(tmp_path / "embeddings.db")
+        embedder = FakeEmbedder()
+        EmbeddingCache("model-a", disk_path=path).get_or_compute(["x"], embedder)
+        EmbeddingCache("model-b", disk_path=path).get_or_compute(["x"], embedder)
+        assert embedder.calls == [1, 1]
+
+    def test_cache_disabled(self):
+        chroma = ChromaService(collection=FakeCollection(), embedder=FakeEmbedder(), cache_size=0)
+        assert chroma.cache is None
+        chroma.embed(["a"])
+        chroma.embed(["a"])
+        assert chroma.embedder.calls == [1, 1]
+
+
+class TestPrecomputedEmbeddings:
+    def test_add_with_embedding_skips_model(self, client, chroma):
+        vector = [1.0] + [0.0] * 25
+        assert client.add_document("v1", "anything", embedding=vector)
+        assert client.add_documents([
+            {"id": "v2", "text": "other", "embedding": vector},
+            {"id": "v3", "text": "embedded by service"},
+        ])
+        assert chroma.embedder.texts == ["embedded by service"]
+        assert chroma.collection.rows["v1"][0] == vector
+
+    def test_query_with_embedding_skips_model(self, client, chroma):
+        vector = [1.0] + [0.0] * 25
+        client.add_documents([{"id": "v1", "text": "aaa", "embedding": vector}])
+        chroma.embedder.texts.clear()
+
+        assert client.query("ignored", query_embedding=vector)[0]["id"] == "v1"
+        many = client.query_many(["ignored", "aaa"], query_embeddings=[vector, []])
+        assert [r[0]["id"] for r in many] == ["v1", "v1"]
+        assert chroma.embedder.texts == ["aaa"]
+
+    def test_mismatched_query_embeddings_rejected(self, client):
+        assert client.query_many(["a", "b"], query_embeddings=[[1.0]]) == [[], []]
+
+
+class TestEmbed:
+    def test_embed_uses_model_and_cache(self, client, chroma):
+        vectors = client.embed(["apple pie", "cherry tart"])
+        expected = FakeEmbedder()(["apple pie", "cherry tart"])
+        assert len(vectors) == 2
+        for vector, want in zip(vectors, expected):
+            assert vector == pytest.approx(want)
+
+        assert client.embed(["apple pie"])[0] == pytest.approx(vectors[0])
+        assert chroma.embedder.texts == ["apple pie", "cherry tart"]
+        assert client.cache_stats()["hits"] == 1
+
+    def test_embed_error_returns_empty(self, client, chroma):
+        assert client.embed([]) == []
+        chroma.embedder = Mock(side_effect=RuntimeError("boom"))
+        assert client.embed(["never cached"]) == []
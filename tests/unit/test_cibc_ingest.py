@@ -0,0 +1,260 @@
+"""
+Unit tests for incremental CIBC CSV ingestion.
+"""
+
+import asyncio
+import csv
+import os
+
+import pytest
+
+from shared.adapters.base import AdapterConfig
+from shared.adapters.finance import csv_ingest
+from shared.adapters.finance.cibc import CIBCAdapter, PARSER_VERSION, _row_context, default_cache_path
+from shared.adapters.finance.csv_ingest import CSVIngestor, get_ingestor
+
+HEADER = ["Date", "Description", "Amount", "Payment", "Card"]
+
+
+def write_rows(path, rows, header=True, mode="w"):
+    with open(path, mode, newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        if header:
+            writer.writerow(HEADER)
+        writer.writerows(rows)
+
+
+def make_rows(start, n, card="4500********1234"):
+    return [
+        [f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}", f"TIM HORTONS #{i}", f"{1 + i}.25", "", card]
+        for i in range(start, start + n)
+    ]
+
+
+def bump_mtime(path):
+    """Make sure a rewrite is visible even on coarse mtime filesystems."""
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+@pytest.fixture(autouse=True)
+def fresh_ingestors(monkeypatch, tmp_path):
+    monkeypatch.setattr(csv_ingest, "_INGESTORS", {})
+    monkeypatch.setenv("CIBC_CACHE_DIR", str(tmp_path / "cache"))
+
+
+class CountingParser:
+    def __init__(self):
+        self.adapter = CIBCAdapter()
+        self.calls = 0
+
+    def __call__(self, row):
+        self.calls += 1
+        return self.adapter._parse_row(row)
+
+
+def make_ingestor(tmp_path, cache=True):
+    parser = CountingParser()
+    ingestor = CSVIngestor(
+        str(tmp_path / "bank"),
+        parser,
+        _row_context,
+        cache_path=str(tmp_path / "cache.db") if cache else None,
+        parser_version=PARSER_VERSION,
+    )
+    return ingestor, parser
+
+
+@pytest.fixture
+def bank(tmp_path):
+    directory = tmp_path / "bank"
+    directory.mkdir()
+    return directory
+
+
+def fetch(bank, **settings):
+    adapter = CIBCAdapter(AdapterConfig(
+        category="finance", platform="cibc", settings={"data_dir": str(bank), **settings},
+    ))
+    result = asyncio.run(adapter.fetch())
+    assert result.success, result.error
+    return result
+
+
+class TestIncremental:
+    def test_unchanged_files_not_reparsed(self, tmp_path, bank):
+        write_rows(bank / "cibc_credit.csv", make_rows(0, 50))
+        ingestor, parser = make_ingestor(tmp_path)
+
+        first = ingestor.ingest()
+        assert parser.calls == 50 and first.parsed_rows == 50
+        second = ingestor.ingest()
+        assert parser.calls == 50 and second.parsed_rows == 0
+        assert second.records == first.records
+
+    def test_append_parses_only_new_row(self, tmp_path, bank):
+        path = bank / "cibc_credit.csv"
+        write_rows(path, make_rows(0, 200))
+        ingestor, parser = make_ingestor(tmp_path)
+        ingestor.ingest()
+
+        write_rows(path, make_rows(200, 1), header=False, mode="a")
+        result = ingestor.ingest()
+
+        assert parser.calls == 201
+        assert result.parsed_rows == 1 and result.reused_rows == 200
+        assert len(result.records) == 201
+        assert result.records[-1].description == "TIM HORTONS #200"
+
+    def test_append_reads_file_once(self, tmp_path, bank, monkeypatch):
+        path = bank / "cibc_credit.csv"
+        write_rows(path, make_rows(0, 20))
+        ingestor, parser = make_ingestor(tmp_path, cache=False)
+        ingestor.ingest()
+
+        opened = []
+
+        def counting_open(file, *args, **kwargs):
+            opened.append(file)
+            return open(file, *args, **kwargs)
+
+        monkeypatch.setattr(csv_ingest, "open", counting_open, raising=False)
+        for start in (20, 21):
+            # The prefix hash carried over from one append must match the next
+            write_rows(path, make_rows(start, 1), header=False, mode="a")
+            result = ingestor.ingest()
+            assert result.parsed_rows == 1 and result.reused_rows == start
+
+        assert opened == [str(path)] * 2
+        assert parser.calls == 22
+
+    def test_unterminated_last_line(self, tmp_path, bank):
+        path = bank / "cibc_credit.csv"
+        write_rows(path, make_rows(0, 3))
+        with open(path, "a") as f:
+            f.write("2024-05-05,PARTIAL ROW,1.00,,")
+        ingestor, parser = make_ingestor(tmp_path)
+
+        assert len(ingestor.ingest().records) == 4
+        # The partial line is completed: re-parsed together with the new row
+        with open(path, "a") as f:
+            f.write("4500********1234\n2024-05-06,NEXT ROW,2.00,,\n")
+        result = ingestor.ingest()
+
+        assert [r.description for r in result.records[-2:]] == ["PARTIAL ROW", "NEXT ROW"]
+        assert result.records[-2].metadata["card_mask"] == "4500********1234"
+        assert result.parsed_rows == 2
+
+    def test_truncation_reparses_file(self, tmp_path, bank):
+        path = bank / "cibc_credit.csv"
+        write_rows(path, make_rows(0, 20))
+        ingestor, _ = make_ingestor(tmp_path)
+        ingestor.ingest()
+
+        write_rows(path, make_rows(0, 5))
+        bump_mtime(path)
+        result = ingestor.ingest()
+        assert len(result.records) == 5 and result.parsed_rows == 5
+
+    def test_rewrite_same_size_detected(self, tmp_path, bank):
+        path = bank / "cibc_credit.csv"
+        write_rows(path, make_rows(0, 5))
+        ingestor, _ = make_ingestor(tmp_path)
+        ingestor.ingest()
+
+        write_rows(path, [r[:1] + [r[1].replace("TIM", "TOM")] + r[2:] for r in make_rows(0, 5)])
+        bump_mtime(path)
+        assert all("TOM" in r.description for r in ingestor.ingest().records)
+
+    def test_rotation(self, tmp_path, bank):
+        write_rows(bank / "cibc_credit_2024.csv", make_rows(0, 10))
+        ingestor, _ = make_ingestor(tmp_path)
+        ingestor.ingest()
+
+        # Old export renamed away, a fresh export takes the rows forward
+        os.rename(bank / "cibc_credit_2024.csv", bank / "cibc_credit_2024_archive.csv")
+        write_rows(bank / "cibc_credit_2025.csv", make_rows(10, 3))
+        result = ingestor.ingest()
+
+        assert result.files == ["cibc_credit_2024_archive.csv", "cibc_credit_2025.csv"]
+        assert len(result.records) == 13
+        assert {r.metadata["source_file"] for r in result.records} == set(result.files)
+
+        os.remove(bank / "cibc_credit_2024_archive.csv")
+        assert len(ingestor.ingest().records) == 3
+
+
+class TestCache:
+    def test_reload_from_disk(self, tmp_path, bank):
+        path = bank / "cibc_credit.csv"
+        write_rows(path, make_rows(0, 30))
+        ingestor, _ = make_ingestor(tmp_path)
+        expected = ingestor.ingest().records
+        ingestor.close()
+
+        restarted, parser = make_ingestor(tmp_path)
+        assert restarted.ingest().records == expected
+        assert parser.calls == 0
+
+        write_rows(path, make_rows(30, 2), header=False, mode="a")
+        assert len(restarted.ingest().records) == 32
+        assert parser.calls == 2
+
+    def test_parser_version_change_invalidates(self, tmp_path, bank):
+        write_rows(bank / "cibc_credit.csv", make_rows(0, 4))
+        ingestor, _ = make_ingestor(tmp_path)
+        ingestor.ingest()
+        ingestor.close()
+
+        parser = CountingParser()
+        changed = CSVIngestor(str(bank), parser, _row_context,
+                              cache_path=str(tmp_path / "cache.db"), parser_version="other")
+        changed.ingest()
+        assert parser.calls == 4
+
+    def test_unwritable_cache_falls_back_to_memory(self, tmp_path, bank):
+        write_rows(bank / "cibc_credit.csv", make_rows(0, 4))
+        ingestor = CSVIngestor(str(bank), CountingParser(), _row_context,
+                               cache_path=str(tmp_path / "missing" / "cache.db"))
+        assert len(ingestor.ingest().records) == 4
+
+
+class TestAdapter:
+    def test_dedup_and_order(self, bank):
+        rows = make_rows(0, 10)
+        write_rows(bank / "cibc_credit_a.csv", rows)
+        write_rows(bank / "cibc_credit_b.csv", rows[5:] + make_rows(10, 2))
+
+        result = fetch(bank)
+        assert result.raw_count == 17
+        assert result.transformed_count == 12
+        timestamps = [t.timestamp for t in result.data]
+        assert timestamps == sorted(timestamps, reverse=True)
+        # First occurrence wins
+        dup = next(t for t in result.data if t.description == "TIM HORTONS #7")
+        assert dup.metadata["source_file"] == "cibc_credit_a.csv"
+
+    def test_refetch_shares_parsed_records(self, bank):
+        write_rows(bank / "cibc_chq.csv", make_rows(0, 5, card=""))
+        first = fetch(bank, cache_path=None)
+        second = fetch(bank, cache_path=None)
+        assert [t.to_dict() for t in first.data] == [t.to_dict() for t in second.data]
+        assert first.data[0].account_id == "cibc_chequing"
+
+    def test_default_cache_outside_data_dir(self, tmp_path, bank):
+        write_rows(bank / "cibc_credit.csv", make_rows(0, 2))
+        fetch(bank)
+
+        assert os.listdir(bank) == ["cibc_credit.csv"]  # data_dir may be read-only
+        assert os.path.exists(default_cache_path(str(bank)))
+        assert os.path.dirname(default_cache_path(str(bank))) == str(tmp_path / "cache")
+
+    def test_ingestor_per_parser_version(self, bank):
+        first = get_ingestor(str(bank), CountingParser(), _row_context, parser_version="a")
+        assert get_ingestor(str(bank), CountingParser(), _row_context, parser_version="a") is first
+        assert get_ingestor(str(bank), CountingParser(), _row_context, parser_version="b") is not first
+
+    def test_raw_rows_still_accepted(self):
+        adapter = CIBCAdapter()
+        row = dict(zip(HEADER, make_rows(0, 1)[0]), _account_type="credit")
+        assert len(adapter.transform({"transactions": [row, dict(row)]})) == 1
@@ -0,0 +1,219 @@
+"""
+Unit tests for the LIDM query classification cache.
+
+A counting fake pool stands in for LLMClientPool so the tests can see
+which classifications reached the LLM; a fake clock drives TTL expiry and
+a bag-of-words embedder drives the similarity tier.
+"""
+
+import json
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from orchestrator.classification_cache import ClassificationCache, normalize_query
+from orchestrator.delegation_manager import DelegationManager
+from orchestrator.routing_config import PerformanceConstraints, RoutingConfig
+
+VOCAB = ["balance", "account", "my", "what", "whats", "is", "code", "python", "write", "the"]
+
+FINANCE = {"task_type": "finance", "capabilities": ["finance"], "complexity": 0.2}
+
+
+class CountingPool:
+    def __init__(self, response=FINANCE):
+        self.response = response
+        self.prompts = []
+
+    def generate(self, prompt, tier="standard", **kwargs):
+        self.prompts.append(prompt)
+        if isinstance(self.response, Exception):
+            raise self.response
+        return json.dumps(self.response)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def bag_of_words(text):
+    words = normalize_query(text).replace("'", "").split()
+    return [float(words.count(word)) for word in VOCAB]
+
+
+def _config(**performance):
+    return RoutingConfig(performance=PerformanceConstraints(**performance))
+
+
+class TestExactTier:
+    @pytest.mark.parametrize("phrasing", [
+        "what's my balance", "What's my balance?", "  WHAT’S   my balance!! ",
+    ])
+    def test_normalized_phrasings_hit(self, phrasing):
+        pool = CountingPool()
+        manager = DelegationManager(pool)
+
+        first = manager._classify_query("what's my balance")
+        again = manager._classify_query(phrasing)
+
+        assert first == again == FINANCE
+        assert len(pool.prompts) == 1
+        assert manager.classification_cache.stats()["hits"] == 1
+
+    def test_different_query_misses(self):
+        pool = CountingPool()
+        manager = DelegationManager(pool)
+        manager._classify_query("what's my balance")
+        manager._classify_query("write python code")
+        assert len(pool.prompts) == 2
+
+    def test_routing_uses_cached_classification(self):
+        pool = CountingPool()
+        manager = DelegationManager(pool)
+        plans = [manager.analyze_and_route("What's my balance?") for _ in range(3)]
+
+        assert len(pool.prompts) == 1
+        assert all(plan.task_type == "finance" and plan.strategy == "direct" for plan in plans)
+
+    def test_failures_are_not_cached(self):
+        pool = CountingPool(response=RuntimeError("standard tier down"))
+        manager = DelegationManager(pool)
+
+        assert manager._classify_query("what's my balance")["task_type"] == "general"
+        pool.response = FINANCE
+        assert manager._classify_query("what's my balance") == FINANCE
+        assert len(pool.prompts) == 2
+
+    def test_callers_cannot_mutate_cached_entry(self):
+        manager = DelegationManager(CountingPool())
+        manager._classify_query("what's my balance")["task_type"] = "mutated"
+        assert manager._classify_query("what's my balance")["task_type"] == "finance"
+
+
+class TestBounds:
+    def test_ttl_expiry(self):
+        clock = FakeClock()
+        cache = ClassificationCache(ttl_seconds=10, clock=clock)
+        classify = MagicMock(return_value=FINANCE)
+
+        cache.get_or_classify("balance", classify)
+        clock.now = 9.9
+        cache.get_or_classify("balance", classify)
+        assert classify.call_count == 1
+
+        clock.now = 10.1
+        cache.get_or_classify("balance", classify)
+        assert classify.call_count == 2
+
+    def test_lru_eviction(self):
+        cache = ClassificationCache(max_entries=2)
+        classify = MagicMock(return_value=FINANCE)
+        for query in ["a", "b", "a", "c"]:  # "b" is least recently used when "c" arrives
+            cache.get_or_classify(query, classify)
+        assert len(cache) == 2
+
+        classify.reset_mock()
+        cache.get_or_classify("a", classify)
+        cache.get_or_classify("b", classify)
+        assert classify.call_count == 1
+
+    def test_size_zero_disables(self):
+        manager = DelegationManager(CountingPool(), config=_config(classification_cache_size=0))
+        manager._classify_query("balance")
+        manager._classify_query("balance")
+        assert len(manager.pool.prompts) == 2
+
+
+class TestSimilarityTier:
+    def test_similar_phrasing_hits_above_threshold(self):
+        pool = CountingPool()
+        manager = DelegationManager(pool, config=_config(classification_similarity_threshold=0.8),
+                                    embed=bag_of_words)
+
+        manager._classify_query("what is my account balance")
+        assert manager._classify_query("what is my balance") == FINANCE
+        assert len(pool.prompts) == 1
+        assert manager.classification_cache.stats()["similar_hits"] == 1
+
+    def test_dissimilar_query_misses(self):
+        pool = CountingPool()
+        manager = DelegationManager(pool, config=_config(classification_similarity_threshold=0.8),
+                                    embed=bag_of_words)
+        manager._classify_query("what is my account balance")
+        manager._classify_query("write the python code")
+        assert len(pool.prompts) == 2
+
+    def test_threshold_is_respected(self):
+        cache = ClassificationCache(embed=bag_of_words, similarity_threshold=0.99)
+        classify = MagicMock(return_value=FINANCE)
+        cache.get_or_classify("what is my account balance", classify)
+        cache.get_or_classify("what is my balance", classify)
+        assert classify.call_count == 2
+
+    def test_embedder_failure_falls_back_to_llm(self):
+        pool = CountingPool()
+        manager = DelegationManager(pool, embed=MagicMock(side_effect=RuntimeError("no model")))
+        manager._classify_query("balance")
+        assert manager._classify_query("Balance?") == FINANCE  # exact tier still works
+        assert len(pool.prompts) == 1
+
+
+class TestInvalidation:
+    def test_config_reload_flushes(self):
+        pool = CountingPool()
+        manager = DelegationManager(pool, config=_config())
+        manager._classify_query("what's my balance")
+
+        manager.on_config_changed(_config(classification_cache_ttl_seconds=60))
+        assert len(manager.classification_cache) == 0
+        manager._classify_query("what's my balance")
+
+        assert len(pool.prompts) == 2
+        assert manager.classification_cache.ttl_seconds == 60
+        assert manager.classification_cache.stats()["invalidations"] == 1
+
+    def test_config_manager_observer_flushes(self, tmp_path):
+        from orchestrator.config_manager import ConfigManager
+
+        config_manager = ConfigManager(str(tmp_path / "routing_config.json"))
+        pool = CountingPool()
+        manager = DelegationManager(pool, config=config_manager.get_config())
+        config_manager.register_observer(manager.on_config_changed)
+        manager._classify_query("what's my balance")
+
+        config_manager.update_config(_config(complexity_threshold_direct=0.7))
+        manager._classify_query("what's my balance")
+        assert len(pool.prompts) == 2
+
+    def test_in_flight_classification_is_dropped_after_reload(self):
+        cache = ClassificationCache()
+        started, release = threading.Event(), threading.Event()
+
+        def slow_classify(query):
+            started.set()
+            release.wait(1)
+            return FINANCE
+
+        worker = threading.Thread(target=cache.get_or_classify, args=("balance", slow_classify))
+        worker.start()
+        started.wait(1)
+        cache.on_config_changed(_config())
+        release.set()
+        worker.join()
+
+        assert len(cache) == 0
+
+    def test_metrics_recorded(self):
+        metrics = MagicMock()
+        cache = ClassificationCache(metrics=metrics)
+        classify = MagicMock(return_value=FINANCE)
+        cache.get_or_classify("balance", classify)
+        cache.get_or_classify("balance", classify)
+
+        results = [call.args[1]["result"] for call in metrics.classification_cache_lookups_total.add.call_args_list]
+        assert results == ["miss", "exact"]
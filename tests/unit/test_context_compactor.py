@@ -1,10 +1,14 @@
 """
 Unit tests for the context compactor.
 
-Tests the compact_context function with mocked LLM engine and ChromaDB
-client to verify summarisation, archival, and edge cases.
+Tests the compact_context function and the token-budget ContextCompactor
+with mocked LLM engine and ChromaDB client to verify summarisation,
+archival, and edge cases.
 """
 
+import threading
+import time
+
 import pytest
 from unittest.mock import Mock, MagicMock, patch, call
 
@@ -15,7 +19,7 @@ from langchain_core.messages import (
     ToolMessage,
 )
 
-from core.context_compactor import compact_context, _role_label
+from core.context_compactor import ContextCompactor, compact_context, _role_label
 
 
 class TestCompactContext:
@@ -168,3 +172,192 @@ class TestRoleLabel:
         msg = ToolMessage(content="x", tool_call_id="tc1", name="search")
         assert "Tool" in _role_label(msg)
         assert "search" in _role_label(msg)
+
+
+class SlowLLM:
+    """Summariser that takes `delay` seconds per call."""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.calls = 0
+        self.prompts = []
+
+    def generate(self, messages, **kwargs):
+        self.calls += 1
+        self.prompts.append(messages[-1]["content"])
+        time.sleep(self.delay)
+        return {"content": f"Summary #{self.calls}."}
+
+
+def _turn(i):
+    return [
+        HumanMessage(content=f"Question {i} " + "word " * 40),
+        AIMessage(content=f"Answer {i} " + "text " * 60),
+    ]
+
+
+class TestContextCompactor:
+    """Tests for core/context_compactor.ContextCompactor"""
+
+    def _compactor(self, llm=None, chroma=None, **kwargs):
+        options = dict(context_tokens=1200, reserve_tokens=200, min_keep=2)
+        options.update(kwargs)
+        compactor = ContextCompactor(llm or SlowLLM(), chroma_client=chroma, **options)
+        return compactor
+
+    def test_under_budget_passes_through(self):
+        llm = SlowLLM()
+        compactor = self._compactor(llm)
+        msgs = _turn(0)
+        assert compactor.prepare(msgs, "t") == msgs
+        assert compactor.wait_idle(1)
+        assert llm.calls == 0
+
+    def test_summary_swapped_in_on_next_turn(self):
+        compactor = self._compactor()
+        msgs = []
+        for i in range(10):
+            msgs += _turn(i)
+        first = compactor.prepare(msgs, "t")
+        # No summary yet: this turn is only trimmed to the budget
+        assert not isinstance(first[0], SystemMessage)
+        assert sum(compactor.count(m) for m in first) <= compactor.budget
+
+        assert compactor.wait_idle(2)
+        msgs += _turn(10)
+        second = compactor.prepare(msgs, "t")
+        assert isinstance(second[0], SystemMessage)
+        assert "Summary #1." in second[0].content
+        assert second[-1] is msgs[-1]
+        assert sum(compactor.count(m) for m in second) <= compactor.budget
+
+    def test_rolling_summary_includes_previous(self):
+        llm = SlowLLM(delay=0)
+        compactor = self._compactor(llm)
+        msgs = []
+        for i in range(30):
+            msgs += _turn(i)
+            compactor.prepare(msgs, "t")
+            compactor.wait_idle(2)
+        assert llm.calls >= 2
+        assert "Earlier summary: Summary #1." in llm.prompts[1]
+
+    def test_changed_history_ignores_stale_summary(self):
+        compactor = self._compactor(llm=SlowLLM(delay=0))
+        msgs = []
+        for i in range(10):
+            msgs += _turn(i)
+        compactor.prepare(msgs, "t")
+        compactor.wait_idle(2)
+
+        rewritten = [HumanMessage(content="different start")] + msgs[1:]
+        result = compactor.prepare(rewritten, "t")
+        assert not any(
+            isinstance(m, SystemMessage) and "Summary" in m.content for m in result
+        )
+        # A fresh summary for the new history replaces the stale one
+        compactor.wait_idle(2)
+        assert "Summary #2." in compactor.prepare(rewritten, "t")[0].content
+
+    def test_tail_never_starts_with_tool_result(self):
+        compactor = self._compactor(llm=SlowLLM(delay=0), min_keep=1)
+        msgs = []
+        for i in range(8):
+            msgs += [
+                HumanMessage(content=f"q{i} " + "w " * 80),
+                AIMessage(content="", tool_calls=[{"name": "search", "args": {}, "id": f"c{i}"}]),
+                ToolMessage(content="r " * 120, tool_call_id=f"c{i}", name="search"),
+                AIMessage(content=f"a{i} " + "x " * 40),
+            ]
+        first = compactor.prepare(msgs, "t")
+        compactor.wait_idle(2)
+        second = compactor.prepare(msgs, "t")
+        for view in (first, second):
+            tail = [m for m in view if not isinstance(m, SystemMessage)]
+            assert not isinstance(tail[0], ToolMessage)
+
+    def test_archival_does_not_block(self):
+        release = threading.Event()
+        chroma = Mock()
+        chroma.add_document.side_effect = lambda **kwargs: release.wait(5)
+        compactor = self._compactor(llm=SlowLLM(delay=0), chroma=chroma)
+        msgs = []
+        for i in range(10):
+            msgs += _turn(i)
+        compactor.prepare(msgs, "t")
+
+        # Summary lands while archival is still stuck in ChromaDB
+        deadline = time.monotonic() + 2
+        view = compactor.prepare(msgs, "t")
+        while not isinstance(view[0], SystemMessage) and time.monotonic() < deadline:
+            time.sleep(0.01)
+            view = compactor.prepare(msgs, "t")
+        assert isinstance(view[0], SystemMessage)
+        assert not compactor.wait_idle(0.05)
+
+        release.set()
+        assert compactor.wait_idle(2)
+        chroma.add_document.assert_called_once()
+        assert chroma.add_document.call_args.kwargs["metadata"]["conversation_id"] == "t"
+
+    def test_summariser_failure_keeps_serving(self):
+        llm = Mock()
+        llm.generate.side_effect = RuntimeError("down")
+        compactor = self._compactor(llm)
+        msgs = []
+        for i in range(10):
+            msgs += _turn(i)
+        compactor.prepare(msgs, "t")
+        assert compactor.wait_idle(2)
+        # Fallback summary still replaces the evicted turns
+        view = compactor.prepare(msgs, "t")
+        assert isinstance(view[0], SystemMessage)
+
+    def test_request_latency_flat_over_hundreds_of_turns(self):
+        llm = SlowLLM(delay=0.2)
+        compactor = self._compactor(llm)
+        msgs = []
+        latencies = []
+        for i in range(300):
+            msgs += _turn(i)
+            start = time.perf_counter()
+            view = compactor.prepare(msgs, "t")
+            latencies.append(time.perf_counter() - start)
+            assert sum(compactor.count(m) for m in view) <= compactor.budget
+
+        early = sorted(latencies[:50])[25]
+        late = sorted(latencies[-50:])[25]
+        # Never waits on the 200 ms summariser, and doesn't grow with history
+        assert max(latencies) < 0.1
+        assert late < max(early * 10, 0.005)
+        compactor.wait_idle(5)
+
+
+class TestPromptTokens:
+    """The LLM node records the size of the compacted prompt it sent."""
+
+    def test_llm_node_records_compacted_prompt_size(self):
+        from core.graph import AgentWorkflow
+        from core.state import WorkflowConfig, create_initial_state
+        from tools.registry import LocalToolRegistry
+
+        engine = Mock()
+        engine.generate.return_value = {"content": "ok"}
+        workflow = AgentWorkflow(
+            LocalToolRegistry(), engine, WorkflowConfig(context_tokens=1200, context_window=2)
+        )
+        state = create_initial_state("t")
+        for i in range(30):
+            state["messages"] = list(state["messages"]) + _turn(i)
+        state["messages"].append(HumanMessage(content="Question 30"))
+
+        compactor = workflow.compactor
+        prepared = []
+        prepare = compactor.prepare
+        compactor.prepare = lambda *args, **kwargs: prepared.append(prepare(*args, **kwargs)) or prepared[-1]
+
+        result = workflow._llm_node(state)
+
+        prompt_tokens = result["metadata"]["prompt_tokens"]
+        assert prompt_tokens == compactor.prompt_tokens(prepared[0])
+        assert prompt_tokens <= compactor.budget < compactor.prompt_tokens(state["messages"])
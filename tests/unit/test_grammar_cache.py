@@ -0,0 +1,391 @@
+"""
+Unit tests for the structured-output grammar subsystem.
+
+The grammars produced by schema_to_gbnf are checked with a small GBNF
+recognizer below (literals, character classes, groups, alternation and
+?/*/+), so correctness does not depend on llama.cpp being installed:
+instances valid for a built-in tool's schema must match the tool's
+grammar and invalid ones must not.
+"""
+
+import json
+import threading
+
+import pytest
+
+from llm_service.grammar_cache import GrammarCache, SchemaError, schema_hash, schema_to_gbnf
+from tools.builtin.code_executor import execute_code
+from tools.builtin.finance_query import query_finance
+from tools.builtin.knowledge_search import search_knowledge, store_knowledge
+from tools.builtin.math_solver import math_solver
+from tools.builtin.user_context import get_commute_time, get_daily_briefing, get_user_context
+from tools.builtin.web_loader import load_web_page
+from tools.builtin.web_search import web_search
+from tools.registry import LocalToolRegistry
+
+BUILTIN_TOOLS = [
+    web_search, math_solver, load_web_page, execute_code, get_user_context,
+    get_daily_briefing, get_commute_time, search_knowledge, store_knowledge, query_finance,
+]
+
+
+# -- GBNF recognizer -------------------------------------------------------
+
+_ESCAPES = {"n": "\n", "r": "\r", "t": "\t", "\\": "\\", '"': '"', "]": "]", "[": "[", "-": "-", "^": "^", "/": "/"}
+
+
+class Grammar:
+    """Parses GBNF text and matches whole strings against its root rule."""
+
+    def __init__(self, text: str):
+        self.rules = {}
+        for line in text.strip().splitlines():
+            name, body = line.split(" ::= ", 1)
+            self._text, self._i = body, 0
+            self.rules[name] = self._alternation()
+            assert self._i == len(body), (line, self._i)
+
+    def matches(self, text: str) -> bool:
+        return len(text) in self._match(self.rules["root"], text, {0})
+
+    # -- parsing -------------------------------------------------------
+
+    def _skip(self):
+        while self._i < len(self._text) and self._text[self._i] == " ":
+            self._i += 1
+
+    def _alternation(self):
+        alternatives = [self._sequence()]
+        while self._i < len(self._text) and self._text[self._i] == "|":
+            self._i += 1
+            alternatives.append(self._sequence())
+        return ("alt", alternatives)
+
+    def _sequence(self):
+        items = []
+        self._skip()
+        while self._i < len(self._text) and self._text[self._i] not in "|)":
+            item = self._primary()
+            if self._i < len(self._text) and self._text[self._i] in "?*+":
+                item = ("rep", item, self._text[self._i])
+                self._i += 1
+            items.append(item)
+            self._skip()
+        return ("seq", items)
+
+    def _char(self):
+        c = self._text[self._i]
+        self._i += 1
+        if c != "\\":
+            return c
+        c = self._text[self._i]
+        self._i += 1
+        if c == "x":
+            code = self._text[self._i:self._i + 2]
+            self._i += 2
+            return chr(int(code, 16))
+        return _ESCAPES[c]
+
+    def _primary(self):
+        c = self._text[self._i]
+        if c == '"':
+            self._i += 1
+            chars = []
+            while self._text[self._i] != '"':
+                chars.append(self._char())
+            self._i += 1
+            return ("lit", "".join(chars))
+        if c == "[":
+            self._i += 1
+            negated = self._text[self._i] == "^"
+            self._i += negated
+            ranges = []
+            while self._text[self._i] != "]":
+                low = self._char()
+                high = low
+                if self._text[self._i] == "-" and self._text[self._i + 1] != "]":
+                    self._i += 1
+                    high = self._char()
+                ranges.append((low, high))
+            self._i += 1
+            return ("cls", negated, ranges)
+        if c == "(":
+            self._i += 1
+            group = self._alternation()
+            assert self._text[self._i] == ")"
+            self._i += 1
+            return group
+        start = self._i
+        while self._i < len(self._text) and (self._text[self._i].isalnum() or self._text[self._i] == "-"):
+            self._i += 1
+        assert self._i > start, self._text[start:]
+        return ("ref", self._text[start:self._i])
+
+    # -- matching: sets of end positions ---------------------------------
+
+    def _match(self, node, text, starts):
+        kind = node[0]
+        if kind == "lit":
+            return {i + len(node[1]) for i in starts if text.startswith(node[1], i)}
+        if kind == "cls":
+            _, negated, ranges = node
+            return {
+                i + 1 for i in starts
+                if i < len(text) and any(low <= text[i] <= high for low, high in ranges) != negated
+            }
+        if kind == "ref":
+            return self._match(self.rules[node[1]], text, starts)
+        if kind == "seq":
+            for item in node[1]:
+                starts = self._match(item, text, starts)
+                if not starts:
+                    break
+            return starts
+        if kind == "alt":
+            ends = set()
+            for alternative in node[1]:
+                ends |= self._match(alternative, text, starts)
+            return ends
+        _, item, op = node  # rep
+        ends = set(starts) if op in "?*" else set()
+        frontier = self._match(item, text, starts)
+        while frontier - ends:
+            ends |= frontier
+            if op == "?":
+                break
+            frontier = self._match(item, text, frontier)
+        return ends
+
+
+@pytest.fixture(scope="module")
+def registry():
+    registry = LocalToolRegistry()
+    for tool in BUILTIN_TOOLS:
+        registry.register(tool)
+    return registry
+
+
+def _grammar(schema) -> Grammar:
+    return Grammar(schema_to_gbnf(schema))
+
+
+# -- schema-to-grammar correctness ------------------------------------------
+
+class TestBuiltinToolSchemas:
+    VALID = {
+        "web_search": [
+            {"query": "weather in Toronto"},
+            {"query": "a \"quoted\" \\ query\n", "num_results": 5, "search_type": "news"},
+            {"query": "é€😀", "search_type": "images"},
+        ],
+        "math_solver": [{"expression": "2 ** 10 + sqrt(16)"}],
+        "load_web_page": [{"url": "https://example.com", "include_links": True}, {"url": "x", "max_length": 0}],
+        "execute_code": [{"code": "print(1)", "language": "python", "timeout_seconds": 30}],
+        "get_user_context": [
+            {},
+            {"categories": ["calendar", "finance"]},
+            {"include_alerts": False, "destination": "office"},
+            {"categories": [], "include_alerts": True, "destination": "home"},
+        ],
+        "get_daily_briefing": [{}],
+        "get_commute_time": [{}, {"destination": "office"}],
+        "search_knowledge": [{"query": "notes", "top_k": -3}],
+        "store_knowledge": [{"document_id": "doc-1", "text": "hello", "source": "user"}],
+        "query_finance": [
+            {},
+            {"action": "summary"},
+            {"category": "food", "per_page": 5, "date_to": "2025-01-31"},
+            {"date_to": "2025-01-31"},
+        ],
+    }
+
+    INVALID = {
+        "web_search": [
+            {},                                              # missing required query
+            {"num_results": 5, "query": "x"},                # required property must come first
+            {"query": 7},                                    # wrong type
+            {"query": "x", "num_results": 2.5},              # not an integer
+            {"query": "x", "unknown": 1},                    # no extra properties
+            {"query": "x", "search_type": "a", "num_results": 1},  # optional properties keep their order
+        ],
+        "load_web_page": [{"url": "x", "include_links": "yes"}],
+        "get_user_context": [{"categories": "calendar"}, {"destination": None}],
+        "store_knowledge": [{"document_id": "doc-1"}, {"text": "hello", "document_id": "doc-1"}],
+        "query_finance": [{"page": "1"}, {"date_to": "x", "action": "summary"}],
+    }
+
+    def test_valid_arguments_accepted(self, registry):
+        for tool, instances in self.VALID.items():
+            grammar = _grammar(registry.tool_call_schema(tool, envelope=False))
+            for instance in instances:
+                for indent in (None, 2):
+                    text = json.dumps(instance, indent=indent, ensure_ascii=False)
+                    assert grammar.matches(text), (tool, text)
+
+    def test_invalid_arguments_rejected(self, registry):
+        for tool, instances in self.INVALID.items():
+            grammar = _grammar(registry.tool_call_schema(tool, envelope=False))
+            for instance in instances:
+                text = json.dumps(instance)
+                assert not grammar.matches(text), (tool, text)
+
+    def test_every_builtin_tool_converts(self, registry):
+        assert set(self.VALID) == set(registry.list_all_tools())
+
+    def test_tool_call_envelope(self, registry):
+        grammar = _grammar(registry.tool_call_schema("web_search"))
+        call = {"type": "tool_call", "tool": "web_search", "arguments": {"query": "x"}}
+        assert grammar.matches(json.dumps(call))
+        assert grammar.matches(json.dumps(call, indent=2))
+        assert not grammar.matches(json.dumps({**call, "tool": "math_solver"}))
+        assert not grammar.matches(json.dumps({**call, "type": "answer"}))
+        assert not grammar.matches(json.dumps({**call, "arguments": {}}))
+
+    def test_unknown_tool(self, registry):
+        assert registry.tool_call_schema("does_not_exist") is None
+
+    def test_output_is_a_json_string_or_invalid(self, registry):
+        grammar = _grammar(registry.tool_call_schema("math_solver", envelope=False))
+        for text in ('{"expression": "a\\u00e9b"}', '{"expression": "tab\\tok"}'):
+            assert grammar.matches(text)
+        for text in ('{"expression": "raw\tcontrol"}', '{"expression": "bad\\q"}', '{"expression": "x"'):
+            assert not grammar.matches(text)
+
+
+class TestSchemaKeywords:
+    def test_enum_const_and_type_lists(self):
+        grammar = _grammar({
+            "type": "object",
+            "properties": {
+                "mode": {"enum": ["fast", "exact", 3, None]},
+                "tag": {"const": {"a": [1]}},
+                "limit": {"type": ["integer", "null"]},
+            },
+            "required": ["mode", "tag", "limit"],
+        })
+        assert grammar.matches('{"mode": "fast", "tag": {"a": [1]}, "limit": null}')
+        assert grammar.matches('{"mode": 3, "tag": {"a": [1]}, "limit": -4}')
+        assert not grammar.matches('{"mode": "slow", "tag": {"a": [1]}, "limit": 1}')
+        assert not grammar.matches('{"mode": null, "tag": {"a": [2]}, "limit": 1}')
+
+    def test_typed_array_items_and_any_of(self):
+        grammar = _grammar({
+            "type": "array",
+            "items": {"anyOf": [{"type": "number"}, {"type": "object", "properties": {"id": {"type": "string"}}}]},
+        })
+        assert grammar.matches('[1.5e3, {"id": "x"}, {}, -0]')
+        assert grammar.matches("[]")
+        assert not grammar.matches('["x"]')
+        assert not grammar.matches("[01]")
+
+    def test_untyped_schema_accepts_any_json(self):
+        grammar = _grammar({})
+        for text in ('{"a": [true, null, "x", 1.0]}', "[]", '"s"', "-2"):
+            assert grammar.matches(text), text
+        assert not grammar.matches("{'a': 1}")
+
+    def test_awkward_property_names(self):
+        grammar = _grammar({
+            "type": "object",
+            "properties": {'we"ird key': {"type": "string"}, "näme": {"type": "boolean"}},
+            "required": ['we"ird key', "näme"],
+        })
+        assert grammar.matches(json.dumps({'we"ird key': "v", "näme": True}, ensure_ascii=False))
+
+    @pytest.mark.parametrize("schema", [
+        '{"type": "object"',
+        {"$ref": "#/definitions/x"},
+        {"type": "float"},
+        {"enum": []},
+        {"properties": {"a": 5}},
+    ])
+    def test_unsupported_schemas_rejected(self, schema):
+        with pytest.raises(SchemaError):
+            schema_to_gbnf(schema)
+
+    def test_schema_hash_is_canonical(self):
+        a = {"type": "object", "properties": {"x": {"type": "string"}}, "required": ["x"]}
+        b = '{"required":["x"],  "properties": {"x": {"type": "string"}}, "type": "object"}'
+        assert schema_hash(a) == schema_hash(b)
+        assert schema_hash(a) != schema_hash({**a, "required": []})
+
+
+# -- cache behaviour ----------------------------------------------------------
+
+class CountingCompiler:
+    def __init__(self):
+        self.compiled = []
+
+    def __call__(self, gbnf):
+        self.compiled.append(gbnf)
+        return Grammar(gbnf)
+
+
+class TestGrammarCache:
+    def test_repeated_tool_requests_compile_once(self, registry):
+        compiler = CountingCompiler()
+        cache = GrammarCache(compiler)
+        tools = registry.list_all_tools()
+        for _ in range(20):
+            for tool in tools:
+                grammar = cache.for_schema(registry.tool_call_schema(tool))
+                assert isinstance(grammar, Grammar)
+
+        stats = cache.stats()
+        assert len(compiler.compiled) == len(tools)
+        assert stats["misses"] == len(tools)
+        assert stats["hits"] == 19 * len(tools)
+        assert stats["hit_rate"] == pytest.approx(0.95)
+
+    def test_same_schema_in_any_form_is_one_entry(self):
+        compiler = CountingCompiler()
+        cache = GrammarCache(compiler)
+        schema = {"type": "object", "properties": {"q": {"type": "string"}}, "required": ["q"]}
+        first = cache.for_schema(schema)
+        assert cache.for_schema(json.dumps(schema, indent=2)) is first
+        assert cache.for_schema(dict(reversed(list(schema.items())))) is first
+        assert len(compiler.compiled) == 1
+
+    def test_gbnf_text_cached(self):
+        compiler = CountingCompiler()
+        cache = GrammarCache(compiler)
+        gbnf = 'root ::= "yes" | "no"\n'
+        assert cache.compile(gbnf) is cache.compile(gbnf)
+        assert compiler.compiled == [gbnf]
+
+    def test_lru_eviction(self):
+        compiler = CountingCompiler()
+        cache = GrammarCache(compiler, max_entries=2)
+        schemas = [{"const": i} for i in range(3)]
+        cache.for_schema(schemas[0])
+        cache.for_schema(schemas[1])
+        cache.for_schema(schemas[0])  # 1 is now least recently used
+        cache.for_schema(schemas[2])
+        assert cache.stats()["evictions"] == 1
+        cache.for_schema(schemas[0])
+        assert len(compiler.compiled) == 3
+        cache.for_schema(schemas[1])
+        assert len(compiler.compiled) == 4
+
+    def test_invalid_schema_not_cached(self):
+        compiler = CountingCompiler()
+        cache = GrammarCache(compiler)
+        with pytest.raises(SchemaError):
+            cache.for_schema({"type": "float"})
+        assert cache.stats()["entries"] == 0 and compiler.compiled == []
+
+    def test_concurrent_lookups(self, registry):
+        cache = GrammarCache(CountingCompiler())
+        schema = registry.tool_call_schema("query_finance")
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.extend(cache.for_schema(schema) for _ in range(50)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        assert len(results) == 400
+        assert cache.stats()["entries"] == 1
+        assert cache.stats()["hits"] + cache.stats()["misses"] == 400
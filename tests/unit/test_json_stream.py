@@ -0,0 +1,149 @@
+"""
+Unit tests for the incremental JSON validator used by Generate.
+
+The property tests are seeded random checks against json.loads: random
+documents fed in random chunkings must never fail early and must be
+complete exactly when json.loads accepts the text so far; random
+mutations must be judged the same way json.loads judges them.
+"""
+
+import json
+import random
+
+import pytest
+
+from llm_service.json_stream import JSONStreamValidator
+
+SEEDS = range(200)
+
+
+def _random_value(rng: random.Random, depth: int = 0):
+    kinds = ["int", "float", "str", "bool", "null"]
+    if depth < 4:
+        kinds += ["list", "dict"] * 2
+    kind = rng.choice(kinds)
+    if kind == "int":
+        return rng.choice([0, -1, 7, 10**rng.randint(1, 20), -rng.randint(0, 10**6)])
+    if kind == "float":
+        return rng.choice([0.5, -2.25e-7, 1e300, rng.uniform(-1e6, 1e6), float("inf"), float("nan")])
+    if kind == "str":
+        alphabet = 'ab "\\/\n\t\x01é€😀{}[],:'
+        return "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+    if kind == "bool":
+        return rng.random() < 0.5
+    if kind == "null":
+        return None
+    if kind == "list":
+        return [_random_value(rng, depth + 1) for _ in range(rng.randint(0, 4))]
+    return {
+        "".join(rng.choice("kéy\"\\") for _ in range(rng.randint(0, 5))): _random_value(rng, depth + 1)
+        for _ in range(rng.randint(0, 4))
+    }
+
+
+def _random_document(rng: random.Random) -> str:
+    text = json.dumps(
+        _random_value(rng),
+        indent=rng.choice([None, 0, 2]),
+        separators=rng.choice([None, (",", ":"), (" , ", " : ")]),
+        ensure_ascii=rng.random() < 0.5,
+    )
+    return rng.choice(["", " ", "\n"]) + text + rng.choice(["", " ", "\r\n"])
+
+
+def _chunks(rng: random.Random, text: str):
+    i = 0
+    while i < len(text):
+        size = rng.randint(1, 6)
+        yield text[i:i + size]
+        i += size
+
+
+def _loads_ok(text: str) -> bool:
+    try:
+        json.loads(text)
+        return True
+    except ValueError:
+        return False
+
+
+def _validate(text: str, rng: random.Random) -> JSONStreamValidator:
+    validator = JSONStreamValidator()
+    for chunk in _chunks(rng, text):
+        validator.feed(chunk)
+    return validator
+
+
+class TestAgainstJsonLoads:
+    def test_valid_documents_every_prefix(self):
+        for seed in SEEDS:
+            rng = random.Random(seed)
+            text = _random_document(rng)
+            validator = JSONStreamValidator()
+            consumed = ""
+            for chunk in _chunks(rng, text):
+                assert validator.feed(chunk), (seed, consumed + chunk, validator.error)
+                consumed += chunk
+                assert validator.complete == _loads_ok(consumed), (seed, consumed)
+            assert validator.complete
+
+    def test_mutated_documents(self):
+        for seed in SEEDS:
+            self._check_mutation(random.Random(seed))
+
+    def _check_mutation(self, rng: random.Random):
+        text = list(_random_document(rng))
+        for _ in range(rng.randint(1, 3)):
+            position = rng.randrange(len(text) + 1)
+            action = rng.choice(["insert", "delete", "replace"])
+            noise = rng.choice('{}[],:"\\ 0123-.eE+tfnulx\x02')
+            if action == "insert" or not text:
+                text.insert(position, noise)
+            elif action == "delete":
+                del text[min(position, len(text) - 1)]
+            else:
+                text[min(position, len(text) - 1)] = noise
+        text = "".join(text)
+
+        validator = _validate(text, rng)
+        assert validator.complete == _loads_ok(text), (text, validator.error)
+        if validator.failed:
+            # An early error means no continuation can repair the text
+            assert not any(_loads_ok(text + tail) for tail in ("", "]", "}", '"', "0", '"}', "]}", "0}"))
+
+
+class TestValidator:
+    def test_complete_and_incomplete(self):
+        validator = JSONStreamValidator()
+        for token, complete in [("{", False), ('"tool"', False), (": ", False), ("[1", False),
+                                (", 2.5", False), ("]", False), ("}", True), ("\n", True)]:
+            assert validator.feed(token)
+            assert validator.complete is complete, token
+
+    def test_top_level_scalars(self):
+        for text in ("0", "-12.5e+3", "true", "null", '"x"', "NaN", "-Infinity"):
+            assert _validate(text, random.Random(0)).complete, text
+        validator = JSONStreamValidator()
+        validator.feed("12")
+        assert validator.complete
+        validator.feed("3")
+        assert validator.complete
+
+    def test_error_reported_at_first_bad_character(self):
+        validator = JSONStreamValidator()
+        assert validator.feed('{"a": 1')
+        assert not validator.feed('} x')
+        assert validator.error == "unexpected 'x' after the document at position 9"
+        assert not validator.feed("anything")  # stays failed
+
+    @pytest.mark.parametrize("text", [
+        '{"a" 1}', "[1,]", '{"a":1,}', "01", "[1 2]", '"\\q"', '"\\u12g4"', "tru e", "-a", '"tab\there"', "}",
+    ])
+    def test_unrecoverable(self, text):
+        validator = _validate(text, random.Random(1))
+        assert validator.failed and not _loads_ok(text)
+
+    @pytest.mark.parametrize("text", ["", "  ", "[", '{"a', '{"a":', "-", "1.", "1e", "1e-", "tr", '"\\u00', "[1,"])
+    def test_recoverable_prefixes(self, text):
+        validator = _validate(text, random.Random(2))
+        assert not validator.failed and not validator.complete
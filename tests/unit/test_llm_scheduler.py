@@ -0,0 +1,402 @@
+"""
+Unit tests for the LLM service request scheduler.
+
+A stub model stands in for llama_cpp.Llama: its next token depends on the
+full evaluated context, so any mix-up of per-request state while requests
+are interleaved changes the output.
+"""
+
+import threading
+import time
+from concurrent import futures
+
+import grpc
+import pytest
+
+from llm_service.config import LLMServiceConfig
+from llm_service.scheduler import (
+    DeadlineExceeded,
+    GenerationRequest,
+    LlamaDecodeBackend,
+    RequestCancelled,
+    RequestScheduler,
+    SchedulerOverloaded,
+)
+from shared.generated import llm_pb2, llm_pb2_grpc
+
+EOS = 0
+
+
+class StubSampler:
+    """Identity object standing in for llama.cpp's per-generation sampler."""
+
+
+class StubLlama:
+    """
+    Minimal stand-in for llama_cpp.Llama's generate/state API.
+
+    Tokens are bytes of the prompt; generation emits lowercase letters
+    derived from the whole context and stops with EOS after as many tokens
+    as the prompt has characters.
+    """
+
+    def __init__(self, step_delay: float = 0.0):
+        self.step_delay = step_delay
+        self.context = []
+        self._sampler = None
+        self.eval_calls = 0
+
+    def tokenize(self, text: bytes, add_bos: bool = True, special: bool = False):
+        return list(text)
+
+    def detokenize(self, tokens):
+        return bytes(tokens)
+
+    def token_eos(self):
+        return EOS
+
+    def set_seed(self, seed):
+        self.seed = seed
+
+    def save_state(self):
+        return list(self.context)
+
+    def load_state(self, state):
+        self.context = list(state)
+
+    def generate(self, tokens, grammar=None, **kwargs):
+        sampler = StubSampler()
+        self._sampler = sampler
+        self.context = list(tokens)
+        budget = len(tokens)
+        produced = 0
+        while True:
+            assert self._sampler is sampler, "sampler not restored for session"
+            if self.step_delay:
+                time.sleep(self.step_delay)
+            self.eval_calls += 1
+            if produced >= budget:
+                token = EOS
+            else:
+                token = 97 + (sum(self.context) * 31 + len(self.context)) % 26
+            produced += 1
+            yield token
+            self.context.append(token)
+
+
+def expected_output(prompt: str, max_tokens: int = 1000) -> str:
+    """Output the stub produces for a prompt when run on its own."""
+    model = StubLlama()
+    backend = LlamaDecodeBackend(lambda: model)
+    session = backend.start(GenerationRequest(prompt=prompt, max_tokens=max_tokens))
+    pieces = []
+    while len(pieces) < max_tokens:
+        piece = backend.step(session)
+        if piece is None:
+            break
+        pieces.append(piece)
+    backend.close(session)
+    return "".join(pieces)
+
+
+@pytest.fixture
+def model():
+    return StubLlama()
+
+
+@pytest.fixture
+def make_scheduler(model):
+    schedulers = []
+
+    def _make(**kwargs):
+        scheduler = RequestScheduler(LlamaDecodeBackend(lambda: model), **kwargs)
+        schedulers.append(scheduler)
+        return scheduler
+
+    yield _make
+    for scheduler in schedulers:
+        scheduler.shutdown()
+
+
+class TestCorrectness:
+    def test_single_request(self, make_scheduler):
+        scheduler = make_scheduler().start()
+        handle = scheduler.submit(GenerationRequest(prompt="hello", max_tokens=50))
+
+        assert handle.result() == expected_output("hello")
+        assert handle.status == "completed"
+
+    def test_interleaved_matches_serial(self, make_scheduler):
+        """State swapping must keep every request's output identical to a solo run."""
+        scheduler = make_scheduler(max_active=4, tokens_per_turn=2)
+        prompts = ["alpha", "a much longer prompt here", "xyz", "interleave me"]
+        handles = [
+            scheduler.submit(GenerationRequest(prompt=p, max_tokens=100)) for p in prompts
+        ]
+        scheduler.start()
+
+        results = [h.result() for h in handles]
+
+        assert results == [expected_output(p) for p in prompts]
+        assert scheduler.stats()["swaps"] > 0
+
+    def test_max_tokens_truncates(self, make_scheduler):
+        scheduler = make_scheduler().start()
+        handle = scheduler.submit(GenerationRequest(prompt="long prompt text", max_tokens=3))
+
+        assert handle.result() == expected_output("long prompt text", max_tokens=3)
+        assert handle.tokens_generated == 3
+
+    def test_single_active_session_never_swaps(self, make_scheduler):
+        scheduler = make_scheduler(max_active=1)
+        for prompt in ["one", "two", "three"]:
+            scheduler.submit(GenerationRequest(prompt=prompt, max_tokens=20))
+        scheduler.start()
+        handle = scheduler.submit(GenerationRequest(prompt="four", max_tokens=20))
+        handle.result()
+
+        assert scheduler.stats()["swaps"] == 0
+
+
+class TestScheduling:
+    def test_short_request_not_blocked_by_long(self, make_scheduler):
+        scheduler = make_scheduler(max_active=4, tokens_per_turn=1)
+        long_handles = [
+            scheduler.submit(GenerationRequest(prompt="L" * 200, max_tokens=200))
+            for _ in range(2)
+        ]
+        short = scheduler.submit(GenerationRequest(prompt="s", max_tokens=10))
+        scheduler.start()
+
+        short.result()
+        # The short request finished while the long ones were still decoding
+        assert all(h.finished_at is None or h.finished_at > short.finished_at
+                   for h in long_handles)
+        for h in long_handles:
+            h.result()
+
+    def test_priority_admitted_first(self, make_scheduler):
+        scheduler = make_scheduler(max_active=1)
+        low = scheduler.submit(GenerationRequest(prompt="low", max_tokens=5, priority=0))
+        high = scheduler.submit(GenerationRequest(prompt="high", max_tokens=5, priority=10))
+        scheduler.start()
+
+        low.result()
+        high.result()
+        assert high.started_at <= low.started_at
+        assert high.finished_at < low.finished_at
+
+    def test_sessions_on_different_models_never_swap(self):
+        models = {"a": StubLlama(), "b": StubLlama()}
+        scheduler = RequestScheduler(
+            LlamaDecodeBackend(lambda model_id: models[model_id]),
+            max_active=2, tokens_per_turn=1,
+        )
+        try:
+            handles = [
+                scheduler.submit(GenerationRequest(prompt=p, max_tokens=100, model=m))
+                for p, m in [("alpha", "a"), ("bravo charlie", "b")]
+            ]
+            scheduler.start()
+
+            assert [h.result() for h in handles] == [
+                expected_output("alpha"), expected_output("bravo charlie")
+            ]
+            assert scheduler.stats()["swaps"] == 0
+        finally:
+            scheduler.shutdown()
+
+    def test_suspended_states_capped(self, model):
+        class TrackingBackend(LlamaDecodeBackend):
+            held = peak = 0
+
+            def suspend(self, session):
+                super().suspend(session)
+                TrackingBackend.held += 1
+
+            def resume(self, session):
+                if session.state is not None:
+                    TrackingBackend.held -= 1
+                super().resume(session)
+                # Sampled once the swap completes (suspend precedes resume)
+                TrackingBackend.peak = max(TrackingBackend.peak, TrackingBackend.held)
+
+        scheduler = RequestScheduler(
+            TrackingBackend(lambda: model), max_active=5, tokens_per_turn=1, max_suspended=1
+        )
+        try:
+            prompts = ["one", "second one", "third", "fourth prompt", "fifth"]
+            handles = [
+                scheduler.submit(GenerationRequest(prompt=p, max_tokens=100)) for p in prompts
+            ]
+            scheduler.start()
+
+            assert [h.result() for h in handles] == [expected_output(p) for p in prompts]
+            assert scheduler.stats()["swaps"] > 0
+            assert TrackingBackend.peak == 1
+        finally:
+            scheduler.shutdown()
+
+    def test_queue_full_rejected(self, make_scheduler):
+        scheduler = make_scheduler(max_queue=2)  # not started: nothing drains
+        scheduler.submit(GenerationRequest(prompt="a", max_tokens=5))
+        scheduler.submit(GenerationRequest(prompt="b", max_tokens=5))
+
+        with pytest.raises(SchedulerOverloaded):
+            scheduler.submit(GenerationRequest(prompt="c", max_tokens=5))
+        assert scheduler.stats()["rejected"] == 1
+
+
+class TestDeadlinesAndCancellation:
+    def test_expired_while_queued(self, make_scheduler):
+        scheduler = make_scheduler()
+        handle = scheduler.submit(GenerationRequest(
+            prompt="late", max_tokens=5, deadline=time.monotonic() - 1
+        ))
+        scheduler.start()
+
+        with pytest.raises(DeadlineExceeded):
+            handle.result()
+        assert handle.status == "expired"
+
+    def test_deadline_during_decode(self):
+        model = StubLlama(step_delay=0.01)
+        scheduler = RequestScheduler(LlamaDecodeBackend(lambda: model)).start()
+        try:
+            handle = scheduler.submit(GenerationRequest(
+                prompt="x" * 500, max_tokens=500, deadline=time.monotonic() + 0.1
+            ))
+            with pytest.raises(DeadlineExceeded):
+                handle.result()
+            assert 0 < handle.tokens_generated < 500
+        finally:
+            scheduler.shutdown()
+
+    def test_cancel_stops_decoding(self):
+        model = StubLlama(step_delay=0.005)
+        scheduler = RequestScheduler(LlamaDecodeBackend(lambda: model)).start()
+        try:
+            handle = scheduler.submit(GenerationRequest(prompt="x" * 500, max_tokens=500))
+            chunks = iter(handle)
+            next(chunks)
+            handle.cancel()
+            with pytest.raises(RequestCancelled):
+                list(chunks)
+            assert handle.tokens_generated < 500
+            assert scheduler.stats()["cancelled"] == 1
+        finally:
+            scheduler.shutdown()
+
+    def test_cancel_while_queued(self, make_scheduler):
+        scheduler = make_scheduler()
+        handle = scheduler.submit(GenerationRequest(prompt="never", max_tokens=5))
+        handle.cancel()
+        scheduler.start()
+
+        with pytest.raises(RequestCancelled):
+            handle.result()
+
+
+class TestExclusive:
+    def test_exclusive_drains_and_holds_admission(self):
+        model = StubLlama(step_delay=0.002)
+        scheduler = RequestScheduler(LlamaDecodeBackend(lambda: model)).start()
+        try:
+            running = scheduler.submit(GenerationRequest(prompt="r" * 30, max_tokens=30))
+            next(iter(running))  # ensure it is active
+
+            with scheduler.exclusive(timeout=5):
+                assert running.status == "completed"
+                waiting = scheduler.submit(GenerationRequest(prompt="w", max_tokens=5))
+                time.sleep(0.05)
+                assert waiting.status == "queued"
+
+            assert waiting.result() == expected_output("w", max_tokens=5)
+        finally:
+            scheduler.shutdown()
+
+    def test_backend_failure_reported(self, make_scheduler, model):
+        def broken(*args, **kwargs):
+            raise RuntimeError("boom")
+
+        model.generate = broken
+        scheduler = make_scheduler().start()
+        handle = scheduler.submit(GenerationRequest(prompt="x", max_tokens=5))
+
+        with pytest.raises(RuntimeError, match="boom"):
+            handle.result()
+        assert handle.status == "failed"
+
+
+def test_concurrent_submitters(make_scheduler):
+    scheduler = make_scheduler(max_active=3, max_queue=0, tokens_per_turn=3).start()
+    prompts = [f"prompt number {i}" for i in range(12)]
+    results = {}
+
+    def worker(prompt):
+        results[prompt] = scheduler.submit(
+            GenerationRequest(prompt=prompt, max_tokens=100)
+        ).result()
+
+    threads = [threading.Thread(target=worker, args=(p,)) for p in prompts]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=10)
+
+    assert results == {p: expected_output(p) for p in prompts}
+
+
+class SchedulerServicer(llm_pb2_grpc.LLMServiceServicer):
+    """Generate handler that, like LLMServiceServicer, blocks on the scheduler."""
+
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+
+    def Generate(self, request, context):
+        handle = self.scheduler.submit(GenerationRequest(
+            prompt=request.prompt, max_tokens=request.max_tokens, priority=request.priority
+        ))
+        yield llm_pb2.GenerateResponse(token=handle.result(), is_final=True)
+
+
+def test_grpc_workers_let_scheduler_queue_fill():
+    """serve()'s thread pool must hand the scheduler more than max_active requests."""
+    config = LLMServiceConfig(scheduler_max_active=2, scheduler_max_queue=4, max_workers=1)
+    assert config.grpc_workers >= config.scheduler_max_active + config.scheduler_max_queue
+
+    model = StubLlama(step_delay=0.002)
+    scheduler = RequestScheduler(
+        LlamaDecodeBackend(lambda: model),
+        max_active=config.scheduler_max_active,
+        max_queue=config.scheduler_max_queue,
+    ).start()
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=config.grpc_workers))
+    llm_pb2_grpc.add_LLMServiceServicer_to_server(SchedulerServicer(scheduler), server)
+    port = server.add_insecure_port("127.0.0.1:0")
+    server.start()
+    channel = grpc.insecure_channel(f"127.0.0.1:{port}")
+    stub = llm_pb2_grpc.LLMServiceStub(channel)
+
+    requests = config.scheduler_max_active + 3
+    with futures.ThreadPoolExecutor(max_workers=requests) as clients:
+        calls = [
+            clients.submit(lambda i=i: list(stub.Generate(llm_pb2.GenerateRequest(
+                prompt=f"request {i} " * 4, max_tokens=40
+            ))))
+            for i in range(requests)
+        ]
+        peak_queue = 0
+        while not all(call.done() for call in calls):
+            peak_queue = max(peak_queue, scheduler.stats()["queue_depth"])
+            time.sleep(0.001)
+        replies = [call.result() for call in calls]
+
+    channel.close()
+    server.stop(None).wait()
+    scheduler.shutdown()
+
+    assert all(reply[-1].is_final for reply in replies)
+    # Requests beyond max_active reached the scheduler and waited in its queue
+    assert peak_queue >= requests - config.scheduler_max_active
+    assert scheduler.stats()["rejected"] == 0
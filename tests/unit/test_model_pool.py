@@ -0,0 +1,234 @@
+"""
+Unit tests for the LLM service resident model pool.
+
+FakeLoader stands in for llama_cpp.Llama loading: every model id has a
+configurable size and load delay, and loads can be held back with an
+event to observe what keeps serving while a model is loading.
+"""
+
+import threading
+import time
+
+import pytest
+
+from llm_service.model_pool import ModelLoadError, ModelPool
+from llm_service.scheduler import GenerationRequest, LlamaDecodeBackend, RequestScheduler
+
+MB = 2**20
+
+
+class FakeModel:
+    """Stub Llama that answers with its own name."""
+
+    def __init__(self, model_id):
+        self.model_id = model_id
+        self._sampler = None
+
+    def tokenize(self, text, add_bos=True, special=False):
+        return list(text)
+
+    def detokenize(self, tokens):
+        return self.model_id.encode()
+
+    def token_eos(self):
+        return 0
+
+    def set_seed(self, seed):
+        self.seed = seed
+
+    def save_state(self):
+        return None
+
+    def load_state(self, state):
+        pass
+
+    def generate(self, tokens, **kwargs):
+        self._sampler = object()
+        yield 1
+        yield 0
+
+
+class FakeLoader:
+    def __init__(self, sizes, delay=0.0):
+        self.sizes = sizes
+        self.delay = delay
+        self.loads = []
+        self.gates = {}
+        self.fail = set()
+
+    def size_of(self, model_id):
+        if model_id not in self.sizes:
+            raise FileNotFoundError(model_id)
+        return self.sizes[model_id] * MB
+
+    def hold(self, model_id):
+        self.gates[model_id] = threading.Event()
+        return self.gates[model_id]
+
+    def __call__(self, model_id):
+        self.loads.append(model_id)
+        if model_id in self.gates:
+            self.gates[model_id].wait(5)
+        time.sleep(self.delay)
+        if model_id in self.fail:
+            raise RuntimeError("corrupt gguf")
+        return FakeModel(model_id)
+
+
+SIZES = {"heavy": 600, "standard": 400, "light": 200, "micro": 100}
+
+
+@pytest.fixture
+def loader():
+    return FakeLoader(SIZES)
+
+
+def _pool(loader, budget_mb, default="light", **kwargs):
+    return ModelPool(loader, default, budget_mb * MB, loader.size_of, **kwargs)
+
+
+def _resident(pool):
+    return [entry["model_id"] for entry in pool.resident()]
+
+
+class TestResidency:
+    def test_several_models_resident_within_budget(self, loader):
+        pool = _pool(loader, 800)
+        for model_id in ("light", "standard", "micro", "light", "standard"):
+            assert pool.get(model_id).model_id == model_id
+        assert loader.loads == ["light", "standard", "micro"]
+        assert pool.stats()["bytes"] == 700 * MB
+        assert pool.get().model_id == "light"  # default
+
+    def test_lru_idle_model_evicted(self, loader):
+        evicted = []
+        pool = _pool(loader, 800, on_evict=lambda model_id, model: evicted.append((model_id, model.model_id)))
+        for model_id in ("light", "standard", "micro", "standard"):
+            pool.get(model_id)
+        pool.get("heavy")
+        # micro was least recently used; light is the default
+        assert evicted == [("micro", "micro"), ("standard", "standard")]
+        assert _resident(pool) == ["light", "heavy"]
+        assert pool.stats()["bytes"] == 800 * MB
+
+    def test_leased_model_not_evicted(self, loader):
+        pool = _pool(loader, 700)
+        with pool.acquire("standard"):
+            # heavy does not fit next to the in-use model; it goes once idle
+            assert pool.get("heavy").model_id == "heavy"
+            assert _resident(pool) == ["standard"]
+
+    def test_over_budget_model_evicted_on_release(self, loader):
+        pool = _pool(loader, 700)
+        standard = pool.acquire("standard")
+        heavy = pool.acquire("heavy")
+        assert _resident(pool) == ["standard", "heavy"]  # over budget while in use
+        standard.release()
+        standard.release()  # idempotent
+        assert _resident(pool) == ["heavy"]
+        heavy.release()
+        assert _resident(pool) == ["heavy"]
+
+    def test_zero_budget_keeps_default_only(self, loader):
+        pool = _pool(loader, 0)
+        pool.get("micro")
+        assert _resident(pool) == []
+        assert pool.get().model_id == "light"
+        assert _resident(pool) == ["light"]
+
+
+class TestBackgroundLoading:
+    def test_resident_model_serves_while_another_loads(self, loader):
+        pool = _pool(loader, 2000)
+        pool.get("light")
+        gate = loader.hold("heavy")
+
+        ready = pool.prefetch("heavy")
+        started = time.monotonic()
+        for _ in range(10):
+            assert pool.get("light").model_id == "light"
+        assert time.monotonic() - started < 0.5
+        assert not ready.is_set() and not pool.is_resident("heavy")
+
+        gate.set()
+        assert ready.wait(5) and pool.is_resident("heavy")
+
+    def test_concurrent_requests_load_once(self, loader):
+        loader.delay = 0.05
+        pool = _pool(loader, 2000)
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(pool.get("standard").model_id))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        assert results == ["standard"] * 8
+        assert loader.loads == ["standard"]
+
+    def test_switch_default_is_non_blocking(self, loader):
+        pool = _pool(loader, 500)
+        pool.get()
+        gate = loader.hold("standard")
+
+        started = time.monotonic()
+        ready = pool.set_default("standard")
+        assert time.monotonic() - started < 0.5
+        # Default traffic stays on the old model until the new one is ready
+        assert pool.get().model_id == "light"
+
+        gate.set()
+        ready.wait(5)
+        assert pool.default_model == "standard"
+        assert pool.get().model_id == "standard"
+        assert _resident(pool) == ["standard"]  # old default evicted once idle
+
+    def test_acquire_timeout(self, loader):
+        pool = _pool(loader, 2000)
+        gate = loader.hold("heavy")
+        with pytest.raises(TimeoutError):
+            pool.acquire("heavy", timeout=0.05)
+        gate.set()
+        with pool.acquire("heavy", timeout=5) as lease:
+            assert lease.model.model_id == "heavy"
+
+    def test_load_failure_and_retry(self, loader):
+        pool = _pool(loader, 2000)
+        loader.fail.add("micro")
+        with pytest.raises(ModelLoadError):
+            pool.get("micro")
+        assert "micro" not in _resident(pool)
+        assert pool.stats()["load_failures"] == 1
+
+        loader.fail.clear()
+        assert pool.get("micro").model_id == "micro"
+
+    def test_failed_switch_keeps_old_default(self, loader):
+        pool = _pool(loader, 2000)
+        loader.fail.add("heavy")
+        pool.set_default("heavy").wait(5)
+        assert pool.default_model == "light"
+
+    def test_unknown_model(self, loader):
+        pool = _pool(loader, 2000)
+        with pytest.raises(FileNotFoundError):
+            pool.acquire("does-not-exist.gguf")
+
+
+def test_scheduler_routes_by_model_id(loader):
+    pool = _pool(loader, 2000)
+    scheduler = RequestScheduler(LlamaDecodeBackend(pool.get)).start()
+    try:
+        handles = {
+            model_id: scheduler.submit(GenerationRequest(prompt="hi", max_tokens=4, model=model_id))
+            for model_id in ("heavy", "micro", "standard")
+        }
+        default = scheduler.submit(GenerationRequest(prompt="hi", max_tokens=4))
+        assert {model_id: h.result() for model_id, h in handles.items()} == {
+            "heavy": "heavy", "micro": "micro", "standard": "standard",
+        }
+        assert default.result() == "light"
+    finally:
+        scheduler.shutdown()
@@ -11,6 +11,7 @@ from llm_service.model_registry import (
     ModelSpec,
     resolve_model_spec,
     auto_configure,
+    estimate_context_bytes,
 )
 
 
@@ -67,3 +68,16 @@ class TestModelRegistry:
             assert spec.recommended_ctx > 0
             assert spec.max_tokens > 0
             assert 0 <= spec.temperature <= 2.0
+
+    def test_estimate_context_bytes_qwen3b(self):
+        path = "models/qwen2.5-3b-instruct-q5_k_m.gguf"
+        kv = 4096 * 36 * 2 * 2 * 128 * 2  # 144 MB of f16 KV cache
+        scores = 512 * 151_936 * 4  # ~297 MB of float32 logits
+        assert estimate_context_bytes(path, 4096, 512) == kv + scores
+        # logits_all (speculative draft) keeps a row per context position
+        assert estimate_context_bytes(path, 4096, 512, logits_all=True) == kv + 8 * scores
+
+    def test_estimate_context_bytes_unknown_model(self):
+        assert estimate_context_bytes("models/unknown.gguf", 4096, 512) > 0
+        assert estimate_context_bytes("models/unknown.gguf", 8192, 512) > \
+            estimate_context_bytes("models/unknown.gguf", 4096, 512)
@@ -0,0 +1,265 @@
+"""
+Unit tests for the LLM service prompt-prefix state cache.
+
+CountingLlama mimics llama_cpp.Llama's prefix reuse in generate() (only the
+tokens after the longest common prefix with the current context are
+evaluated) and counts every evaluated token.
+"""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from llm_service.prefix_cache import BLOCK_TOKENS, PrefixStateCache
+from llm_service.scheduler import GenerationRequest, LlamaDecodeBackend, RequestScheduler
+
+EOS = 0
+BYTES_PER_TOKEN = 100
+
+
+class CountingLlama:
+    def __init__(self):
+        self.input_ids = []
+        self.n_tokens = 0
+        self.evaluated = 0
+        self._sampler = None
+
+    def tokenize(self, text: bytes, add_bos: bool = True, special: bool = False):
+        return list(text)
+
+    def detokenize(self, tokens):
+        return bytes(tokens)
+
+    def token_eos(self):
+        return EOS
+
+    def set_seed(self, seed):
+        self.seed = seed
+
+    def save_state(self):
+        return SimpleNamespace(
+            input_ids=list(self.input_ids[:self.n_tokens]),
+            llama_state_size=self.n_tokens * BYTES_PER_TOKEN,
+        )
+
+    def load_state(self, state):
+        self.input_ids = list(state.input_ids)
+        self.n_tokens = len(state.input_ids)
+
+    def _eval(self, tokens):
+        self.evaluated += len(tokens)
+        self.input_ids = self.input_ids[:self.n_tokens] + list(tokens)
+        self.n_tokens = len(self.input_ids)
+
+    def generate(self, tokens, reset=True, **kwargs):
+        self._sampler = object()
+        if reset and self.n_tokens > 0:
+            longest = 0
+            for a, b in zip(self.input_ids[:self.n_tokens], tokens[:-1]):
+                if a != b:
+                    break
+                longest += 1
+            tokens = tokens[longest:]
+            self.n_tokens = longest
+        produced = 0
+        while True:
+            self._eval(tokens)
+            token = EOS if produced >= 4 else 97 + sum(self.input_ids) % 26
+            produced += 1
+            yield token
+            tokens = [token]
+
+
+SYSTEM = "You are a helpful AI assistant with access to tools.\n" + "tool schema " * 40
+
+
+def _prompt(question: str) -> str:
+    return f"{SYSTEM}\nConversation:\n{question}\nYour response (JSON only):"
+
+
+def _run(backend, prompt):
+    session = backend.start(GenerationRequest(prompt=prompt, max_tokens=16))
+    pieces = []
+    while (piece := backend.step(session)) is not None:
+        pieces.append(piece)
+    backend.close(session)
+    return "".join(pieces)
+
+
+@pytest.fixture
+def model():
+    return CountingLlama()
+
+
+class TestPrefixReuse:
+    def test_repeated_prefix_evaluated_once(self, model):
+        cache = PrefixStateCache(max_bytes=10**9)
+        backend = LlamaDecodeBackend(lambda: model, prefix_cache=cache)
+
+        _run(backend, _prompt("What is 2+2?"))
+        first = model.evaluated
+        # Another prompt in between replaces the model's context
+        _run(backend, "unrelated " * 20)
+        before = model.evaluated
+        second_prompt = _prompt("Where is my next meeting?")
+        _run(backend, second_prompt)
+        second = model.evaluated - before
+
+        shared = len(SYSTEM) + len("\nConversation:\n")
+        assert first >= len(_prompt("What is 2+2?"))
+        # Only the differing tail (+ generated tokens) is evaluated
+        assert second <= len(second_prompt) - shared + 8
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["tokens_reused"] >= shared // BLOCK_TOKENS * BLOCK_TOKENS
+
+    def test_same_output_with_and_without_cache(self):
+        prompts = [_prompt(q) for q in ("a?", "b?", "a?", "something longer?")]
+        plain = LlamaDecodeBackend(lambda m=CountingLlama(): m)
+        cached_model = CountingLlama()
+        cached = LlamaDecodeBackend(lambda: cached_model, prefix_cache=PrefixStateCache(10**9))
+        for prompt in prompts:
+            _run(plain, "reset " * 30)
+            _run(cached, "reset " * 30)
+            assert _run(cached, prompt) == _run(plain, prompt)
+
+    def test_disabled_cache_re_evaluates(self, model):
+        backend = LlamaDecodeBackend(lambda: model, prefix_cache=PrefixStateCache(max_bytes=0))
+        for question in ("one?", "two?"):
+            _run(backend, "unrelated " * 20)
+            before = model.evaluated
+            _run(backend, _prompt(question))
+            assert model.evaluated - before >= len(SYSTEM)
+
+    def test_short_prompts_not_saved(self, model):
+        cache = PrefixStateCache(max_bytes=10**9)
+        _run(LlamaDecodeBackend(lambda: model, prefix_cache=cache), "short")
+        assert cache.stats()["entries"] == 0
+
+    def test_tool_loop_through_scheduler(self, model):
+        cache = PrefixStateCache(max_bytes=10**9)
+        scheduler = RequestScheduler(LlamaDecodeBackend(lambda: model, prefix_cache=cache)).start()
+        try:
+            evaluated = []
+            conversation = "User: plan my day"
+            for step in range(5):
+                # Interleave an unrelated client between tool-loop iterations
+                scheduler.submit(GenerationRequest(prompt="other client " * 10, max_tokens=4)).result()
+                before = model.evaluated
+                scheduler.submit(GenerationRequest(prompt=_prompt(conversation), max_tokens=8)).result()
+                evaluated.append(model.evaluated - before)
+                conversation += f"\nTool result {step}: ok"
+        finally:
+            scheduler.shutdown()
+
+        # The system prompt + tool schema is only evaluated on the first iteration
+        assert evaluated[0] > len(SYSTEM)
+        assert all(count < len(SYSTEM) / 2 for count in evaluated[1:])
+
+
+class TestBudget:
+    def test_lru_eviction_and_metrics(self, model):
+        # Room for two saved 200-token prompt states
+        cache = PrefixStateCache(max_bytes=200 * BYTES_PER_TOKEN * 2 + 50)
+        backend = LlamaDecodeBackend(lambda: model, prefix_cache=cache)
+
+        for name in ("aa", "bb", "cc"):
+            _run(backend, name * 100)
+        stats = cache.stats()
+        assert stats["entries"] == 2
+        assert stats["evictions"] == 1
+        assert stats["bytes"] <= cache.max_bytes
+
+        # "cc…" is still cached, "aa…" was evicted (short fillers aren't saved)
+        _run(backend, "z" * 40)
+        before = model.evaluated
+        _run(backend, "cc" * 100)
+        assert model.evaluated - before < 10
+        _run(backend, "z" * 40)
+        before = model.evaluated
+        _run(backend, "aa" * 100)
+        assert model.evaluated - before >= 190
+
+    def test_oversized_state_not_cached(self, model):
+        cache = PrefixStateCache(max_bytes=10 * BYTES_PER_TOKEN)
+        _run(LlamaDecodeBackend(lambda: model, prefix_cache=cache), _prompt("q"))
+        assert cache.stats()["entries"] == 0
+
+    def test_scores_and_input_ids_count_against_budget(self):
+        class ScoresLlama(CountingLlama):
+            """Saves a LlamaState-like scores buffer (n_batch x n_vocab floats)."""
+
+            def save_state(self):
+                state = super().save_state()
+                state.scores = np.zeros((512, 1024), dtype=np.single)
+                state.input_ids = np.array(state.input_ids, dtype=np.intc)
+                return state
+
+        prompt = _prompt("q")
+        state_bytes = len(prompt) * BYTES_PER_TOKEN
+        scores_bytes = 512 * 1024 * 4
+
+        # Fits on llama_state_size alone, not with the scores copy
+        small = PrefixStateCache(max_bytes=state_bytes * 2)
+        _run(LlamaDecodeBackend(ScoresLlama, prefix_cache=small), prompt)
+        assert small.stats()["entries"] == 0
+
+        large = PrefixStateCache(max_bytes=10**9)
+        _run(LlamaDecodeBackend(ScoresLlama, prefix_cache=large), prompt)
+        assert large.stats()["bytes"] == state_bytes + scores_bytes + len(prompt) * 4
+
+    def test_states_not_shared_between_models(self, model):
+        cache = PrefixStateCache(max_bytes=10**9)
+        _run(LlamaDecodeBackend(lambda: model, prefix_cache=cache), _prompt("q"))
+        assert cache.stats()["entries"] == 1
+
+        other = CountingLlama()
+        _run(LlamaDecodeBackend(lambda: other, prefix_cache=cache), _prompt("q"))
+        assert other.evaluated >= len(_prompt("q"))
+        assert cache.stats()["hits"] == 0
+        assert (cache.stats()["entries"], cache.stats()["models"]) == (2, 2)
+
+    def test_alternating_models_keep_their_prefixes(self):
+        cache = PrefixStateCache(max_bytes=10**9)
+        models = [CountingLlama(), CountingLlama()]
+        backends = [LlamaDecodeBackend(lambda m=m: m, prefix_cache=cache) for m in models]
+
+        for backend in backends:
+            _run(backend, _prompt("warm up?"))
+        for step in range(3):
+            for model, backend in zip(models, backends):
+                _run(backend, "unrelated " * 20)
+                before = model.evaluated
+                _run(backend, _prompt(f"question {step}?"))
+                # Routing to the other model in between didn't drop this one's prefix
+                assert model.evaluated - before < len(SYSTEM) / 2
+        assert cache.stats()["models"] == 2
+
+    def test_forget_unloaded_model(self, model):
+        cache = PrefixStateCache(max_bytes=10**9)
+        other = CountingLlama()
+        _run(LlamaDecodeBackend(lambda: model, prefix_cache=cache), _prompt("q"))
+        _run(LlamaDecodeBackend(lambda: other, prefix_cache=cache), _prompt("q"))
+        cache.forget(CountingLlama())
+        assert cache.stats()["entries"] == 2
+        cache.forget(model)
+        assert (cache.stats()["entries"], cache.stats()["models"]) == (1, 1)
+        assert cache.stats()["bytes"] == len(_prompt("q")) * BYTES_PER_TOKEN
+
+    def test_forget_while_scheduler_runs(self, model):
+        cache = PrefixStateCache(max_bytes=10**9)
+        scheduler = RequestScheduler(LlamaDecodeBackend(lambda: model, prefix_cache=cache)).start()
+        try:
+            futures = [
+                scheduler.submit(GenerationRequest(prompt=_prompt(f"q{i}?"), max_tokens=4))
+                for i in range(20)
+            ]
+            # Model-pool eviction calls forget() from another thread
+            for _ in range(200):
+                cache.forget(model)
+            for future in futures:
+                future.result()
+        finally:
+            scheduler.shutdown()
+        cache.forget(model)
+        assert cache.stats()["bytes"] == 0
@@ -0,0 +1,205 @@
+"""
+Unit tests for streaming online providers through the shared LoopRunner.
+
+A local aiohttp server (on its own LoopRunner) serves an OpenAI-compatible
+/chat/completions endpoint that emits SSE chunks with a delay between them,
+so tokens arriving before the stream ends show up as a short time to first
+token. It also records the client port of every request, which shows
+whether keep-alive connections are reused.
+"""
+
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+from aiohttp import web
+
+from orchestrator.orchestrator_service import OnlineProviderWrapper
+from shared.providers import ChatMessage, ChatRequest, ProviderConfig, ProviderError, ProviderType
+from shared.providers.loop_runner import LoopRunner, get_loop_runner
+from shared.providers.online_provider import OnlineProvider
+
+TOKENS = ["The", " office", " is", " 25", " minutes", " away", "."]
+DELAY = 0.1
+
+
+class StubServer:
+    def __init__(self):
+        self.runner = LoopRunner(name="stub-server")
+        self.peers = []
+        self.aborted = threading.Event()
+        self.status = 200
+
+    async def _chat(self, request):
+        self.peers.append(request.transport.get_extra_info("peername")[1])
+        body = await request.json()
+        if self.status != 200:
+            return web.Response(status=self.status, text="denied")
+        if not body.get("stream"):
+            return web.json_response({
+                "choices": [{"message": {"content": "".join(TOKENS)}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 9, "completion_tokens": len(TOKENS)},
+            })
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        try:
+            for token in TOKENS:
+                chunk = {"choices": [{"delta": {"content": token}}]}
+                await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                await asyncio.sleep(DELAY)
+            await response.write(b"data: [DONE]\n\n")
+        except (asyncio.CancelledError, ConnectionResetError):
+            self.aborted.set()
+            raise
+        return response
+
+    async def _start(self):
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self._chat)
+        self._app_runner = web.AppRunner(app)
+        await self._app_runner.setup()
+        site = web.TCPSite(self._app_runner, "127.0.0.1", 0)
+        await site.start()
+        return site._server.sockets[0].getsockname()[1]
+
+    def start(self) -> str:
+        port = self.runner.run(self._start())
+        return f"http://127.0.0.1:{port}/v1"
+
+    def stop(self):
+        self.runner.run(self._app_runner.cleanup())
+        self.runner.close()
+
+
+@pytest.fixture
+def server():
+    stub = StubServer()
+    stub.base_url = stub.start()
+    yield stub
+    stub.stop()
+
+
+@pytest.fixture
+def runner():
+    loop_runner = LoopRunner(name="test-provider-loop").start()
+    yield loop_runner
+    loop_runner.close()
+
+
+def _provider(server):
+    return OnlineProvider(ProviderConfig(
+        provider_type=ProviderType.OPENAI, api_key="test-key", base_url=server.base_url, timeout=10,
+    ))
+
+
+def _request(stream=False):
+    return ChatRequest(messages=[ChatMessage(role="user", content="commute?")], model="stub", stream=stream)
+
+
+def _timed(chunks):
+    start = time.perf_counter()
+    first, tokens = None, []
+    for chunk in chunks:
+        if first is None:
+            first = time.perf_counter() - start
+        tokens.append(chunk)
+    return first, time.perf_counter() - start, tokens
+
+
+class TestTimeToFirstToken:
+    def test_wrapper_streams_as_chunks_arrive(self, server, runner):
+        wrapper = OnlineProviderWrapper(_provider(server), model="stub", loop_runner=runner)
+        first, total, chunks = _timed(wrapper.generate_stream("commute?"))
+
+        assert [c.token for c in chunks[:-1]] == TOKENS
+        assert chunks[-1].is_final and chunks[-1].token == ""
+        assert not any(c.is_final for c in chunks[:-1])
+        assert total >= DELAY * (len(TOKENS) - 1)
+        assert first < DELAY * 2  # previously: only after the whole stream
+
+    def test_generate_stream_sync(self, server):
+        first, total, tokens = _timed(_provider(server).generate_stream_sync(_request(stream=True)))
+        assert tokens == TOKENS
+        assert first < DELAY * 2 < total
+
+
+class TestNoLeaks:
+    def test_one_loop_one_session(self, server, runner, monkeypatch):
+        provider = _provider(server)
+        wrapper = OnlineProviderWrapper(provider, model="stub", loop_runner=runner)
+        wrapper.generate("warm up")
+        threads = threading.active_count()
+
+        new_loops = []
+        real_new_event_loop = asyncio.new_event_loop
+        monkeypatch.setattr(asyncio, "new_event_loop", lambda: new_loops.append(1) or real_new_event_loop())
+
+        def worker():
+            for _ in range(3):
+                assert wrapper.generate("hi") == "".join(TOKENS)
+                assert [c.token for c in wrapper.generate_stream("hi")][:-1] == TOKENS
+
+        workers = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+
+        assert new_loops == []
+        assert threading.active_count() == threads
+        assert runner.session_count == 1
+        assert provider._session is None  # pooled on the runner, not per provider
+        # How many keep-alive connections concurrent requests open depends on
+        # release timing (and the aiohttp version); reuse is covered by
+        # test_sequential_requests_reuse_connection
+
+    def test_sequential_requests_reuse_connection(self, server, runner):
+        wrapper = OnlineProviderWrapper(_provider(server), model="stub", loop_runner=runner)
+        for _ in range(5):
+            wrapper.generate("hi")
+        assert len(set(server.peers)) == 1
+
+    def test_close_releases_sessions_and_thread(self, server):
+        loop_runner = LoopRunner(name="closing-loop")
+        wrapper = OnlineProviderWrapper(_provider(server), model="stub", loop_runner=loop_runner)
+        wrapper.generate("hi")
+        sessions = list(loop_runner._sessions.values())
+        thread = loop_runner._thread
+
+        loop_runner.close()
+        assert all(session.closed for session in sessions)
+        assert not thread.is_alive()
+        assert not loop_runner.running
+
+
+class TestCancellationAndErrors:
+    def test_early_close_cancels_request(self, server, runner):
+        wrapper = OnlineProviderWrapper(_provider(server), model="stub", loop_runner=runner)
+        stream = wrapper.generate_stream("hi")
+        assert next(stream).token == TOKENS[0]
+        stream.close()
+
+        assert server.aborted.wait(timeout=DELAY * 10)
+        assert wrapper.generate("again") == "".join(TOKENS)
+
+    def test_errors_reach_the_caller(self, server, runner):
+        server.status = 401
+        wrapper = OnlineProviderWrapper(_provider(server), model="stub", loop_runner=runner)
+        with pytest.raises(ProviderError):
+            wrapper.generate("hi")
+        with pytest.raises(ProviderError):
+            list(wrapper.generate_stream("hi"))
+
+    def test_run_from_loop_thread_is_rejected(self, runner):
+        async def nested():
+            return runner.run(asyncio.sleep(0))
+
+        with pytest.raises(RuntimeError, match="own loop thread"):
+            runner.run(nested())
+
+    def test_shared_runner_is_a_singleton(self):
+        assert get_loop_runner() is get_loop_runner()
+        assert get_loop_runner().running
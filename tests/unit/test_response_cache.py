@@ -0,0 +1,258 @@
+"""
+Unit tests for the agent response cache.
+
+Covers the hit / miss / bypass decisions of ResponseCache on its own (with
+a fake clock for per-intent TTLs and a bag-of-words embedder for
+similarity), and OrchestratorService._process_query serving repeats from
+the cache instead of re-running a real AgentWorkflow.
+"""
+
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from langgraph.checkpoint.memory import MemorySaver
+
+from core.graph import AgentWorkflow
+from core.state import WorkflowConfig
+from orchestrator.classification_cache import normalize_query
+from orchestrator.intent_patterns import analyze_intent
+from orchestrator.orchestrator_service import LLMEngineWrapper, OrchestratorService
+from orchestrator.response_cache import ResponseCache
+from tools.registry import LocalToolRegistry
+
+VOCAB = ["what", "is", "a", "monad", "explain", "monads", "functor", "define"]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def bag_of_words(text):
+    words = normalize_query(text).split()
+    return [float(words.count(word)) for word in VOCAB]
+
+
+def _lookup(cache, query):
+    return cache.lookup(query, analyze_intent(query))
+
+
+def _answer(cache, query, content="answer"):
+    lookup = _lookup(cache, query)
+    if lookup.hit:
+        return lookup
+    cache.store(lookup, content)
+    return lookup
+
+
+class TestDecisions:
+    @pytest.mark.parametrize("repeat", [
+        "what is a monad", "What is a monad?", "  WHAT is a   monad!! ",
+    ])
+    def test_normalized_repeat_hits(self, repeat):
+        cache = ResponseCache()
+        assert _answer(cache, "what is a monad", "A monoid in the category of endofunctors").decision == "miss"
+
+        lookup = _lookup(cache, repeat)
+        assert lookup.decision == "hit"
+        assert lookup.content == "A monoid in the category of endofunctors"
+
+    @pytest.mark.parametrize("cached, asked", [
+        ("what is 2+2", "what is 2*2"),
+        ("define C++", "define C#"),
+        ("Is 5 > 3?", "Is 5 < 3?"),
+        ("what is 15% of 80", "what is 15 of 80"),
+    ])
+    def test_symbols_are_part_of_the_key(self, cached, asked):
+        cache = ResponseCache()
+        _answer(cache, cached, "answer to " + cached)
+        assert _lookup(cache, asked).decision == "miss"
+        assert _lookup(cache, cached).decision == "hit"
+
+    def test_different_question_misses(self):
+        cache = ResponseCache()
+        _answer(cache, "what is a monad")
+        assert _lookup(cache, "what is a functor").decision == "miss"
+
+    @pytest.mark.parametrize("query, reason", [
+        ("what's the weather like", "tool_intent"),
+        ("when should I leave for work", "tool_intent"),
+        ("when should I leave", "clarification"),
+        ("what is the latest python release", "time_sensitive"),
+        ("what is on the news today", "time_sensitive"),
+        ("what is my account balance", "live_data"),
+        ("search for monad tutorials", "live_data"),
+        ("explain that again", "context_reference"),
+    ])
+    def test_bypass(self, query, reason):
+        cache = ResponseCache()
+        first = _answer(cache, query)
+        second = _lookup(cache, query)
+
+        assert first.decision == second.decision == "bypass"
+        assert second.reason == reason
+        assert len(cache) == 0
+
+    def test_empty_answers_are_not_stored(self):
+        cache = ResponseCache()
+        _answer(cache, "what is a monad", content="  ")
+        assert _lookup(cache, "what is a monad").decision == "miss"
+
+    def test_hit_rate(self):
+        cache = ResponseCache()
+        for query in ["what is a monad", "what is a monad", "what is my balance", "what is a monad"]:
+            _answer(cache, query)
+        stats = cache.stats()
+        assert (stats["hit"], stats["miss"], stats["bypass"]) == (2, 1, 1)
+        assert stats["hit_rate"] == pytest.approx(0.5)
+
+
+class TestExpiryAndVersions:
+    def test_per_intent_ttls(self):
+        clock = FakeClock()
+        cache = ResponseCache(default_ttl_seconds=60, intent_ttls={"code": 600, "definition": 3600}, clock=clock)
+        _answer(cache, "write a python function to reverse a list")  # code
+        _answer(cache, "what is a monad")  # definition
+        _answer(cache, "tell me a joke about cats")  # general
+
+        clock.now = 120
+        assert _lookup(cache, "tell me a joke about cats").decision == "miss"
+        assert _lookup(cache, "write a python function to reverse a list").decision == "hit"
+
+        clock.now = 1200
+        assert _lookup(cache, "write a python function to reverse a list").decision == "miss"
+        assert _lookup(cache, "what is a monad").decision == "hit"
+
+    def test_zero_ttl_disables_category(self):
+        cache = ResponseCache(intent_ttls={"general": 0})
+        lookup = _answer(cache, "tell me a joke about cats")
+        assert lookup.decision == "bypass" and lookup.reason == "disabled"
+
+    def test_lru_bound(self):
+        cache = ResponseCache(max_entries=2)
+        for query in ["what is a monad", "what is a functor", "what is a monoid"]:
+            _answer(cache, query)
+        assert len(cache) == 2
+        assert _lookup(cache, "what is a monad").decision == "miss"
+
+    def test_version_change_flushes(self):
+        cache = ResponseCache(version="local:qwen:1")
+        _answer(cache, "what is a monad")
+        cache.set_version("local:qwen:2")
+
+        assert len(cache) == 0
+        assert _lookup(cache, "what is a monad").decision == "miss"
+
+    def test_answer_generated_across_version_change_is_dropped(self):
+        cache = ResponseCache(version="v1")
+        lookup = _lookup(cache, "what is a monad")
+        cache.set_version("v2")
+        assert cache.store(lookup, "stale answer") is False
+        assert len(cache) == 0
+
+
+class TestSimilarity:
+    def test_similar_phrasing_hits_in_same_category(self):
+        cache = ResponseCache(embed=bag_of_words, similarity_threshold=0.8)
+        _answer(cache, "what is a monad", "monad answer")
+
+        lookup = _lookup(cache, "what is monad")
+        assert lookup.decision == "similar"
+        assert lookup.content == "monad answer"
+
+    def test_threshold_and_category_respected(self):
+        cache = ResponseCache(embed=bag_of_words, similarity_threshold=0.8)
+        _answer(cache, "what is a monad")
+        assert _lookup(cache, "what is a functor").decision == "miss"  # below threshold
+        # same words, different category (general, not definition)
+        assert _lookup(cache, "monad").decision == "miss"
+
+
+class CountingClient:
+    def __init__(self, answer="A monad is a monoid in the category of endofunctors."):
+        self.answer = answer
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def generate(self, prompt, max_tokens=512, temperature=0.7, response_format=""):
+        with self.lock:
+            self.calls += 1
+        return self.answer
+
+
+def _service(client, cache, checkpointer=None):
+    engine = LLMEngineWrapper(client, max_tool_iterations=2)
+    workflow = AgentWorkflow(LocalToolRegistry(), engine, WorkflowConfig())
+
+    service = OrchestratorService.__new__(OrchestratorService)
+    service.config = SimpleNamespace(context_window=12)
+    service.observability_enabled = False
+    service.request_metrics = None
+    service.tool_metrics = None
+    service.pipeline_metrics = None
+    service.delegation_enabled = False
+    service.delegation_manager = None
+    service.response_cache = cache
+    service.compiled_workflow = workflow.compile(checkpointer)
+    return service
+
+
+class TestProcessQuery:
+    def test_repeat_skips_workflow(self):
+        client = CountingClient()
+        service = _service(client, ResponseCache())
+
+        first = service._process_query("What is a monad?", thread_id="t-1")
+        calls = client.calls
+        second = service._process_query("what is a monad", thread_id="t-2")
+
+        assert client.calls == calls > 0
+        assert second["content"] == first["content"] == client.answer
+        assert second["cached"] is True and "cached" not in first
+        assert service._build_sources_metadata(second, "t-2")["cached"] is True
+
+    def test_bypassed_query_runs_workflow_each_time(self):
+        client = CountingClient(answer="It is sunny.")
+        service = _service(client, ResponseCache())
+
+        service._process_query("what is the weather today", thread_id="t-1")
+        calls = client.calls
+        service._process_query("what is the weather today", thread_id="t-1")
+
+        assert client.calls == 2 * calls
+        assert service.response_cache.stats()["bypass"] == 2
+
+    def test_answers_that_used_tools_are_not_stored(self):
+        cache = ResponseCache()
+        service = _service(CountingClient(), cache)
+        service._run_query = lambda *args: {"content": "from a tool", "tool_results": [{"tool_name": "web_search"}]}
+
+        service._process_query("what is a monad", thread_id="t-1")
+        assert len(cache) == 0
+
+    def test_disabled_cache_always_runs_workflow(self):
+        client = CountingClient()
+        service = _service(client, None)
+        service._process_query("what is a monad", thread_id="t-1")
+        calls = client.calls
+        service._process_query("what is a monad", thread_id="t-1")
+        assert client.calls == 2 * calls
+
+    def test_cache_hit_is_saved_to_thread_history(self):
+        client = CountingClient()
+        service = _service(client, ResponseCache(), checkpointer=MemorySaver())
+        service._process_query("What is a monad?", thread_id="t-1")
+        result = service._process_query("what is a monad", thread_id="t-2")
+        assert result["cached"] is True
+
+        config = {"configurable": {"thread_id": "t-2"}}
+        history = service.compiled_workflow.get_state(config).values["messages"]
+        assert [m.content for m in history] == ["what is a monad", client.answer]
+
+        # The thread keeps working normally after a cached turn
+        assert service._process_query("tell me a joke about cats", thread_id="t-2")["content"] == client.answer
@@ -0,0 +1,180 @@
+"""
+Unit tests for the sandbox warm worker pool.
+
+Spawns real worker interpreters (no gRPC server needed).
+"""
+
+import pytest
+
+from sandbox_service.sandbox_service import SAFE_IMPORTS, execute_in_sandbox
+from sandbox_service.worker_pool import (
+    WorkerError,
+    WorkerPool,
+    WorkerProtocolError,
+    WorkerTimeout,
+)
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = WorkerPool(size=2, memory_limit_mb=256, preload=SAFE_IMPORTS, max_executions=50)
+    pool.start()
+    yield pool
+    pool.shutdown()
+
+
+def run(pool, code, timeout=10, memory_mb=256, environment=None):
+    return execute_in_sandbox(
+        code=code,
+        language="python",
+        timeout_seconds=timeout,
+        memory_limit_mb=memory_mb,
+        allowed_imports=[],
+        environment=environment or {},
+        pool=pool,
+    )
+
+
+class TestExecution:
+    def test_stdout_captured(self, pool):
+        result = run(pool, "import math\nprint(math.factorial(5))")
+        assert result["stdout"] == "120\n"
+        assert result["exit_code"] == 0
+
+    def test_error_reported_like_cold_start(self, pool):
+        warm = run(pool, "print('before')\n1 / 0")
+        cold = run(None, "print('before')\n1 / 0")
+        assert (warm["stdout"], warm["stderr"], warm["exit_code"]) == (
+            cold["stdout"], cold["stderr"], cold["exit_code"]
+        )
+        assert warm["error_message"] == "Error: division by zero"
+
+    def test_disallowed_import_blocked(self, pool):
+        result = run(pool, "import os")
+        assert result["exit_code"] == 1
+        assert "not allowed" in result["stderr"]
+
+    def test_restricted_builtins(self, pool):
+        result = run(pool, "open('/etc/passwd')")
+        assert result["exit_code"] == 1
+        assert "open" in result["stderr"]
+
+    def test_globals_not_shared_between_runs(self, pool):
+        run(pool, "leaked = 42")
+        result = run(pool, "print(leaked)")
+        assert result["exit_code"] == 1
+
+    def test_module_attributes_restored(self, pool):
+        for _ in range(pool.size + 1):
+            run(pool, "import math\nmath.pi = 3")
+        result = run(pool, "import math\nprint(math.pi > 3.14)")
+        assert result["stdout"] == "True\n"
+
+    def test_interpreter_state_reset_between_runs(self):
+        pool = WorkerPool(size=1, preload=SAFE_IMPORTS, max_executions=50).start()
+        allowed = SAFE_IMPORTS | {"os", "sys", "string"}
+        try:
+            first = pool.run(
+                "import os, sys, string, decimal, fractions\n"
+                "string.leaked = 1\n"
+                "sys.leaked = 2\n"
+                "os.chdir('/')\n"
+                "decimal.getcontext().prec = 3\n"
+                "decimal.DefaultContext.prec = 5\n"
+                "fractions.Fraction.leaked = 3\n"
+                "print(os.getpid())",
+                allowed, 10, 256,
+            )
+            second = pool.run(
+                "import os, sys, string\n"
+                "print(os.getpid(), 'leaked' in string.__dict__, 'leaked' in sys.__dict__, os.getcwd())",
+                allowed, 10, 256,
+            )
+            third = pool.run(
+                "import decimal, fractions\n"
+                "print(decimal.Decimal(1) / decimal.Decimal(7))\n"
+                "print(decimal.DefaultContext.prec, 'leaked' in fractions.Fraction.__dict__)",
+                allowed, 10, 256,
+            )
+        finally:
+            pool.shutdown()
+        pid, string_leaked, sys_leaked, cwd = second.stdout.split()
+        assert pid == first.stdout.strip()  # same warm worker
+        assert (string_leaked, sys_leaked, cwd) == ("False", "False", "/tmp")
+        assert third.stdout == "0.1428571428571428571428571429\n28 False\n"
+
+    def test_environment_applied_per_run(self, pool):
+        code = "import os\nprint(os.environ.get('SANDBOX_TEST_VAR'))"
+        first = pool.run(code, SAFE_IMPORTS | {"os"}, 10, 256, {"SANDBOX_TEST_VAR": "x"})
+        second = pool.run(code, SAFE_IMPORTS | {"os"}, 10, 256, {})
+        assert first.stdout == "x\n"
+        assert second.stdout == "None\n"
+
+
+class TestLimitsAndRecycling:
+    def test_timeout_kills_worker(self, pool):
+        result = run(pool, "while True:\n    pass", timeout=1)
+        assert result["timed_out"] is True
+        assert result["exit_code"] == 124
+
+        # Pool keeps serving after the recycle
+        assert run(pool, "print('ok')")["stdout"] == "ok\n"
+
+    def test_memory_limit_enforced(self, pool):
+        before = pool.stats()["recycled"]
+        result = run(pool, "x = [0] * (100 * 1024 * 1024)", memory_mb=128)
+        assert result["memory_exceeded"] is True
+        assert pool.stats()["recycled"] == before + 1
+
+    def test_recycled_after_max_executions(self):
+        pool = WorkerPool(size=1, preload=SAFE_IMPORTS, max_executions=3).start()
+        try:
+            pids = set()
+            for _ in range(6):
+                pids.add(int(pool.run(
+                    "import os\nprint(os.getpid())", SAFE_IMPORTS | {"os"}, 10, 256
+                ).stdout))
+            assert len(pids) >= 2
+            assert pool.stats()["recycled"] >= 1
+        finally:
+            pool.shutdown()
+
+    def test_corrupted_reply_retires_worker(self):
+        pool = WorkerPool(size=1, preload=SAFE_IMPORTS).start()
+        try:
+            with pytest.raises(WorkerProtocolError, match="Malformed"):
+                pool.run("import os\nos.write(1, b'not json\\n')", SAFE_IMPORTS | {"os"}, 10, 256)
+            assert pool.stats()["recycled"] == 1
+            assert pool.run("print('ok')", SAFE_IMPORTS, 10, 256).stdout == "ok\n"
+        finally:
+            pool.shutdown()
+
+    def test_corrupted_reply_not_rerun_cold(self):
+        pool = WorkerPool(size=1, preload=SAFE_IMPORTS).start()
+        try:
+            result = execute_in_sandbox(
+                code="import os\nos.write(1, b'not json\\n')\nprint('ran')",
+                language="python",
+                timeout_seconds=10,
+                memory_limit_mb=256,
+                allowed_imports=["os"],
+                environment={},
+                pool=pool,
+            )
+            # A cold-start rerun would succeed and print 'ran' a second time
+            assert result["exit_code"] == 1
+            assert "Malformed" in result["error_message"]
+            assert result["stdout"] == ""
+        finally:
+            pool.shutdown()
+
+    def test_shut_down_pool_falls_back_to_cold_start(self):
+        pool = WorkerPool(size=1, preload=SAFE_IMPORTS).start()
+        pool.shutdown()
+        with pytest.raises(WorkerError):
+            pool.run("print('ok')", SAFE_IMPORTS, 10, 256)
+        assert run(pool, "print('ok')")["stdout"] == "ok\n"
+
+    def test_worker_timeout_raised_by_pool(self, pool):
+        with pytest.raises(WorkerTimeout):
+            pool.run("while True:\n    pass", SAFE_IMPORTS, 0.5, 256)
@@ -0,0 +1,299 @@
+"""
+Unit tests for speculative decoding in the LLM service.
+
+TargetLlama is a deterministic stand-in for llama_cpp.Llama whose
+generate() verifies draft proposals the way llama-cpp-python does: every
+position is sampled from the target (one draw of the seeded sampler per
+token) and a draft token is kept only while it equals that sample. Its
+"model" picks a context-dependent favourite token most of the time, so a
+draft that knows the favourite is usually right and a wrong draft never
+is. Outputs must match decoding without a draft token for token.
+"""
+
+import random
+
+import pytest
+
+from llm_service.config import LLMServiceConfig
+from llm_service.scheduler import GenerationRequest, LlamaDecodeBackend, RequestScheduler
+from llm_service.speculative import (
+    DraftModel,
+    PromptLookupDraft,
+    SpeculationStats,
+    parse_draft_models,
+)
+
+VOCAB = 50
+EOS = 0
+
+
+def favourite(context):
+    """The target's most likely next token."""
+    return (context[-1] * 7 + len(context)) % (VOCAB - 1) + 1
+
+
+class TargetLlama:
+    def __init__(self, draft_model=None, eos_at=200, p_favourite=0.8):
+        self.draft_model = draft_model
+        self.eos_at = eos_at
+        self.p_favourite = p_favourite
+        self.forward_passes = 0
+        self._seed = 1234
+        self._sampler = None
+
+    def tokenize(self, text, add_bos=True, special=False):
+        return [b % (VOCAB - 1) + 1 for b in text]
+
+    def detokenize(self, tokens):
+        return "".join(f"<{t}>" for t in tokens).encode()
+
+    def token_eos(self):
+        return EOS
+
+    def set_seed(self, seed):
+        self._seed = seed
+
+    def save_state(self):
+        return object()  # context lives in the generator; the sampler is swapped by the backend
+
+    def load_state(self, state):
+        pass
+
+    def _sample(self, context):
+        u = self._sampler.random()
+        if len(context) >= self.eos_at:
+            return EOS
+        if u < self.p_favourite:
+            return favourite(context)
+        return int(u * 1000) % (VOCAB - 1) + 1
+
+    def generate(self, tokens, **kwargs):
+        self._sampler = random.Random(self._seed)
+        context = list(tokens)
+        drafts = []
+        while True:
+            self.forward_passes += 1  # last token + drafts in one batch
+            for i in range(len(drafts) + 1):
+                token = self._sample(context)
+                context.append(token)
+                yield token
+                if i < len(drafts) and token != drafts[i]:
+                    break
+            drafts = []
+            if self.draft_model is not None:
+                drafts = [int(t) for t in self.draft_model(context)]
+
+
+class SmallLlama:
+    """Draft model stub: greedy, knows the target's favourite token."""
+
+    def __init__(self, wrong_every=0):
+        self.wrong_every = wrong_every
+        self.calls = 0
+
+    def n_ctx(self):
+        return 4096
+
+    def generate(self, tokens, temp, top_k, repeat_penalty, reset):
+        assert temp == 0.0
+        self.calls += 1
+        context = list(tokens)
+        while True:
+            token = favourite(context)
+            if self.wrong_every and len(context) % self.wrong_every == 0:
+                token = token % (VOCAB - 1) + 1
+            context.append(token)
+            yield token
+
+
+class WrongDraft(DraftModel):
+    def propose(self, context):
+        return [VOCAB + 1] * self.num_pred_tokens  # never sampled by the target
+
+
+def _run(model, prompt="speculate", max_tokens=64, seed=7, **scheduler_kwargs):
+    scheduler = RequestScheduler(LlamaDecodeBackend(lambda: model), **scheduler_kwargs).start()
+    try:
+        handle = scheduler.submit(GenerationRequest(prompt=prompt, max_tokens=max_tokens, seed=seed))
+        return handle.result(), handle.stats
+    finally:
+        scheduler.shutdown()
+
+
+def _expected_stats(output_tokens, context, draft_fn, k):
+    """Replay the rounds: each proposal is checked against the actual output."""
+    stats = {"drafted": 0, "accepted": 0, "rounds": 0}
+    i = 1  # the first token comes from the prompt pass, before any proposal
+    context = context + output_tokens[:1]
+    while i < len(output_tokens):
+        proposal = draft_fn(context)[:k]
+        stats["rounds"] += 1
+        matched = 0
+        while matched < len(proposal) and i + matched < len(output_tokens) and output_tokens[i + matched] == proposal[matched]:
+            matched += 1
+        remaining = len(output_tokens) - i
+        stats["accepted"] += matched
+        if matched < len(proposal) and matched < remaining:
+            stats["drafted"] += len(proposal)  # rejected at matched
+        else:
+            stats["drafted"] += min(len(proposal), remaining)
+        step = min(matched + 1, remaining)
+        context = context + output_tokens[i:i + step]
+        i += step
+    return stats
+
+
+def _tokens(text):
+    return [int(t) for t in text.strip("<>").split("><")]
+
+
+def _greedy_proposal(small, k):
+    def propose(context):
+        generator = small.generate(context, temp=0.0, top_k=1, repeat_penalty=1.0, reset=True)
+        return [next(generator) for _ in range(k)]
+    return propose
+
+
+class TestOutputEquivalence:
+    @pytest.mark.parametrize("seed", [0, 7, 99])
+    @pytest.mark.parametrize("num_pred_tokens", [1, 4, 8])
+    def test_draft_model_preserves_output(self, seed, num_pred_tokens):
+        baseline, stats = _run(TargetLlama(), seed=seed)
+        assert "speculation" not in stats
+
+        target = TargetLlama(draft_model=DraftModel(SmallLlama(wrong_every=5), num_pred_tokens))
+        output, stats = _run(target, seed=seed)
+        assert output == baseline
+        assert stats["speculation"]["accepted"] > 0
+
+    def test_prompt_lookup_preserves_output(self):
+        baseline, _ = _run(TargetLlama(p_favourite=1.0), prompt="abcabcabc" * 4)
+        target = TargetLlama(draft_model=PromptLookupDraft(num_pred_tokens=4), p_favourite=1.0)
+        output, stats = _run(target, prompt="abcabcabc" * 4)
+        assert output == baseline
+        assert stats["speculation"]["rounds"] > 0
+
+    def test_fewer_target_passes_with_a_good_draft(self):
+        plain = TargetLlama()
+        _run(plain, max_tokens=128)
+        speculative = TargetLlama(draft_model=DraftModel(SmallLlama(), 4))
+        _run(speculative, max_tokens=128)
+        assert speculative.forward_passes < plain.forward_passes * 0.6
+
+    def test_interleaved_requests(self):
+        prompts = ["first request", "second", "third prompt here"]
+        baseline = [_run(TargetLlama(), prompt=p, seed=i)[0] for i, p in enumerate(prompts)]
+
+        target = TargetLlama(draft_model=DraftModel(SmallLlama(wrong_every=3), 4))
+        scheduler = RequestScheduler(LlamaDecodeBackend(lambda: target), tokens_per_turn=3)
+        handles = [
+            scheduler.submit(GenerationRequest(prompt=p, max_tokens=64, seed=i))
+            for i, p in enumerate(prompts)
+        ]
+        scheduler.start()
+        try:
+            assert [h.result() for h in handles] == baseline
+            assert all(h.stats["speculation"]["drafted"] > 0 for h in handles)
+        finally:
+            scheduler.shutdown()
+
+
+class TestAcceptanceAccounting:
+    @pytest.mark.parametrize("wrong_every", [0, 3, 5])
+    @pytest.mark.parametrize("num_pred_tokens", [2, 4])
+    def test_matches_replay(self, wrong_every, num_pred_tokens):
+        small = SmallLlama(wrong_every=wrong_every)
+        target = TargetLlama(draft_model=DraftModel(small, num_pred_tokens))
+        output, stats = _run(target, prompt="accounting", max_tokens=80)
+
+        expected = _expected_stats(
+            _tokens(output),
+            target.tokenize(b"accounting"),
+            _greedy_proposal(SmallLlama(wrong_every=wrong_every), num_pred_tokens),
+            num_pred_tokens,
+        )
+        speculation = stats["speculation"]
+        assert {key: speculation[key] for key in expected} == expected
+        assert speculation["acceptance_rate"] == pytest.approx(expected["accepted"] / expected["drafted"])
+
+    def test_wrong_draft_accepts_nothing(self):
+        target = TargetLlama(draft_model=WrongDraft(SmallLlama(), 3))
+        _, stats = _run(target, max_tokens=20)
+        speculation = stats["speculation"]
+        assert speculation["accepted"] == 0
+        assert speculation["drafted"] == 3 * speculation["rounds"]
+        assert speculation["rounds"] == 19
+        assert speculation["acceptance_rate"] == 0.0
+
+    def test_perfect_draft(self):
+        target = TargetLlama(draft_model=DraftModel(SmallLlama(), 4), p_favourite=1.0)
+        _, stats = _run(target, max_tokens=41)
+        # 40 tokens after the first: 8 rounds of 4 accepted drafts + 1 bonus token
+        assert stats["speculation"] == {"drafted": 32, "accepted": 32, "rounds": 8, "acceptance_rate": 1.0}
+
+    def test_stats_unit(self):
+        stats = SpeculationStats()
+        stats.propose([1, 2, 3])
+        for token in (1, 2, 9):
+            stats.observe(token)
+        stats.propose([4, 5])
+        stats.observe(4)
+        stats.finish()  # 5 was never verified
+        stats.observe(5)
+        assert (stats.drafted, stats.accepted, stats.rounds) == (4, 3, 2)
+
+    def test_failing_draft_falls_back(self):
+        class Broken(DraftModel):
+            def propose(self, context):
+                raise RuntimeError("draft crashed")
+
+        baseline, _ = _run(TargetLlama())
+        output, stats = _run(TargetLlama(draft_model=Broken(SmallLlama(), 4)))
+        assert output == baseline
+        assert stats["speculation"]["drafted"] == 0
+
+
+class TestDrafts:
+    def test_prompt_lookup(self):
+        draft = PromptLookupDraft(num_pred_tokens=3)
+        assert list(draft([1, 2, 3, 4, 5, 9, 2, 3])) == [4, 5, 9]
+        assert list(draft([1, 2, 3, 4, 1, 7, 3])) == [4, 1, 7]  # unigram fallback
+        assert list(draft([5, 6, 7])) == []
+        assert draft.take_proposal() == []
+        assert draft.take_proposal() is None
+
+    def test_draft_model_respects_context(self):
+        small = SmallLlama()
+        small.n_ctx = lambda: 10
+        draft = DraftModel(small, num_pred_tokens=4)
+        assert len(draft([1] * 6)) == 4
+        assert len(draft([1] * 7)) == 0
+
+
+class TestPairingConfig:
+    def test_parse(self):
+        assert parse_draft_models("", "a.gguf") == {}
+        assert parse_draft_models("small.gguf", "a.gguf") == {"a.gguf": "small.gguf"}
+        assert parse_draft_models(" a.gguf = s.gguf, b.gguf=prompt-lookup ", "x.gguf") == {
+            "a.gguf": "s.gguf", "b.gguf": "prompt-lookup",
+        }
+
+    @pytest.mark.parametrize("spec", ["a.gguf=", "=s.gguf", "a.gguf=a.gguf"])
+    def test_invalid(self, spec):
+        with pytest.raises(ValueError):
+            parse_draft_models(spec, "a.gguf")
+
+    def test_config(self, monkeypatch):
+        monkeypatch.setenv("LLM_MODEL_PATH", "/models/Qwen2.5-14B-Instruct-Q4_K.gguf")
+        monkeypatch.setenv("LLM_DRAFT_MODELS", "qwen2.5-0.5b-instruct-q5_k_m.gguf,qwen2.5-3b-instruct-q5_k_m.gguf=prompt-lookup")
+        monkeypatch.setenv("LLM_DRAFT_TOKENS", "6")
+        config = LLMServiceConfig.from_env()
+        assert config.draft_tokens == 6
+        assert config.draft_model_for("Qwen2.5-14B-Instruct-Q4_K.gguf") == "qwen2.5-0.5b-instruct-q5_k_m.gguf"
+        assert config.draft_model_for("qwen2.5-3b-instruct-q5_k_m.gguf") == "prompt-lookup"
+        assert config.draft_model_for("qwen2.5-0.5b-instruct-q5_k_m.gguf") is None
+
+    def test_drafts_need_a_scheduler_that_never_swaps(self):
+        assert LLMServiceConfig().scheduler_swaps_states
+        assert not LLMServiceConfig(scheduler_max_suspended=0).scheduler_swaps_states
+        assert not LLMServiceConfig(scheduler_max_active=1).scheduler_swaps_states
@@ -0,0 +1,206 @@
+"""
+Unit tests for DAG-parallel sub-task execution in DelegationManager.
+
+FakeTierPool stands in for LLMClientPool: each sub-task instruction has a
+fixed delay, and the pool records when every call started and finished and
+how many calls each tier was serving at once. Wall times are compared with
+the critical path (longest dependency chain) of the graph.
+"""
+
+import threading
+import time
+from collections import defaultdict
+
+import pytest
+
+from orchestrator.delegation_manager import DelegationManager, SubTask, TaskDecomposition
+from orchestrator.routing_config import RoutingConfig, TierConfig
+from orchestrator.task_graph import DEADLOCK_RESULT, UNKNOWN_DEPENDENCY_RESULT, TaskGraphExecutor
+
+SLACK = 0.12  # scheduling overhead allowed on top of the critical path
+
+
+class FakeTierPool:
+    def __init__(self, delays):
+        self.delays = delays
+        self.lock = threading.Lock()
+        self.spans = {}
+        self.prompts = {}
+        self.active = defaultdict(int)
+        self.peak = defaultdict(int)
+        self.t0 = time.monotonic()
+
+    def generate(self, prompt, tier="standard", **kwargs):
+        instruction = prompt.rsplit("\n\n", 1)[-1]
+        with self.lock:
+            start = time.monotonic() - self.t0
+            self.prompts[instruction] = prompt
+            self.active[tier] += 1
+            self.peak[tier] = max(self.peak[tier], self.active[tier])
+        time.sleep(self.delays[instruction])
+        if instruction.startswith("fail"):
+            with self.lock:
+                self.active[tier] -= 1
+            raise RuntimeError(f"{tier} tier unavailable")
+        with self.lock:
+            self.active[tier] -= 1
+            self.spans[instruction] = (start, time.monotonic() - self.t0)
+        return f"result of {instruction}"
+
+
+def _task(task_id, tier="standard", depends_on=(), priority=1):
+    return SubTask(
+        task_id=task_id,
+        instruction=task_id,
+        required_capabilities=[],
+        target_tier=tier,
+        depends_on=list(depends_on),
+        priority=priority,
+    )
+
+
+def _critical_path(tasks, delays):
+    by_id = {task.task_id: task for task in tasks}
+    memo = {}
+
+    def finish(task_id):
+        if task_id not in memo:
+            deps = by_id[task_id].depends_on
+            memo[task_id] = max((finish(d) for d in deps), default=0.0) + delays[task_id]
+        return memo[task_id]
+
+    return max(finish(task.task_id) for task in tasks)
+
+
+def _run(tasks, delays, tiers=None):
+    pool = FakeTierPool(delays)
+    config = RoutingConfig(tiers={
+        name: TierConfig(max_concurrent_requests=limit) for name, limit in (tiers or {}).items()
+    })
+    manager = DelegationManager(pool, config=config)
+    start = time.monotonic()
+    result = manager.execute_delegation(
+        TaskDecomposition(original_query="q", sub_tasks=tasks, strategy="decompose")
+    )
+    return pool, result, time.monotonic() - start
+
+
+class TestOrdering:
+    def test_diamond(self):
+        delays = {"a": 0.15, "b": 0.15, "c": 0.25, "d": 0.1}
+        tasks = [
+            _task("a"),
+            _task("b", tier="heavy", depends_on=["a"]),
+            _task("c", tier="standard", depends_on=["a"]),
+            _task("d", depends_on=["b", "c"]),
+        ]
+        pool, result, wall = _run(tasks, delays)
+
+        spans = pool.spans
+        assert spans["b"][0] >= spans["a"][1] and spans["c"][0] >= spans["a"][1]
+        assert spans["d"][0] >= max(spans["b"][1], spans["c"][1])
+        assert spans["b"][0] < spans["c"][1]  # siblings overlap
+        assert "result of b" in pool.prompts["d"] and "result of c" in pool.prompts["d"]
+        assert [r["task_id"] for r in result["sub_results"]] == ["a", "b", "c", "d"]
+        assert all(task.status == "completed" for task in tasks)
+
+        critical = _critical_path(tasks, delays)
+        assert critical <= wall < critical + SLACK
+        assert wall < sum(delays.values()) - 0.1
+
+    def test_dependents_start_when_their_dependency_finishes(self):
+        delays = {"a": 0.1, "b": 0.1, "slow": 0.4}
+        tasks = [_task("a"), _task("slow", tier="heavy"), _task("b", depends_on=["a"])]
+        pool, result, wall = _run(tasks, delays)
+
+        assert pool.spans["b"][0] < pool.spans["slow"][1]  # not held back to a round boundary
+        assert pool.spans["b"][0] - pool.spans["a"][1] < SLACK
+        assert wall < 0.4 + SLACK
+
+    @pytest.mark.parametrize("width", [3, 5])
+    def test_independent_tasks_run_together(self, width):
+        delays = {f"t{i}": 0.2 for i in range(width)}
+        tasks = [_task(f"t{i}", tier=("heavy", "standard")[i % 2]) for i in range(width)]
+        _, _, wall = _run(tasks, delays)
+        assert wall < 0.2 + SLACK
+
+
+class TestTierCaps:
+    @pytest.mark.parametrize("limit", [1, 2])
+    def test_cap_respected(self, limit):
+        delays = {f"h{i}": 0.1 for i in range(4)}
+        delays["s"] = 0.1
+        tasks = [_task(f"h{i}", tier="heavy") for i in range(4)] + [_task("s")]
+        pool, _, wall = _run(tasks, delays, tiers={"heavy": limit, "standard": 4})
+
+        assert pool.peak["heavy"] == limit
+        assert wall >= 0.1 * 4 / limit
+        assert wall < 0.1 * 4 / limit + SLACK
+        assert pool.spans["s"][0] < 0.05  # other tiers are not held back
+
+    def test_priority_order_under_cap(self):
+        delays = {"low": 0.05, "high": 0.05, "mid": 0.05}
+        tasks = [_task("low", priority=3), _task("high", priority=1), _task("mid", priority=2)]
+        pool, result, _ = _run(tasks, delays, tiers={"standard": 1})
+        assert [r["task_id"] for r in result["sub_results"]] == ["high", "mid", "low"]
+
+    def test_caps_follow_config_reload(self):
+        manager = DelegationManager(FakeTierPool({}), config=RoutingConfig(
+            tiers={"heavy": TierConfig(max_concurrent_requests=3)}
+        ))
+        assert manager._executor.limit_for("heavy") == 3
+        assert manager._executor.limit_for("ultra") == TierConfig().max_concurrent_requests
+
+        manager.on_config_changed(RoutingConfig(tiers={"heavy": TierConfig(max_concurrent_requests=1)}))
+        assert manager._executor.limit_for("heavy") == 1
+
+
+class TestFailures:
+    def test_failure_is_passed_to_dependents(self):
+        delays = {"fail_a": 0.05, "b": 0.05}
+        tasks = [_task("fail_a"), _task("b", depends_on=["fail_a"])]
+        pool, result, _ = _run(tasks, delays)
+
+        assert tasks[0].status == "failed"
+        assert "unavailable" in pool.prompts["b"]
+        assert tasks[1].status == "completed"
+        assert set(result["completed"]) == {"fail_a", "b"}
+
+    def test_deadlocked_tasks_fail_after_the_rest_runs(self):
+        delays = {"ok": 0.05, "x": 0.05, "y": 0.05, "z": 0.05}
+        tasks = [
+            _task("ok"),
+            _task("x", depends_on=["y"]),
+            _task("y", depends_on=["x"]),
+            _task("z", depends_on=["x", "ok"]),
+        ]
+        pool, result, _ = _run(tasks, delays)
+
+        assert list(result["completed"]) == ["ok"]
+        for task in tasks[1:]:
+            assert task.status == "failed"
+            assert task.result == DEADLOCK_RESULT
+        assert set(pool.spans) == {"ok"}
+
+    def test_unknown_dependency_fails_without_running(self):
+        delays = {"orphan": 0.05, "child": 0.05, "partial": 0.05, "ok": 0.05}
+        tasks = [
+            _task("ok"),
+            _task("orphan", depends_on=["missing", "gone"]),
+            _task("child", depends_on=["orphan"]),
+            _task("partial", depends_on=["ok", "missing"]),
+        ]
+        pool, result, _ = _run(tasks, delays)
+
+        assert tasks[1].status == "failed"
+        assert tasks[1].result == f"{UNKNOWN_DEPENDENCY_RESULT}: gone, missing"
+        assert tasks[3].status == "failed" and tasks[3].result.startswith(UNKNOWN_DEPENDENCY_RESULT)
+        # The error is passed on like any failed dependency's
+        assert tasks[2].status == "completed"
+        assert UNKNOWN_DEPENDENCY_RESULT in pool.prompts["child"]
+        assert set(pool.spans) == {"ok", "child"}
+        assert set(result["completed"]) == {"ok", "child"}
+
+    def test_executor_rejects_bad_default(self):
+        with pytest.raises(ValueError):
+            TaskGraphExecutor(lambda task, deps: "", default_limit=0)
@@ -0,0 +1,363 @@
+"""
+Unit tests for per-tier admission control (orchestrator.tier_admission).
+
+StubClient stands in for LLMClient: generate() sleeps for a fixed time and
+records how many calls it was serving at once. Bursts of threads drive
+synthetic load through AdmittedClientPool, and the peaks are compared with
+the TierConfig limits.
+"""
+
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from orchestrator.routing_config import RoutingConfig, TierConfig
+from orchestrator.tier_admission import (
+    AdmittedClientPool,
+    TierAdmission,
+    TierAdmissionError,
+    TierAdmissionTimeout,
+    TierQueueFullError,
+    _TierGate,
+)
+from shared.clients.llm_client import LLMClientPool
+from shared.observability import metrics as obs_metrics
+
+
+class StubClient:
+    def __init__(self, tier, delay=0.1):
+        self.tier = tier
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+        self.calls = 0
+
+    def generate(self, prompt, **kwargs):
+        with self.lock:
+            self.active += 1
+            self.calls += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+        return f"{self.tier}:{prompt}"
+
+    def generate_stream(self, prompt, **kwargs):
+        with self.lock:
+            self.active += 1
+            self.calls += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            for token in (self.tier, ":", prompt):
+                time.sleep(self.delay / 3)
+                yield token
+        finally:
+            with self.lock:
+                self.active -= 1
+
+    def generate_batch_stream(self, prompt, num_samples=2, **kwargs):
+        for index, token in enumerate(self.generate_stream(prompt)):
+            if index < num_samples:
+                yield {"index": index, "response": token}
+        yield {"responses": [], "count": num_samples}
+
+
+def _pool(tiers, delays=None):
+    pool = LLMClientPool({})
+    pool.clients = {tier: StubClient(tier, (delays or {}).get(tier, 0.1)) for tier in tiers}
+    return pool
+
+
+def _config(**tiers):
+    return RoutingConfig(tiers={name: TierConfig(**settings) for name, settings in tiers.items()})
+
+
+def _burst(fn, count):
+    results, errors = [None] * count, [None] * count
+
+    def worker(i):
+        try:
+            results[i] = fn(i)
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+        time.sleep(0.002)  # keep arrival order deterministic
+    for thread in threads:
+        thread.join()
+    return results, errors, time.monotonic() - start
+
+
+class TestConcurrencyLimits:
+    @pytest.mark.parametrize("limit", [1, 3])
+    def test_limit_is_enforced_and_queue_drains(self, limit):
+        pool = _pool(["heavy"])
+        admitted = AdmittedClientPool(pool, TierAdmission(_config(heavy={"max_concurrent_requests": limit})))
+
+        results, errors, wall = _burst(lambda i: admitted.generate(str(i), tier="heavy"), 6)
+
+        assert errors == [None] * 6
+        assert results == [f"heavy:{i}" for i in range(6)]
+        assert pool.clients["heavy"].peak == limit
+        assert wall >= 0.1 * 6 / limit
+        stats = admitted.admission.stats()["heavy"]
+        assert stats["active"] == 0 and stats["queued"] == 0 and stats["admitted"] == 6
+
+    def test_tiers_are_independent(self):
+        pool = _pool(["heavy", "standard"])
+        admitted = AdmittedClientPool(pool, TierAdmission(_config(
+            heavy={"max_concurrent_requests": 1}, standard={"max_concurrent_requests": 4},
+        )))
+
+        _, errors, _ = _burst(lambda i: admitted.generate(str(i), tier=("heavy", "standard")[i % 2]), 8)
+
+        assert errors == [None] * 8
+        assert pool.clients["heavy"].peak == 1
+        assert pool.clients["standard"].peak == 4
+
+    def test_clients_from_get_client_are_admitted(self):
+        pool = _pool(["heavy"])
+        admitted = AdmittedClientPool(pool, TierAdmission(_config(heavy={"max_concurrent_requests": 2})))
+        client = admitted.get_client("heavy")
+
+        _, errors, _ = _burst(lambda i: client.generate(str(i)), 5)
+
+        assert errors == [None] * 5
+        assert pool.clients["heavy"].peak == 2
+        assert client.tier == "heavy"  # other attributes pass through
+
+    @pytest.mark.parametrize("method", ["generate_stream", "generate_batch_stream"])
+    def test_streams_hold_slot_until_exhausted(self, method):
+        pool = _pool(["heavy"])
+        admitted = AdmittedClientPool(pool, TierAdmission(_config(heavy={"max_concurrent_requests": 1})))
+        client = admitted.get_client("heavy")
+
+        results, errors, wall = _burst(lambda i: list(getattr(client, method)(str(i))), 3)
+
+        assert errors == [None] * 3
+        assert all(results)
+        assert pool.clients["heavy"].peak == 1
+        assert wall >= 0.1 * 3
+        assert admitted.admission.stats()["heavy"]["admitted"] == 3
+
+    def test_closed_stream_frees_slot(self):
+        pool = _pool(["heavy"], {"heavy": 0.03})
+        admitted = AdmittedClientPool(pool, TierAdmission(_config(
+            heavy={"max_concurrent_requests": 1, "queue_timeout_ms": 100},
+        )))
+        client = admitted.get_client("heavy")
+
+        stream = client.generate_stream("a")
+        assert next(stream) == "heavy"
+        assert admitted.admission.stats()["heavy"]["active"] == 1
+        with pytest.raises(TierAdmissionTimeout):
+            list(client.generate_stream("b"))
+
+        stream.close()
+        assert admitted.admission.stats()["heavy"]["active"] == 0
+        assert "".join(client.generate_stream("b")) == "heavy:b"
+
+    def test_unknown_tier_uses_pool_fallback(self):
+        pool = _pool(["standard"])
+        admitted = AdmittedClientPool(pool, TierAdmission(_config(standard={"max_concurrent_requests": 1})))
+
+        _, errors, _ = _burst(lambda i: admitted.generate(str(i), tier="ultra"), 3)
+
+        assert errors == [None] * 3
+        assert pool.clients["standard"].peak == 1
+
+
+class TestBoundedQueue:
+    def test_full_queue_rejects_immediately(self):
+        pool = _pool(["heavy"], {"heavy": 0.2})
+        admitted = AdmittedClientPool(pool, TierAdmission(_config(
+            heavy={"max_concurrent_requests": 1, "max_queue_depth": 2},
+        )))
+
+        _, errors, _ = _burst(lambda i: admitted.generate(str(i), tier="heavy"), 5)
+
+        assert errors[:3] == [None] * 3
+        assert all(isinstance(e, TierQueueFullError) for e in errors[3:])
+        assert errors[3].tier == "heavy"
+        assert pool.clients["heavy"].calls == 3
+
+    def test_wait_deadline(self):
+        pool = _pool(["heavy"], {"heavy": 0.3})
+        admitted = AdmittedClientPool(pool, TierAdmission(_config(
+            heavy={"max_concurrent_requests": 1, "queue_timeout_ms": 100},
+        )))
+
+        _, errors, _ = _burst(lambda i: admitted.generate(str(i), tier="heavy"), 2)
+
+        assert errors[0] is None
+        assert isinstance(errors[1], TierAdmissionTimeout)
+        assert isinstance(errors[1], TierAdmissionError)
+        assert admitted.admission.stats()["heavy"]["queued"] == 0
+
+    def test_caller_timeout_is_capped_by_tier(self):
+        admission = TierAdmission(_config(heavy={"max_concurrent_requests": 1}))
+        with admission.admit("heavy"):
+            start = time.monotonic()
+            with pytest.raises(TierAdmissionTimeout):
+                with admission.admit("heavy", timeout=0.05):
+                    pass
+            assert time.monotonic() - start < 0.5
+
+    def test_fifo_order(self):
+        admission = TierAdmission(_config(heavy={"max_concurrent_requests": 1}))
+        order = []
+
+        def call(i):
+            with admission.admit("heavy"):
+                order.append(i)
+                time.sleep(0.03)
+
+        _, errors, _ = _burst(call, 5)
+        assert errors == [None] * 5
+        assert order == list(range(5))
+
+
+class TestSpillover:
+    def test_waiting_calls_spill_to_fallback_tier(self):
+        pool = _pool(["heavy", "standard"], {"heavy": 0.3, "standard": 0.1})
+        admitted = AdmittedClientPool(pool, TierAdmission(_config(
+            heavy={"max_concurrent_requests": 1, "spillover_tier": "standard", "spillover_after_ms": 50},
+            standard={"max_concurrent_requests": 2},
+        )))
+
+        results, errors, wall = _burst(lambda i: admitted.generate(str(i), tier="heavy"), 3)
+
+        assert errors == [None] * 3
+        assert results == ["heavy:0", "standard:1", "standard:2"]
+        assert pool.clients["heavy"].calls == 1
+        assert pool.clients["standard"].peak == 2
+        assert wall < 0.3 + 0.15  # not serialised behind the heavy call
+        stats = admitted.admission.stats()
+        assert stats["heavy"]["spilled_out"] == 2 and stats["standard"]["spilled_in"] == 2
+
+    def test_no_spill_before_threshold(self):
+        pool = _pool(["heavy", "standard"], {"heavy": 0.05})
+        admitted = AdmittedClientPool(pool, TierAdmission(_config(
+            heavy={"max_concurrent_requests": 1, "spillover_tier": "standard", "spillover_after_ms": 1000},
+        )))
+
+        results, errors, _ = _burst(lambda i: admitted.generate(str(i), tier="heavy"), 3)
+
+        assert errors == [None] * 3
+        assert results == ["heavy:0", "heavy:1", "heavy:2"]
+        assert pool.clients["standard"].calls == 0
+
+    def test_busy_fallback_keeps_place_in_line(self):
+        pool = _pool(["heavy", "standard"], {"heavy": 0.15, "standard": 0.4})
+        admitted = AdmittedClientPool(pool, TierAdmission(_config(
+            heavy={"max_concurrent_requests": 1, "spillover_tier": "standard", "spillover_after_ms": 20},
+            standard={"max_concurrent_requests": 1},
+        )))
+        blocker = threading.Thread(target=admitted.generate, args=("block",), kwargs={"tier": "standard"})
+        blocker.start()
+        time.sleep(0.02)
+
+        results, errors, _ = _burst(lambda i: admitted.generate(str(i), tier="heavy"), 2)
+        blocker.join()
+
+        assert errors == [None, None]
+        assert results == ["heavy:0", "heavy:1"]
+
+    def test_mutual_spillover_does_not_deadlock(self):
+        gates = {name: _TierGate(name, TierConfig(max_concurrent_requests=1), None) for name in "ab"}
+        for gate in gates.values():
+            assert gate.acquire(time.monotonic() + 1)  # both tiers full
+        both_spilling = threading.Barrier(2)
+
+        def spill_to(other):
+            first = [True]
+
+            def spill():
+                if first:
+                    first.pop()
+                    # Both waiters try to spill into each other's tier at once
+                    both_spilling.wait(timeout=2)
+                return gates[other].try_acquire()
+
+            return spill
+
+        errors = []
+
+        def wait(name, other):
+            start = time.monotonic()
+            try:
+                gates[name].acquire(start + 0.3, spill_to(other), start)
+            except TierAdmissionError as e:
+                errors.append(e)
+
+        # Daemon threads: a deadlock fails the test instead of hanging it
+        threads = [threading.Thread(target=wait, args=pair, daemon=True) for pair in ("ab", "ba")]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=3)
+
+        assert not any(thread.is_alive() for thread in threads)
+        assert len(errors) == 2 and all(isinstance(e, TierAdmissionTimeout) for e in errors)
+        assert all(gate.stats()["queued"] == 0 for gate in gates.values())
+
+    def test_no_spill_to_tier_without_client(self):
+        pool = _pool(["heavy"], {"heavy": 0.1})
+        admitted = AdmittedClientPool(pool, TierAdmission(_config(
+            heavy={"max_concurrent_requests": 1, "spillover_tier": "standard", "spillover_after_ms": 10},
+        )))
+
+        results, errors, _ = _burst(lambda i: admitted.generate(str(i), tier="heavy"), 2)
+
+        assert errors == [None, None]
+        assert results == ["heavy:0", "heavy:1"]
+
+
+class TestMetricsAndReload:
+    def test_metrics_recorded(self):
+        lidm = MagicMock()
+        pool = _pool(["heavy", "standard"], {"heavy": 0.2})
+        admitted = AdmittedClientPool(pool, TierAdmission(_config(
+            heavy={"max_concurrent_requests": 1, "max_queue_depth": 1,
+                   "spillover_tier": "standard", "spillover_after_ms": 30},
+        ), metrics=lidm))
+        depths = []
+        original = obs_metrics.update_tier_queue_depth
+
+        def spy(tier, depth):
+            depths.append((tier, depth))
+            original(tier, depth)
+
+        import orchestrator.tier_admission as tier_admission
+        tier_admission.update_tier_queue_depth = spy
+        try:
+            _, errors, _ = _burst(lambda i: admitted.generate(str(i), tier="heavy"), 3)
+        finally:
+            tier_admission.update_tier_queue_depth = original
+
+        assert isinstance(errors[2], TierQueueFullError)
+        assert ("heavy", 1) in depths and depths[-1] == ("heavy", 0)
+        assert obs_metrics._tier_queue_depths["heavy"] == 0
+        lidm.tier_spillovers_total.add.assert_called_once_with(1, {"from_tier": "heavy", "to_tier": "standard"})
+        lidm.tier_admission_rejections_total.add.assert_called_once_with(
+            1, {"tier": "heavy", "reason": "queue_full"})
+        outcomes = [call.args[1]["outcome"] for call in lidm.tier_admission_wait_ms.record.call_args_list]
+        assert sorted(outcomes) == ["admitted", "queue_full", "spilled"]
+
+    def test_limits_follow_config_reload(self):
+        pool = _pool(["heavy"], {"heavy": 0.1})
+        admitted = AdmittedClientPool(pool, TierAdmission(_config(heavy={"max_concurrent_requests": 1})))
+        admitted.generate("warm", tier="heavy")
+
+        admitted.on_config_changed(_config(heavy={"max_concurrent_requests": 3}))
+        _, errors, _ = _burst(lambda i: admitted.generate(str(i), tier="heavy"), 6)
+
+        assert errors == [None] * 6
+        assert pool.clients["heavy"].peak == 3
+        assert admitted.admission.stats()["heavy"]["limit"] == 3
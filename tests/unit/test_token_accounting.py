@@ -0,0 +1,268 @@
+"""
+Unit tests for exact token accounting.
+
+WordTokenizer is a deterministic stand-in for a llama.cpp vocabulary: words,
+punctuation and runs of whitespace are one token each, with an optional BOS.
+Every count reported by the service side (TokenAccountant, scheduler stats)
+and the orchestrator side (TokenCounter, LLMEngineWrapper) is compared with
+what the tokenizer itself returns.
+"""
+
+import re
+from unittest.mock import Mock
+
+import pytest
+
+from llm_service.scheduler import GenerationRequest, LlamaDecodeBackend, RequestScheduler
+from llm_service.token_accounting import TokenAccountant, count_tokens
+from shared.clients.llm_client import Completion
+from shared.clients.token_counter import TokenCounter
+
+BOS = 1
+EOS = 2
+_PIECES = re.compile(rb"\w+|[^\w\s]|\s+")
+
+TEXTS = [
+    "",
+    "hello",
+    "How long does it take to get to the office?",
+    '{"type": "tool_call", "tool": "web_search", "arguments": {"query": "gRPC"}}',
+    "def f(x):\n    return x ** 2\n",
+    "Grüße aus Köln — ça va?",
+]
+
+
+class WordTokenizer:
+    """Vocabulary grows as pieces are seen, so ids are stable per instance."""
+
+    def __init__(self):
+        self.vocab = {}
+        self.pieces = {}
+
+    def tokenize(self, text, add_bos=True, special=False):
+        ids = [BOS] if add_bos else []
+        for piece in _PIECES.findall(text):
+            if piece not in self.vocab:
+                self.vocab[piece] = len(self.vocab) + 3
+                self.pieces[self.vocab[piece]] = piece
+            ids.append(self.vocab[piece])
+        return ids
+
+    def detokenize(self, tokens):
+        return b"".join(self.pieces.get(t, b"") for t in tokens)
+
+
+class WordLlama(WordTokenizer):
+    """Llama stub that answers every prompt with a fixed reply."""
+
+    def __init__(self, reply):
+        super().__init__()
+        self.reply = reply
+        self._sampler = None
+
+    def token_eos(self):
+        return EOS
+
+    def set_seed(self, seed):
+        pass
+
+    def save_state(self):
+        return object()
+
+    def load_state(self, state):
+        pass
+
+    def generate(self, tokens, **kwargs):
+        yield from self.tokenize(self.reply.encode(), add_bos=False)
+        while True:
+            yield EOS
+
+
+def _generate(model, prompt, max_tokens=256):
+    scheduler = RequestScheduler(LlamaDecodeBackend(lambda: model)).start()
+    try:
+        handle = scheduler.submit(GenerationRequest(prompt=prompt, max_tokens=max_tokens))
+        return handle.result(), handle.stats
+    finally:
+        scheduler.shutdown()
+
+
+class TestCountTokens:
+    @pytest.mark.parametrize("text", TEXTS)
+    def test_matches_tokenizer(self, text):
+        tokenizer = WordTokenizer()
+        assert count_tokens(tokenizer, text) == len(tokenizer.tokenize(text.encode(), add_bos=False))
+        assert count_tokens(tokenizer, text, add_bos=True) == len(tokenizer.tokenize(text.encode()))
+
+
+class TestTokenAccountant:
+    def test_uses_resident_model(self):
+        model = WordTokenizer()
+        load_vocab = Mock()
+        accountant = TokenAccountant(resident=lambda model_id: model, load_vocab=load_vocab)
+
+        counts = accountant.count(TEXTS, "a.gguf")
+        assert counts == [len(model.tokenize(t.encode(), add_bos=False)) for t in TEXTS]
+        load_vocab.assert_not_called()
+        assert accountant.stats()["resident"] == 1
+
+    def test_vocab_only_fallback_is_cached(self):
+        vocabs = {}
+
+        def load_vocab(model_id):
+            vocabs[model_id] = WordTokenizer()
+            return vocabs[model_id]
+
+        accountant = TokenAccountant(resident=lambda model_id: None, load_vocab=load_vocab, max_tokenizers=2)
+        for _ in range(3):
+            assert accountant.count(["a b c"], "a.gguf") == [5]
+        assert accountant.stats() == {"vocab_tokenizers": 1, "resident": 0, "vocab_hits": 2, "vocab_loads": 1}
+
+        accountant.count(["x"], "b.gguf")
+        accountant.count(["x"], "c.gguf")  # evicts a.gguf
+        accountant.count(["x"], "a.gguf")
+        assert accountant.stats()["vocab_loads"] == 4
+        assert accountant.stats()["vocab_tokenizers"] == 2
+
+    def test_unknown_model(self):
+        def load_vocab(model_id):
+            raise FileNotFoundError(model_id)
+
+        accountant = TokenAccountant(resident=lambda model_id: None, load_vocab=load_vocab)
+        with pytest.raises(FileNotFoundError):
+            accountant.count(["hi"], "missing.gguf")
+
+
+class TestGenerationUsage:
+    @pytest.mark.parametrize("prompt", TEXTS[1:])
+    def test_counts_match_tokenizer(self, prompt):
+        reply = "It takes about 25 minutes by bike."
+        model = WordLlama(reply)
+        output, stats = _generate(model, prompt)
+
+        assert output == reply
+        assert stats["prompt_tokens"] == len(model.tokenize(prompt.encode(), add_bos=True))
+        assert stats["completion_tokens"] == len(model.tokenize(reply.encode(), add_bos=False))
+
+    def test_max_tokens_caps_completion(self):
+        model = WordLlama("one two three four five six")
+        _, stats = _generate(model, "count", max_tokens=4)
+        assert stats["completion_tokens"] == 4
+
+
+class TestTokenCounter:
+    def _remote(self, tokenizer):
+        return Mock(side_effect=lambda texts: [count_tokens(tokenizer, t) for t in texts])
+
+    def test_exact_and_cached(self):
+        tokenizer = WordTokenizer()
+        remote = self._remote(tokenizer)
+        counter = TokenCounter(remote)
+
+        expected = [count_tokens(tokenizer, t) for t in TEXTS]
+        assert counter.count_many(TEXTS + TEXTS) == expected + expected
+        assert remote.call_count == 1
+        assert len(remote.call_args.args[0]) == len(TEXTS)  # duplicates counted once
+
+        assert [counter(t) for t in TEXTS] == expected
+        assert remote.call_count == 1
+        assert counter.stats()["hits"] == len(TEXTS)
+
+    def test_lru_eviction(self):
+        remote = self._remote(WordTokenizer())
+        counter = TokenCounter(remote, max_entries=2)
+        for text in ("a", "b", "c", "a"):
+            counter.count(text)
+        assert remote.call_count == 4
+        assert counter.stats()["entries"] == 2
+
+    def test_fallback_is_calibrated_and_retried(self):
+        tokenizer = WordTokenizer()
+        now = [0.0]
+        healthy = [True]
+
+        def remote(texts):
+            if not healthy[0]:
+                raise ConnectionError("llm_service unavailable")
+            return [count_tokens(tokenizer, t) for t in texts]
+
+        counter = TokenCounter(remote, retry_after=30.0, clock=lambda: now[0])
+        calibration = "the quick brown fox jumps over the lazy dog"
+        counter.count(calibration)
+        ratio = len(calibration) / count_tokens(tokenizer, calibration)
+        assert counter.chars_per_token == pytest.approx(ratio)
+
+        healthy[0] = False
+        text = "a sentence the service never counted"
+        assert counter.count(text) == round(len(text) / ratio)
+        assert counter.stats()["fallbacks"] == 1
+
+        healthy[0] = True
+        now[0] = 10.0  # still backing off: estimate without calling the service
+        assert counter.count(text) == round(len(text) / ratio)
+        assert counter.stats()["remote_calls"] == 1
+
+        now[0] = 31.0
+        assert counter.count(text) == count_tokens(tokenizer, text)
+        assert counter.stats()["remote_calls"] == 2
+
+    def test_mismatched_response_falls_back(self):
+        counter = TokenCounter(lambda texts: [1])
+        assert counter.count_many(["abcd", "efgh"]) == [1, 1]
+        assert counter.stats() == {"entries": 0, "hits": 0, "misses": 2, "remote_calls": 0, "fallbacks": 1}
+
+
+class TestEngineUsageMetrics:
+    def _engine(self, client):
+        from orchestrator.orchestrator_service import LLMEngineWrapper
+
+        return LLMEngineWrapper(client, pipeline_metrics=Mock())
+
+    def test_reports_service_counts(self):
+        tokenizer = WordTokenizer()
+        prompt_text = "What is 2 + 2?"
+        reply = "2 + 2 = 4"
+
+        class Client:
+            def complete(self, prompt, max_tokens, temperature, response_format=""):
+                return Completion(
+                    text=reply,
+                    prompt_tokens=count_tokens(tokenizer, prompt, add_bos=True),
+                    completion_tokens=count_tokens(tokenizer, reply),
+                )
+
+            def count_tokens(self, texts, model=""):
+                return [count_tokens(tokenizer, t) for t in texts]
+
+        engine = self._engine(Client())
+        result = engine.generate([{"role": "user", "content": prompt_text}])
+        assert result["content"] == reply
+
+        added = {
+            call.args[1]["type"]: call.args[0]
+            for call in engine.pipeline_metrics.tokens_total.add.call_args_list
+        }
+        prompt = engine._format_messages([{"role": "user", "content": prompt_text}])
+        assert added == {
+            "prompt": count_tokens(tokenizer, prompt, add_bos=True),
+            "completion": count_tokens(tokenizer, reply),
+        }
+        assert engine.count_tokens(reply) == count_tokens(tokenizer, reply)
+
+    def test_counts_locally_when_client_reports_nothing(self):
+        tokenizer = WordTokenizer()
+
+        class Client:
+            def generate(self, prompt, max_tokens, temperature, response_format=""):
+                return "It is sunny."
+
+            def count_tokens(self, texts, model=""):
+                return [count_tokens(tokenizer, t) for t in texts]
+
+        engine = self._engine(Client())
+        engine.generate([{"role": "user", "content": "Weather?"}])
+        added = {
+            call.args[1]["type"]: call.args[0]
+            for call in engine.pipeline_metrics.tokens_total.add.call_args_list
+        }
+        assert added["completion"] == count_tokens(tokenizer, "It is sunny.")
@@ -0,0 +1,304 @@
+"""
+Unit tests for tools.executor.ToolExecutor and its use in AgentWorkflow.
+
+Uses fake sleeping tools to verify concurrent dispatch, per-tool timeouts,
+ordering of results, and error handling.
+"""
+
+import threading
+import time
+from typing import Any, Dict
+
+import pytest
+from unittest.mock import Mock
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from core.graph import AgentWorkflow
+from core.state import WorkflowConfig, create_initial_state
+from tools.executor import ToolExecutor, ToolCallOutcome
+from tools.registry import LocalToolRegistry
+
+
+def _call(name: str, call_id: str, **arguments) -> Dict[str, Any]:
+    """Build an OpenAI-style tool call."""
+    return {"id": call_id, "function": {"name": name, "arguments": arguments}}
+
+
+@pytest.fixture
+def sleepy_registry() -> LocalToolRegistry:
+    """Registry with tools that sleep for a given number of seconds."""
+    registry = LocalToolRegistry()
+
+    @registry.register
+    def slow_a(delay: float) -> Dict[str, Any]:
+        """
+        Sleep then return.
+
+        Args:
+            delay (float): Seconds to sleep
+        """
+        time.sleep(delay)
+        return {"status": "success", "data": "a"}
+
+    @registry.register
+    def slow_b(delay: float) -> Dict[str, Any]:
+        """
+        Sleep then return.
+
+        Args:
+            delay (float): Seconds to sleep
+        """
+        time.sleep(delay)
+        return {"status": "success", "data": "b"}
+
+    @registry.register(timeout=0.05)
+    def hangs(delay: float) -> Dict[str, Any]:
+        """
+        Sleep past its timeout.
+
+        Args:
+            delay (float): Seconds to sleep
+        """
+        time.sleep(delay)
+        return {"status": "success", "data": "late"}
+
+    @registry.register
+    def broken(delay: float) -> Dict[str, Any]:
+        """
+        Always raise.
+
+        Args:
+            delay (float): Ignored
+        """
+        raise RuntimeError("boom")
+
+    return registry
+
+
+@pytest.fixture
+def tracked_registry():
+    """Registry with a tool recording its peak number of concurrent invocations."""
+    registry = LocalToolRegistry()
+    lock = threading.Lock()
+    state = {"running": 0, "peak": 0}
+
+    @registry.register
+    def tracked(delay: float) -> Dict[str, Any]:
+        """
+        Track concurrent invocations.
+
+        Args:
+            delay (float): Seconds to sleep
+        """
+        with lock:
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+        time.sleep(delay)
+        with lock:
+            state["running"] -= 1
+        return {"status": "success"}
+
+    return registry, state
+
+
+class TestToolExecutor:
+    """Tests for ToolExecutor.execute"""
+
+    def test_empty_batch(self, sleepy_registry):
+        executor = ToolExecutor(sleepy_registry)
+        assert executor.execute([]) == []
+
+    def test_results_keep_call_order(self, sleepy_registry):
+        executor = ToolExecutor(sleepy_registry, max_workers=4)
+        # The first call finishes last; order must still follow the request
+        outcomes = executor.execute([
+            _call("slow_a", "c1", delay=0.15),
+            _call("slow_b", "c2", delay=0.01),
+            _call("slow_a", "c3", delay=0.05),
+        ])
+        assert [o.tool_call_id for o in outcomes] == ["c1", "c2", "c3"]
+        assert [o.result["data"] for o in outcomes] == ["a", "b", "a"]
+        assert all(isinstance(o, ToolCallOutcome) for o in outcomes)
+        assert all(o.status == "success" for o in outcomes)
+
+    def test_calls_run_concurrently(self, sleepy_registry):
+        executor = ToolExecutor(sleepy_registry, max_workers=3)
+        start = time.monotonic()
+        executor.execute([
+            _call("slow_a", "c1", delay=0.2),
+            _call("slow_b", "c2", delay=0.2),
+            _call("slow_a", "c3", delay=0.2),
+        ])
+        elapsed = time.monotonic() - start
+        assert elapsed < 0.4
+
+    def test_max_workers_bounds_concurrency(self, tracked_registry):
+        registry, state = tracked_registry
+        executor = ToolExecutor(registry, max_workers=2)
+        executor.execute([_call("tracked", f"c{i}", delay=0.05) for i in range(6)])
+        assert state["peak"] == 2
+
+    def test_per_execute_limit_shares_larger_pool(self, tracked_registry):
+        registry, state = tracked_registry
+        executor = ToolExecutor(registry, max_workers=8, max_calls_per_execute=2)
+        executor.execute([_call("tracked", f"c{i}", delay=0.05) for i in range(6)])
+        assert state["peak"] == 2
+
+        # Concurrent turns each get their own limit on the shared pool
+        state["peak"] = 0
+        turns = [
+            threading.Thread(target=executor.execute, args=(
+                [_call("tracked", f"t{t}c{i}", delay=0.1) for i in range(4)],
+            ))
+            for t in range(2)
+        ]
+        for turn in turns:
+            turn.start()
+        for turn in turns:
+            turn.join(timeout=5)
+        assert state["peak"] == 4
+
+    def test_stuck_calls_judged_against_pool_size(self, sleepy_registry):
+        executor = ToolExecutor(
+            sleepy_registry, max_workers=3, max_calls_per_execute=1, default_timeout=5.0
+        )
+        assert executor.execute([_call("hangs", "c1", delay=0.5)])[0].status == "timeout"
+
+        # One stuck worker fills this turn's limit but not the pool
+        outcome = executor.execute([_call("slow_a", "c2", delay=0.01)])[0]
+        assert outcome.status == "success"
+
+    def test_per_tool_timeout(self, sleepy_registry):
+        executor = ToolExecutor(sleepy_registry, default_timeout=5.0)
+        outcomes = executor.execute([
+            _call("hangs", "c1", delay=1.0),
+            _call("slow_a", "c2", delay=0.01),
+        ])
+        assert outcomes[0].status == "timeout"
+        assert outcomes[0].result["status"] == "error"
+        assert "timed out" in outcomes[0].result["error"]
+        assert outcomes[0].latency_ms < 500
+        assert outcomes[1].status == "success"
+
+    def test_timeout_starts_when_call_runs(self, sleepy_registry):
+        executor = ToolExecutor(sleepy_registry, max_workers=1, default_timeout=0.3)
+        outcomes = executor.execute([
+            _call("slow_a", "c1", delay=0.2),
+            _call("slow_b", "c2", delay=0.2),  # queued 0.2s, then runs 0.2s
+        ])
+        assert [o.status for o in outcomes] == ["success", "success"]
+
+    def test_hung_tool_does_not_block_free_worker(self, sleepy_registry):
+        executor = ToolExecutor(sleepy_registry, max_workers=2, default_timeout=0.3)
+        assert executor.execute([_call("hangs", "c1", delay=0.5)])[0].status == "timeout"
+
+        # The hung call still holds one worker; a later fast call runs on the other
+        outcome = executor.execute([_call("slow_a", "c2", delay=0.01)])[0]
+        assert outcome.status == "success"
+        assert outcome.latency_ms < 200
+
+    def test_pool_held_by_hung_tools_rejects_fast(self, sleepy_registry):
+        executor = ToolExecutor(sleepy_registry, max_workers=1, default_timeout=5.0)
+        assert executor.execute([_call("hangs", "c1", delay=0.5)])[0].status == "timeout"
+
+        start = time.monotonic()
+        outcome = executor.execute([_call("slow_a", "c2", delay=0.01)])[0]
+        assert outcome.status == "busy"
+        assert outcome.result["status"] == "error"
+        assert time.monotonic() - start < 0.2
+
+        time.sleep(0.6)  # the hung call returns and frees its worker
+        assert executor.execute([_call("slow_a", "c3", delay=0.01)])[0].status == "success"
+
+    def test_default_timeout(self, sleepy_registry):
+        executor = ToolExecutor(sleepy_registry, default_timeout=0.05)
+        assert executor.timeout_for("slow_a") == 0.05
+        assert executor.timeout_for("hangs") == 0.05
+        outcomes = executor.execute([_call("slow_a", "c1", delay=1.0)])
+        assert outcomes[0].status == "timeout"
+
+    def test_timeout_works_off_main_thread(self, sleepy_registry):
+        executor = ToolExecutor(sleepy_registry)
+        box = {}
+
+        def worker():
+            box["outcomes"] = executor.execute([_call("hangs", "c1", delay=1.0)])
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join(timeout=2)
+        assert box["outcomes"][0].status == "timeout"
+
+    def test_errors_and_unknown_tools(self, sleepy_registry):
+        executor = ToolExecutor(sleepy_registry)
+        outcomes = executor.execute([
+            _call("broken", "c1", delay=0),
+            _call("missing_tool", "c2"),
+            _call("slow_a", "c3", wrong_arg=1),
+        ])
+        assert [o.status for o in outcomes] == ["error", "error", "error"]
+        assert "boom" in outcomes[0].result["error"]
+        assert "not found" in outcomes[1].result["error"]
+
+    def test_dispatches_through_call_tool(self, sleepy_registry):
+        executor = ToolExecutor(sleepy_registry)
+        outcomes = executor.execute([_call("slow_a", "c1", delay=0)])
+        # call_tool attaches execution metadata
+        assert outcomes[0].result["_metadata"]["tool_name"] == "slow_a"
+
+    def test_callbacks_fire_in_completion_order(self, sleepy_registry):
+        executor = ToolExecutor(sleepy_registry, max_workers=4)
+        started, finished = [], []
+        outcomes = executor.execute(
+            [
+                _call("slow_a", "c1", delay=0.15),
+                _call("slow_b", "c2", delay=0.01),
+            ],
+            on_start=lambda name, call_id, args: started.append(call_id),
+            on_finish=lambda outcome: finished.append(outcome.tool_call_id),
+        )
+        assert started == ["c1", "c2"]
+        assert finished == ["c2", "c1"]
+        assert [o.tool_call_id for o in outcomes] == ["c1", "c2"]
+
+    def test_invalid_max_workers(self, sleepy_registry):
+        with pytest.raises(ValueError):
+            ToolExecutor(sleepy_registry, max_workers=0)
+        with pytest.raises(ValueError):
+            ToolExecutor(sleepy_registry, max_calls_per_execute=0)
+
+
+class TestToolsNode:
+    """Tests for AgentWorkflow._tools_node with concurrent execution"""
+
+    def test_executor_pool_separate_from_turn_limit(self, sleepy_registry):
+        config = WorkflowConfig(max_tool_calls_per_turn=3, tool_pool_workers=12)
+        executor = AgentWorkflow(sleepy_registry, Mock(), config).tool_executor
+        assert executor.max_workers == 12
+        assert executor.max_calls_per_execute == 3
+
+    def test_tool_messages_in_call_order(self, sleepy_registry):
+        config = WorkflowConfig(max_tool_calls_per_turn=5, tool_timeout_seconds=1.0)
+        workflow = AgentWorkflow(sleepy_registry, Mock(), config)
+
+        state = create_initial_state("conv-1")
+        state["messages"] = [
+            HumanMessage(content="run tools"),
+            AIMessage(content="", additional_kwargs={"tool_calls": [
+                _call("slow_a", "c1", delay=0.1),
+                _call("hangs", "c2", delay=1.0),
+                _call("slow_b", "c3", delay=0.0),
+            ]}),
+        ]
+
+        result = workflow._tools_node(state)
+
+        messages = result["messages"]
+        assert all(isinstance(m, ToolMessage) for m in messages)
+        assert [m.tool_call_id for m in messages] == ["c1", "c2", "c3"]
+        assert "[slow_a RESULT]: a" == messages[0].content
+        assert "timed out" in messages[1].content
+        assert [r["status"] for r in result["tool_results"]] == ["success", "timeout", "success"]
+        assert result["total_tool_calls"] == 3
+        assert result["next_action"] == "validate"
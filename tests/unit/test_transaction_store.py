@@ -0,0 +1,264 @@
+"""
+Unit tests for the columnar bank transaction store.
+
+BankService responses are compared against the previous list-scan
+implementation (kept here as the reference) over randomized queries.
+"""
+
+import asyncio
+import csv
+import random
+from collections import defaultdict
+
+import pytest
+
+from dashboard_service.bank_service import BankService
+from dashboard_service.transaction_store import TransactionStore
+
+DESCRIPTIONS = [
+    "TIM HORTONS #1234 TORONTO ON",
+    "AMAZON.CA*AB12 WWW.AMAZON.CA",
+    "UBER CANADA/UBERTRIP TORONTO",
+    "LOBLAWS 1012",
+    "PAYMENT THANK YOU",
+    "NETFLIX.COM",
+    "SHELL C12345",
+    "STARBUCKS 0422",
+    "E-TRANSFER SENT",
+    "ROGERS *WIRELESS",
+]
+
+
+def write_bank_csvs(directory, n_rows: int, seed: int = 7) -> None:
+    """Write synthetic CIBC credit and chequing exports."""
+    rng = random.Random(seed)
+    for filename, card in (("cibc_credit.csv", "4500********1234"), ("cibc_chq.csv", "")):
+        with open(directory / filename, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["Date", "Description", "Amount", "Payment", "Card"])
+            for i in range(n_rows // 2):
+                date = f"20{rng.randint(21, 24)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+                amount = f"{rng.choice([5, 12.5, 20]) if rng.random() < 0.2 else rng.uniform(1, 900):.2f}"
+                debit = rng.random() < 0.85
+                writer.writerow([
+                    date,
+                    f"{rng.choice(DESCRIPTIONS)} {i % 97}",
+                    amount if debit else "",
+                    "" if debit else amount,
+                    card,
+                ])
+
+
+# -- reference: the list-scan implementation the store replaces --------------
+
+def _ref_filter(txns, category=None, account=None, date_from=None, date_to=None,
+                amount_min=None, amount_max=None, search=None):
+    filtered = txns
+    if category:
+        filtered = [t for t in filtered if t["spending_category"].lower() == category.lower()]
+    if account:
+        filtered = [
+            t for t in filtered
+            if account.lower() in t.get("account_type", "").lower()
+            or account.lower() in t.get("account_id", "").lower()
+        ]
+    if date_from:
+        filtered = [t for t in filtered if t["timestamp"] >= date_from]
+    if date_to:
+        date_to_end = date_to + "T23:59:59" if "T" not in date_to else date_to
+        filtered = [t for t in filtered if t["timestamp"] <= date_to_end]
+    if amount_min is not None:
+        filtered = [t for t in filtered if t["amount"] >= amount_min]
+    if amount_max is not None:
+        filtered = [t for t in filtered if t["amount"] <= amount_max]
+    if search:
+        search_lower = search.lower()
+        filtered = [
+            t for t in filtered
+            if search_lower in t.get("merchant", "").lower()
+            or search_lower in t.get("description", "").lower()
+            or search_lower in t.get("spending_category", "").lower()
+        ]
+    return filtered
+
+
+def ref_transactions(txns, sort=None, sort_dir="desc", page=1, per_page=50, **filters):
+    filtered = _ref_filter(txns, **filters)
+    if sort:
+        sort_key_map = {
+            "timestamp": lambda t: t.get("timestamp", ""),
+            "merchant": lambda t: t.get("merchant", "").lower(),
+            "description": lambda t: t.get("description", "").lower(),
+            "amount": lambda t: t.get("amount", 0),
+            "category": lambda t: t.get("spending_category", "").lower(),
+        }
+        key_fn = sort_key_map.get(sort, sort_key_map["timestamp"])
+        filtered = sorted(filtered, key=key_fn, reverse=(sort_dir == "desc"))
+    total = len(filtered)
+    start = (page - 1) * per_page
+    return {
+        "transactions": filtered[start:start + per_page],
+        "total": total,
+        "page": page,
+        "per_page": per_page,
+        "pages": (total + per_page - 1) // per_page if per_page > 0 else 0,
+    }
+
+
+def ref_summary(txns, group_by="category", **filters):
+    filtered = _ref_filter(txns, **filters)
+    groups = defaultdict(lambda: {"total": 0.0, "count": 0, "debits": 0.0, "credits": 0.0})
+    for txn in filtered:
+        if group_by == "company":
+            key = txn.get("merchant", "Other")
+        elif group_by == "month":
+            key = txn["timestamp"][:7]
+        elif group_by == "year":
+            key = txn["timestamp"][:4]
+        else:
+            key = txn.get("spending_category", "Other")
+        groups[key]["count"] += 1
+        if txn.get("is_debit", True):
+            groups[key]["debits"] += txn["amount"]
+            groups[key]["total"] += txn["amount"]
+        else:
+            groups[key]["credits"] += txn["amount"]
+    sorted_groups = sorted(groups.items(), key=lambda x: x[1]["total"], reverse=True)
+    return {
+        "group_by": group_by,
+        "groups": [
+            {
+                "name": name,
+                "total": round(data["total"], 2),
+                "debits": round(data["debits"], 2),
+                "credits": round(data["credits"], 2),
+                "count": data["count"],
+            }
+            for name, data in sorted_groups
+        ],
+        "total_transactions": len(filtered),
+    }
+
+
+def ref_search(txns, query, limit=50):
+    q = query.lower()
+    matches = [
+        t for t in txns
+        if q in t.get("merchant", "").lower()
+        or q in t.get("description", "").lower()
+        or q in t.get("spending_category", "").lower()
+        or q in t.get("parent_company", "").lower()
+    ]
+    return {"query": query, "results": matches[:limit], "total": len(matches)}
+
+
+# -- fixtures -----------------------------------------------------------------
+
+@pytest.fixture(scope="module")
+def service(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("bank")
+    write_bank_csvs(directory, 3000)
+    service = BankService(data_dir=str(directory))
+    asyncio.run(service._ensure_loaded())
+    assert len(service._transactions) > 2000
+    return service
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def random_filters(rng, txns):
+    categories = sorted({t["spending_category"] for t in txns})
+    filters = {}
+    if rng.random() < 0.4:
+        filters["category"] = rng.choice(categories + ["nope"]).swapcase()
+    if rng.random() < 0.3:
+        filters["account"] = rng.choice(["credit", "CHQ", "1234", "zzz"])
+    if rng.random() < 0.5:
+        filters["date_from"] = rng.choice(["2022-03-15", "2023", "2022-07-01T00:00:00", "2030-01-01"])
+    if rng.random() < 0.5:
+        filters["date_to"] = rng.choice(["2023-06-30", "2024-02", "2022-01-05", "2023-11-11T12:00:00"])
+    if rng.random() < 0.3:
+        filters["amount_min"] = rng.choice([0, 5.0, 12.5, 100.0])
+    if rng.random() < 0.3:
+        filters["amount_max"] = rng.choice([5.0, 20.0, 400.0, 1.0])
+    if rng.random() < 0.3:
+        filters["search"] = rng.choice(["tim", "AMAZON", "1", "payment", "xyz"])
+    return filters
+
+
+class TestIdenticalResponses:
+    def test_transactions_match_reference(self, service):
+        rng = random.Random(1)
+        txns = service._transactions
+        for _ in range(200):
+            kwargs = random_filters(rng, txns)
+            kwargs["sort"] = rng.choice([None, "timestamp", "merchant", "description",
+                                         "amount", "category", "bogus"])
+            kwargs["sort_dir"] = rng.choice(["asc", "desc"])
+            kwargs["page"] = rng.choice([1, 2, 7])
+            kwargs["per_page"] = rng.choice([1, 50, 500])
+            assert run(service.get_transactions(**kwargs)) == ref_transactions(txns, **kwargs), kwargs
+
+    def test_summary_matches_reference(self, service):
+        rng = random.Random(2)
+        txns = service._transactions
+        for _ in range(150):
+            kwargs = random_filters(rng, txns)
+            kwargs.pop("amount_min", None)
+            kwargs.pop("amount_max", None)
+            if rng.random() < 0.5:
+                # Exercise the precomputed period path
+                kwargs = {k: v for k, v in kwargs.items() if k.startswith("date")}
+            kwargs["group_by"] = rng.choice(["category", "company", "month", "year", "other"])
+            assert run(service.get_summary(**kwargs)) == ref_summary(txns, **kwargs), kwargs
+
+    def test_categories_match_reference(self, service):
+        expected = [
+            {"name": g["name"], "total": g["total"], "count": g["count"]}
+            for g in ref_summary(service._transactions)["groups"]
+        ]
+        assert run(service.get_categories()) == {"categories": expected}
+
+    @pytest.mark.parametrize("query,limit", [("tim", 50), ("", 10), ("other", 200), ("nomatch", 5)])
+    def test_search_matches_reference(self, service, query, limit):
+        assert run(service.search(query, limit)) == ref_search(service._transactions, query, limit)
+
+
+class TestStore:
+    def test_unsorted_base_order(self, service):
+        """Date filters stay exact when rows are not loaded newest-first."""
+        rows = list(service._transactions)
+        random.Random(3).shuffle(rows)
+        store = TransactionStore(rows)
+        assert not store._dates_descending
+
+        selected = store.select(date_from="2022-05-01", date_to="2023-01-31", search="a")
+        expected = _ref_filter(rows, date_from="2022-05-01", date_to="2023-01-31", search="a")
+        assert [rows[r] for r in selected] == expected
+
+    def test_missing_merchant_grouped_as_other(self):
+        rows = [
+            {"timestamp": "2024-01-02", "amount": 5.0, "merchant": "Tim Hortons",
+             "description": "TIM HORTONS #1", "spending_category": "Food"},
+            {"timestamp": "2024-01-01", "amount": 7.0,
+             "description": "E-TRANSFER SENT", "spending_category": "Transfers"},
+        ]
+        store = TransactionStore(rows)
+
+        groups, count = store.summarize("company")
+        assert [g[0] for g in groups] == [g["name"] for g in ref_summary(rows, "company")["groups"]]
+        assert [g[0] for g in groups] == ["Other", "Tim Hortons"]
+        # The label is not merchant text: searching for it does not match the row
+        assert [rows[r] for r in store.select(search="other")] == _ref_filter(rows, search="other")
+
+    def test_empty_store(self):
+        store = TransactionStore([])
+        assert list(store.select(category="x", date_from="2024")) == []
+        assert store.summarize("month", date_from="2024") == ([], 0)
+        assert store.search("a", 10) == ([], 0)
+
+    def test_reload_rebuilds_store(self, service):
+        count = run(service.reload())
+        assert count == len(service._store)
@@ -29,6 +29,7 @@ Example:
 from .base import BaseTool, ToolResult, ToolError, ToolCallable
 from .registry import LocalToolRegistry
 from .circuit_breaker import CircuitBreaker
+from .executor import ToolExecutor, ToolCallOutcome
 from .decorators import (
     tool,
     mcp_tool,
@@ -50,6 +51,10 @@ __all__ = [
     # Circuit breaker
     "CircuitBreaker",
     
+    # Concurrent execution
+    "ToolExecutor",
+    "ToolCallOutcome",
+    
     # Decorators
     "tool",
     "mcp_tool",
@@ -0,0 +1,294 @@
+"""
+Bounded concurrent tool executor.
+
+Dispatches the independent tool calls of a single agent turn through
+LocalToolRegistry.call_tool on a shared thread pool, so a turn that hits
+several I/O-bound tools waits for the slowest one instead of their sum.
+The pool serves every concurrent turn; each execute() call is separately
+limited in how many of its calls run at once.
+
+Timeouts are enforced by waiting on futures rather than with SIGALRM, so
+they work from any thread (gRPC handlers never run on the main thread).
+A call's timeout starts when a worker picks it up, not when it is queued.
+Results are always returned in the order the calls were requested.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ToolCallOutcome:
+    """
+    Result of a single tool call dispatched by ToolExecutor.
+
+    Attributes:
+        tool_name: Name of the executed tool
+        tool_call_id: ID from the originating tool call (for ToolMessage)
+        status: "success", "error", "timeout" or "busy" (never started: every
+            worker is held by a timed-out call that is still running)
+        result: Standardized result dict with "status" key
+        latency_ms: Wall time from start to completion (or timeout); for
+            "busy", time spent queued
+    """
+
+    tool_name: str
+    tool_call_id: str
+    status: str
+    result: Dict[str, Any]
+    latency_ms: float
+
+
+@dataclass
+class _Dispatch:
+    """Bookkeeping for one submitted call; started_at is set by the worker."""
+
+    index: int
+    tool_name: str
+    tool_call_id: str
+    timeout: Optional[float]
+    submitted_at: float
+    started_at: Optional[float] = None
+
+    @property
+    def deadline(self) -> Optional[float]:
+        if self.timeout is None or self.started_at is None:
+            return None
+        return self.started_at + self.timeout
+
+
+# Poll interval while calls wait for a worker (their start is not a future event)
+_QUEUED_POLL_S = 0.01
+
+
+class ToolExecutor:
+    """
+    Runs batches of tool calls concurrently with per-tool timeouts.
+
+    The pool is bounded by max_workers and shared across turns (and across
+    concurrent requests); max_calls_per_execute bounds how many workers a
+    single execute() call occupies at once, so one turn cannot take the
+    whole pool. Calls beyond that limit start as earlier ones finish. A call that
+    exceeds its timeout is reported as status="timeout"; its worker thread
+    cannot be interrupted and finishes in the background, but its result is
+    discarded. The timeout counts from when the call starts running, so
+    time spent queued behind other calls is not charged to it. While every
+    worker is held by such a timed-out call, queued calls are reported as
+    status="busy" at once instead of waiting for a worker.
+
+    Per-tool timeouts come from the registry's tool metadata
+    (``registry.register(func, timeout=10)``), falling back to
+    default_timeout.
+
+    Example:
+        >>> executor = ToolExecutor(registry, max_workers=4, default_timeout=30)
+        >>> outcomes = executor.execute([
+        ...     {"id": "call_1", "function": {"name": "web_search", "arguments": {"query": "x"}}},
+        ...     {"id": "call_2", "function": {"name": "math_solver", "arguments": {"expression": "2+2"}}},
+        ... ])
+        >>> [o.tool_call_id for o in outcomes]
+        ['call_1', 'call_2']
+    """
+
+    def __init__(
+        self,
+        registry,  # LocalToolRegistry
+        max_workers: int = 4,
+        default_timeout: Optional[float] = 30.0,
+        max_calls_per_execute: Optional[int] = None,
+    ):
+        """
+        Initialize executor.
+
+        Args:
+            registry: LocalToolRegistry used to dispatch calls
+            max_workers: Size of the shared pool (tools running at once
+                across all execute() calls)
+            default_timeout: Seconds before a call is reported as timed out
+                (None disables the timeout)
+            max_calls_per_execute: Calls of one execute() running at once
+                (None = up to max_workers)
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be >= 1")
+        if max_calls_per_execute is not None and max_calls_per_execute < 1:
+            raise ValueError("max_calls_per_execute must be >= 1")
+
+        self.registry = registry
+        self.max_workers = max_workers
+        self.max_calls_per_execute = max_calls_per_execute or max_workers
+        self.default_timeout = default_timeout
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self._stuck: Set[Future] = set()  # timed-out calls still holding a worker
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        """Lazily create the shared worker pool."""
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="tool-exec",
+                )
+            return self._pool
+
+    def timeout_for(self, tool_name: str) -> Optional[float]:
+        """
+        Resolve the timeout for a tool.
+
+        Args:
+            tool_name: Registered tool name
+
+        Returns:
+            Timeout in seconds, or None for no timeout
+        """
+        metadata = getattr(self.registry, "tool_metadata", {}).get(tool_name, {})
+        return metadata.get("timeout_seconds", self.default_timeout)
+
+    def execute(
+        self,
+        tool_calls: List[Dict[str, Any]],
+        on_start: Optional[Callable[[str, str, Dict[str, Any]], None]] = None,
+        on_finish: Optional[Callable[[ToolCallOutcome], None]] = None,
+    ) -> List[ToolCallOutcome]:
+        """
+        Execute tool calls concurrently (at most max_calls_per_execute at once).
+
+        Args:
+            tool_calls: OpenAI-style tool calls
+                ({"id": ..., "function": {"name": ..., "arguments": {...}}})
+            on_start: Optional callback(tool_name, tool_call_id, arguments)
+                invoked as each call is submitted to the pool
+            on_finish: Optional callback(outcome) invoked as each call
+                completes or times out (completion order)
+
+        Returns:
+            One ToolCallOutcome per call, in the same order as tool_calls
+        """
+        if not tool_calls:
+            return []
+
+        pool = self._get_pool()
+        waiting = deque(enumerate(tool_calls))  # not yet submitted (per-call limit)
+        pending: Dict[Future, _Dispatch] = {}
+
+        def submit_waiting() -> None:
+            while waiting and len(pending) < self.max_calls_per_execute:
+                index, tool_call = waiting.popleft()
+                tool_name = tool_call["function"]["name"]
+                tool_args = tool_call["function"].get("arguments") or {}
+                tool_call_id = tool_call.get("id", f"call_{tool_name}")
+
+                logger.debug("Tool %s called with args: %r", tool_name, tool_args)
+                if on_start:
+                    on_start(tool_name, tool_call_id, tool_args)
+
+                dispatch = _Dispatch(
+                    index, tool_name, tool_call_id, self.timeout_for(tool_name), time.monotonic()
+                )
+                future = pool.submit(self._run, dispatch, tool_args)
+                pending[future] = dispatch
+
+        outcomes: List[Optional[ToolCallOutcome]] = [None] * len(tool_calls)
+
+        def finish(dispatch: _Dispatch, status: str, result: Dict[str, Any], since: float) -> None:
+            outcome = ToolCallOutcome(
+                tool_name=dispatch.tool_name,
+                tool_call_id=dispatch.tool_call_id,
+                status=status,
+                result=result,
+                latency_ms=(time.monotonic() - since) * 1000,
+            )
+            outcomes[dispatch.index] = outcome
+            if on_finish:
+                on_finish(outcome)
+
+        def busy(dispatch: _Dispatch) -> None:
+            logger.warning(f"Tool '{dispatch.tool_name}' not run: all workers busy")
+            finish(dispatch, "busy", {
+                "status": "error",
+                "error": f"Tool '{dispatch.tool_name}' not run: all tool workers are busy",
+            }, dispatch.submitted_at)
+
+        submit_waiting()
+        while pending:
+            if len(self._stuck) >= self.max_workers:
+                for future, dispatch in list(pending.items()):
+                    if dispatch.started_at is None and future.cancel():
+                        del pending[future]
+                        busy(dispatch)
+                while waiting:
+                    index, tool_call = waiting.popleft()
+                    tool_name = tool_call["function"]["name"]
+                    busy(_Dispatch(
+                        index, tool_name, tool_call.get("id", f"call_{tool_name}"),
+                        None, time.monotonic(),
+                    ))
+                if not pending:
+                    break
+
+            now = time.monotonic()
+            deadlines = [d.deadline for d in pending.values() if d.deadline is not None]
+            wait_for = max(0.0, min(deadlines) - now) if deadlines else None
+            if any(d.started_at is None for d in pending.values()):
+                wait_for = _QUEUED_POLL_S if wait_for is None else min(wait_for, _QUEUED_POLL_S)
+
+            done, _ = wait(list(pending), timeout=wait_for, return_when=FIRST_COMPLETED)
+            now = time.monotonic()
+
+            for future in list(pending):
+                dispatch = pending[future]
+                if future in done:
+                    del pending[future]
+                    result = future.result()
+                    status = "error" if result.get("status") == "error" else "success"
+                    finish(dispatch, status, result, dispatch.started_at)
+                elif dispatch.deadline is not None and now >= dispatch.deadline:
+                    del pending[future]
+                    if not future.cancel():
+                        self._mark_stuck(future)
+                    logger.warning(f"Tool '{dispatch.tool_name}' timed out after {dispatch.timeout}s")
+                    finish(dispatch, "timeout", {
+                        "status": "error",
+                        "error": f"Tool '{dispatch.tool_name}' timed out after {dispatch.timeout}s",
+                    }, dispatch.started_at)
+            submit_waiting()
+
+        return outcomes
+
+    def _mark_stuck(self, future: Future) -> None:
+        """Count a timed-out call's worker as held until the call returns."""
+        with self._pool_lock:
+            self._stuck.add(future)
+
+        def release(done: Future) -> None:
+            with self._pool_lock:
+                self._stuck.discard(done)
+
+        future.add_done_callback(release)
+
+    def _run(self, dispatch: _Dispatch, tool_args: Dict[str, Any]) -> Dict[str, Any]:
+        """Worker entry point: dispatch through the registry."""
+        dispatch.started_at = time.monotonic()
+        tool_name = dispatch.tool_name
+        try:
+            return self.registry.call_tool(tool_name, **tool_args)
+        except Exception as e:
+            # call_tool already catches tool errors; this guards bad arguments
+            logger.error(f"Tool {tool_name} error: {e}", exc_info=True)
+            return {"status": "error", "error": str(e)}
+
+    def shutdown(self, wait: bool = False):
+        """Release the worker pool."""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=wait, cancel_futures=True)
+                self._pool = None
+                self._stuck.clear()
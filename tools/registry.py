@@ -71,7 +71,8 @@ class LocalToolRegistry:
         func: Optional[Callable] = None,
         *,
         name: Optional[str] = None,
-        description: Optional[str] = None
+        description: Optional[str] = None,
+        timeout: Optional[float] = None
     ):
         """
         Decorator for registering Python functions as tools.
@@ -83,6 +84,8 @@ class LocalToolRegistry:
             func: Function to register (when used as @register)
             name: Override tool name (default: function name)
             description: Override description (default: from docstring)
+            timeout: Per-tool timeout in seconds used by ToolExecutor
+                (default: executor's default_timeout)
         
         Returns:
             Decorated function or decorator
@@ -113,6 +116,8 @@ class LocalToolRegistry:
                     "type": "function",
                     "registered_at": datetime.now().isoformat()
                 }
+                if timeout is not None:
+                    self.tool_metadata[tool_name]["timeout_seconds"] = timeout
                 
                 logger.info(
                     f"Registered function tool '{tool_name}' with "
@@ -311,7 +316,41 @@ class LocalToolRegistry:
                 })
         
         return openai_tools
-    
+
+    def tool_call_schema(self, tool_name: str, envelope: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        JSON schema for a call to one tool, for schema-constrained generation.
+
+        Args:
+            tool_name: Registered tool name
+            envelope: Wrap the arguments in the orchestrator's tool-call
+                format ({"type": "tool_call", "tool": ..., "arguments": {...}});
+                False returns the arguments schema alone
+
+        Returns:
+            JSON schema dictionary, or None if the tool is not registered
+
+        Example:
+            >>> llm_client.generate(prompt, json_schema=registry.tool_call_schema("web_search"))
+        """
+        schema = self.schemas.get(tool_name)
+        if schema is None:
+            return None
+
+        arguments = schema.get("parameters", {"type": "object", "properties": {}, "required": []})
+        if not envelope:
+            return arguments
+
+        return {
+            "type": "object",
+            "properties": {
+                "type": {"const": "tool_call"},
+                "tool": {"const": tool_name},
+                "arguments": arguments,
+            },
+            "required": ["type", "tool", "arguments"],
+        }
+
     def _extract_schema(
         self,
         func: Callable,